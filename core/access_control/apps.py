@@ -4,3 +4,6 @@ class AccessControlConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'access_control'
     verbose_name = 'Access Control'
+
+    def ready(self):
+        import access_control.signals
@@ -7,11 +7,14 @@ def access_control(request):
     Add access control utilities to template context
     """
     if request.user.is_authenticated:
+        from core.request_cache import get_request_available_apps
         from .controller import UnifiedAccessController
-        from .utils import get_user_available_apps, check_user_access
+        from .utils import check_user_access
         
+        # Both lambdas answer from the user's compiled permission set, and the
+        # available apps are resolved once per request
         return {
-            'user_available_apps': get_user_available_apps(request.user),
+            'user_available_apps': get_request_available_apps(request),
             'has_access': lambda resource_key, action='access': check_user_access(
                 request.user, resource_key, action
             ),
@@ -20,9 +23,9 @@ def access_control(request):
                 request.user, resource_key, action
             ),
             'user_permissions_summary': lambda: {
-                'permissions': [perm['key'] for perm in get_user_available_apps(request.user)]
+                'permissions': [perm['key'] for perm in get_request_available_apps(request)]
             },
-            'all_user_permissions': lambda: get_user_available_apps(request.user)
+            'all_user_permissions': lambda: get_request_available_apps(request)
         }
     
-    return {}
\ No newline at end of file
+    return {}
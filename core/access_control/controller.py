@@ -1,9 +1,9 @@
 from django.contrib.auth.models import Permission
 from .models import AccessControl, TenantAccessControl, RoleAccessControl, UserAccessControl
 from django.db.models import Q
-from django.core.cache import cache
 import logging
 from billing.plan_access_service import PlanAccessService
+from .permission_set import get_permission_set, invalidate_permission_sets
 
 logger = logging.getLogger(__name__)
 
@@ -17,25 +17,16 @@ class UnifiedAccessController:
         """
         Check if user has access to a resource with a specific action
         """
-        cache_key = f"access_{user.id}_{resource_key}_{action}"
-        cached_result = cache.get(cache_key)
-        if cached_result is not None:
-            return cached_result
-
         # Check system-level permissions first
         if user.is_superuser:
-            result = True
-        else:
-            # Check direct Django permissions
-            if cls._has_django_permission(user, resource_key, action):
-                result = True
-            else:
-                # Check unified access controls
-                result = cls._has_unified_access(user, resource_key, action)
-        
-        # Cache for 5 minutes (300 seconds)
-        cache.set(cache_key, result, 300)
-        return result
+            return True
+
+        # Check direct Django permissions
+        if cls._has_django_permission(user, resource_key, action):
+            return True
+
+        # Check unified access controls against the compiled permission set
+        return get_permission_set(user).has_access(resource_key)
     
     @classmethod
     def has_access_with_reason(cls, user, resource_key, action='access'):
@@ -281,76 +272,14 @@ class UnifiedAccessController:
         return False, ["No permission found"]
     
     @classmethod
-  
     def get_available_resources(cls, user):
         """
         Get list of resources available to user
         """
-        available = []
-        
         if not user.tenant:
-            return available
+            return []
+        return list(get_permission_set(user).available_resources)
 
-        # Get Tenant Entitlements/Features
-        tenant_assignments = TenantAccessControl.objects.filter(
-            tenant=user.tenant,
-            is_enabled=True
-        ).select_related('access_control')
-        
-        for assign in tenant_assignments:
-            ac = assign.access_control
-            if ac.access_type in ['entitlement', 'feature_flag']:
-                # Extract base key (e.g., 'leads.entitlement' -> 'leads')
-                # This ensures keys match the app IDs in AVAILABLE_APPS
-                base_key = ac.key.rsplit('.', 1)[0] if '.' in ac.key else ac.key
-                available.append({
-                        'key': base_key,
-                        'name': ac.name,
-                        'description': ac.description
-                })
-
-        # ALSO check permissions assigned to user's role
-        if user.role:
-            # Get role hierarchy permissions
-            current_role = user.role
-            while current_role:
-                role_assignments = RoleAccessControl.objects.filter(
-                    role=current_role,
-                    is_enabled=True
-                ).select_related('access_control')
-                
-                for assign in role_assignments:
-                    ac = assign.access_control
-                    if ac.access_type == 'permission':
-                        base_key = ac.key.rsplit('.', 1)[0] if '.' in ac.key else ac.key
-                        # Only add if not already in available list
-                        if not any(item['key'] == base_key for item in available):
-                            available.append({
-                                'key': base_key,
-                                'name': ac.name,
-                                'description': ac.description
-                            })
-                current_role = current_role.parent
-
-        # ALSO check direct user permissions
-        user_assignments = UserAccessControl.objects.filter(
-            user=user,
-            is_enabled=True
-        ).select_related('access_control')
-
-        for assign in user_assignments:
-            ac = assign.access_control
-            if ac.access_type == 'permission':
-                base_key = ac.key.rsplit('.', 1)[0] if '.' in ac.key else ac.key
-                # Only add if not already in available list
-                if not any(item['key'] == base_key for item in available):
-                    available.append({
-                        'key': base_key,
-                        'name': ac.name,
-                        'description': ac.description
-                    })
-
-        return available
     @classmethod
     def grant_access(cls, user, resource_key, access_type='permission', scope_type='user', **kwargs):
         """
@@ -372,8 +301,13 @@ class UnifiedAccessController:
         elif scope_type == 'tenant' and kwargs.get('tenant'):
             TenantAccessControl.objects.create(tenant=kwargs.get('tenant'), access_control=access_def, is_enabled=True)
 
-        # Clear cache
-        cache.delete_pattern(f"access_{user.id}_*_*")
+        # Invalidate compiled permission sets for the affected scope
+        if scope_type == 'user':
+            invalidate_permission_sets(user.tenant_id, user=user)
+        elif scope_type == 'tenant' and kwargs.get('tenant'):
+            invalidate_permission_sets(kwargs.get('tenant').pk, user=user)
+        else:
+            invalidate_permission_sets(user=user)
         
         return access_def
 
@@ -389,7 +323,7 @@ class UnifiedAccessController:
                 UserAccessControl.objects.filter(user=user, access_control=access_def).delete()
             # ... implement others
             
-            cache.delete_pattern(f"access_{user.id}_*_*")
+            invalidate_permission_sets(user.tenant_id, user=user)
             return True
         except AccessControl.DoesNotExist:
             return False
\ No newline at end of file
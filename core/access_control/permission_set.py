@@ -0,0 +1,227 @@
+"""
+Compiled Permission Sets for the Unified Access Controller
+
+Resolves everything UnifiedAccessController needs for one (user, tenant, role)
+in a handful of bulk queries:
+- Access control definitions (key -> access type)
+- Tenant entitlements, feature flags and cascaded permissions
+- Permissions granted along the whole role-parent chain
+- Direct user grants
+- The billing-module fallback for the tenant's plan
+
+The compiled set is cached under generation stamps that are bumped whenever
+assignments change, so has_access() reduces to set lookups.
+"""
+import logging
+from typing import Dict, Any, List, Optional, Set
+
+from django.core.cache import cache
+
+from core.cache_versions import bump_version, get_versions
+
+logger = logging.getLogger(__name__)
+
+CACHE_PREFIX = 'access_perms:'
+CACHE_TTL = 3600
+GLOBAL_GENERATION = 'access_control'
+
+
+def _tenant_generation(tenant_id) -> str:
+    return f"access_control:tenant:{tenant_id}"
+
+
+def _base_key(key: str) -> str:
+    """Extract the app key (e.g. 'leads.entitlement' -> 'leads')."""
+    return key.rsplit('.', 1)[0] if '.' in key else key
+
+
+class PermissionSet:
+    """
+    Immutable, picklable snapshot of a user's effective access.
+
+    Usage:
+        from access_control.permission_set import get_permission_set
+
+        permissions = get_permission_set(request.user)
+        permissions.has_access('leads.view')
+    """
+
+    def __init__(self, definitions: Dict[str, str], tenant_keys: Set[str],
+                 role_keys: Set[str], user_keys: Set[str], has_tenant: bool,
+                 has_role: bool, billing_enabled: bool,
+                 available_resources: List[Dict[str, Any]]):
+        self.definitions = definitions
+        self.tenant_keys = frozenset(tenant_keys)
+        self.role_keys = frozenset(role_keys)
+        self.user_keys = frozenset(user_keys)
+        self.has_tenant = has_tenant
+        self.has_role = has_role
+        self.billing_enabled = billing_enabled
+        self.available_resources = available_resources
+
+    def has_access(self, resource_key: str) -> bool:
+        """Mirror UnifiedAccessController._has_unified_access without queries."""
+        access_type = self.definitions.get(resource_key)
+        if access_type is None:
+            return False
+
+        if self.has_tenant and access_type in ('entitlement', 'feature_flag'):
+            return resource_key in self.tenant_keys
+
+        if access_type == 'permission':
+            if resource_key in self.user_keys:
+                return True
+            if self.has_role and self.has_tenant and resource_key in self.role_keys:
+                return True
+            if self.has_tenant and resource_key in self.tenant_keys:
+                return True
+
+        # Billing keys fall back to the plan's billing module, except admin config keys
+        if resource_key.startswith('billing.') and self.has_tenant and '.admin.' not in resource_key:
+            return self.billing_enabled
+
+        return False
+
+
+def compile_permission_set(user) -> PermissionSet:
+    """Build a PermissionSet for a user from the database."""
+    from .models import AccessControl, TenantAccessControl, RoleAccessControl, UserAccessControl
+    from .role_models import Role
+
+    tenant_id = user.tenant_id
+    role_id = user.role_id
+
+    definitions = dict(AccessControl.objects.values_list('key', 'access_type'))
+    descriptions = {}
+
+    def collect(assignments):
+        keys = set()
+        for key, access_type, name, description in assignments:
+            keys.add(key)
+            descriptions[key] = (access_type, name, description)
+        return keys
+
+    fields = ('access_control__key', 'access_control__access_type',
+              'access_control__name', 'access_control__description')
+
+    tenant_keys = set()
+    if tenant_id:
+        tenant_keys = collect(TenantAccessControl.objects.filter(
+            tenant_id=tenant_id, is_enabled=True
+        ).values_list(*fields))
+
+    role_chain = _resolve_role_chain(Role, role_id, tenant_id)
+    role_keys = set()
+    if role_chain:
+        role_assignments = RoleAccessControl.objects.filter(
+            role_id__in=role_chain, is_enabled=True
+        ).values_list('role_id', *fields)
+        by_role = {}
+        for assignment_role_id, *assignment in role_assignments:
+            by_role.setdefault(assignment_role_id, []).append(tuple(assignment))
+        # Collect in chain order, child role first
+        for chain_role_id in role_chain:
+            role_keys |= collect(by_role.get(chain_role_id, []))
+
+    user_keys = collect(UserAccessControl.objects.filter(
+        user_id=user.pk, is_enabled=True
+    ).values_list(*fields))
+
+    billing_enabled = False
+    if tenant_id and user.tenant.plan_id:
+        from billing.plan_access_service import PlanAccessService
+        billing_enabled = PlanAccessService.get_module_access(user.tenant.plan, 'billing')
+
+    available = []
+    if tenant_id:
+        seen = set()
+        ordered = (
+            [(key, ('entitlement', 'feature_flag')) for key in _ordered(tenant_keys, descriptions)] +
+            [(key, ('permission',)) for key in _ordered(role_keys, descriptions)] +
+            [(key, ('permission',)) for key in _ordered(user_keys, descriptions)]
+        )
+        for key, types in ordered:
+            access_type, name, description = descriptions[key]
+            base_key = _base_key(key)
+            if access_type in types and base_key not in seen:
+                seen.add(base_key)
+                available.append({'key': base_key, 'name': name, 'description': description})
+
+    return PermissionSet(
+        definitions=definitions,
+        tenant_keys=tenant_keys,
+        role_keys=role_keys,
+        user_keys=user_keys,
+        has_tenant=bool(tenant_id),
+        has_role=bool(role_id),
+        billing_enabled=billing_enabled,
+        available_resources=available,
+    )
+
+
+def _ordered(keys: Set[str], descriptions: Dict[str, tuple]) -> List[str]:
+    # Dict insertion order follows query order, which keeps listings stable
+    return [key for key in descriptions if key in keys]
+
+
+def _resolve_role_chain(Role, role_id: Optional[int], tenant_id: Optional[int]) -> List[int]:
+    """Return [role, parent, grandparent, ...] ids, loading the candidates in one query."""
+    if not role_id:
+        return []
+
+    from django.db.models import Q
+    parents = dict(
+        Role.objects.filter(Q(tenant_id=tenant_id) | Q(tenant__isnull=True) | Q(pk=role_id))
+        .values_list('pk', 'parent_id')
+    )
+
+    chain = []
+    current = role_id
+    while current and current not in chain:
+        chain.append(current)
+        if current not in parents:
+            # Parent lives outside the preloaded scope; fetch it directly
+            parents.update(Role.objects.filter(pk=current).values_list('pk', 'parent_id'))
+        current = parents.get(current)
+    return chain
+
+
+def _cache_key(user, versions: Dict[str, int]) -> str:
+    return (
+        f"{CACHE_PREFIX}{user.pk}:{user.tenant_id}:{user.role_id}:"
+        f"{versions[GLOBAL_GENERATION]}:{versions[_tenant_generation(user.tenant_id)]}"
+    )
+
+
+def get_permission_set(user) -> PermissionSet:
+    """
+    Get the compiled permission set for a user.
+
+    The set is memoised on the user instance for the rest of the request and
+    shared across workers through the cache.
+    """
+    permission_set = getattr(user, '_compiled_permission_set', None)
+    if permission_set is not None:
+        return permission_set
+
+    versions = get_versions([GLOBAL_GENERATION, _tenant_generation(user.tenant_id)])
+    key = _cache_key(user, versions)
+    permission_set = cache.get(key)
+    if permission_set is None:
+        permission_set = compile_permission_set(user)
+        cache.set(key, permission_set, CACHE_TTL)
+
+    user._compiled_permission_set = permission_set
+    return permission_set
+
+
+def invalidate_permission_sets(tenant_id=None, user=None) -> None:
+    """
+    Invalidate compiled permission sets.
+
+    Pass a tenant id to invalidate one tenant, nothing to invalidate all
+    tenants. A user instance also drops its request-level memo.
+    """
+    if user is not None and hasattr(user, '_compiled_permission_set'):
+        del user._compiled_permission_set
+    bump_version(_tenant_generation(tenant_id) if tenant_id else GLOBAL_GENERATION)
@@ -0,0 +1,62 @@
+from django.core.exceptions import ObjectDoesNotExist
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from billing.models import Plan, PlanModuleAccess
+from tenants.models import Tenant
+from .models import AccessControl, TenantAccessControl, RoleAccessControl, UserAccessControl
+from .role_models import Role
+from .permission_set import invalidate_permission_sets
+
+
+def _related_tenant_id(instance, relation):
+    # The related row may already be gone during cascade deletes; fall back
+    # to invalidating every tenant in that case
+    try:
+        return getattr(instance, relation).tenant_id
+    except ObjectDoesNotExist:
+        return None
+
+
+@receiver(post_save, sender=TenantAccessControl)
+@receiver(post_delete, sender=TenantAccessControl)
+def invalidate_tenant_assignment(sender, instance, **kwargs):
+    """Tenant grants only affect users of that tenant"""
+    invalidate_permission_sets(instance.tenant_id)
+
+
+@receiver(post_save, sender=UserAccessControl)
+@receiver(post_delete, sender=UserAccessControl)
+def invalidate_user_assignment(sender, instance, **kwargs):
+    """User grants are compiled into the user's tenant generation"""
+    invalidate_permission_sets(_related_tenant_id(instance, 'user'))
+
+
+@receiver(post_save, sender=RoleAccessControl)
+@receiver(post_delete, sender=RoleAccessControl)
+def invalidate_role_assignment(sender, instance, **kwargs):
+    """Child roles inherit grants, so system roles invalidate every tenant"""
+    invalidate_permission_sets(_related_tenant_id(instance, 'role'))
+
+
+@receiver(post_save, sender=Role)
+@receiver(post_delete, sender=Role)
+def invalidate_role_hierarchy(sender, instance, **kwargs):
+    """Re-parenting a role changes the inherited permissions of its subtree"""
+    invalidate_permission_sets(instance.tenant_id)
+
+
+@receiver(post_save, sender=Tenant)
+def invalidate_tenant_plan(sender, instance, created, **kwargs):
+    """The billing fallback depends on the tenant's plan"""
+    if not created:
+        invalidate_permission_sets(instance.pk)
+
+
+@receiver(post_save, sender=AccessControl)
+@receiver(post_delete, sender=AccessControl)
+@receiver(post_save, sender=Plan)
+@receiver(post_save, sender=PlanModuleAccess)
+@receiver(post_delete, sender=PlanModuleAccess)
+def invalidate_all_permission_sets(sender, instance, **kwargs):
+    """Definitions and plan modules are shared across tenants"""
+    invalidate_permission_sets()
@@ -0,0 +1,94 @@
+from unittest import mock
+
+from django.core.cache import cache, caches
+from django.test import TestCase
+from core.models import User
+from tenants.models import Tenant
+from access_control.models import AccessControl, TenantAccessControl, RoleAccessControl
+from access_control.role_models import Role
+from access_control.controller import UnifiedAccessController
+from access_control.permission_set import get_permission_set
+
+
+class CompiledPermissionSetTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.tenant = Tenant.objects.create(name="Perm Tenant", slug="perm-tenant")
+        self.parent_role = Role.objects.create(name="Manager", tenant=self.tenant)
+        self.role = Role.objects.create(name="Rep", tenant=self.tenant, parent=self.parent_role)
+        self.user = User.objects.create_user(
+            username="rep", email="rep@example.com", password="password",
+            tenant=self.tenant, role=self.role
+        )
+
+        self.entitlement = AccessControl.objects.create(
+            name="Leads", key="leads.entitlement", access_type="entitlement"
+        )
+        self.inherited = AccessControl.objects.create(
+            name="Reports", key="reports.view", access_type="permission"
+        )
+        TenantAccessControl.objects.create(tenant=self.tenant, access_control=self.entitlement)
+        RoleAccessControl.objects.create(role=self.parent_role, access_control=self.inherited)
+
+    def _fresh_user(self):
+        return User.objects.select_related('tenant').get(pk=self.user.pk)
+
+    def test_resolves_tenant_and_inherited_role_access(self):
+        user = self._fresh_user()
+        self.assertTrue(UnifiedAccessController.has_access(user, "leads.entitlement"))
+        self.assertTrue(UnifiedAccessController.has_access(user, "reports.view"))
+        self.assertFalse(UnifiedAccessController.has_access(user, "unknown.key"))
+
+    def test_repeated_checks_do_not_query(self):
+        user = self._fresh_user()
+        UnifiedAccessController.has_access(user, "reports.view")
+        with self.assertNumQueries(0):
+            for _ in range(20):
+                UnifiedAccessController.has_access(user, "reports.view")
+                UnifiedAccessController.has_access(user, "leads.entitlement")
+
+    def test_compiled_set_is_shared_through_cache(self):
+        get_permission_set(self._fresh_user())
+        user = self._fresh_user()
+        with self.assertNumQueries(0):
+            self.assertTrue(get_permission_set(user).has_access("reports.view"))
+
+    def test_grant_and_revoke_invalidate(self):
+        user = self._fresh_user()
+        self.assertFalse(UnifiedAccessController.has_access(user, "deals.edit"))
+
+        UnifiedAccessController.grant_access(user, "deals.edit", name="Edit deals")
+        self.assertTrue(UnifiedAccessController.has_access(user, "deals.edit"))
+        self.assertTrue(UnifiedAccessController.has_access(self._fresh_user(), "deals.edit"))
+
+        UnifiedAccessController.revoke_access(user, "deals.edit")
+        self.assertFalse(UnifiedAccessController.has_access(user, "deals.edit"))
+
+    def test_role_assignment_change_invalidates(self):
+        RoleAccessControl.objects.filter(role=self.parent_role).update(is_enabled=False)
+        # Queryset updates bypass signals; saving an assignment bumps the generation
+        assignment = RoleAccessControl.objects.get(role=self.parent_role)
+        assignment.save()
+        self.assertFalse(UnifiedAccessController.has_access(self._fresh_user(), "reports.view"))
+
+    def test_available_resources_are_deduplicated(self):
+        duplicate = AccessControl.objects.create(
+            name="Leads permission", key="leads.view", access_type="permission"
+        )
+        RoleAccessControl.objects.create(role=self.role, access_control=duplicate)
+
+        resources = UnifiedAccessController.get_available_resources(self._fresh_user())
+        self.assertEqual([r['key'] for r in resources], ['leads', 'reports'])
+
+    def test_revoke_in_another_process_invalidates(self):
+        user = self._fresh_user()
+        UnifiedAccessController.grant_access(user, "deals.edit", name="Edit deals")
+        self.assertTrue(get_permission_set(self._fresh_user()).has_access("deals.edit"))
+
+        # A second client stands in for another worker sharing the cache
+        other_worker = caches.create_connection('default')
+        with mock.patch('core.cache_versions.cache', other_worker), \
+                mock.patch('access_control.permission_set.cache', other_worker):
+            UnifiedAccessController.revoke_access(self._fresh_user(), "deals.edit")
+
+        self.assertFalse(get_permission_set(self._fresh_user()).has_access("deals.edit"))
@@ -0,0 +1,72 @@
+"""
+Convert the audit log table into monthly range partitions on PostgreSQL.
+
+The model is unchanged; only the physical table is rebuilt. The primary key
+becomes (id, audit_log_created_at) because PostgreSQL requires the partition
+key in every unique constraint. Other databases are left untouched.
+"""
+from django.db import migrations
+
+TABLE = 'audit_logs_auditlog'
+LEGACY = f'{TABLE}_legacy'
+
+
+def partition_audit_log(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor != 'postgresql':
+        return
+
+    from audit_logs.partitions import DEFAULT_PARTITION, ensure_partitions, is_partitioned
+    if is_partitioned(connection):
+        return
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT indexdef FROM pg_indexes WHERE tablename = %s AND indexname NOT IN ("
+            "SELECT conname FROM pg_constraint WHERE conrelid = %s::regclass AND contype = 'p')",
+            [TABLE, TABLE],
+        )
+        index_definitions = [row[0] for row in cursor.fetchall()]
+        cursor.execute(
+            "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint "
+            "WHERE conrelid = %s::regclass AND contype = 'f'",
+            [TABLE],
+        )
+        foreign_keys = cursor.fetchall()
+        cursor.execute(f'SELECT MIN(audit_log_created_at), MAX(id) FROM "{TABLE}"')
+        oldest, max_id = cursor.fetchone()
+
+        cursor.execute(f'ALTER TABLE "{TABLE}" RENAME TO "{LEGACY}"')
+        cursor.execute(
+            f'CREATE TABLE "{TABLE}" (LIKE "{LEGACY}" INCLUDING DEFAULTS INCLUDING IDENTITY) '
+            f'PARTITION BY RANGE (audit_log_created_at)'
+        )
+        cursor.execute(f'ALTER TABLE "{TABLE}" ADD PRIMARY KEY (id, audit_log_created_at)')
+        cursor.execute(f'CREATE TABLE "{DEFAULT_PARTITION}" PARTITION OF "{TABLE}" DEFAULT')
+
+    ensure_partitions(start=oldest, using=connection)
+
+    with connection.cursor() as cursor:
+        cursor.execute(f'INSERT INTO "{TABLE}" SELECT * FROM "{LEGACY}"')
+        cursor.execute(f'DROP TABLE "{LEGACY}"')
+        cursor.execute(
+            f"SELECT setval(pg_get_serial_sequence('\"{TABLE}\"', 'id'), %s, false)",
+            [(max_id or 0) + 1],
+        )
+        for definition in index_definitions:
+            cursor.execute(definition)
+        for name, definition in foreign_keys:
+            cursor.execute(f'ALTER TABLE "{TABLE}" ADD CONSTRAINT "{name}" {definition}')
+
+
+class Migration(migrations.Migration):
+
+    atomic = True
+
+    dependencies = [
+        ('audit_logs', '0003_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(partition_audit_log, migrations.RunPython.noop),
+    ]
@@ -96,6 +96,76 @@ class AuditLog(models.Model):
     def action_type(self, value):
         self.action = value
 
+    # Verb fragments of free-form action types (e.g. 'LEADS_CREATE', 'USER_DELETED')
+    ACTION_KEYWORDS = [
+        ('DELETE', 'delete'),
+        ('REVOKE', 'permission_change'),
+        ('PERMISSION', 'permission_change'),
+        ('ROLE', 'permission_change'),
+        ('LOGIN', 'login'),
+        ('LOGOUT', 'logout'),
+        ('PASSWORD', 'authentication'),
+        ('MFA', 'authentication'),
+        ('EXPORT', 'data_export'),
+        ('IMPORT', 'data_import'),
+        ('SETTINGS', 'configuration_change'),
+        ('CREATE', 'create'),
+        ('UPDATE', 'update'),
+        ('UPGRADE', 'update'),
+        ('CANCEL', 'update'),
+        ('SUSPEND', 'update'),
+        ('CHANGE', 'update'),
+    ]
+
+    @classmethod
+    def normalize_action(cls, action_type):
+        """Map a free-form action type onto ACTION_CHOICES"""
+        action_type = (action_type or '').upper()
+        for keyword, action in cls.ACTION_KEYWORDS:
+            if keyword in action_type:
+                return action
+        return 'api_call'
+
+    @classmethod
+    def build_entry(cls, user=None, action_type='', resource_type='', resource_id='',
+                    description='', severity='info', state_before=None, state_after=None,
+                    ip_address=None, user_agent='', response_status=None, tenant=None,
+                    metadata=None):
+        """Build an unsaved audit entry from the arguments callers pass to log_action"""
+        user_id = user if isinstance(user, int) else getattr(user, 'pk', None)
+        tenant_id = getattr(tenant, 'pk', tenant)
+        if tenant_id is None and user is not None and not isinstance(user, int):
+            tenant_id = getattr(user, 'tenant_id', None)
+
+        metadata = dict(metadata or {})
+        metadata['action_type'] = action_type
+        if response_status is not None:
+            metadata['response_status'] = response_status
+
+        return cls(
+            tenant_id=tenant_id,
+            user_id=user_id,
+            action=cls.normalize_action(action_type),
+            resource_type=(resource_type or 'unknown').lower()[:50],
+            resource_id=str(resource_id or '')[:100],
+            resource_name=(description or '')[:255],
+            old_values=state_before or {},
+            new_values=state_after or {},
+            ip_address=ip_address or None,
+            user_agent=user_agent or '',
+            is_successful=response_status is None or response_status < 400,
+            metadata=metadata,
+            severity=severity,
+        )
+
+    @classmethod
+    def log_action(cls, **kwargs):
+        """Queue an audit entry for batched insertion by the audit pipeline"""
+        from core.audit_pipeline import audit_pipeline
+        entry = cls.build_entry(**kwargs)
+        audit_pipeline.submit(entry)
+        return entry
+
 
 class ComplianceAuditTrail(models.Model):
     """Model for specific compliance-related audit events"""
@@ -0,0 +1,143 @@
+"""
+Monthly Time Partitions for the Audit Log Table
+
+On PostgreSQL the audit log table is range-partitioned by month on
+audit_log_created_at (see migration 0004). Retention then becomes a matter of
+detaching and dropping whole partitions instead of deleting rows:
+- ensure_partitions() creates the current and upcoming monthly partitions
+- drop_partitions_before() drops partitions that lie entirely before a cutoff
+- delete_rows_before() removes any remaining old rows in bounded batches
+
+On other databases the partition helpers are no-ops and retention falls back
+to batched deletes.
+"""
+import logging
+import re
+from datetime import datetime, timezone as dt_timezone
+from typing import List, Optional, Tuple
+
+from django.db import connection, transaction
+
+logger = logging.getLogger(__name__)
+
+TABLE = 'audit_logs_auditlog'
+DEFAULT_PARTITION = f'{TABLE}_default'
+PARTITION_PATTERN = re.compile(rf'^{TABLE}_p(\d{{4}})(\d{{2}})$')
+
+
+def month_start(value: datetime) -> datetime:
+    return datetime(value.year, value.month, 1, tzinfo=dt_timezone.utc)
+
+
+def add_months(value: datetime, months: int) -> datetime:
+    index = value.year * 12 + value.month - 1 + months
+    return datetime(index // 12, index % 12 + 1, 1, tzinfo=dt_timezone.utc)
+
+
+def partition_name(start: datetime) -> str:
+    return f'{TABLE}_p{start.year:04d}{start.month:02d}'
+
+
+def is_partitioned(using=None) -> bool:
+    """Return True when the audit log table is a partitioned PostgreSQL table."""
+    conn = using or connection
+    if conn.vendor != 'postgresql':
+        return False
+    with conn.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM pg_partitioned_table pt "
+            "JOIN pg_class c ON c.oid = pt.partrelid WHERE c.relname = %s",
+            [TABLE],
+        )
+        return cursor.fetchone() is not None
+
+
+def list_partitions(using=None) -> List[Tuple[str, datetime, datetime]]:
+    """Return (name, start, end) for each monthly partition, oldest first."""
+    conn = using or connection
+    if not is_partitioned(conn):
+        return []
+    with conn.cursor() as cursor:
+        cursor.execute(
+            "SELECT child.relname FROM pg_inherits i "
+            "JOIN pg_class parent ON parent.oid = i.inhparent "
+            "JOIN pg_class child ON child.oid = i.inhrelid "
+            "WHERE parent.relname = %s",
+            [TABLE],
+        )
+        names = [row[0] for row in cursor.fetchall()]
+
+    partitions = []
+    for name in names:
+        match = PARTITION_PATTERN.match(name)
+        if match:
+            start = datetime(int(match.group(1)), int(match.group(2)), 1, tzinfo=dt_timezone.utc)
+            partitions.append((name, start, add_months(start, 1)))
+    return sorted(partitions, key=lambda partition: partition[1])
+
+
+def ensure_partitions(months_ahead: int = 2, start: Optional[datetime] = None, using=None) -> List[str]:
+    """Create monthly partitions from ``start`` (default: this month) onwards."""
+    conn = using or connection
+    if not is_partitioned(conn):
+        return []
+
+    from django.utils import timezone
+    current = month_start(start or timezone.now())
+    last = add_months(month_start(timezone.now()), months_ahead)
+    existing = {name for name, _, _ in list_partitions(conn)}
+
+    created = []
+    with conn.cursor() as cursor:
+        while current <= last:
+            name = partition_name(current)
+            if name not in existing:
+                cursor.execute(
+                    f'CREATE TABLE IF NOT EXISTS "{name}" PARTITION OF "{TABLE}" '
+                    f"FOR VALUES FROM ('{current.isoformat()}') "
+                    f"TO ('{add_months(current, 1).isoformat()}')"
+                )
+                created.append(name)
+            current = add_months(current, 1)
+
+    if created:
+        logger.info(f"Created audit log partitions: {', '.join(created)}")
+    return created
+
+
+def drop_partitions_before(cutoff: datetime, using=None) -> Tuple[int, int]:
+    """
+    Drop every monthly partition that ends on or before ``cutoff``.
+
+    Returns (partitions dropped, estimated rows removed).
+    """
+    conn = using or connection
+    dropped = 0
+    rows = 0
+    for name, _, end in list_partitions(conn):
+        if end > cutoff:
+            break
+        with transaction.atomic(using=conn.alias), conn.cursor() as cursor:
+            cursor.execute("SELECT reltuples::bigint FROM pg_class WHERE relname = %s", [name])
+            estimate = cursor.fetchone()[0]
+            cursor.execute(f'ALTER TABLE "{TABLE}" DETACH PARTITION "{name}"')
+            cursor.execute(f'DROP TABLE "{name}"')
+        dropped += 1
+        rows += max(estimate, 0)
+        logger.info(f"Dropped audit log partition {name} (~{estimate} rows)")
+    return dropped, rows
+
+
+def delete_rows_before(cutoff: datetime, batch_size: int = 5000) -> int:
+    """Delete audit rows older than ``cutoff`` in bounded batches."""
+    from .models import AuditLog
+
+    deleted = 0
+    while True:
+        old_rows = AuditLog.objects.filter(audit_log_created_at__lt=cutoff)
+        ids = list(old_rows.values_list('pk', flat=True)[:batch_size])
+        if not ids:
+            break
+        count, _ = old_rows.filter(pk__in=ids).delete()
+        deleted += count
+    return deleted
@@ -1,5 +1,6 @@
 
 import logging
+from typing import Optional
 from django.utils import timezone
 from .models import AutomationAlert, AutomationNotificationPreference, WorkflowExecution, AutomationExecutionLog
 from django.core.mail import send_mail
@@ -1,6 +1,6 @@
 import logging
 import time
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 from django.db import transaction
 from .models import Automation, AutomationCondition, AutomationAction, AutomationExecutionLog
 
@@ -247,6 +247,25 @@ def execute_automations_sync(trigger_type: str, payload: Dict[str, Any]) -> None
         execute_automation(automation, payload)
 
 
+def execute_automations_batch(events: List[Tuple[str, Dict[str, Any]]]) -> None:
+    """
+    Execute automations for several (trigger_type, payload) events, loading
+    the active automations of each trigger type once for the whole batch.
+    """
+    from .models import Automation
+    trigger_types = {trigger_type for trigger_type, _ in events}
+    by_trigger: Dict[str, List[Automation]] = {}
+    for automation in Automation.objects.filter(
+        trigger_type__in=trigger_types,
+        is_active=True
+    ).select_related('created_by').prefetch_related('conditions', 'actions'):
+        by_trigger.setdefault(automation.trigger_type, []).append(automation)
+    
+    for trigger_type, payload in events:
+        for automation in by_trigger.get(trigger_type, ()):
+            execute_automation(automation, payload)
+
+
 # Workflow Engine for new Workflow models
 
 class WorkflowEngine:
@@ -268,7 +287,7 @@ class WorkflowEngine:
         Returns:
             List of Workflow instances that should execute
         """
-        from .models import Workflow, WorkflowTrigger
+        from .trigger_index import get_trigger_index
         
         event_type = event.get('event_type')
         payload = event.get('payload', {})
@@ -279,23 +298,8 @@ class WorkflowEngine:
             return []
         
         try:
-            # Find workflows matching the trigger type
-            workflows = Workflow.objects.filter(
-                workflow_trigger_type=event_type,
-                workflow_is_active=True,
-                tenant_id=tenant_id
-            ).prefetch_related('triggers', 'workflow_actions')
-            
-            triggered_workflows = []
-            
-            for workflow in workflows:
-                # Check if any active triggers match
-                for trigger in workflow.triggers.filter(is_active=True):
-                    if self._evaluate_trigger_conditions(trigger, payload):
-                        triggered_workflows.append(workflow)
-                        break  # Only need one matching trigger
-            
-            return triggered_workflows
+            # Match against the tenant's compiled trigger index (no queries on a warm index)
+            return get_trigger_index(tenant_id).match(event_type, payload)
             
         except Exception as e:
             self.logger.error(f"Error evaluating triggers: {e}")
@@ -365,28 +369,28 @@ class WorkflowEngine:
         """
         Execute a workflow with the given context, supporting branching.
         """
-        from .models import Workflow, WorkflowExecution, WorkflowAction, WorkflowBranch
+        from .execution_plan import get_execution_plan
+        from .models import WorkflowExecution
         from django.utils import timezone
         
         start_time = time.time()
         
-        try:
-            workflow = Workflow.objects.get(id=workflow_id, workflow_is_active=True)
-        except Workflow.DoesNotExist:
+        plan = get_execution_plan(workflow_id)
+        if plan is None or not plan.is_active:
             self.logger.error(f"Workflow {workflow_id} not found or inactive")
             return False
         
         with transaction.atomic():
             execution = WorkflowExecution.objects.create(
-                workflow=workflow,
+                workflow_id=plan.workflow_id,
                 workflow_execution_trigger_payload=context.get('payload', {}),
                 workflow_execution_status='running',
-                tenant_id=workflow.tenant_id
+                tenant_id=plan.tenant_id
             )
             
             try:
                 # Start recursive execution from the root (no parent branch)
-                success = self._execute_recursive(workflow, context, execution, None, None)
+                success = self._execute_recursive(plan, context, execution, None, None)
                 
                 if success:
                     execution.workflow_execution_status = 'completed'
@@ -425,35 +429,18 @@ class WorkflowEngine:
                 self.logger.error(f"Workflow {workflow_id} execution failed: {e}")
                 return False
 
-    def _execute_recursive(self, workflow, context, execution, parent_branch, branch_value, start_from_item_id=None) -> bool:
-        """Recursive helper to execute actions and branches."""
-        from .models import WorkflowAction, WorkflowBranch
-
-        # Get actions in this context
-        actions = list(workflow.workflow_actions.filter(
-            workflow_action_is_active=True,
-            branch=parent_branch,
-            branch_value=branch_value
-        ))
-
-        # Get branches in this context
-        branches = list(workflow.workflow_branches.filter(
-            branch_is_active=True,
-            parent_branch=parent_branch,
-            parent_branch_value=branch_value
-        ))
+    def _execute_recursive(self, plan, context, execution, parent_branch, branch_value, start_from_item_id=None) -> bool:
+        """Recursive helper to execute actions and branches of a preloaded plan."""
+        from .execution_plan import PlannedAction
 
-        # Combine and sort by order
-        items = sorted(
-            actions + branches,
-            key=lambda x: getattr(x, 'workflow_action_order', getattr(x, 'branch_order', 0))
-        )
+        parent_branch_id = parent_branch.id if parent_branch is not None else None
+        items = plan.children(parent_branch_id, branch_value)
 
         skip_until_found = start_from_item_id is not None
         
         for item in items:
             if skip_until_found:
-                if item.id == start_from_item_id:
+                if isinstance(item, PlannedAction) and item.id == start_from_item_id:
                     skip_until_found = False
                     # We continue from this item (which was the one that paused)
                     # Actually, if it paused *at* an action, we should probably skip it or re-execute?
@@ -461,19 +448,23 @@ class WorkflowEngine:
                     continue
                 continue
 
-            if isinstance(item, WorkflowAction):
+            if isinstance(item, PlannedAction):
                 if not self.execute_action(item, context, execution):
                     return False
-            elif isinstance(item, WorkflowBranch):
+            else:
                 # Evaluate branch condition
                 branch_result = self._evaluate_branch_conditions(item, context.get('payload', {}))
-                if not self._execute_recursive(workflow, context, execution, item, branch_result):
+                if not self._execute_recursive(plan, context, execution, item, branch_result):
                     return False
         
         return True
 
     def _evaluate_branch_conditions(self, branch: 'WorkflowBranch', payload: Dict[str, Any]) -> bool:
         """Evaluate branch conditions against payload."""
+        predicate = getattr(branch, 'predicate', None)
+        if predicate is not None:
+            return predicate(payload)
+
         conditions = branch.branch_conditions
         if not conditions:
             return True
@@ -495,7 +486,8 @@ class WorkflowEngine:
 
     def resume_workflow(self, execution_id: int, context_update: Dict[str, Any] = None) -> bool:
         """Resume a paused workflow execution."""
-        from .models import WorkflowExecution, Workflow
+        from .execution_plan import get_execution_plan
+        from .models import WorkflowExecution
         from django.utils import timezone
         
         start_time = time.time()
@@ -506,7 +498,10 @@ class WorkflowEngine:
                 self.logger.warning(f"Execution {execution_id} is not in waiting state.")
                 return False
                 
-            workflow = execution.workflow
+            plan = get_execution_plan(execution.workflow_id)
+            if plan is None:
+                self.logger.error(f"Workflow {execution.workflow_id} for execution {execution_id} no longer exists")
+                return False
             context = execution.workflow_execution_context_data
             if context_update:
                 context.update(context_update)
@@ -522,14 +517,15 @@ class WorkflowEngine:
             
             with transaction.atomic():
                 try:
-                    # Finding the parent branch object
+                    # Finding the parent branch in the plan
                     parent_branch = None
                     if current_branch_id:
-                        from .models import WorkflowBranch
-                        parent_branch = WorkflowBranch.objects.get(id=current_branch_id)
+                        parent_branch = plan.branches.get(current_branch_id)
+                        if parent_branch is None:
+                            raise ValueError(f"Branch {current_branch_id} is no longer part of the workflow")
                     
                     success = self._execute_recursive(
-                        workflow, context, execution, 
+                        plan, context, execution, 
                         parent_branch, current_branch_value, 
                         start_from_item_id=current_step_id
                     )
@@ -544,7 +540,7 @@ class WorkflowEngine:
                     return success
                     
                 except WorkflowPauseException:
-                    self.logger.info(f"Workflow {workflow.id} paused again")
+                    self.logger.info(f"Workflow {plan.workflow_id} paused again")
                     return True
                 except Exception as e:
                     execution.workflow_execution_status = 'failed'
@@ -763,7 +759,7 @@ class WorkflowEngine:
                 if execution:
                     execution.workflow_execution_status = 'waiting_for_approval'
                     execution.workflow_execution_current_step_id = action.id
-                    execution.workflow_execution_current_branch_id = action.branch.id if action.branch else None
+                    execution.workflow_execution_current_branch_id = action.branch_id
                     execution.workflow_execution_current_branch_value = action.branch_value
                     execution.workflow_execution_context_data = context
                     execution.save()
@@ -772,7 +768,7 @@ class WorkflowEngine:
                     from .models import WorkflowApproval
                     WorkflowApproval.objects.create(
                         workflow_execution=execution,
-                        workflow_action=action,
+                        workflow_action_id=action.id,
                         approval_status='pending',
                         tenant_id=execution.tenant_id
                     )
@@ -981,7 +977,7 @@ class WorkflowEngine:
                     # Save current state for resumption
                     execution.workflow_execution_status = 'waiting_for_approval'  # Reusing status for paused state
                     execution.workflow_execution_current_step_id = action.id
-                    execution.workflow_execution_current_branch_id = action.branch.id if action.branch else None
+                    execution.workflow_execution_current_branch_id = action.branch_id
                     execution.workflow_execution_current_branch_value = action.branch_value
                     execution.workflow_execution_context_data = context
                     execution.save()
@@ -989,7 +985,7 @@ class WorkflowEngine:
                     # Create scheduled execution record
                     WorkflowScheduledExecution.objects.create(
                         workflow_execution=execution,
-                        action=action,
+                        action_id=action.id,
                         scheduled_for=scheduled_for,
                         status='pending',
                         context_data=context,
@@ -1096,6 +1092,8 @@ class WorkflowEngine:
             self.logger.info(f"Action {action.action_type} executed successfully")
             return True
             
+        except WorkflowPauseException:
+            raise
         except Exception as e:
             self.logger.error(f"Action {action.id} execution failed: {e}")
             return False
@@ -0,0 +1,98 @@
+"""
+Benchmark workflow trigger matching.
+
+Compares the former query-per-event evaluation with the compiled trigger
+index and reports events/sec for each. All data is created inside a
+transaction that is rolled back afterwards.
+
+Usage:
+    python manage.py benchmark_triggers --workflows 50 --events 5000
+"""
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from automation.engine import WorkflowEngine
+from automation.models import Workflow, WorkflowTrigger
+from tenants.models import Tenant
+
+
+class Command(BaseCommand):
+    help = 'Measure events/sec for workflow trigger evaluation before and after indexing'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workflows', type=int, default=50, help='Workflows to create')
+        parser.add_argument('--events', type=int, default=2000, help='Events to evaluate per run')
+        parser.add_argument('--event-type', default='lead.created', help='Trigger type to benchmark')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            results = self._run(options['workflows'], options['events'], options['event_type'])
+            transaction.set_rollback(True)
+
+        legacy_rate, indexed_rate, matched = results
+        self.stdout.write(f"Workflows matched per event: {matched}")
+        self.stdout.write(f"Query-per-event evaluation: {legacy_rate:,.0f} events/sec")
+        self.stdout.write(f"Compiled trigger index:     {indexed_rate:,.0f} events/sec")
+        if legacy_rate:
+            self.stdout.write(self.style.SUCCESS(f"Speed-up: {indexed_rate / legacy_rate:.1f}x"))
+
+    def _run(self, workflow_count, event_count, event_type):
+        tenant = Tenant.objects.create(name='Trigger Benchmark', slug=f'trigger-benchmark-{time.time_ns()}')
+        for number in range(workflow_count):
+            workflow = Workflow.objects.create(
+                tenant=tenant,
+                workflow_name=f'Benchmark workflow {number}',
+                workflow_trigger_type=event_type,
+            )
+            WorkflowTrigger.objects.create(
+                tenant=tenant,
+                workflow=workflow,
+                workflow_trigger_event=event_type,
+                workflow_trigger_conditions={
+                    'lead_score': {'operator': 'gte', 'value': str(number % 100)},
+                    'source': {'operator': 'regex', 'value': r'^(web|referral)'},
+                    'status': {'operator': 'in', 'value': ['new', 'open']},
+                },
+            )
+
+        engine = WorkflowEngine()
+        events = [
+            {
+                'event_type': event_type,
+                'tenant_id': tenant.id,
+                'payload': {'lead_score': number % 120, 'source': 'web_form', 'status': 'new'},
+            }
+            for number in range(event_count)
+        ]
+
+        started = time.perf_counter()
+        for event in events:
+            self._legacy_evaluate(engine, event)
+        legacy_rate = event_count / (time.perf_counter() - started)
+
+        engine.evaluate_trigger(events[0])  # warm the index
+        started = time.perf_counter()
+        matched = 0
+        for event in events:
+            matched += len(engine.evaluate_trigger(event))
+        indexed_rate = event_count / (time.perf_counter() - started)
+
+        return legacy_rate, indexed_rate, matched / max(event_count, 1)
+
+    def _legacy_evaluate(self, engine, event):
+        """The previous evaluate_trigger: one workflow query plus one trigger query per workflow."""
+        workflows = Workflow.objects.filter(
+            workflow_trigger_type=event['event_type'],
+            workflow_is_active=True,
+            tenant_id=event['tenant_id'],
+        ).prefetch_related('triggers', 'workflow_actions')
+
+        triggered = []
+        for workflow in workflows:
+            for trigger in workflow.triggers.filter(workflow_trigger_is_active=True):
+                if engine._evaluate_trigger_conditions(trigger, event['payload']):
+                    triggered.append(workflow)
+                    break
+        return triggered
@@ -90,6 +90,16 @@ class WorkflowAction(TenantModel):
     def __str__(self):
         return f"{self.workflow_action_type} for {self.workflow.workflow_name}"
 
+    @property
+    def action_type(self):
+        """Alias used by WorkflowEngine.execute_action"""
+        return self.workflow_action_type
+
+    @property
+    def parameters(self):
+        """Alias used by WorkflowEngine.execute_action"""
+        return self.workflow_action_parameters
+
 
 class WorkflowBranch(TenantModel):
     """Model for defining branching logic (if/else) in workflows"""
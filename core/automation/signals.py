@@ -1,5 +1,8 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
+from .execution_plan import invalidate_execution_plan
+from .models import Workflow, WorkflowAction, WorkflowBranch, WorkflowTrigger
+from .trigger_index import invalidate_trigger_index
 from .utils import emit_event
 
 @receiver(post_save, sender='leads.Lead')
@@ -64,5 +67,22 @@ def engagement_event_post_save(sender, instance, created, **kwargs):
         emit_event(trigger_type, payload)
 
 
+@receiver(post_save, sender=Workflow)
+@receiver(post_delete, sender=Workflow)
+@receiver(post_save, sender=WorkflowTrigger)
+@receiver(post_delete, sender=WorkflowTrigger)
+def invalidate_workflow_index(sender, instance, **kwargs):
+    """Rebuild the tenant's compiled trigger index after workflow edits"""
+    invalidate_trigger_index(instance.tenant_id)
 
 
+@receiver(post_save, sender=Workflow)
+@receiver(post_delete, sender=Workflow)
+@receiver(post_save, sender=WorkflowAction)
+@receiver(post_delete, sender=WorkflowAction)
+@receiver(post_save, sender=WorkflowBranch)
+@receiver(post_delete, sender=WorkflowBranch)
+def invalidate_workflow_plan(sender, instance, **kwargs):
+    """Rebuild the workflow's preloaded execution plan after edits"""
+    workflow_id = instance.pk if sender is Workflow else instance.workflow_id
+    invalidate_execution_plan(workflow_id)
@@ -1,7 +1,7 @@
 from celery import shared_task
 from celery.utils.log import get_task_logger
-from typing import Any, Dict, Optional
-from .engine import execute_automations_sync
+from typing import Any, Dict, List, Optional
+from .engine import execute_automations_batch, execute_automations_sync
 
 logger = get_task_logger(__name__)
 
@@ -17,6 +17,17 @@ def execute_automation_task(self, trigger_type: str, payload: Dict[str, Any]):
         # Retry with exponential backoff
         raise self.retry(exc=exc, countdown=60 * (2 ** self.request.retries))
 
+@shared_task(bind=True, max_retries=3)
+def execute_automation_batch_task(self, events: List[List[Any]]):
+    """
+    Celery task to execute automations for a chunk of [trigger_type, payload] events.
+    """
+    try:
+        execute_automations_batch([(trigger_type, payload) for trigger_type, payload in events])
+    except Exception as exc:
+        logger.error(f"Automation batch task failed: {exc}")
+        raise self.retry(exc=exc, countdown=60 * (2 ** self.request.retries))
+
 @shared_task(bind=True)
 def send_webhook_task(self, endpoint_id: int, payload: Dict[str, Any], event_type: str = 'workflow.execution'):
     """
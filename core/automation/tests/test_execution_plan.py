@@ -0,0 +1,132 @@
+from unittest import mock
+
+from django.core.cache import cache, caches
+from django.test import TestCase
+from automation import execution_plan
+from automation.engine import WorkflowEngine
+from automation.execution_plan import get_execution_plan, invalidate_execution_plan
+from automation.models import Workflow, WorkflowAction, WorkflowBranch, WorkflowExecution
+from tenants.models import Tenant
+
+CALLS = []
+
+
+def record(step):
+    CALLS.append(step)
+
+
+class ExecutionPlanTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        CALLS.clear()
+        self.engine = WorkflowEngine()
+        self.tenant = Tenant.objects.create(name='Plan Tenant', slug='plan-tenant')
+        self.workflow = Workflow.objects.create(
+            tenant=self.tenant, workflow_name='Routing', workflow_trigger_type='lead.created'
+        )
+
+    def _action(self, step, order=0, branch=None, branch_value=None, action_type='run_function'):
+        return WorkflowAction.objects.create(
+            tenant=self.tenant, workflow=self.workflow, workflow_action_type=action_type,
+            workflow_action_parameters={
+                'function': 'automation.tests.test_execution_plan.record', 'args': {'step': step}
+            },
+            workflow_action_order=order, branch=branch, branch_value=branch_value,
+        )
+
+    def _branch(self, name, score, order=0, parent=None, parent_value=None):
+        return WorkflowBranch.objects.create(
+            tenant=self.tenant, workflow=self.workflow, branch_name=name, branch_order=order,
+            branch_conditions={'score': {'operator': 'gt', 'value': score}},
+            parent_branch=parent, parent_branch_value=parent_value,
+        )
+
+    def _build_tree(self):
+        self._action('first', order=0)
+        outer = self._branch('hot', 50, order=1)
+        self._action('last', order=2)
+        self._action('hot', branch=outer, branch_value=True)
+        self._action('cold', branch=outer, branch_value=False)
+        inner = self._branch('very hot', 90, order=1, parent=outer, parent_value=True)
+        self._action('very hot', branch=inner, branch_value=True)
+        return outer, inner
+
+    def _run(self, score):
+        CALLS.clear()
+        return self.engine.execute_workflow(self.workflow.id, {'payload': {'score': score}})
+
+    def test_plan_loads_in_fixed_number_of_queries(self):
+        self._build_tree()
+        with self.assertNumQueries(3):
+            plan = get_execution_plan(self.workflow.id)
+        self.assertEqual([step.order for step in plan.children(None, None)], [0, 1, 2])
+        with self.assertNumQueries(0):
+            get_execution_plan(self.workflow.id)
+
+    def test_branches_execute_in_order(self):
+        self._build_tree()
+        self.assertTrue(self._run(95))
+        self.assertEqual(CALLS, ['first', 'hot', 'very hot', 'last'])
+        self.assertTrue(self._run(60))
+        self.assertEqual(CALLS, ['first', 'hot', 'last'])
+        self.assertTrue(self._run(10))
+        self.assertEqual(CALLS, ['first', 'cold', 'last'])
+
+    def test_warm_plan_issues_no_tree_queries(self):
+        self._build_tree()
+        self._run(95)
+        # Savepoint, execution insert, final update, release
+        with self.assertNumQueries(4):
+            self._run(95)
+        self.assertEqual(len(CALLS), 4)
+
+    def test_edits_invalidate_plan(self):
+        outer, _ = self._build_tree()
+        self._run(95)
+        self._action('late', order=3)
+        outer.branch_is_active = False
+        outer.save()
+        self._run(95)
+        self.assertEqual(CALLS, ['first', 'last', 'late'])
+
+        self.workflow.workflow_is_active = False
+        self.workflow.save()
+        self.assertFalse(self._run(95))
+
+    def test_edit_in_another_worker_invalidates_plan(self):
+        self._build_tree()
+        self._run(95)
+        WorkflowAction.objects.filter(workflow=self.workflow).update(workflow_action_is_active=False)
+
+        # A second cache client stands in for the worker that saved the edit
+        with mock.patch('core.cache_versions.cache', caches.create_connection('default')):
+            invalidate_execution_plan(self.workflow.id)
+        CALLS.clear()
+        self._run(95)
+        self.assertEqual(CALLS, [])
+
+    def test_old_plans_are_rebuilt_without_a_bump(self):
+        self._build_tree()
+        get_execution_plan(self.workflow.id)
+        with mock.patch.object(execution_plan._plans, 'max_age', 0):
+            with self.assertNumQueries(3):
+                get_execution_plan(self.workflow.id)
+
+    def test_resume_continues_after_paused_action(self):
+        outer = self._branch('hot', 50)
+        self._action('before', branch=outer, branch_value=True)
+        approval = self._action('approve', order=1, branch=outer, branch_value=True, action_type='approval')
+        self._action('after', order=2, branch=outer, branch_value=True)
+
+        self.assertTrue(self._run(70))
+        self.assertEqual(CALLS, ['before'])
+        execution = WorkflowExecution.objects.get(workflow=self.workflow)
+        self.assertEqual(execution.workflow_execution_status, 'waiting_for_approval')
+        self.assertEqual(execution.workflow_execution_current_step_id, approval.id)
+        self.assertTrue(execution.approvals.filter(workflow_action=approval).exists())
+
+        CALLS.clear()
+        self.assertTrue(self.engine.resume_workflow(execution.id))
+        self.assertEqual(CALLS, ['after'])
+        execution.refresh_from_db()
+        self.assertEqual(execution.workflow_execution_status, 'completed')
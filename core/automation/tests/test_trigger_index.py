@@ -0,0 +1,101 @@
+from io import StringIO
+from unittest import mock
+
+from django.core.cache import cache, caches
+from django.core.management import call_command
+from django.test import TestCase
+from automation.engine import WorkflowEngine
+from automation.models import Workflow, WorkflowTrigger
+from automation import trigger_index
+from automation.trigger_index import compile_conditions
+from tenants.models import Tenant
+
+
+class CompiledConditionTests(TestCase):
+    def test_operators_match_engine_semantics(self):
+        engine = WorkflowEngine()
+        cases = [
+            ('gt', '80', 90), ('gt', '80', 'abc'), ('lte', 'x', 3),
+            ('in', ['new', 'open'], 'new'), ('in', [[1]], [1]), ('in', 'abc', 'b'),
+            ('contains', 'corp', 'Acme Corp'), ('contains', 5, 'x'),
+            ('regex', r'^web', 'web_form'), ('regex', '(', 'x'),
+            ('eq', 'a', 'a'), ('ne', 'a', 'a'), ('unknown', 1, 1),
+        ]
+        for operator, expected, actual in cases:
+            payload = {'lead': {'field': actual}}
+            condition = {'lead.field': {'operator': operator, 'value': expected}}
+            try:
+                legacy = engine._compare_values(actual, operator, expected)
+            except Exception:
+                legacy = False  # _evaluate_trigger_conditions treats errors as no match
+            self.assertEqual(compile_conditions(condition)(payload), legacy, (operator, expected, actual))
+
+    def test_empty_and_malformed_conditions(self):
+        self.assertTrue(compile_conditions({})({}))
+        self.assertFalse(compile_conditions({'score': 'gt 5'})({'score': 10}))
+
+
+class TriggerIndexTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.engine = WorkflowEngine()
+        self.tenant = Tenant.objects.create(name='Trigger Tenant', slug='trigger-tenant')
+        self.workflow = Workflow.objects.create(
+            tenant=self.tenant, workflow_name='Hot leads', workflow_trigger_type='lead.created'
+        )
+        self.trigger = WorkflowTrigger.objects.create(
+            tenant=self.tenant, workflow=self.workflow, workflow_trigger_event='lead.created',
+            workflow_trigger_conditions={'score': {'operator': 'gt', 'value': 80}},
+        )
+
+    def _event(self, score, tenant_id=None):
+        return {
+            'event_type': 'lead.created',
+            'payload': {'score': score},
+            'tenant_id': tenant_id or self.tenant.id,
+        }
+
+    def test_warm_index_matches_without_queries(self):
+        self.engine.evaluate_trigger(self._event(90))
+        with self.assertNumQueries(0):
+            self.assertEqual(self.engine.evaluate_trigger(self._event(90)), [self.workflow])
+            self.assertEqual(self.engine.evaluate_trigger(self._event(50)), [])
+
+    def test_index_is_scoped_to_tenant(self):
+        other = Tenant.objects.create(name='Other Tenant', slug='other-trigger-tenant')
+        self.assertEqual(self.engine.evaluate_trigger(self._event(90, tenant_id=other.id)), [])
+
+    def test_saving_workflows_and_triggers_invalidates(self):
+        self.assertEqual(len(self.engine.evaluate_trigger(self._event(90))), 1)
+
+        self.trigger.workflow_trigger_conditions = {'score': {'operator': 'gt', 'value': 95}}
+        self.trigger.save()
+        self.assertEqual(self.engine.evaluate_trigger(self._event(90)), [])
+
+        self.workflow.workflow_is_active = False
+        self.workflow.save()
+        self.assertEqual(self.engine.evaluate_trigger(self._event(99)), [])
+
+    def test_edit_in_another_worker_invalidates(self):
+        self.assertEqual(len(self.engine.evaluate_trigger(self._event(90))), 1)
+
+        WorkflowTrigger.objects.filter(pk=self.trigger.pk).update(
+            workflow_trigger_conditions={'score': {'operator': 'gt', 'value': 95}}
+        )
+        # A second cache client stands in for the worker that saved the edit
+        with mock.patch('core.cache_versions.cache', caches.create_connection('default')):
+            trigger_index.invalidate_trigger_index(self.tenant.id)
+        self.assertEqual(self.engine.evaluate_trigger(self._event(90)), [])
+
+    def test_old_indexes_are_rebuilt_without_a_bump(self):
+        self.engine.evaluate_trigger(self._event(90))
+        WorkflowTrigger.objects.filter(pk=self.trigger.pk).update(workflow_trigger_is_active=False)
+
+        with mock.patch.object(trigger_index._indexes, 'max_age', 0):
+            self.assertEqual(self.engine.evaluate_trigger(self._event(90)), [])
+
+    def test_benchmark_command_reports_rates(self):
+        out = StringIO()
+        call_command('benchmark_triggers', workflows=3, events=20, stdout=out)
+        self.assertIn('Compiled trigger index', out.getvalue())
+        self.assertEqual(Workflow.objects.filter(workflow_name__startswith='Benchmark').count(), 0)
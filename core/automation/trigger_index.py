@@ -0,0 +1,226 @@
+"""
+Compiled Workflow Trigger Index
+
+Turns a tenant's active workflows and triggers into an in-memory index so
+WorkflowEngine.evaluate_trigger can match events without touching the
+database:
+- event_type -> [(workflow, [trigger predicates])]
+- Field paths split once, regexes compiled once, numeric operands coerced once
+- Indexes are stamped with a per-tenant version that workflow and trigger
+  signals bump, so every worker rebuilds after an edit; none is used for
+  longer than AUTOMATION_COMPILED_MAX_AGE seconds
+
+Predicates keep the semantics of WorkflowEngine._compare_values: a value
+that cannot be coerced or compared simply does not match.
+"""
+import logging
+import operator
+import re
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from django.conf import settings
+
+from core.cache_versions import VersionedLocalCache, bump_version
+
+logger = logging.getLogger(__name__)
+
+MAX_INDEXES = 512
+
+NUMERIC_OPERATORS = {
+    'gt': operator.gt,
+    'lt': operator.lt,
+    'gte': operator.ge,
+    'lte': operator.le,
+}
+
+Predicate = Callable[[Dict[str, Any]], bool]
+
+
+def _never(_value) -> bool:
+    return False
+
+
+def _always(_payload) -> bool:
+    return True
+
+
+def compile_path(path: str) -> Callable[[Any], Any]:
+    """Compile a dotted field path into a getter (see engine._get_nested_value)."""
+    keys = tuple(str(path).split('.'))
+
+    def get(data):
+        current = data
+        for key in keys:
+            if isinstance(current, dict) and key in current:
+                current = current[key]
+            elif hasattr(current, key):
+                current = getattr(current, key)
+            else:
+                return None
+        return current
+
+    return get
+
+
+def compile_comparison(operator_name: str, expected: Any) -> Callable[[Any], bool]:
+    """Compile an operator and expected value into a single-argument test."""
+    if operator_name == 'eq':
+        return lambda actual: actual == expected
+    if operator_name == 'ne':
+        return lambda actual: actual != expected
+
+    if operator_name in NUMERIC_OPERATORS:
+        try:
+            bound = float(expected)
+        except (TypeError, ValueError):
+            return _never
+        compare = NUMERIC_OPERATORS[operator_name]
+
+        def numeric(actual):
+            try:
+                return compare(float(actual), bound)
+            except (TypeError, ValueError):
+                return False
+        return numeric
+
+    if operator_name == 'in':
+        if isinstance(expected, (list, tuple, set, frozenset)):
+            members = tuple(expected)
+            try:
+                hashed = frozenset(members)
+            except TypeError:
+                hashed = None
+
+            def member(actual):
+                if hashed is not None:
+                    try:
+                        return actual in hashed
+                    except TypeError:
+                        pass
+                return actual in members
+            return member
+
+        def contained(actual):
+            try:
+                return actual in expected
+            except TypeError:
+                return False
+        return contained
+
+    if operator_name == 'contains':
+        if not isinstance(expected, str):
+            return _never
+        return lambda actual: expected in str(actual)
+
+    if operator_name == 'regex':
+        try:
+            pattern = re.compile(expected)
+        except (re.error, TypeError):
+            return _never
+        return lambda actual: pattern.search(str(actual)) is not None
+
+    return _never
+
+
+def compile_conditions(conditions: Any) -> Predicate:
+    """
+    Compile a ``{field_path: {'operator': ..., 'value': ...}}`` mapping into
+    one predicate over the event payload. Empty conditions always match.
+    """
+    if not conditions:
+        return _always
+    if not isinstance(conditions, dict):
+        return _never
+
+    checks = []
+    for field_path, config in conditions.items():
+        if not isinstance(config, dict):
+            return _never
+        checks.append((
+            compile_path(field_path),
+            compile_comparison(config.get('operator', 'eq'), config.get('value')),
+        ))
+
+    def predicate(payload):
+        try:
+            for get, test in checks:
+                if not test(get(payload)):
+                    return False
+            return True
+        except Exception as e:
+            logger.warning(f"Trigger condition evaluation failed: {e}")
+            return False
+
+    return predicate
+
+
+class TriggerIndex:
+    """
+    Active workflows of one tenant keyed by trigger type.
+
+    Usage:
+        from automation.trigger_index import get_trigger_index
+
+        workflows = get_trigger_index(tenant_id).match('lead.created', payload)
+    """
+
+    def __init__(self, tenant_id: Optional[int], entries: Dict[str, List[Tuple[Any, List[Predicate]]]]):
+        self.tenant_id = tenant_id
+        self.entries = entries
+
+    def __len__(self):
+        return sum(len(workflows) for workflows in self.entries.values())
+
+    def match(self, event_type: str, payload: Dict[str, Any]) -> List[Any]:
+        """Return the workflows with at least one trigger matching the payload."""
+        return [
+            workflow
+            for workflow, predicates in self.entries.get(event_type, ())
+            if any(predicate(payload) for predicate in predicates)
+        ]
+
+
+def build_trigger_index(tenant_id: Optional[int]) -> TriggerIndex:
+    """Load a tenant's active workflows and triggers (two queries) and compile them."""
+    from .models import Workflow, WorkflowTrigger
+
+    workflows = {
+        workflow.pk: workflow
+        for workflow in Workflow.objects.filter(tenant_id=tenant_id, workflow_is_active=True)
+    }
+    predicates: Dict[int, List[Predicate]] = {}
+    for workflow_id, conditions in WorkflowTrigger.objects.filter(
+        workflow_id__in=list(workflows), workflow_trigger_is_active=True
+    ).order_by('pk').values_list('workflow_id', 'workflow_trigger_conditions'):
+        predicates.setdefault(workflow_id, []).append(compile_conditions(conditions))
+
+    entries: Dict[str, List[Tuple[Any, List[Predicate]]]] = {}
+    for workflow_id, workflow in workflows.items():
+        if workflow_id in predicates:
+            entries.setdefault(workflow.workflow_trigger_type, []).append(
+                (workflow, predicates[workflow_id])
+            )
+
+    logger.debug(f"Compiled trigger index for tenant {tenant_id}: {len(workflows)} workflows")
+    return TriggerIndex(tenant_id, entries)
+
+
+def _version_name(tenant_id) -> str:
+    return f"automation:workflows:{tenant_id}"
+
+
+_indexes = VersionedLocalCache(
+    max_entries=MAX_INDEXES, max_age=getattr(settings, 'AUTOMATION_COMPILED_MAX_AGE', 300)
+)
+
+
+def get_trigger_index(tenant_id: Optional[int]) -> TriggerIndex:
+    """Return the tenant's compiled index, rebuilding it if its version moved."""
+    return _indexes.get_or_build(
+        tenant_id, _version_name(tenant_id), lambda: build_trigger_index(tenant_id)
+    )
+
+
+def invalidate_trigger_index(tenant_id: Optional[int]) -> None:
+    """Invalidate a tenant's compiled workflow structures in every worker."""
+    bump_version(_version_name(tenant_id))
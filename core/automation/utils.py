@@ -1,16 +1,19 @@
 import json
-from typing import Dict, Any
+from typing import Dict, Any, List, Tuple
 from django.db import transaction
 from django.utils import timezone
 from .models import Automation, AutomationExecutionLog, Workflow, WorkflowTrigger, WorkflowAction, WorkflowBranch
-from .engine import execute_automation, execute_automations_sync
-from .tasks import execute_automation_task
+from .engine import execute_automation, execute_automations_batch, execute_automations_sync
+from .tasks import execute_automation_batch_task, execute_automation_task
 from django.conf import settings
 
 def emit_event(trigger_type: str, payload: Dict[str, Any]) -> None:
     """
     Emit an event that can trigger automations.
     
+    Inside an event bus batch or an open transaction the event is buffered
+    and dispatched with the rest of the batch after commit.
+    
     Usage:
         emit_event('account.created', {
             'account_id': account.id,
@@ -19,11 +22,11 @@ def emit_event(trigger_type: str, payload: Dict[str, Any]) -> None:
             'tenant_id': account.tenant_id,
         })
     """
-  
+    from core.event_bus import event_bus
     
-    # Add timestamp to payload
-    payload['event_timestamp'] = timezone.now().isoformat()
-    payload['trigger_type'] = trigger_type
+    _stamp_payload(trigger_type, payload)
+    if event_bus.defer_automation_event(trigger_type, payload):
+        return
     
     # Execute automations synchronously or asynchronously
     if getattr(settings, 'AUTOMATION_ASYNC', False):
@@ -34,6 +37,32 @@ def emit_event(trigger_type: str, payload: Dict[str, Any]) -> None:
         execute_automations_sync(trigger_type, payload)
 
 
+def dispatch_automation_events(events: List[Tuple[str, Dict[str, Any]]]) -> None:
+    """
+    Dispatch several (trigger_type, payload) events at once.
+    
+    Async mode enqueues one task per chunk of EVENT_BUS_BATCH_SIZE events;
+    sync mode runs them through execute_automations_batch.
+    """
+    from core.event_bus import chunked, json_safe
+    
+    for trigger_type, payload in events:
+        _stamp_payload(trigger_type, payload)
+    
+    if getattr(settings, 'AUTOMATION_ASYNC', False):
+        for chunk in chunked(events, getattr(settings, 'EVENT_BUS_BATCH_SIZE', 500)):
+            execute_automation_batch_task.delay([
+                (trigger_type, json_safe(payload)) for trigger_type, payload in chunk
+            ])
+    else:
+        execute_automations_batch(events)
+
+
+def _stamp_payload(trigger_type: str, payload: Dict[str, Any]) -> None:
+    payload.setdefault('event_timestamp', timezone.now().isoformat())
+    payload['trigger_type'] = trigger_type
+
+
 
 def get_available_triggers() -> list:
     """Get list of all available trigger types."""
@@ -6,6 +6,9 @@ Automatically captures audit logs for:
 - Data modifications (create, update, delete)
 - Sensitive operations
 - API access
+
+Entries are queued on the audit pipeline (core.audit_pipeline) and written
+in batches, so audited requests do not pay for an INSERT.
 """
 import json
 import logging
@@ -82,7 +85,7 @@ class AuditLoggingMiddleware:
         return False
     
     def _log_request(self, request, response) -> None:
-        """Log the request to audit logs (non-blocking, graceful degradation)."""
+        """Queue the request for batched audit logging (graceful degradation)."""
         try:
             from audit_logs.models import AuditLog
             
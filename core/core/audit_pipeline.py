@@ -0,0 +1,226 @@
+"""
+Batched Audit Ingestion Pipeline for SalesCompass CRM
+
+Audit rows are queued in process and written in bulk, off the request path:
+- Bounded in-memory queue shared by middlewares and the event bus
+- Background flusher thread that bulk_creates each batch
+- Back-pressure policy for when the queue is full (block, sync or drop)
+- Flush on interpreter exit and Celery worker shutdown
+
+Any unsaved model instance can be submitted; batches are grouped by model.
+"""
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+from typing import Dict, List, Optional
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+FULL_POLICIES = ('block', 'sync', 'drop')
+
+
+class AuditPipeline:
+    """
+    Bounded audit queue with a background bulk writer.
+
+    Usage:
+        from core.audit_pipeline import audit_pipeline
+
+        audit_pipeline.submit(AuditLog(action='update', ...))
+
+    When the queue is full the AUDIT_QUEUE_FULL_POLICY applies:
+    - 'block': wait up to AUDIT_QUEUE_BLOCK_TIMEOUT for space, then write inline
+    - 'sync': write the record inline immediately
+    - 'drop': discard the record and count it
+    """
+
+    def __init__(self, max_size: Optional[int] = None, batch_size: Optional[int] = None,
+                 flush_interval: Optional[float] = None, policy: Optional[str] = None,
+                 background: Optional[bool] = None, block_timeout: Optional[float] = None):
+        self.max_size = max_size or getattr(settings, 'AUDIT_QUEUE_MAX_SIZE', 10000)
+        self.batch_size = batch_size or getattr(settings, 'AUDIT_BATCH_SIZE', 500)
+        self.flush_interval = (
+            flush_interval if flush_interval is not None
+            else getattr(settings, 'AUDIT_FLUSH_INTERVAL', 2)
+        )
+        self.policy = policy or getattr(settings, 'AUDIT_QUEUE_FULL_POLICY', 'block')
+        if self.policy not in FULL_POLICIES:
+            raise ValueError(f"Unknown audit queue policy: {self.policy}")
+        self.background = (
+            background if background is not None
+            else getattr(settings, 'AUDIT_PIPELINE_BACKGROUND', True)
+        )
+        self.block_timeout = (
+            block_timeout if block_timeout is not None
+            else getattr(settings, 'AUDIT_QUEUE_BLOCK_TIMEOUT', 0.5)
+        )
+
+        self._queue: queue.Queue = queue.Queue(maxsize=self.max_size)
+        self._flush_lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._pid = os.getpid()
+        self._last_flush = time.monotonic()
+
+        self.submitted = 0
+        self.written = 0
+        self.dropped = 0
+        self.inline_writes = 0
+
+    def __len__(self) -> int:
+        return self._queue.qsize()
+
+    def submit(self, record) -> bool:
+        """
+        Queue an unsaved model instance for insertion.
+
+        Returns False only when the record was dropped by the 'drop' policy.
+        """
+        self._check_fork()
+        if self.background:
+            self._ensure_flusher()
+
+        self.submitted += 1
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            return self._handle_full(record)
+
+        if self._queue.qsize() >= self.batch_size:
+            if self.background:
+                self._wakeup.set()
+            else:
+                self.flush()
+        elif not self.background and time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+        return True
+
+    def flush(self) -> int:
+        """Drain the queue and bulk insert everything in it. Returns rows written."""
+        written = 0
+        with self._flush_lock:
+            while True:
+                batch = self._drain(self.batch_size)
+                if not batch:
+                    break
+                written += self._write(batch)
+            self._last_flush = time.monotonic()
+        return written
+
+    def shutdown(self, timeout: float = 5.0) -> None:
+        """Stop the flusher and write whatever is still queued."""
+        self._stopping.set()
+        self._wakeup.set()
+        thread = self._thread
+        if thread is not None and thread.is_alive() and thread is not threading.current_thread():
+            thread.join(timeout)
+        try:
+            self.flush()
+        except Exception as e:
+            logger.error(f"Audit pipeline shutdown flush failed: {e}")
+        self._stopping.clear()
+        self._thread = None
+
+    def _handle_full(self, record) -> bool:
+        if self.policy == 'drop':
+            self.dropped += 1
+            if self.dropped == 1 or self.dropped % 1000 == 0:
+                logger.warning(f"Audit queue full, {self.dropped} records dropped so far")
+            return False
+
+        if self.policy == 'block':
+            self._wakeup.set()
+            try:
+                self._queue.put(record, timeout=self.block_timeout)
+                return True
+            except queue.Full:
+                pass
+
+        # Never lose an audit record silently: fall back to a direct insert
+        self.inline_writes += 1
+        self._write([record])
+        return True
+
+    def _drain(self, limit: int) -> List:
+        batch = []
+        while len(batch) < limit:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _write(self, records: List) -> int:
+        by_model: Dict[type, List] = {}
+        for record in records:
+            by_model.setdefault(type(record), []).append(record)
+
+        written = 0
+        for model, batch in by_model.items():
+            try:
+                model.objects.bulk_create(batch)
+                written += len(batch)
+            except Exception as e:
+                logger.warning(f"Bulk audit insert for {model.__name__} failed, retrying rows: {e}")
+                for record in batch:
+                    try:
+                        record.save()
+                        written += 1
+                    except Exception as row_error:
+                        logger.error(f"Dropping {model.__name__} audit record: {row_error}")
+        self.written += written
+        return written
+
+    def _check_fork(self) -> None:
+        # Queues and threads do not survive fork(); start afresh in the child
+        if self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._queue = queue.Queue(maxsize=self.max_size)
+            self._flush_lock = threading.Lock()
+            self._thread = None
+
+    def _ensure_flusher(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name='audit-pipeline', daemon=True
+                )
+                self._thread.start()
+
+    def _run(self) -> None:
+        from django.db import close_old_connections, connection
+
+        while not self._stopping.is_set():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            if not self._queue.qsize():
+                continue
+            close_old_connections()
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Audit pipeline flush failed: {e}")
+        connection.close()
+
+
+audit_pipeline = AuditPipeline()
+
+atexit.register(audit_pipeline.shutdown)
+
+try:
+    from celery.signals import worker_process_shutdown
+
+    worker_process_shutdown.connect(
+        lambda **kwargs: audit_pipeline.shutdown(), weak=False
+    )
+except ImportError:
+    pass
@@ -0,0 +1,108 @@
+"""
+Shared Version Stamps for Cache Invalidation
+
+Compiled structures (permission sets, flag rules, trigger indexes, ...) are
+cached under a key that embeds a version stamp. Bumping the stamp in the
+shared cache invalidates every derived entry in every worker at once,
+without having to enumerate or delete the entries themselves.
+
+Stamps must live in a cache shared by all processes (CACHES in settings);
+a per-process cache would only invalidate the worker that bumped them.
+
+Stamps are seeded from the current time in milliseconds, so if a stamp is
+evicted it is re-created with a newer value and stale entries are never
+resurrected.
+
+VersionedLocalCache keeps structures that cannot be pickled (compiled
+closures, plans) in process, validated against a shared stamp on each read.
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Iterable, Optional
+
+from django.core.cache import cache
+
+VERSION_PREFIX = 'version:'
+
+
+def _version_key(name: str) -> str:
+    return f"{VERSION_PREFIX}{name}"
+
+
+def _seed() -> int:
+    return int(time.time() * 1000)
+
+
+def get_version(name: str) -> int:
+    """Return the current version stamp for ``name``."""
+    return get_versions([name])[name]
+
+
+def get_versions(names: Iterable[str]) -> Dict[str, int]:
+    """Return the current version stamps for several names in one round trip."""
+    names = list(names)
+    found = cache.get_many([_version_key(name) for name in names])
+    versions = {}
+    for name in names:
+        key = _version_key(name)
+        if key not in found:
+            cache.add(key, _seed(), timeout=None)
+            found[key] = cache.get(key)
+        versions[name] = found[key]
+    return versions
+
+
+def bump_version(name: str) -> None:
+    """Invalidate everything cached under the current version of ``name``."""
+    key = _version_key(name)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, _seed(), timeout=None)
+
+
+class VersionedLocalCache:
+    """
+    Bounded per-process LRU whose entries are tied to a shared version stamp.
+    With ``max_age`` (seconds) entries are also rebuilt once that old, which
+    bounds staleness should a bump ever be missed (e.g. an evicted stamp or
+    a change made without signals).
+
+    Usage:
+        plans = VersionedLocalCache(max_entries=256, max_age=300)
+        plan = plans.get_or_build(workflow_id, f"workflow:{workflow_id}", build)
+    """
+
+    def __init__(self, max_entries: int = 256, max_age: Optional[float] = None):
+        self.max_entries = max_entries
+        self.max_age = max_age
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get_or_build(self, key: Hashable, version_name: str, build: Callable[[], Any]) -> Any:
+        """Return the entry for ``key`` if built under the current version, else rebuild it."""
+        version = get_version(version_name)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == version and (
+                self.max_age is None or now - entry[1] < self.max_age
+            ):
+                self._entries.move_to_end(key)
+                return entry[2]
+
+        value = build()
+        with self._lock:
+            self._entries[key] = (version, now, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
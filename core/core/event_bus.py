@@ -6,11 +6,18 @@ This module provides a unified event system that:
 - Handles async/sync processing based on Celery availability
 - Provides consistent event schema and validation
 - Enables cross-module communication without tight coupling
+- Buffers events emitted inside a transaction or an explicit batch() and
+  publishes them after commit as chunked Celery tasks
 """
 import json
 import logging
-from typing import Dict, Any, List, Optional, Callable
+import threading
+import weakref
+from contextlib import contextmanager
+from functools import partial
+from typing import Dict, Any, List, Optional, Callable, Tuple
 from datetime import datetime
+from django.db import transaction
 from django.utils import timezone
 from django.conf import settings
 
@@ -43,6 +50,38 @@ class EventSchema:
         return enriched
 
 
+class EventBatch:
+    """Events held back until a batch() block closes or a transaction commits."""
+
+    def __init__(self):
+        # (event, async) pairs emitted through EventBus.emit
+        self.events: List[Tuple[Dict[str, Any], bool]] = []
+        # (trigger_type, payload) pairs emitted through automation.utils.emit_event
+        self.automation: List[Tuple[str, Dict[str, Any]]] = []
+        # Weak reference to the on_commit hook that publishes a deferred
+        # buffer; Django drops the hook, and so kills the reference, when the
+        # savepoint or transaction it was registered in rolls back
+        self.commit_hook = None
+
+    def __len__(self):
+        return len(self.events) + len(self.automation)
+
+
+def chunked(items: List[Any], size: int):
+    """Yield successive slices of at most ``size`` items."""
+    size = max(int(size), 1)
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def json_safe(event: Dict[str, Any]) -> Dict[str, Any]:
+    """Return a JSON-serialisable copy of an event (model instances become their pk)."""
+    def default(value):
+        pk = getattr(value, 'pk', None)
+        return pk if pk is not None else str(value)
+    return json.loads(json.dumps(event, default=default))
+
+
 class EventBus:
     """
     Central event bus for cross-module communication.
@@ -61,6 +100,11 @@ class EventBus:
         @event_bus.subscribe('lead.created')
         def handle_lead_created(event):
             print(f"Lead {event['lead_id']} created!")
+        
+        # Coalesce the events of a bulk operation
+        with event_bus.batch():
+            for row in rows:
+                Lead.objects.create(**row)
     """
     
     # Event categories for routing
@@ -106,6 +150,7 @@ class EventBus:
     def __init__(self):
         self._handlers: Dict[str, List[Callable]] = {}
         self._middleware: List[Callable] = []
+        self._local = threading.local()
     
     def subscribe(self, event_type: str):
         """Decorator to subscribe a handler to an event type."""
@@ -151,28 +196,137 @@ class EventBus:
         should_async = async_execution if async_execution is not None else getattr(
             settings, 'EVENT_BUS_ASYNC', False
         )
+        should_async = bool(should_async) and not getattr(settings, 'CELERY_TASK_ALWAYS_EAGER', True)
         
-        if should_async and not getattr(settings, 'CELERY_TASK_ALWAYS_EAGER', True):
+        buffer = self._active_buffer()
+        if buffer is not None:
+            buffer.events.append((event, should_async))
+        elif should_async:
             self._emit_async(event)
         else:
             self._emit_sync(event)
     
+    @contextmanager
+    def batch(self):
+        """
+        Buffer every event emitted inside the block and publish them together
+        when the outermost block exits. Inside a transaction the batch is
+        published after commit and discarded on rollback.
+        """
+        stack = self._batch_stack()
+        if stack:
+            # Nested blocks join the outermost batch
+            yield stack[-1]
+            return
+        
+        current = EventBatch()
+        stack.append(current)
+        try:
+            yield current
+        finally:
+            stack.pop()
+            if len(current):
+                transaction.on_commit(partial(self.publish, current))
+    
+    def defer_automation_event(self, trigger_type: str, payload: Dict[str, Any]) -> bool:
+        """
+        Buffer an automation trigger in the active batch or transaction.
+        
+        Returns False when nothing is buffering and the caller should
+        dispatch immediately.
+        """
+        buffer = self._active_buffer()
+        if buffer is None:
+            return False
+        buffer.automation.append((trigger_type, payload))
+        return True
+    
+    def publish(self, batch: EventBatch) -> None:
+        """Dispatch a closed batch: chunked Celery tasks when async, batch dispatchers otherwise."""
+        async_events = [event for event, is_async in batch.events if is_async]
+        sync_events = [event for event, is_async in batch.events if not is_async]
+        
+        for chunk in chunked(async_events, getattr(settings, 'EVENT_BUS_BATCH_SIZE', 500)):
+            self._emit_async_batch(chunk)
+        if sync_events:
+            self._emit_sync_batch(sync_events)
+        
+        if batch.automation:
+            try:
+                from automation.utils import dispatch_automation_events
+                dispatch_automation_events(batch.automation)
+            except ImportError:
+                logger.debug("Automation module not available")
+        
+        logger.debug(f"Published event batch: {len(batch.events)} events, "
+                     f"{len(batch.automation)} automation triggers")
+    
+    def _batch_stack(self) -> List[EventBatch]:
+        stack = getattr(self._local, 'batches', None)
+        if stack is None:
+            stack = self._local.batches = []
+        return stack
+    
+    def _active_buffer(self) -> Optional[EventBatch]:
+        """Return the batch new events belong to, or None to dispatch them now."""
+        stack = self._batch_stack()
+        if stack:
+            return stack[-1]
+        
+        if not getattr(settings, 'EVENT_BUS_DEFER_IN_TRANSACTION', True):
+            return None
+        connection = transaction.get_connection()
+        if not connection.in_atomic_block:
+            # Any buffers left belong to transactions that have ended
+            self._local.deferred = {}
+            return None
+        
+        # One buffer per savepoint, each published by a commit hook registered
+        # inside it, so rolling a savepoint back discards exactly its events
+        savepoints = [sid for sid in connection.savepoint_ids if sid is not None]
+        scope = savepoints[-1] if savepoints else None
+        deferred = getattr(self._local, 'deferred', None)
+        if deferred is None:
+            deferred = self._local.deferred = {}
+        
+        buffer = deferred.get(scope)
+        if buffer is None or buffer.commit_hook() is None:
+            # New transaction or savepoint; forget buffers of savepoints that
+            # were left and of transactions that were rolled back
+            for key in [key for key, stale in deferred.items()
+                        if (key is not None and key not in savepoints) or stale.commit_hook() is None]:
+                del deferred[key]
+            buffer = deferred[scope] = EventBatch()
+            hook = partial(self._publish_deferred, scope, buffer)
+            buffer.commit_hook = weakref.ref(hook)
+            transaction.on_commit(hook)
+        return buffer
+    
+    def _publish_deferred(self, scope: Optional[str], batch: EventBatch) -> None:
+        deferred = getattr(self._local, 'deferred', None) or {}
+        if deferred.get(scope) is batch:
+            del deferred[scope]
+        self.publish(batch)
+    
     def _emit_sync(self, event: Dict[str, Any]) -> None:
         """Synchronously dispatch event to handlers."""
-        event_type = event['event_type']
+        self._emit_sync_batch([event])
         
-        self._dispatch_to_automation(event)
-        self._dispatch_to_engagement(event)
-        self._dispatch_to_audit_log(event)
-        self._dispatch_to_handlers(event)
-        
-        logger.debug(f"Event emitted: {event_type}")
+        logger.debug(f"Event emitted: {event['event_type']}")
+    
+    def _emit_sync_batch(self, events: List[Dict[str, Any]]) -> None:
+        """Synchronously dispatch several events through the batch-aware dispatchers."""
+        self._dispatch_to_automation(events)
+        self._dispatch_to_engagement(events)
+        self._dispatch_to_audit_log(events)
+        for event in events:
+            self._dispatch_to_handlers(event)
     
     def _emit_async(self, event: Dict[str, Any]) -> None:
         """Asynchronously dispatch event via Celery."""
         try:
             from core.tasks import process_event_task
-            process_event_task.delay(event)
+            process_event_task.delay(json_safe(event))
         except ImportError:
             logger.warning("Celery task not available, falling back to sync")
             self._emit_sync(event)
@@ -180,71 +334,98 @@ class EventBus:
             logger.error(f"Async event dispatch failed: {e}, falling back to sync")
             self._emit_sync(event)
     
-    def _dispatch_to_automation(self, event: Dict[str, Any]) -> None:
-        """Route event to automation engine if applicable."""
-        event_type = event['event_type']
-        if event_type in self.AUTOMATION_EVENTS:
-            try:
-                from automation.utils import emit_event as automation_emit
-                automation_emit(event_type, event)
-            except ImportError:
-                logger.debug("Automation module not available")
-            except Exception as e:
-                logger.error(f"Automation dispatch error: {e}")
+    def _emit_async_batch(self, events: List[Dict[str, Any]]) -> None:
+        """Asynchronously dispatch a chunk of events as a single Celery task."""
+        try:
+            from core.tasks import process_event_batch_task
+            process_event_batch_task.delay([json_safe(event) for event in events])
+        except ImportError:
+            logger.warning("Celery task not available, falling back to sync")
+            self._emit_sync_batch(events)
+        except Exception as e:
+            logger.error(f"Async batch dispatch failed: {e}, falling back to sync")
+            self._emit_sync_batch(events)
     
-    def _dispatch_to_engagement(self, event: Dict[str, Any]) -> None:
-        """Route event to engagement tracking if applicable."""
-        event_type = event['event_type']
-        if event_type in self.ENGAGEMENT_EVENTS:
-            try:
-                from engagement.utils import log_engagement_event
-                log_engagement_event(
-                    event_type=self._map_to_engagement_type(event_type),
-                    tenant_id=event.get('tenant_id'),
-                    account_id=event.get('account_id'),
-                    contact_id=event.get('contact_id'),
-                    metadata=event
-                )
-            except ImportError:
-                logger.debug("Engagement module not available")
-            except Exception as e:
-                logger.error(f"Engagement dispatch error: {e}")
+    def _dispatch_to_automation(self, events: List[Dict[str, Any]]) -> None:
+        """Route events to the automation engine if applicable."""
+        triggers = [
+            (event['event_type'], event) for event in events
+            if event['event_type'] in self.AUTOMATION_EVENTS
+        ]
+        if not triggers:
+            return
+        try:
+            from automation.utils import dispatch_automation_events
+            dispatch_automation_events(triggers)
+        except ImportError:
+            logger.debug("Automation module not available")
+        except Exception as e:
+            logger.error(f"Automation dispatch error: {e}")
     
-    def _dispatch_to_audit_log(self, event: Dict[str, Any]) -> None:
-        """Route event to audit logging if applicable."""
-        event_type = event['event_type']
-        if event_type not in self.AUDIT_EVENTS:
+    def _dispatch_to_engagement(self, events: List[Dict[str, Any]]) -> None:
+        """Route events to engagement tracking, inserting them in bulk."""
+        entries = []
+        for event in events:
+            event_type = event['event_type']
+            if event_type not in self.ENGAGEMENT_EVENTS:
+                continue
+            entries.append({
+                'tenant_id': event.get('tenant_id'),
+                'event_type': self._map_to_engagement_type(event_type),
+                'description': event.get('description') or event_type,
+                'account_company_id': event.get('account_id'),
+                'contact_id': event.get('contact_id'),
+                'metadata': json_safe(event),
+            })
+        if not entries:
             return
-            
         try:
-            from audit_logs.models import AuditLog
-            
-            severity = 'info'
-            if 'deleted' in event_type or 'revoked' in event_type:
-                severity = 'warning'
-            if 'suspended' in event_type:
-                severity = 'critical'
-            
-            parts = event_type.split('.', 1)
-            resource_type = parts[0] if parts else 'unknown'
-            action = parts[1] if len(parts) > 1 else 'unknown'
-            
-            AuditLog.log_action(
-                user=event.get('user'),
-                action_type=event_type.upper().replace('.', '_'),
-                resource_type=resource_type.capitalize(),
-                resource_id=str(event.get(f'{resource_type}_id', '')),
-                description=event.get('description', f'{action} {resource_type}'),
-                severity=severity,
-                state_before=event.get('state_before'),
-                state_after=event.get('state_after'),
-                ip_address=event.get('ip_address', '0.0.0.0'),
-                user_agent=event.get('user_agent', ''),
-            )
+            from engagement.utils import log_engagement_events
+            log_engagement_events(entries)
         except ImportError:
-            pass
+            logger.debug("Engagement module not available")
         except Exception as e:
-            logger.warning(f"Audit log dispatch error (non-fatal): {e}")
+            logger.error(f"Engagement dispatch error: {e}")
+    
+    def _dispatch_to_audit_log(self, events: List[Dict[str, Any]]) -> None:
+        """Queue events for batched audit logging if applicable."""
+        try:
+            from audit_logs.models import AuditLog
+            from core.audit_pipeline import audit_pipeline
+        except ImportError:
+            return
+        
+        for event in events:
+            event_type = event['event_type']
+            if event_type not in self.AUDIT_EVENTS:
+                continue
+            
+            try:
+                severity = 'info'
+                if 'deleted' in event_type or 'revoked' in event_type:
+                    severity = 'warning'
+                if 'suspended' in event_type:
+                    severity = 'critical'
+                
+                parts = event_type.split('.', 1)
+                resource_type = parts[0] if parts else 'unknown'
+                action = parts[1] if len(parts) > 1 else 'unknown'
+                
+                audit_pipeline.submit(AuditLog.build_entry(
+                    user=event.get('user'),
+                    tenant=event.get('tenant_id'),
+                    action_type=event_type.upper().replace('.', '_'),
+                    resource_type=resource_type.capitalize(),
+                    resource_id=str(event.get(f'{resource_type}_id', '')),
+                    description=event.get('description', f'{action} {resource_type}'),
+                    severity=severity,
+                    state_before=event.get('state_before'),
+                    state_after=event.get('state_after'),
+                    ip_address=event.get('ip_address', '0.0.0.0'),
+                    user_agent=event.get('user_agent', ''),
+                ))
+            except Exception as e:
+                logger.warning(f"Audit log dispatch error (non-fatal): {e}")
     
     def _dispatch_to_handlers(self, event: Dict[str, Any]) -> None:
         """Dispatch to custom registered handlers."""
@@ -5,42 +5,103 @@ Provides:
 - Automatic feature flag checking based on URL patterns
 - Template context with feature flags
 - API for checking feature flags programmatically
+- Bounded, version-stamped cache of compiled per-tenant flag rules
 """
 import re
+import time
 import logging
+import threading
+from collections import OrderedDict
 from typing import Optional, Dict, Any
 from functools import lru_cache
 from django.conf import settings
+from django.core.cache import cache
 from django.http import HttpResponseForbidden, JsonResponse
 from django.shortcuts import render
+from core.cache_versions import bump_version, get_version
+from core.request_cache import get_request_features, memoize
 
 logger = logging.getLogger(__name__)
 
 
 class FeatureFlagCache:
-    """In-memory cache for feature flags to reduce database queries."""
-    
-    _cache: Dict[str, Any] = {}
-    _cache_timeout = 60
-    
-    @classmethod
-    def get(cls, key: str, user) -> Optional[bool]:
-        """Get cached flag status for user."""
-        cache_key = f"{key}:{user.id if user else 'anon'}"
-        if cache_key in cls._cache:
-            return cls._cache[cache_key]
-        return None
-    
-    @classmethod
-    def set(cls, key: str, user, value: bool) -> None:
-        """Cache flag status for user."""
-        cache_key = f"{key}:{user.id if user else 'anon'}"
-        cls._cache[cache_key] = value
-    
-    @classmethod
-    def clear(cls) -> None:
-        """Clear the cache."""
-        cls._cache = {}
+    """
+    Bounded LRU cache of compiled per-tenant flag rules with TTL expiry.
+
+    Entries are stamped with the shared ``feature_flags`` version, which is
+    bumped whenever a feature_flags model changes, so every worker drops stale
+    rules on its next lookup. A worker that misses locally first tries the
+    compiled rules other workers stored in the shared cache.
+
+    Usage:
+        from core.feature_flag_middleware import flag_cache
+
+        rules = flag_cache.get_rules(user.tenant_id)
+        rules.is_enabled('new_dashboard', user)
+    """
+
+    VERSION_NAME = 'feature_flags'
+    SHARED_PREFIX = 'feature_flags:rules:'
+
+    def __init__(self, max_entries: Optional[int] = None, ttl: Optional[int] = None):
+        self.max_entries = max_entries or getattr(settings, 'FEATURE_FLAG_CACHE_SIZE', 256)
+        self.ttl = ttl if ttl is not None else getattr(settings, 'FEATURE_FLAG_CACHE_TTL', 60)
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get_rules(self, tenant_id: Optional[int]):
+        """Return the compiled rules for a tenant, compiling them on a miss."""
+        version = get_version(self.VERSION_NAME)
+        now = time.monotonic()
+
+        with self._lock:
+            entry = self._entries.get(tenant_id)
+            if entry is not None:
+                entry_version, expires_at, rules = entry
+                if entry_version == version and expires_at > now:
+                    self._entries.move_to_end(tenant_id)
+                    self.hits += 1
+                    return rules
+                del self._entries[tenant_id]
+            self.misses += 1
+
+        shared_key = f"{self.SHARED_PREFIX}{tenant_id}:{version}"
+        rules = cache.get(shared_key)
+        if rules is None:
+            from feature_flags.rules import compile_flag_rules
+            rules = compile_flag_rules(tenant_id)
+            cache.set(shared_key, rules, self.ttl)
+
+        with self._lock:
+            self._entries[tenant_id] = (version, now + self.ttl, rules)
+            self._entries.move_to_end(tenant_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return rules
+
+    def clear(self) -> None:
+        """Drop this process's entries."""
+        with self._lock:
+            self._entries.clear()
+
+    def invalidate(self) -> None:
+        """Invalidate compiled rules in every worker."""
+        bump_version(self.VERSION_NAME)
+        self.clear()
+
+
+flag_cache = FeatureFlagCache()
+
+
+def _flag_user(user):
+    if user is not None and getattr(user, 'is_authenticated', False):
+        return user
+    return None
 
 
 def is_feature_enabled(feature_key: str, user=None) -> bool:
@@ -68,21 +129,10 @@ def is_feature_enabled(feature_key: str, user=None) -> bool:
     if user and hasattr(user, 'is_staff') and user.is_staff:
         return True
     
-    cached = FeatureFlagCache.get(feature_key, user)
-    if cached is not None:
-        return cached
-    
     try:
-        from feature_flags.models import FeatureFlag
-        
-        flag = FeatureFlag.objects.filter(key=feature_key).first()
-        if not flag:
-            FeatureFlagCache.set(feature_key, user, False)
-            return False
-        
-        enabled = flag.is_enabled_for_user(user) if user else flag.is_active
-        FeatureFlagCache.set(feature_key, user, enabled)
-        return enabled
+        user = _flag_user(user)
+        rules = flag_cache.get_rules(getattr(user, 'tenant_id', None))
+        return rules.is_enabled(feature_key, user)
         
     except ImportError:
         return True
@@ -99,13 +149,9 @@ def get_all_features(user=None) -> Dict[str, bool]:
         Dict[str, bool]: Dictionary of feature keys to enabled status
     """
     try:
-        from feature_flags.models import FeatureFlag
-        
-        flags = FeatureFlag.objects.filter(is_active=True)
-        return {
-            flag.key: flag.is_enabled_for_user(user) if user else flag.is_active
-            for flag in flags
-        }
+        user = _flag_user(user)
+        rules = flag_cache.get_rules(getattr(user, 'tenant_id', None))
+        return rules.enabled_features(user)
     except ImportError:
         return {}
     except Exception as e:
@@ -150,8 +196,11 @@ class FeatureFlagMiddleware:
                 if not is_feature_enabled(required_flag, user):
                     return self._handle_disabled_feature(request, required_flag)
             
-            request.feature_flags = lambda key: is_feature_enabled(key, request.user if request.user.is_authenticated else None)
-            request.all_features = lambda: get_all_features(request.user if request.user.is_authenticated else None)
+            request.feature_flags = lambda key: memoize(
+                request, f'feature:{key}',
+                lambda: is_feature_enabled(key, request.user if request.user.is_authenticated else None)
+            )
+            request.all_features = lambda: get_request_features(request)
         except Exception as e:
             logger.warning(f"Feature flag middleware error (allowing request): {e}")
         
@@ -192,14 +241,12 @@ def feature_flag_context_processor(request):
             <a href="/new-dashboard/">Try New Dashboard</a>
         {% endif %}
     """
-    if hasattr(request, 'user') and request.user.is_authenticated:
-        features = get_all_features(request.user)
-    else:
-        features = get_all_features()
-    
     return {
-        'features': features,
-        'is_feature_enabled': lambda key: is_feature_enabled(key, getattr(request, 'user', None)),
+        'features': get_request_features(request),
+        'is_feature_enabled': lambda key: memoize(
+            request, f'feature:{key}',
+            lambda: is_feature_enabled(key, getattr(request, 'user', None))
+        ),
     }
 
 
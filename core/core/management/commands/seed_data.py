@@ -25,6 +25,8 @@ from django.contrib.auth import get_user_model
 from django.db import transaction
 from faker import Faker
 
+from core.event_bus import event_bus
+
 # Import models
 from tenants.models import Tenant
 from accounts.models import Account, Contact
@@ -206,39 +208,41 @@ class Command(BaseCommand):
                 batch_end = min(j + batch_size, num_accounts)
                 batch_accounts = []
                 
-                for k in range(j, batch_end):
-                    if progressive and (k + 1) % 20 == 0:
-                        self.stdout.write(f'    Progress: {k+1}/{num_accounts} accounts')
+                # Coalesce the events of each batch into chunked dispatches
+                with event_bus.batch():
+                    for k in range(j, batch_end):
+                        if progressive and (k + 1) % 20 == 0:
+                            self.stdout.write(f'    Progress: {k+1}/{num_accounts} accounts')
                     
-                    owner = random.choice(all_users)
-                    account = self.create_account(tenant, owner, k)
-                    batch_accounts.append(account)
+                        owner = random.choice(all_users)
+                        account = self.create_account(tenant, owner, k)
+                        batch_accounts.append(account)
                     
-                    # Create contacts for account
-                    contacts = self.create_contacts(tenant, account, random.randint(2, 5))
+                        # Create contacts for account
+                        contacts = self.create_contacts(tenant, account, random.randint(2, 5))
                     
-                    # Create leads for account
-                    self.create_leads(tenant, account, owner, lead_statuses, lead_sources, random.randint(1, 4))
+                        # Create leads for account
+                        self.create_leads(tenant, account, owner, lead_statuses, lead_sources, random.randint(1, 4))
                     
-                    # Create opportunities for account
-                    opportunities = self.create_opportunities(tenant, account, owner, opp_stages, random.randint(1, 3))
+                        # Create opportunities for account
+                        opportunities = self.create_opportunities(tenant, account, owner, opp_stages, random.randint(1, 3))
                     
-                    for opp in opportunities:
-                        self.create_proposals(tenant, opp, owner)
-                        # if opp.stage.is_won:
-                        #     # Randomly pick a product for the sale
-                        #     if products:
-                        #         self.create_sales(tenant, opp, products, owner)
+                        for opp in opportunities:
+                            self.create_proposals(tenant, opp, owner)
+                            # if opp.stage.is_won:
+                            #     # Randomly pick a product for the sale
+                            #     if products:
+                            #         self.create_sales(tenant, opp, products, owner)
                     
-                    # Create cases for account
-                    self.create_cases(tenant, account, owner, random.randint(0, 2))
+                        # Create cases for account
+                        self.create_cases(tenant, account, owner, random.randint(0, 2))
                     
-                    # Create tasks
-                    self.create_tasks(tenant, account, owner, random.randint(1, 3))
+                        # Create tasks
+                        self.create_tasks(tenant, account, owner, random.randint(1, 3))
 
-                    # Create engagement data
-                    if contacts:
-                        self.create_engagement_data(tenant, account, contacts, owner)
+                        # Create engagement data
+                        if contacts:
+                            self.create_engagement_data(tenant, account, contacts, owner)
             
             # Create commissions
             if products:
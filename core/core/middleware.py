@@ -6,6 +6,7 @@ from django.contrib import messages
 from django.urls import resolve
 from django.template.response import TemplateResponse
 from tenants.models import Tenant
+from core.request_cache import get_request_role
 import logging
 
 
@@ -45,12 +46,13 @@ class DataVisibilityMiddleware(MiddlewareMixin):
             # Initialize visibility_context
             visibility_context = {}
             
+            role = get_request_role(request)
             if user.is_superuser:
                 # Superusers have 'all' visibility for everything
                 visibility_context = {'default': 'all'}
-            elif user.role and hasattr(user.role, 'data_visibility_rules'):
+            elif role and hasattr(role, 'data_visibility_rules'):
                 # Use the role's data_visibility_rules
-                visibility_context = user.role.data_visibility_rules.copy()
+                visibility_context = role.data_visibility_rules.copy()
             else:
                 # Default to 'own_only' for all models
                 visibility_context = {'default': 'own_only'}
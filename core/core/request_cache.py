@@ -0,0 +1,164 @@
+"""
+Request-Scoped Cache for SalesCompass CRM
+
+Context processors and middlewares all need the same per-request facts
+(tenant, role, plan, white-label settings, feature flags, available apps).
+This module loads each of them at most once per request and shares it:
+- ``memoize(request, key, compute)`` for arbitrary per-request values
+- Typed helpers for the tenant, role, white-label settings and features
+- ``RequestCacheMiddleware`` to count the queries each request runs
+"""
+import logging
+from contextlib import ExitStack
+from typing import Any, Callable, Dict
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+
+class RequestCache:
+    """Per-request memo table plus query statistics."""
+
+    def __init__(self):
+        self._values: Dict[str, Any] = {}
+        self.query_count = 0
+        self.hits = 0
+
+    def get_or_set(self, key: str, compute: Callable[[], Any]) -> Any:
+        value = self._values.get(key, _MISSING)
+        if value is not _MISSING:
+            self.hits += 1
+            return value
+        value = compute()
+        self._values[key] = value
+        return value
+
+    def count_query(self, execute, sql, params, many, context):
+        self.query_count += 1
+        return execute(sql, params, many, context)
+
+
+def get_request_cache(request) -> RequestCache:
+    """Return the cache attached to ``request``, creating it on first use."""
+    request_cache = getattr(request, '_request_cache', None)
+    if request_cache is None:
+        request_cache = RequestCache()
+        request._request_cache = request_cache
+    return request_cache
+
+
+def memoize(request, key: str, compute: Callable[[], Any]) -> Any:
+    """
+    Compute a value at most once per request.
+
+    Usage:
+        from core.request_cache import memoize
+
+        dashboards = memoize(request, 'user_dashboards', lambda: list(queryset))
+    """
+    return get_request_cache(request).get_or_set(key, compute)
+
+
+def _authenticated_user(request):
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated:
+        return user
+    return None
+
+
+def get_request_tenant(request):
+    """
+    Return the current user's tenant with its plan preloaded.
+
+    The instance is also placed in the user's relation cache, so later
+    ``request.user.tenant`` lookups reuse it.
+    """
+    def load():
+        user = _authenticated_user(request)
+        if user is None or not getattr(user, 'tenant_id', None):
+            return None
+        from tenants.models import Tenant
+        tenant = Tenant.objects.select_related('plan').filter(pk=user.tenant_id).first()
+        if tenant is not None:
+            user.tenant = tenant
+        return tenant
+
+    return memoize(request, 'tenant', load)
+
+
+def get_request_role(request):
+    """Return the current user's role, loaded once per request."""
+    def load():
+        user = _authenticated_user(request)
+        if user is None or not getattr(user, 'role_id', None):
+            return None
+        return user.role
+
+    return memoize(request, 'role', load)
+
+
+def get_request_white_label(request):
+    """Return the tenant's white-label settings, or None when it has none."""
+    def load():
+        tenant = get_request_tenant(request)
+        if tenant is None:
+            return None
+        from tenants.models import WhiteLabelSettings
+        return WhiteLabelSettings.objects.filter(tenant=tenant).first()
+
+    return memoize(request, 'white_label_settings', load)
+
+
+def get_request_features(request) -> Dict[str, bool]:
+    """Return every active feature flag and whether it is on for the user."""
+    def load():
+        from core.feature_flag_middleware import get_all_features
+        return get_all_features(_authenticated_user(request))
+
+    return memoize(request, 'features', load)
+
+
+def get_request_available_apps(request):
+    """Return the apps available to the current user."""
+    def load():
+        user = _authenticated_user(request)
+        if user is None:
+            return []
+        get_request_tenant(request)
+        from access_control.utils import get_user_available_apps
+        return get_user_available_apps(user)
+
+    return memoize(request, 'available_apps', load)
+
+
+class RequestCacheMiddleware:
+    """
+    Attach a request cache and count the queries each request runs.
+
+    Place first in MIDDLEWARE so the count covers the whole stack. The total is
+    logged at debug level and, when REQUEST_QUERY_COUNT_HEADER is enabled
+    (defaults to DEBUG), returned in an ``X-Query-Count`` response header.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request_cache = get_request_cache(request)
+
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(request_cache.count_query))
+            response = self.get_response(request)
+
+        logger.debug(
+            f"{request.method} {request.path}: {request_cache.query_count} queries, "
+            f"{request_cache.hits} request cache hits"
+        )
+        if getattr(settings, 'REQUEST_QUERY_COUNT_HEADER', settings.DEBUG):
+            response['X-Query-Count'] = str(request_cache.query_count)
+        return response
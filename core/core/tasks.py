@@ -10,7 +10,7 @@ Provides async task execution for:
 - Scheduled tasks
 """
 import logging
-from typing import Dict, Any
+from typing import Dict, Any, List
 from celery import shared_task
 from django.conf import settings
 
@@ -33,6 +33,23 @@ def process_event_task(self, event: Dict[str, Any]) -> None:
         self.retry(exc=e)
 
 
+@shared_task(bind=True, max_retries=3, default_retry_delay=60)
+def process_event_batch_task(self, events: List[Dict[str, Any]]) -> None:
+    """
+    Process a chunk of events published by an event bus batch.
+    
+    The chunk goes through the batch-aware dispatchers in one pass, so bulk
+    operations cost one broker message per chunk instead of one per event.
+    """
+    try:
+        from core.event_bus import event_bus
+        event_bus._emit_sync_batch(events)
+        logger.info(f"Processed event batch: {len(events)} events")
+    except Exception as e:
+        logger.error(f"Failed to process event batch: {e}")
+        self.retry(exc=e)
+
+
 @shared_task
 def send_email_async(
     to: list,
@@ -95,17 +112,23 @@ def cleanup_old_audit_logs(days: int = 90) -> int:
     """
     Clean up audit logs older than specified days.
     
-    Should be scheduled to run daily.
+    Whole monthly partitions before the cutoff are dropped (PostgreSQL);
+    remaining old rows are deleted in bounded batches. Upcoming partitions
+    are created on the way. Should be scheduled to run daily.
     """
     try:
-        from audit_logs.models import AuditLog
+        from audit_logs.partitions import (
+            delete_rows_before, drop_partitions_before, ensure_partitions,
+        )
         from django.utils import timezone
         from datetime import timedelta
         
         cutoff = timezone.now() - timedelta(days=days)
-        count, _ = AuditLog.objects.filter(timestamp__lt=cutoff).delete()
+        ensure_partitions()
+        partitions, dropped_rows = drop_partitions_before(cutoff)
+        count = dropped_rows + delete_rows_before(cutoff)
         
-        logger.info(f"Deleted {count} old audit logs")
+        logger.info(f"Deleted {count} old audit logs ({partitions} partitions dropped)")
         return count
     except Exception as e:
         logger.error(f"Failed to cleanup audit logs: {e}")
@@ -121,9 +144,9 @@ def check_feature_flag_consistency() -> None:
     """
     try:
         from feature_flags.models import FeatureFlag
-        from core.feature_flag_middleware import FeatureFlagCache
+        from core.feature_flag_middleware import flag_cache
         
-        FeatureFlagCache.clear()
+        flag_cache.clear()
         
         flags = FeatureFlag.objects.filter(is_active=True)
         logger.info(f"Active feature flags: {flags.count()}")
@@ -0,0 +1,107 @@
+import threading
+from datetime import timedelta
+
+from django.test import TestCase
+from django.utils import timezone
+from audit_logs.models import AuditLog
+from audit_logs.partitions import delete_rows_before, drop_partitions_before
+from core.audit_pipeline import AuditPipeline
+from core.models import User
+from tenants.models import Tenant
+
+
+class AuditPipelineTests(TestCase):
+    def setUp(self):
+        self.tenant = Tenant.objects.create(name='Audit Tenant', slug='audit-tenant')
+        self.user = User.objects.create_user(
+            username='auditor', email='auditor@test.com', password='pw', tenant=self.tenant
+        )
+
+    def _entry(self, **kwargs):
+        defaults = dict(user=self.user, action_type='LEADS_CREATE', resource_type='leads',
+                        resource_id=7, description='POST /leads/7/', ip_address='10.0.0.1')
+        defaults.update(kwargs)
+        return AuditLog.build_entry(**defaults)
+
+    def test_build_entry_maps_onto_model_fields(self):
+        entry = self._entry(response_status=500, severity='error')
+        self.assertEqual(entry.action, 'create')
+        self.assertEqual(entry.tenant_id, self.tenant.pk)
+        self.assertEqual(entry.resource_id, '7')
+        self.assertFalse(entry.is_successful)
+        self.assertEqual(entry.metadata, {'action_type': 'LEADS_CREATE', 'response_status': 500})
+        self.assertEqual(AuditLog.normalize_action('USER_DELETED'), 'delete')
+
+    def test_records_are_written_in_batches(self):
+        pipeline = AuditPipeline(batch_size=50, flush_interval=3600, background=False)
+        with self.assertNumQueries(0):
+            for _ in range(10):
+                pipeline.submit(self._entry())
+        self.assertEqual(len(pipeline), 10)
+
+        with self.assertNumQueries(1):
+            self.assertEqual(pipeline.flush(), 10)
+        self.assertEqual(AuditLog.objects.count(), 10)
+
+    def test_full_batch_flushes_inline_without_background_thread(self):
+        pipeline = AuditPipeline(batch_size=5, flush_interval=3600, background=False)
+        for _ in range(5):
+            pipeline.submit(self._entry())
+        self.assertEqual(len(pipeline), 0)
+        self.assertEqual(AuditLog.objects.count(), 5)
+
+    def test_back_pressure_policies(self):
+        dropping = AuditPipeline(max_size=2, batch_size=10, flush_interval=3600,
+                                 background=False, policy='drop')
+        results = [dropping.submit(self._entry()) for _ in range(3)]
+        self.assertEqual(results, [True, True, False])
+        self.assertEqual(dropping.dropped, 1)
+
+        syncing = AuditPipeline(max_size=2, batch_size=10, flush_interval=3600,
+                                background=False, policy='sync')
+        for _ in range(3):
+            syncing.submit(self._entry())
+        self.assertEqual(syncing.inline_writes, 1)
+        self.assertEqual(AuditLog.objects.count(), 1)
+
+        with self.assertRaises(ValueError):
+            AuditPipeline(policy='ignore')
+
+    def test_background_flusher_and_shutdown(self):
+        flushed = threading.Event()
+        writers = []
+
+        class RecordingPipeline(AuditPipeline):
+            def _write(self, records):
+                writers.append(threading.current_thread().name)
+                flushed.set()
+                return len(records)
+
+        pipeline = RecordingPipeline(batch_size=2, flush_interval=3600, background=True)
+        pipeline.submit(object())
+        pipeline.submit(object())
+        self.assertTrue(flushed.wait(5))
+        self.assertEqual(writers, ['audit-pipeline'])
+
+        pipeline.submit(object())
+        pipeline.shutdown()
+        self.assertEqual(len(pipeline), 0)
+        self.assertEqual(len(writers), 2)
+        self.assertIsNone(pipeline._thread)
+
+    def test_cleanup_removes_rows_before_cutoff(self):
+        old = AuditLog.objects.create(
+            tenant=self.tenant, action='create', resource_type='lead',
+            resource_id='1', resource_name='old'
+        )
+        AuditLog.objects.filter(pk=old.pk).update(
+            audit_log_created_at=timezone.now() - timedelta(days=120)
+        )
+        AuditLog.objects.create(
+            tenant=self.tenant, action='create', resource_type='lead',
+            resource_id='2', resource_name='recent'
+        )
+        cutoff = timezone.now() - timedelta(days=90)
+        self.assertEqual(drop_partitions_before(cutoff), (0, 0))
+        self.assertEqual(delete_rows_before(cutoff, batch_size=1), 1)
+        self.assertEqual(list(AuditLog.objects.values_list('resource_name', flat=True)), ['recent'])
@@ -0,0 +1,104 @@
+from unittest import mock
+
+from django.db import transaction
+from django.test import TestCase, override_settings
+from accounts.models import Account
+from core.event_bus import EventBus, event_bus
+from engagement.models import EngagementEvent
+from tenants.models import Tenant
+
+
+@override_settings(EVENT_BUS_ASYNC=False, AUTOMATION_ASYNC=False)
+class EventBusBatchTests(TestCase):
+    def setUp(self):
+        self.bus = EventBus()
+        self.received = []
+        self.bus.subscribe('test.batched')(self.received.append)
+
+    def _emit(self, n=0):
+        self.bus.emit('test.batched', {'tenant_id': 1, 'n': n})
+
+    def test_batch_publishes_after_commit(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            with self.bus.batch():
+                for n in range(3):
+                    self._emit(n)
+                with self.bus.batch():
+                    self._emit(3)
+                self.assertEqual(self.received, [])
+        self.assertEqual(len(callbacks), 1)
+        callbacks[0]()
+        self.assertEqual([event['n'] for event in self.received], [0, 1, 2, 3])
+
+    def test_events_in_transaction_wait_for_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self._emit(1)
+            try:
+                with transaction.atomic():
+                    self._emit(2)
+                    raise ValueError
+            except ValueError:
+                pass
+            self._emit(3)
+            self.assertEqual(self.received, [])
+        self.assertEqual([event['n'] for event in self.received], [1, 3])
+
+    def test_buffers_do_not_outlive_their_savepoints(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            try:
+                with transaction.atomic():
+                    self._emit(1)
+                    raise ValueError
+            except ValueError:
+                pass
+            with transaction.atomic():
+                for n in range(2, 5):
+                    self._emit(n)
+        # One live hook for the committed savepoint; the rolled back buffer is gone
+        self.assertEqual(len(self.bus._local.deferred), 1)
+        for callback in callbacks:
+            callback()
+        self.assertEqual([event['n'] for event in self.received], [2, 3, 4])
+        self.assertEqual(self.bus._local.deferred, {})
+
+    @override_settings(EVENT_BUS_DEFER_IN_TRANSACTION=False)
+    def test_immediate_dispatch_without_batch(self):
+        self._emit(1)
+        self.assertEqual(len(self.received), 1)
+
+    @override_settings(EVENT_BUS_ASYNC=True, CELERY_TASK_ALWAYS_EAGER=False, EVENT_BUS_BATCH_SIZE=2)
+    def test_async_batches_are_chunked(self):
+        with mock.patch.object(self.bus, '_emit_async_batch') as dispatch:
+            with self.captureOnCommitCallbacks(execute=True):
+                with self.bus.batch():
+                    for n in range(5):
+                        self.bus.emit('test.batched', {'tenant_id': 1, 'user': Tenant(pk=9)})
+        self.assertEqual([len(call.args[0]) for call in dispatch.call_args_list], [2, 2, 1])
+
+    def test_automation_triggers_are_coalesced(self):
+        from automation.utils import emit_event
+        with mock.patch('automation.utils.execute_automations_batch') as execute:
+            with self.captureOnCommitCallbacks(execute=True):
+                with event_bus.batch():
+                    for n in range(4):
+                        emit_event('leads.lead_created', {'lead_id': n, 'tenant_id': 1})
+                execute.assert_not_called()
+        execute.assert_called_once()
+        events = execute.call_args.args[0]
+        self.assertEqual([payload['lead_id'] for _, payload in events], [0, 1, 2, 3])
+        self.assertEqual(events[0][1]['trigger_type'], 'leads.lead_created')
+
+    def test_engagement_events_are_bulk_inserted(self):
+        tenant = Tenant.objects.create(name='Bus Tenant', slug='bus-tenant')
+        account = Account.objects.create(tenant=tenant, account_name='Acme')
+        with mock.patch('automation.utils.execute_automations_batch') as execute:
+            with self.captureOnCommitCallbacks(execute=True):
+                with event_bus.batch():
+                    for _ in range(3):
+                        event_bus.emit('website.visited', {'tenant_id': tenant.id, 'account_id': account.id})
+        self.assertEqual(
+            EngagementEvent.objects.filter(account_company=account, event_type='website_visit').count(), 3
+        )
+        # The rows' post_save automation triggers are dispatched together
+        execute.assert_called_once()
+        self.assertEqual(len(execute.call_args.args[0]), 3)
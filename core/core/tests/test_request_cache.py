@@ -0,0 +1,62 @@
+from django.contrib.auth import get_user_model
+from django.http import HttpResponse
+from django.test import TestCase, RequestFactory, override_settings
+from core.request_cache import (
+    RequestCacheMiddleware, get_request_cache, get_request_tenant, memoize,
+)
+from dashboard.context_processors import user_dashboards
+from tenants.context_processor import white_label_context
+from tenants.models import Tenant
+
+User = get_user_model()
+
+
+class RequestCacheTests(TestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.tenant = Tenant.objects.create(name='Cached Tenant', slug='cached-tenant')
+        self.user = User.objects.create_user(
+            username='cache_test', email='cache@test.com', password='pw', tenant=self.tenant
+        )
+
+    def _request(self):
+        request = self.factory.get('/')
+        request.user = User.objects.get(pk=self.user.pk)
+        return request
+
+    def test_memoize_computes_once(self):
+        request = self._request()
+        calls = []
+        for _ in range(3):
+            value = memoize(request, 'answer', lambda: calls.append(1) or 42)
+        self.assertEqual(value, 42)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(get_request_cache(request).hits, 2)
+
+    def test_tenant_is_shared_with_user_relation(self):
+        request = self._request()
+        tenant = get_request_tenant(request)
+        with self.assertNumQueries(0):
+            self.assertIs(request.user.tenant, tenant)
+            self.assertIs(get_request_tenant(request), tenant)
+
+    def test_context_processors_query_once_per_request(self):
+        request = self._request()
+        user_dashboards(request)
+        white_label_context(request)
+        with self.assertNumQueries(0):
+            context = white_label_context(request)
+            user_dashboards(request)
+        self.assertIsNone(context['white_label_settings'])
+
+    @override_settings(REQUEST_QUERY_COUNT_HEADER=True)
+    def test_middleware_reports_query_count(self):
+        def view(request):
+            list(Tenant.objects.all())
+            list(Tenant.objects.all())
+            return HttpResponse('ok')
+
+        request = self.factory.get('/')
+        response = RequestCacheMiddleware(view)(request)
+        self.assertEqual(response['X-Query-Count'], '2')
+        self.assertEqual(request._request_cache.query_count, 2)
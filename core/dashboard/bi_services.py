@@ -2,14 +2,16 @@
 Business Intelligence Services for SalesCompass CRM
 Provides data aggregation, metrics calculation, and trend analysis.
 """
-from django.db.models import Count, Sum, Avg, F, Q
-from django.db.models.functions import TruncDate, TruncMonth, TruncWeek
+from django.db.models import Count, Sum, F, Q
+from django.db.models.functions import TruncDate
 from django.utils import timezone
 from datetime import timedelta
 from decimal import Decimal
 import asyncio
 import logging
 
+from .rollups import activity_matrix, rollup_series, rollup_totals
+
 logger = logging.getLogger(__name__)
 
 
@@ -141,12 +143,21 @@ class MetricsCalculationService:
     def __init__(self, tenant):
         self.tenant = tenant
         self.aggregation = DataAggregationService(tenant)
+        self._totals = None
     
+    def _kpi_totals(self):
+        """Tenant totals from the daily KPI rollups, read once per service."""
+        if self._totals is None:
+            self._totals = rollup_totals(self.tenant.id, (
+                'leads_created', 'leads_converted', 'opportunities_created', 'opportunities_won', 'won_amount',
+            ))
+        return self._totals
+
     def get_conversion_rate(self, days=30):
         """Calculate lead to opportunity conversion rate."""
-        leads = self.aggregation.get_leads_summary(days)
-        total = leads.get('total', 0)
-        converted = leads.get('converted', 0)
+        totals = self._kpi_totals()
+        total = totals['leads_created']
+        converted = totals['leads_converted']
         
         if total == 0:
             return Decimal('0')
@@ -154,9 +165,9 @@ class MetricsCalculationService:
     
     def get_win_rate(self, days=30):
         """Calculate opportunity win rate."""
-        opps = self.aggregation.get_opportunities_summary(days)
-        total = opps.get('total', 0)
-        won = opps.get('won', 0)
+        totals = self._kpi_totals()
+        total = totals['opportunities_created']
+        won = totals['opportunities_won']
         
         if total == 0:
             return Decimal('0')
@@ -164,35 +175,20 @@ class MetricsCalculationService:
     
     def get_average_deal_size(self):
         """Calculate average deal size from won opportunities."""
-        from opportunities.models import Opportunity
-        
-        result = Opportunity.objects.filter(
-            tenant=self.tenant,
-            stage='closed_won'
-        ).aggregate(avg=Avg('amount'))
-        
-        return result['avg'] or Decimal('0')
+        totals = self._kpi_totals()
+        if totals['opportunities_won'] == 0:
+            return Decimal('0')
+        return Decimal(totals['won_amount']) / Decimal(totals['opportunities_won'])
     
     def get_sales_velocity(self, days=90):
         """Calculate sales velocity metric."""
         # Sales Velocity = (# Opportunities × Win Rate × Avg Deal Size) / Sales Cycle Length
-        from opportunities.models import Opportunity
-        
-        opps = Opportunity.objects.filter(tenant=self.tenant)
-        total_opps = opps.count()
+        total_opps = self._kpi_totals()['opportunities_created']
         win_rate = self.get_win_rate(days) / 100
         avg_deal = self.get_average_deal_size()
         
-        # Estimate sales cycle (average days from created to won)
-        won_opps = opps.filter(stage='closed_won')
-        if won_opps.exists():
-            # Simplified - would need created_at and closed_at fields
-            sales_cycle = 30  # Default 30 days
-        else:
-            sales_cycle = 30
-        
-        if sales_cycle == 0:
-            return Decimal('0')
+        # Simplified - would need created_at and closed_at fields
+        sales_cycle = 30  # Default 30 days
         
         return (Decimal(total_opps) * win_rate * avg_deal) / Decimal(sales_cycle)
     
@@ -227,51 +223,21 @@ class TrendAnalysisService:
     
     def get_leads_trend(self, days=30, interval='day'):
         """Get leads created over time."""
-        from leads.models import Lead
-        
-        start_date = timezone.now() - timedelta(days=days)
-        leads = Lead.objects.filter(
-            tenant=self.tenant,
-            lead_created_at__gte=start_date
-        )
-        
-        if interval == 'week':
-            trunc_func = TruncWeek
-        elif interval == 'month':
-            trunc_func = TruncMonth
-        else:
-            trunc_func = TruncDate
-        
-        return list(leads.annotate(
-            date=trunc_func('lead_created_at')
-        ).values('date').annotate(
-            count=Count('id')
-        ).order_by('date'))
+        start_day = timezone.localdate() - timedelta(days=days)
+        series = rollup_series(self.tenant.id, ('leads_created',), start_day, interval)
+        return [
+            {'date': item['date'], 'count': item['leads_created']}
+            for item in series if item['leads_created']
+        ]
     
     def get_revenue_trend(self, days=90, interval='week'):
         """Get revenue (won opportunities) over time."""
-        from opportunities.models import Opportunity
-        
-        start_date = timezone.now() - timedelta(days=days)
-        opps = Opportunity.objects.filter(
-            tenant=self.tenant,
-            stage='closed_won',
-            opportunity_created_at__gte=start_date
-        )
-        
-        if interval == 'week':
-            trunc_func = TruncWeek
-        elif interval == 'month':
-            trunc_func = TruncMonth
-        else:
-            trunc_func = TruncDate
-        
-        return list(opps.annotate(
-            date=trunc_func('opportunity_created_at')
-        ).values('date').annotate(
-            total=Sum('amount'),
-            count=Count('id')
-        ).order_by('date'))
+        start_day = timezone.localdate() - timedelta(days=days)
+        series = rollup_series(self.tenant.id, ('won_amount', 'opportunities_won'), start_day, interval)
+        return [
+            {'date': item['date'], 'total': item['won_amount'], 'count': item['opportunities_won']}
+            for item in series if item['opportunities_won']
+        ]
     
     def get_pipeline_funnel(self):
         """Get pipeline funnel data for visualization."""
@@ -295,100 +261,47 @@ class TrendAnalysisService:
     
     def get_conversion_trend(self, days=90):
         """Get lead to opportunity conversion trend over time."""
-        from leads.models import Lead
-        from opportunities.models import Opportunity
-        
-        start_date = timezone.now() - timedelta(days=days)
-        
-        # Get leads by week
-        leads = Lead.objects.filter(
-            tenant=self.tenant,
-            lead_created_at__gte=start_date
-        ).annotate(
-            week=TruncWeek('lead_created_at')
-        ).values('week').annotate(
-            count=Count('id')
-        ).order_by('week')
-        
-        # Get opportunities by week
-        opps = Opportunity.objects.filter(
-            tenant=self.tenant,
-            opportunity_created_at__gte=start_date
-        ).annotate(
-            week=TruncWeek('opportunity_created_at')
-        ).values('week').annotate(
-            count=Count('id')
-        ).order_by('week')
-        
-        # Combine data
-        trend_data = {}
-        for lead in leads:
-            week = lead['week'].strftime('%Y-%m-%d')
-            trend_data[week] = {'leads': lead['count'], 'opportunities': 0}
-            
-        for opp in opps:
-            week = opp['week'].strftime('%Y-%m-%d')
-            if week in trend_data:
-                trend_data[week]['opportunities'] = opp['count']
-            else:
-                trend_data[week] = {'leads': 0, 'opportunities': opp['count']}
+        start_day = timezone.localdate() - timedelta(days=days)
+        series = rollup_series(
+            self.tenant.id, ('leads_created', 'opportunities_created'), start_day, 'week'
+        )
         
         # Calculate conversion rates
         result = []
-        for week, data in trend_data.items():
+        for item in series:
+            leads, opportunities = item['leads_created'], item['opportunities_created']
+            if not (leads or opportunities):
+                continue
             conversion_rate = 0
-            if data['leads'] > 0:
-                conversion_rate = round((data['opportunities'] / data['leads']) * 100, 2)
+            if leads > 0:
+                conversion_rate = round((opportunities / leads) * 100, 2)
                 
             result.append({
-                'week': week,
-                'leads': data['leads'],
-                'opportunities': data['opportunities'],
+                'week': item['date'].strftime('%Y-%m-%d'),
+                'leads': leads,
+                'opportunities': opportunities,
                 'conversion_rate': conversion_rate
             })
         
-        return sorted(result, key=lambda x: x['week'])
+        return result
 
     def get_user_trend(self, user, days=30, interval='day'):
         """Get user-specific performance trend."""
-        from leads.models import Lead
-        from opportunities.models import Opportunity
-        
-        start_date = timezone.now() - timedelta(days=days)
-        
-        if interval == 'week':
-            trunc_func = TruncWeek
-        elif interval == 'month':
-            trunc_func = TruncMonth
-        else:
-            trunc_func = TruncDate
-        
-        # Get user's leads
-        leads = Lead.objects.filter(
-            tenant=self.tenant,
-            assigned_to=user,
-            lead_created_at__gte=start_date
-        ).annotate(
-            date=trunc_func('lead_created_at')
-        ).values('date').annotate(
-            count=Count('id')
-        ).order_by('date')
-        
-        # Get user's opportunities
-        opps = Opportunity.objects.filter(
-            tenant=self.tenant,
-            assigned_to=user,
-            opportunity_created_at__gte=start_date
-        ).annotate(
-            date=trunc_func('opportunity_created_at')
-        ).values('date').annotate(
-            count=Count('id'),
-            total_value=Sum('amount')
-        ).order_by('date')
+        start_day = timezone.localdate() - timedelta(days=days)
+        series = rollup_series(
+            self.tenant.id, ('leads_created', 'opportunities_created', 'pipeline_amount'),
+            start_day, interval, owner_id=user.id
+        )
         
         return {
-            'leads_trend': list(leads),
-            'opportunities_trend': list(opps)
+            'leads_trend': [
+                {'date': item['date'], 'count': item['leads_created']}
+                for item in series if item['leads_created']
+            ],
+            'opportunities_trend': [
+                {'date': item['date'], 'count': item['opportunities_created'], 'total_value': item['pipeline_amount']}
+                for item in series if item['opportunities_created']
+            ]
         }
 
 
@@ -450,17 +363,17 @@ class RealTimeProcessor:
             audit_log_created_at__gt=last_timestamp
         ).select_related('user').order_by('-audit_log_created_at')[:5]
         
-        # Get recent leads
+        # Get recently created or updated leads (updated_at is set on create too)
         recent_leads = Lead.objects.filter(
             tenant=self.tenant,
-            lead_created_at__gt=last_timestamp
-        ).order_by('-lead_created_at')[:5]
+            updated_at__gt=last_timestamp
+        ).order_by('-updated_at')[:5]
         
-        # Get recent opportunities
+        # Get recently created or updated opportunities
         recent_opps = Opportunity.objects.filter(
             tenant=self.tenant,
-            opportunity_created_at__gt=last_timestamp
-        ).order_by('-opportunity_created_at')[:5]
+            updated_at__gt=last_timestamp
+        ).select_related('stage', 'account').order_by('-updated_at')[:5]
         
         return {
             'timestamp': timezone.now().isoformat(),
@@ -474,16 +387,18 @@ class RealTimeProcessor:
             'leads': [{
                 'id': lead.id,
                 'name': str(lead),
-                'source': lead.source,
+                'source': lead.lead_source,
                 'status': lead.status,
-                'created_at': lead.lead_created_at.isoformat(),
+                'created_at': lead.created_at.isoformat(),
+                'updated_at': lead.updated_at.isoformat(),
             } for lead in recent_leads],
             'opportunities': [{
                 'id': opp.id,
                 'name': str(opp),
-                'stage': opp.stage,
+                'stage': str(opp.stage) if opp.stage_id else None,
                 'amount': float(opp.amount or 0),
-                'created_at': opp.opportunity_created_at.isoformat(),
+                'created_at': opp.created_at.isoformat(),
+                'updated_at': opp.updated_at.isoformat(),
             } for opp in recent_opps]
         }
 
@@ -513,28 +428,8 @@ class AdvancedVisualizationService:
     
     def get_heatmap_data(self, days=30):
         """Generate heatmap data showing activity by day/hour."""
-        from audit_logs.models import AuditLog
-        
-        start_date = timezone.now() - timedelta(days=days)
-        
-        # Get activity grouped by day of week and hour
-        heatmap_data = AuditLog.objects.filter(
-            tenant=self.tenant,
-            audit_log_created_at__gte=start_date
-        ).extra(select={
-            'day_of_week': 'EXTRACT(dow FROM audit_log_created_at)',
-            'hour_of_day': 'EXTRACT(hour FROM audit_log_created_at)'
-        }).values('day_of_week', 'hour_of_day').annotate(
-            count=Count('id')
-        )
-        
-        # Convert to matrix format
-        matrix = [[0 for _ in range(24)] for _ in range(7)]
-        for entry in heatmap_data:
-            day = int(entry['day_of_week'])
-            hour = int(entry['hour_of_day'])
-            count = entry['count']
-            matrix[day][hour] = count
+        start_day = timezone.localdate() - timedelta(days=days)
+        matrix = activity_matrix(self.tenant.id, start_day)
             
         return {
             'matrix': matrix,
@@ -681,20 +576,14 @@ class AdvancedVisualizationService:
 
     def get_cohort_analysis(self, months=12):
         """Perform cohort analysis on customer acquisition."""
-        from accounts.models import Account
-        
-        # Get accounts created in the last N months
-        start_date = timezone.now() - timedelta(days=months*30)
-        accounts = Account.objects.filter(
-            tenant=self.tenant,
-            account_created_at__gte=start_date
-        ).annotate(
-            cohort_month=TruncMonth('account_created_at')
-        ).values('cohort_month').annotate(
-            count=Count('id')
-        ).order_by('cohort_month')
-        
-        return list(accounts)
+        # Accounts created in the last N months
+        start_day = timezone.localdate() - timedelta(days=months*30)
+        series = rollup_series(self.tenant.id, ('accounts_created',), start_day, 'month')
+        
+        return [
+            {'cohort_month': item['date'], 'count': item['accounts_created']}
+            for item in series if item['accounts_created']
+        ]
     
 
 
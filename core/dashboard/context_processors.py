@@ -1,3 +1,4 @@
+from core.request_cache import memoize
 from dashboard.models import DashboardConfig
 
 def user_dashboards(request):
@@ -7,11 +8,12 @@ def user_dashboards(request):
     context = {}
     
     if request.user.is_authenticated:
-        # Get user's dashboards, ordered by default first, then by updated date
-        dashboards = DashboardConfig.objects.filter(
-            user=request.user
-        ).order_by('-is_default', '-config_updated_at')[:10]  # Limit to 10 most recent
-        
-        context['user_dashboards'] = dashboards
+        # Get user's dashboards, ordered by default first, then by updated date.
+        # Evaluated once per request and shared by every render.
+        context['user_dashboards'] = memoize(request, 'user_dashboards', lambda: list(
+            DashboardConfig.objects.filter(
+                user=request.user
+            ).order_by('-is_default', '-config_updated_at')[:10]  # Limit to 10 most recent
+        ))
     
     return context
@@ -0,0 +1,127 @@
+"""
+Live BI Dashboard Updates
+
+One producer per tenant instead of one polling loop per open socket:
+- Lead and Opportunity saves and deletes mark the tenant's dashboards dirty
+- The first change in a BI_DASHBOARD_UPDATE_DEBOUNCE window schedules one
+  publish task for the end of the window; later changes are coalesced
+- The task computes the delta (rows created or updated since the tenant's
+  previous publish) once and sends it to the bi_dashboard_{tenant_id}
+  group, which every connected BIDashboardConsumer relays to its socket
+- Tenants without open dashboards are skipped
+
+Listener counts, pending flags and publish watermarks live in the Django
+cache and updates reach consumers through the channel layer. Both are
+Redis-backed in settings (CACHES, CHANNEL_LAYERS): the ASGI process that
+counts a listener is not the web or Celery process that reads the count.
+
+Usage:
+    from dashboard.live_updates import request_update
+
+    request_update(lead.tenant_id)
+"""
+import logging
+from typing import Any, Dict, Optional
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+LISTENERS_KEY = 'bi_dashboard:listeners:{tenant_id}'
+PENDING_KEY = 'bi_dashboard:pending:{tenant_id}'
+PUBLISHED_KEY = 'bi_dashboard:published:{tenant_id}'
+
+
+def group_name(tenant_id) -> str:
+    return f'bi_dashboard_{tenant_id}'
+
+
+def _debounce() -> int:
+    return getattr(settings, 'BI_DASHBOARD_UPDATE_DEBOUNCE', 5)
+
+
+def add_listener(tenant_id) -> None:
+    """Count an open dashboard socket for the tenant."""
+    key = LISTENERS_KEY.format(tenant_id=tenant_id)
+    if not cache.add(key, 1, timeout=None):
+        cache.incr(key)
+
+
+def remove_listener(tenant_id) -> None:
+    key = LISTENERS_KEY.format(tenant_id=tenant_id)
+    try:
+        if cache.decr(key) <= 0:
+            cache.delete(key)
+    except ValueError:
+        # Counter already gone (cache restart or eviction)
+        pass
+
+
+def has_listeners(tenant_id) -> bool:
+    return (cache.get(LISTENERS_KEY.format(tenant_id=tenant_id)) or 0) > 0
+
+
+def request_update(tenant_id) -> None:
+    """
+    Schedule a publish for the tenant unless one is already pending.
+    Scheduling waits for the surrounding transaction to commit.
+    """
+    if tenant_id is None or not has_listeners(tenant_id):
+        return
+    # The flag outlives the debounce window so a lost task cannot block updates for long
+    if cache.add(PENDING_KEY.format(tenant_id=tenant_id), True, timeout=max(_debounce() * 4, 60)):
+        transaction.on_commit(lambda: _schedule(tenant_id))
+
+
+def _schedule(tenant_id) -> None:
+    try:
+        from .tasks import publish_bi_dashboard_update
+        publish_bi_dashboard_update.apply_async((tenant_id,), countdown=_debounce())
+    except Exception as e:
+        logger.error(f"Could not schedule BI dashboard update for tenant {tenant_id}: {e}")
+        cache.delete(PENDING_KEY.format(tenant_id=tenant_id))
+
+
+def _has_changes(data: Dict[str, Any]) -> bool:
+    return any(data.get(key) for key in ('activities', 'leads', 'opportunities'))
+
+
+def publish_update(tenant_id) -> Optional[Dict[str, Any]]:
+    """
+    Compute the tenant's delta since its last publish and broadcast it.
+    Returns the message sent, or None when there was nothing to send.
+    """
+    from tenants.models import Tenant
+    from .bi_services import RealTimeProcessor
+
+    # Clear first so changes made while computing schedule another publish
+    cache.delete(PENDING_KEY.format(tenant_id=tenant_id))
+    if not has_listeners(tenant_id):
+        return None
+    tenant = Tenant.objects.filter(id=tenant_id).first()
+    if tenant is None:
+        return None
+
+    published_key = PUBLISHED_KEY.format(tenant_id=tenant_id)
+    started = timezone.now().isoformat()
+    data = RealTimeProcessor(tenant).get_streaming_data(cache.get(published_key))
+    # Rows written while the delta was read fall into the next one
+    cache.set(published_key, started, timeout=24 * 60 * 60)
+    if not _has_changes(data):
+        return None
+
+    message = {
+        'type': 'live_update',
+        'timestamp': data['timestamp'],
+        'data': data,
+    }
+    async_to_sync(get_channel_layer().group_send)(
+        group_name(tenant_id),
+        {'type': 'bi_dashboard.update', 'data': message},
+    )
+    return message
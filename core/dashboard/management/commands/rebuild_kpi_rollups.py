@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from dashboard.rollups import reconcile
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the KPI and activity rollup tables behind the BI dashboards.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tenant', type=int, action='append', dest='tenants',
+                            help='Tenant id to rebuild (repeatable). Defaults to all tenants.')
+        parser.add_argument('--days', type=int, default=None,
+                            help='Only rebuild this many trailing days. Defaults to full history.')
+
+    def handle(self, *args, **options):
+        count = reconcile(tenant_ids=options['tenants'], days=options['days'])
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt KPI rollups for {count} tenants."))
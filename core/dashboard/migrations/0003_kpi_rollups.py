@@ -0,0 +1,57 @@
+# Generated by Django 5.2.18 on 2026-10-16 22:40
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0002_initial'),
+        ('tenants', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='KPIDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('leads_created', models.PositiveIntegerField(default=0)),
+                ('leads_converted', models.PositiveIntegerField(default=0)),
+                ('opportunities_created', models.PositiveIntegerField(default=0)),
+                ('opportunities_won', models.PositiveIntegerField(default=0)),
+                ('pipeline_amount', models.DecimalField(decimal_places=2, default=0, max_digits=18)),
+                ('won_amount', models.DecimalField(decimal_places=2, default=0, max_digits=18)),
+                ('cases_opened', models.PositiveIntegerField(default=0)),
+                ('cases_resolved', models.PositiveIntegerField(default=0)),
+                ('tasks_created', models.PositiveIntegerField(default=0)),
+                ('tasks_completed', models.PositiveIntegerField(default=0)),
+                ('accounts_created', models.PositiveIntegerField(default=0)),
+                ('rollup_updated_at', models.DateTimeField(auto_now=True)),
+                ('owner', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='kpi_rollups', to=settings.AUTH_USER_MODEL)),
+                ('tenant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='%(class)ss', to='tenants.tenant')),
+            ],
+            options={
+                'indexes': [
+                    models.Index(fields=['tenant', 'day'], name='dashboard_kpi_tenant_day_idx'),
+                    models.Index(fields=['tenant', 'owner', 'day'], name='dashboard_kpi_owner_day_idx'),
+                ],
+            },
+        ),
+        migrations.CreateModel(
+            name='ActivityHourlyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('hour', models.PositiveSmallIntegerField()),
+                ('activity_count', models.PositiveIntegerField(default=0)),
+                ('tenant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='%(class)ss', to='tenants.tenant')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('tenant', 'day', 'hour'), name='unique_activity_hourly_rollup')],
+            },
+        ),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 5.2.18 on 2026-10-16 14:05
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+METRIC_COLUMNS = (
+    'leads_created', 'leads_converted', 'opportunities_created', 'opportunities_won',
+    'pipeline_amount', 'won_amount', 'cases_opened', 'cases_resolved',
+    'tasks_created', 'tasks_completed', 'accounts_created',
+)
+
+
+def merge_duplicate_rows(apps, schema_editor):
+    """Fold rows sharing (tenant, day, owner) into the oldest one; refreshes kept each fact on one row."""
+    KPIDailyRollup = apps.get_model('dashboard', 'KPIDailyRollup')
+    duplicates = KPIDailyRollup.objects.values('tenant_id', 'day', 'owner_id').annotate(
+        rows=models.Count('id')
+    ).filter(rows__gt=1).order_by()
+    for key in duplicates:
+        rows = list(KPIDailyRollup.objects.filter(
+            tenant_id=key['tenant_id'], day=key['day'], owner_id=key['owner_id']
+        ).order_by('pk'))
+        keep = rows[0]
+        for row in rows[1:]:
+            for column in METRIC_COLUMNS:
+                setattr(keep, column, getattr(keep, column) + getattr(row, column))
+        keep.save(update_fields=METRIC_COLUMNS)
+        KPIDailyRollup.objects.filter(pk__in=[row.pk for row in rows[1:]]).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0003_kpi_rollups'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_rows, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='kpidailyrollup',
+            name='owner',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='kpi_rollups', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddConstraint(
+            model_name='kpidailyrollup',
+            constraint=models.UniqueConstraint(fields=('tenant', 'day', 'owner'), name='unique_kpi_daily_rollup', nulls_distinct=False),
+        ),
+    ]
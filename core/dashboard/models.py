@@ -109,3 +109,54 @@ class DashboardConfig(TenantModel):
 
     class Meta:
         ordering = ['-is_default', '-config_created_at']
+
+
+class KPIDailyRollup(TenantModel):
+    """
+    Daily per-owner facts for BI dashboards, bucketed by the day each record
+    was created. Maintained by dashboard.rollups; a deleted owner's rows go
+    with them and their records are rolled up again under no owner.
+    """
+    day = models.DateField()
+    owner = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True, related_name='kpi_rollups')
+    leads_created = models.PositiveIntegerField(default=0)
+    leads_converted = models.PositiveIntegerField(default=0)
+    opportunities_created = models.PositiveIntegerField(default=0)
+    opportunities_won = models.PositiveIntegerField(default=0)
+    pipeline_amount = models.DecimalField(max_digits=18, decimal_places=2, default=0)
+    won_amount = models.DecimalField(max_digits=18, decimal_places=2, default=0)
+    cases_opened = models.PositiveIntegerField(default=0)
+    cases_resolved = models.PositiveIntegerField(default=0)
+    tasks_created = models.PositiveIntegerField(default=0)
+    tasks_completed = models.PositiveIntegerField(default=0)
+    accounts_created = models.PositiveIntegerField(default=0)
+    rollup_updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['tenant', 'day', 'owner'], nulls_distinct=False, name='unique_kpi_daily_rollup'
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['tenant', 'day'], name='dashboard_kpi_tenant_day_idx'),
+            models.Index(fields=['tenant', 'owner', 'day'], name='dashboard_kpi_owner_day_idx'),
+        ]
+
+    def __str__(self):
+        return f"KPI rollup {self.day} (owner {self.owner_id})"
+
+
+class ActivityHourlyRollup(TenantModel):
+    """Audit-log activity per tenant, day and hour of day, for the activity heatmap."""
+    day = models.DateField()
+    hour = models.PositiveSmallIntegerField()
+    activity_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['tenant', 'day', 'hour'], name='unique_activity_hourly_rollup'),
+        ]
+
+    def __str__(self):
+        return f"Activity {self.day} {self.hour:02d}:00 ({self.activity_count})"
@@ -0,0 +1,377 @@
+"""
+KPI Rollups for BI Dashboards
+
+Daily per-tenant, per-owner fact rows (KPIDailyRollup) for leads,
+opportunities, revenue, cases, tasks and accounts, plus hourly audit-log
+activity (ActivityHourlyRollup). BI services read weekly and monthly views
+from these tables instead of grouping raw rows on every dashboard load.
+
+- Facts are bucketed by the local day a record was created, so a record
+  always belongs to the same day and owner changes only move it between
+  rows of that day
+- post_save / post_delete (and bulk paths through mark_instances_dirty)
+  mark (source, tenant, day) dirty. Dirty days are recomputed from the
+  source table once the transaction commits: one grouped query per day
+  and source, upserting only that source's columns on the
+  (tenant, day, owner) unique key, so concurrent refreshes of a day cannot
+  duplicate its rows
+- Deleting a user drops their rows and recomputes those days once the
+  deletion commits, with their records under no owner
+- reconcile_kpi_rollups runs nightly over the last KPI_ROLLUP_RECONCILE_DAYS
+  days to pick up changes that bypass signals (queryset.update(), stage
+  definitions changing) and rolls up the previous days' audit activity
+- `manage.py rebuild_kpi_rollups` backfills full history
+
+Usage:
+    from dashboard.rollups import rollup_series
+
+    weekly = rollup_series(tenant.id, ('won_amount',), start_day, 'week')
+"""
+import logging
+import threading
+from datetime import date, datetime, time, timedelta
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+from django.apps import apps
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Count, F, Max, Min, Q, Sum
+from django.db.models.functions import ExtractHour, TruncDate, TruncMonth, TruncWeek
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+
+class FactSource(NamedTuple):
+    """A source table and the KPIDailyRollup columns it feeds."""
+    model_label: str
+    owner_field: str
+    aggregates: Callable[[], Dict[str, Any]]
+
+    @property
+    def model(self):
+        return apps.get_model(self.model_label)
+
+    @property
+    def columns(self) -> Tuple[str, ...]:
+        return tuple(self.aggregates())
+
+
+FACT_SOURCES = {
+    'leads': FactSource('leads.Lead', 'owner', lambda: {
+        'leads_created': Count('id'),
+        'leads_converted': Count('id', filter=Q(status='converted')),
+    }),
+    'opportunities': FactSource('opportunities.Opportunity', 'owner', lambda: {
+        'opportunities_created': Count('id'),
+        'opportunities_won': Count('id', filter=Q(stage__is_won=True)),
+        'pipeline_amount': Sum('amount'),
+        'won_amount': Sum('amount', filter=Q(stage__is_won=True)),
+    }),
+    'cases': FactSource('cases.Case', 'owner', lambda: {
+        'cases_opened': Count('id'),
+        'cases_resolved': Count('id', filter=Q(status__in=['resolved', 'closed'])),
+    }),
+    'tasks': FactSource('tasks.Task', 'assigned_to', lambda: {
+        'tasks_created': Count('id'),
+        'tasks_completed': Count('id', filter=Q(status='completed')),
+    }),
+    'accounts': FactSource('accounts.Account', 'owner', lambda: {
+        'accounts_created': Count('id'),
+    }),
+}
+
+METRIC_COLUMNS = tuple(column for source in FACT_SOURCES.values() for column in source.columns)
+
+DirtyKey = Tuple[str, int, date]
+
+_local = threading.local()
+
+
+def _reconcile_days() -> int:
+    return getattr(settings, 'KPI_ROLLUP_RECONCILE_DAYS', 3)
+
+
+def _local_day(value: datetime) -> date:
+    return timezone.localdate(value) if timezone.is_aware(value) else value.date()
+
+
+def _day_bounds(start_day: date, end_day: date) -> Tuple[datetime, datetime]:
+    """Datetimes covering start_day through end_day (inclusive) in the current timezone."""
+    start = datetime.combine(start_day, time.min)
+    end = datetime.combine(end_day + timedelta(days=1), time.min)
+    if settings.USE_TZ:
+        start, end = timezone.make_aware(start), timezone.make_aware(end)
+    return start, end
+
+
+def source_for_model(model) -> Optional[str]:
+    label = model._meta.label
+    for name, source in FACT_SOURCES.items():
+        if source.model_label == label:
+            return name
+    return None
+
+
+# ---------------------------------------------------------------------------
+# Maintenance
+# ---------------------------------------------------------------------------
+
+def refresh_facts(source_name: str, tenant_id: int, start_day: date, end_day: date) -> None:
+    """Recompute one source's columns for a tenant's days from the source table."""
+    from .models import KPIDailyRollup
+
+    source = FACT_SOURCES[source_name]
+    columns = source.columns
+    start, end = _day_bounds(start_day, end_day)
+
+    facts: Dict[Tuple[date, Optional[int]], Dict[str, Any]] = {}
+    grouped = source.model._default_manager.filter(
+        tenant_id=tenant_id, created_at__gte=start, created_at__lt=end
+    ).annotate(rollup_day=TruncDate('created_at')).order_by().values(
+        'rollup_day', source.owner_field
+    ).annotate(**source.aggregates())
+    for item in grouped:
+        key = (item.pop('rollup_day'), item.pop(source.owner_field))
+        facts[key] = {column: item[column] or 0 for column in columns}
+
+    zeros = dict.fromkeys(columns, 0)
+    with transaction.atomic():
+        rows = KPIDailyRollup.objects.filter(tenant_id=tenant_id, day__gte=start_day, day__lte=end_day)
+        # Existing keys without facts any more have this source's columns zeroed
+        for key in rows.values_list('day', 'owner_id'):
+            facts.setdefault(key, zeros)
+        _upsert([
+            KPIDailyRollup(tenant_id=tenant_id, day=day, owner_id=owner_id, **values)
+            for (day, owner_id), values in facts.items()
+        ], columns)
+        rows.filter(**dict.fromkeys(METRIC_COLUMNS, 0)).delete()
+
+
+def _upsert(rows: List[Any], columns: Sequence[str]) -> None:
+    """Insert rollup rows, or overwrite ``columns`` of the existing row with the same key."""
+    from .models import KPIDailyRollup
+
+    update_fields = list(columns) + ['rollup_updated_at']
+    if connection.features.supports_nulls_distinct_unique_constraints:
+        KPIDailyRollup.objects.bulk_create(
+            rows, update_conflicts=True, unique_fields=['tenant', 'day', 'owner'], update_fields=update_fields
+        )
+        return
+
+    # Backends without NULLS NOT DISTINCT (SQLite) skip the constraint; they
+    # also allow one writer at a time, so update-then-insert cannot race
+    if not rows:
+        return
+    tenant_id = rows[0].tenant_id
+    existing = dict(
+        ((day, owner_id), pk) for day, owner_id, pk in KPIDailyRollup.objects.filter(
+            tenant_id=tenant_id, day__in={row.day for row in rows}
+        ).values_list('day', 'owner_id', 'pk')
+    )
+    now = timezone.now()
+    for row in rows:
+        row.pk = existing.get((row.day, row.owner_id))
+        row.rollup_updated_at = now
+    KPIDailyRollup.objects.bulk_update([row for row in rows if row.pk], update_fields)
+    KPIDailyRollup.objects.bulk_create([row for row in rows if not row.pk])
+
+
+def refresh_activity(tenant_id: int, start_day: date, end_day: date) -> None:
+    """Recompute hourly audit activity for a tenant's (complete) days."""
+    from audit_logs.models import AuditLog
+    from .models import ActivityHourlyRollup
+
+    start, end = _day_bounds(start_day, end_day)
+    grouped = AuditLog.objects.filter(
+        tenant_id=tenant_id, audit_log_created_at__gte=start, audit_log_created_at__lt=end
+    ).annotate(
+        rollup_day=TruncDate('audit_log_created_at'), rollup_hour=ExtractHour('audit_log_created_at')
+    ).order_by().values('rollup_day', 'rollup_hour').annotate(count=Count('id'))
+
+    with transaction.atomic():
+        ActivityHourlyRollup.objects.filter(tenant_id=tenant_id, day__gte=start_day, day__lte=end_day).delete()
+        ActivityHourlyRollup.objects.bulk_create([
+            ActivityHourlyRollup(
+                tenant_id=tenant_id, day=item['rollup_day'], hour=item['rollup_hour'], activity_count=item['count']
+            )
+            for item in grouped
+        ])
+
+
+def _refresh_keys(keys: Iterable[DirtyKey]) -> None:
+    for source_name, tenant_id, day in sorted(set(keys)):
+        try:
+            refresh_facts(source_name, tenant_id, day, day)
+        except Exception as e:
+            # The nightly reconcile repairs the day
+            logger.error(f"KPI rollup refresh failed for {source_name} tenant {tenant_id} on {day}: {e}")
+
+
+def _flush() -> None:
+    keys = getattr(_local, 'pending', None)
+    _local.pending = set()
+    if keys:
+        _refresh_keys(keys)
+
+
+def _mark(keys: List[DirtyKey]) -> None:
+    if not keys:
+        return
+    if not transaction.get_connection().in_atomic_block:
+        _refresh_keys(keys)
+        return
+
+    # Every mark adds a commit hook: the first one to run refreshes all the
+    # keys gathered so far and the rest find none left. Keys of a rolled back
+    # transaction are refreshed with the next commit, which is harmless.
+    pending = getattr(_local, 'pending', None)
+    if pending is None:
+        pending = _local.pending = set()
+    pending.update(keys)
+    transaction.on_commit(_flush)
+
+
+def mark_instances_dirty(instances: Iterable[Any]) -> None:
+    """Schedule a refresh of the days holding ``instances`` (for bulk_create and other signal-free writes)."""
+    keys = []
+    for instance in instances:
+        source_name = source_for_model(type(instance))
+        created_at = getattr(instance, 'created_at', None)
+        if source_name is None or created_at is None or instance.tenant_id is None:
+            continue
+        keys.append((source_name, instance.tenant_id, _local_day(created_at)))
+    _mark(keys)
+
+
+def mark_record_dirty(sender, instance, **kwargs) -> None:
+    """post_save / post_delete receiver for the fact source models."""
+    mark_instances_dirty([instance])
+
+
+def _refresh_spans(spans: List[Tuple[int, date, date]]) -> None:
+    for tenant_id, start_day, end_day in spans:
+        for source_name in FACT_SOURCES:
+            try:
+                refresh_facts(source_name, tenant_id, start_day, end_day)
+            except Exception as e:
+                logger.error(f"KPI rollup refresh failed for {source_name} tenant {tenant_id}: {e}")
+
+
+def release_owner(sender, instance, **kwargs) -> None:
+    """
+    pre_delete receiver for users. Their rollup rows are deleted with them
+    while their records move to no owner, so the days they held are
+    recomputed once the deletion commits.
+    """
+    from .models import KPIDailyRollup
+
+    spans = list(KPIDailyRollup.objects.filter(owner=instance).order_by().values('tenant_id').annotate(
+        first=Min('day'), last=Max('day')
+    ).values_list('tenant_id', 'first', 'last'))
+    if spans:
+        transaction.on_commit(lambda: _refresh_spans(spans))
+
+
+def reconcile(tenant_ids: Optional[Sequence[int]] = None, days: Optional[int] = None) -> int:
+    """
+    Recompute the last ``days`` days of facts (all history when ``days`` is
+    None) and the completed days of activity. Returns the tenants processed.
+    """
+    from tenants.models import Tenant
+    from audit_logs.models import AuditLog
+
+    if tenant_ids is None:
+        tenant_ids = list(Tenant.objects.values_list('id', flat=True))
+    today = timezone.localdate()
+    yesterday = today - timedelta(days=1)
+
+    for tenant_id in tenant_ids:
+        for source_name, source in FACT_SOURCES.items():
+            if days is not None:
+                start_day = today - timedelta(days=days)
+            else:
+                first = source.model._default_manager.filter(tenant_id=tenant_id).aggregate(first=Min('created_at'))['first']
+                if first is None:
+                    continue
+                start_day = _local_day(first)
+            refresh_facts(source_name, tenant_id, start_day, today)
+
+        if days is not None:
+            start_day = today - timedelta(days=days)
+        else:
+            first = AuditLog.objects.filter(tenant_id=tenant_id).aggregate(
+                first=Min('audit_log_created_at')
+            )['first']
+            start_day = _local_day(first) if first else today
+        if start_day <= yesterday:
+            refresh_activity(tenant_id, start_day, yesterday)
+    return len(tenant_ids)
+
+
+# ---------------------------------------------------------------------------
+# Queries
+# ---------------------------------------------------------------------------
+
+def _rollup_rows(tenant_id: int, start_day: Optional[date] = None, owner_id: Optional[int] = None):
+    from .models import KPIDailyRollup
+
+    rows = KPIDailyRollup.objects.filter(tenant_id=tenant_id)
+    if start_day is not None:
+        rows = rows.filter(day__gte=start_day)
+    if owner_id is not None:
+        rows = rows.filter(owner_id=owner_id)
+    return rows
+
+
+def rollup_totals(tenant_id: int, columns: Sequence[str], start_day: Optional[date] = None,
+                  owner_id: Optional[int] = None) -> Dict[str, Any]:
+    """Sums of ``columns`` over a tenant's (or owner's) days since ``start_day``."""
+    totals = _rollup_rows(tenant_id, start_day, owner_id).aggregate(
+        **{column: Sum(column) for column in columns}
+    )
+    return {column: totals[column] or 0 for column in columns}
+
+
+def rollup_series(tenant_id: int, columns: Sequence[str], start_day: date, interval: str = 'day',
+                  owner_id: Optional[int] = None) -> List[Dict[str, Any]]:
+    """``columns`` summed per day, week or month since ``start_day``: [{'date': ..., column: ...}]."""
+    if interval == 'week':
+        period = TruncWeek('day')
+    elif interval == 'month':
+        period = TruncMonth('day')
+    else:
+        period = F('day')
+    data = _rollup_rows(tenant_id, start_day, owner_id).annotate(period=period).values('period').annotate(
+        **{column: Sum(column) for column in columns}
+    ).order_by('period')
+    return [
+        {'date': item['period'], **{column: item[column] or 0 for column in columns}}
+        for item in data
+    ]
+
+
+def activity_matrix(tenant_id: int, start_day: date) -> List[List[int]]:
+    """
+    Activity counts as a [day of week (Sunday = 0)][hour] matrix. Days after
+    the latest rolled-up day are read from the audit log directly.
+    """
+    from audit_logs.models import AuditLog
+    from .models import ActivityHourlyRollup
+
+    matrix = [[0 for _ in range(24)] for _ in range(7)]
+    rolled = ActivityHourlyRollup.objects.filter(tenant_id=tenant_id, day__gte=start_day)
+    for day, hour, count in rolled.values_list('day', 'hour', 'activity_count'):
+        matrix[day.isoweekday() % 7][hour] += count
+
+    latest = rolled.order_by('-day').values_list('day', flat=True).first()
+    raw_day = max(start_day, latest + timedelta(days=1)) if latest else start_day
+    raw_start, _ = _day_bounds(raw_day, raw_day)
+    recent = AuditLog.objects.filter(
+        tenant_id=tenant_id, audit_log_created_at__gte=raw_start
+    ).annotate(
+        rollup_day=TruncDate('audit_log_created_at'), rollup_hour=ExtractHour('audit_log_created_at')
+    ).order_by().values('rollup_day', 'rollup_hour').annotate(count=Count('id'))
+    for item in recent:
+        matrix[item['rollup_day'].isoweekday() % 7][item['rollup_hour']] += item['count']
+    return matrix
@@ -0,0 +1,42 @@
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from accounts.models import Account
+from cases.models import Case
+from core.models import User
+from leads.models import Lead
+from opportunities.models import Opportunity
+from tasks.models import Task
+
+from .live_updates import request_update
+from .rollups import mark_record_dirty, release_owner
+
+
+@receiver(post_save, sender=Lead)
+@receiver(post_delete, sender=Lead)
+@receiver(post_save, sender=Opportunity)
+@receiver(post_delete, sender=Opportunity)
+def schedule_bi_dashboard_update(sender, instance, **kwargs):
+    """Coalesce changes into one live update per tenant (see dashboard.live_updates)."""
+    request_update(instance.tenant_id)
+
+
+@receiver(post_save, sender=Lead)
+@receiver(post_delete, sender=Lead)
+@receiver(post_save, sender=Opportunity)
+@receiver(post_delete, sender=Opportunity)
+@receiver(post_save, sender=Case)
+@receiver(post_delete, sender=Case)
+@receiver(post_save, sender=Task)
+@receiver(post_delete, sender=Task)
+@receiver(post_save, sender=Account)
+@receiver(post_delete, sender=Account)
+def refresh_kpi_rollups(sender, instance, **kwargs):
+    """Recompute the record's KPI rollup day once the transaction commits (see dashboard.rollups)."""
+    mark_record_dirty(sender, instance, **kwargs)
+
+
+@receiver(pre_delete, sender=User)
+def release_kpi_rollup_owner(sender, instance, **kwargs):
+    """Roll the user's records up again under no owner once they are deleted."""
+    release_owner(sender, instance, **kwargs)
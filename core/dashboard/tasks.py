@@ -0,0 +1,18 @@
+from celery import shared_task
+
+
+@shared_task
+def publish_bi_dashboard_update(tenant_id: int):
+    """Compute a tenant's live BI dashboard delta once and broadcast it to its sockets."""
+    from .live_updates import publish_update
+    publish_update(tenant_id)
+
+
+@shared_task
+def reconcile_kpi_rollups(days: int = None):
+    """Recompute recent KPI rollups for every tenant and roll up completed days of activity."""
+    from django.conf import settings
+    from .rollups import reconcile
+    if days is None:
+        days = getattr(settings, 'KPI_ROLLUP_RECONCILE_DAYS', 3)
+    return reconcile(days=days)
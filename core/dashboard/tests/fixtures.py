@@ -0,0 +1,36 @@
+from unittest import mock
+
+from accounts.models import Account
+from opportunities.models import Opportunity, OpportunityStage
+from tenants.models import Tenant
+
+
+class OpportunityFixtureMixin:
+    """
+    A tenant named after ``fixture_name`` with open and won opportunity
+    stages and one committed account. Outgoing webhooks are patched out.
+    """
+
+    fixture_name = 'Dashboard'
+
+    def setUp(self):
+        super().setUp()
+        webhooks = mock.patch('settings_app.signals.trigger_webhook')
+        webhooks.start()
+        self.addCleanup(webhooks.stop)
+
+        self.tenant = Tenant.objects.create(
+            name=f'{self.fixture_name} Tenant', slug=f'{self.fixture_name.lower()}-tenant'
+        )
+        self.stage = OpportunityStage.objects.create(tenant=self.tenant, opportunity_stage_name='Open')
+        self.won_stage = OpportunityStage.objects.create(
+            tenant=self.tenant, opportunity_stage_name='Won', is_won=True
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            self.account = Account.objects.create(tenant=self.tenant, account_name=f'{self.fixture_name} Account')
+
+    def create_opportunity(self, amount, stage=None):
+        return Opportunity.objects.create(
+            tenant=self.tenant, opportunity_name=f'Deal {amount}', amount=amount, probability=0.5,
+            stage=stage or self.stage, account=self.account, close_date='2024-01-01'
+        )
@@ -0,0 +1,81 @@
+from decimal import Decimal
+
+from django.test import TestCase
+from django.utils import timezone
+
+from core.models import User
+from dashboard import rollups
+from dashboard.bi_services import MetricsCalculationService, TrendAnalysisService
+from dashboard.models import KPIDailyRollup
+from dashboard.tests.fixtures import OpportunityFixtureMixin
+
+
+class KPIRollupTests(OpportunityFixtureMixin, TestCase):
+    """Test suite for the daily KPI rollups behind the BI services."""
+
+    fixture_name = 'Rollup'
+
+    def _today(self):
+        return KPIDailyRollup.objects.filter(tenant=self.tenant, day=timezone.localdate())
+
+    def test_saves_refresh_the_day_once_committed(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.create_opportunity(100, self.won_stage)
+            self.create_opportunity(300, self.stage)
+            self.assertEqual(self._today().filter(opportunities_created__gt=0).count(), 0)
+
+        totals = rollups.rollup_totals(self.tenant.id, rollups.METRIC_COLUMNS)
+        self.assertEqual(totals['accounts_created'], 1)
+        self.assertEqual(totals['opportunities_created'], 2)
+        self.assertEqual(totals['opportunities_won'], 1)
+        self.assertEqual(totals['pipeline_amount'], Decimal('400'))
+        self.assertEqual(totals['won_amount'], Decimal('100'))
+
+        kpis = MetricsCalculationService(self.tenant).get_all_kpis()
+        self.assertEqual(kpis['win_rate'], Decimal('50.0'))
+        self.assertEqual(kpis['avg_deal_size'], Decimal('100.00'))
+
+    def test_deletes_and_reconcile_keep_rollups_exact(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            opportunity = self.create_opportunity(100, self.stage)
+        # Bypasses signals; only the reconcile sees it
+        Opportunity.objects.filter(pk=opportunity.pk).update(stage=self.won_stage)
+        self.assertEqual(rollups.rollup_totals(self.tenant.id, ('opportunities_won',))['opportunities_won'], 0)
+
+        rollups.reconcile(tenant_ids=[self.tenant.id], days=1)
+        self.assertEqual(rollups.rollup_totals(self.tenant.id, ('opportunities_won',))['opportunities_won'], 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            opportunity.delete()
+            self.account.delete()
+        self.assertFalse(KPIDailyRollup.objects.filter(tenant=self.tenant).exists())
+
+    def test_deleting_an_owner_rolls_their_records_up_under_no_owner(self):
+        owner = User.objects.create_user(
+            username='rollup-owner', email='owner@rollup.io', password='password', tenant=self.tenant
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            opportunity = self.create_opportunity(100, self.won_stage)
+            opportunity.owner = owner
+            opportunity.save()
+        self.assertEqual(self._today().get(owner=owner).opportunities_won, 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            owner.delete()
+        row = self._today().get()
+        self.assertIsNone(row.owner_id)
+        self.assertEqual((row.accounts_created, row.opportunities_won), (1, 1))
+
+        # Refreshing again overwrites the same row
+        rollups.refresh_facts('opportunities', self.tenant.id, row.day, row.day)
+        self.assertEqual(self._today().count(), 1)
+
+    def test_trends_read_weekly_buckets(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.create_opportunity(100, self.won_stage)
+            self.create_opportunity(50, self.won_stage)
+
+        trend = TrendAnalysisService(self.tenant).get_revenue_trend(days=7, interval='week')
+        self.assertEqual(len(trend), 1)
+        self.assertEqual(trend[0]['count'], 2)
+        self.assertEqual(trend[0]['total'], Decimal('150'))
@@ -0,0 +1,68 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase
+
+from dashboard import live_updates
+from dashboard.tests.fixtures import OpportunityFixtureMixin
+
+
+class LiveUpdateProducerTests(OpportunityFixtureMixin, TestCase):
+    """Test suite for the per-tenant BI dashboard update producer."""
+
+    fixture_name = 'Live'
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        super().setUp()
+
+    def test_changes_are_coalesced_per_tenant(self):
+        live_updates.add_listener(self.tenant.id)
+        with mock.patch('dashboard.tasks.publish_bi_dashboard_update.apply_async') as schedule:
+            with self.captureOnCommitCallbacks(execute=True):
+                for amount in (100, 200, 300):
+                    self.create_opportunity(amount)
+        schedule.assert_called_once_with((self.tenant.id,), countdown=live_updates._debounce())
+
+    def test_tenants_without_listeners_are_skipped(self):
+        with mock.patch('dashboard.tasks.publish_bi_dashboard_update.apply_async') as schedule:
+            with self.captureOnCommitCallbacks(execute=True):
+                self.create_opportunity(100)
+        schedule.assert_not_called()
+
+        live_updates.add_listener(self.tenant.id)
+        live_updates.remove_listener(self.tenant.id)
+        self.assertFalse(live_updates.has_listeners(self.tenant.id))
+
+    def test_publish_broadcasts_delta_once_to_tenant_group(self):
+        live_updates.add_listener(self.tenant.id)
+        live_updates.add_listener(self.tenant.id)
+        with mock.patch('dashboard.tasks.publish_bi_dashboard_update.apply_async'):
+            self.create_opportunity(100)
+
+        layer = mock.Mock(group_send=mock.AsyncMock())
+        with mock.patch('dashboard.live_updates.get_channel_layer', return_value=layer):
+            message = live_updates.publish_update(self.tenant.id)
+            # Nothing changed since the previous publish
+            self.assertIsNone(live_updates.publish_update(self.tenant.id))
+
+        layer.group_send.assert_awaited_once()
+        group, event = layer.group_send.await_args.args
+        self.assertEqual(group, f'bi_dashboard_{self.tenant.id}')
+        self.assertEqual(event, {'type': 'bi_dashboard.update', 'data': message})
+        self.assertEqual([opp['name'] for opp in message['data']['opportunities']], ['Deal 100 (Live Account)'])
+        self.assertIsNone(cache.get(live_updates.PENDING_KEY.format(tenant_id=self.tenant.id)))
+
+    def test_updates_to_existing_rows_are_published(self):
+        live_updates.add_listener(self.tenant.id)
+        with mock.patch('dashboard.tasks.publish_bi_dashboard_update.apply_async'):
+            opportunity = self.create_opportunity(100)
+            layer = mock.Mock(group_send=mock.AsyncMock())
+            with mock.patch('dashboard.live_updates.get_channel_layer', return_value=layer):
+                live_updates.publish_update(self.tenant.id)
+                opportunity.amount = 250
+                opportunity.save()
+                message = live_updates.publish_update(self.tenant.id)
+
+        self.assertEqual([opp['amount'] for opp in message['data']['opportunities']], [250.0])
@@ -0,0 +1,186 @@
+"""
+Multi-Touch Attribution
+
+Tenant-wide attribution of engagement to channels (campaign, source,
+referring domain or direct) under the first_touch, last_touch, linear,
+time_decay and u_shaped models that marketing's AttributionService uses:
+- The tenant's EngagementEvents in the window are read in one streaming
+  pass, ordered by (account, created_at), into NumPy arrays
+- Account boundaries in the sorted arrays give every touchpoint its
+  position, its account's size and time span; each model's weights are
+  then array arithmetic and per-channel totals are bincounts
+- An account's value (the sum of calculate_attribution_value over its
+  touchpoints) is split across its touchpoints by the model's weights
+- All models come out of the same pass and are cached per
+  (tenant, model, window) for ENGAGEMENT_ATTRIBUTION_CACHE_TTL seconds
+
+Usage:
+    from engagement.attribution import get_tenant_attribution
+
+    report = get_tenant_attribution(tenant_id, model='time_decay', days=90)
+"""
+from datetime import timedelta
+from typing import Any, Dict, List
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from .models import EngagementEvent
+from .utils import ATTRIBUTION_EVENT_VALUES
+
+ATTRIBUTION_MODELS = [
+    ('first_touch', 'First Touch'),
+    ('last_touch', 'Last Touch'),
+    ('linear', 'Linear'),
+    ('time_decay', 'Time Decay'),
+    ('u_shaped', 'U-Shaped'),
+]
+
+CACHE_KEY = 'engagement_attribution:{tenant_id}:{model}:{days}'
+SECONDS_PER_DAY = 24 * 60 * 60
+
+
+def _cache_ttl() -> int:
+    return getattr(settings, 'ENGAGEMENT_ATTRIBUTION_CACHE_TTL', 900)
+
+
+def _chunk_size() -> int:
+    return getattr(settings, 'ENGAGEMENT_ATTRIBUTION_CHUNK_SIZE', 5000)
+
+
+def channel_for(utm_campaign, utm_source, referring_domain) -> str:
+    """The channel a touchpoint is credited to."""
+    if utm_campaign:
+        return f"Campaign: {utm_campaign}"
+    if utm_source:
+        return f"Source: {utm_source}"
+    if referring_domain:
+        return f"Domain: {referring_domain}"
+    return "Direct"
+
+
+def _model_weights(timestamps: np.ndarray, group: np.ndarray, starts: np.ndarray,
+                   counts: np.ndarray) -> Dict[str, np.ndarray]:
+    """Each touchpoint's share of its account's credit, per model. Shares sum to 1 per account."""
+    size = counts[group]
+    position = np.arange(len(group)) - starts[group]
+    first = position == 0
+    last = position == size - 1
+
+    # 40% first, 40% last, 20% across the middle; 50/50 for two touches
+    u_shaped = np.where(first | last, 0.4, 0.2 / np.maximum(size - 2, 1))
+    u_shaped = np.where(size == 2, 0.5, u_shaped)
+    u_shaped = np.where(size == 1, 1.0, u_shaped)
+
+    # 2 ^ (days_from_first / span_days); equal shares when the span is under a day
+    first_seen = timestamps[starts]
+    days_from_first = np.floor((timestamps - first_seen[group]) / SECONDS_PER_DAY)
+    span = np.floor((timestamps[starts + counts - 1] - first_seen) / SECONDS_PER_DAY)[group]
+    decay = np.where(span > 0, np.exp2(days_from_first / np.where(span > 0, span, 1)), 1.0)
+
+    return {
+        'first_touch': first.astype(float),
+        'last_touch': last.astype(float),
+        'linear': 1.0 / size,
+        'time_decay': decay / np.bincount(group, weights=decay)[group],
+        'u_shaped': u_shaped,
+    }
+
+
+def _empty_result(model: str, days: int) -> Dict[str, Any]:
+    return {'model': model, 'days': days, 'accounts': 0, 'touchpoints': 0, 'total_value': 0.0, 'channels': []}
+
+
+def attribute_events(events, days: int) -> Dict[str, Dict[str, Any]]:
+    """
+    Attribute ``events`` (touchpoints without an account are ignored) under
+    every model. Returns {model: {'accounts', 'touchpoints', 'total_value',
+    'channels': [{'channel', 'touchpoints', 'credit', 'credit_share',
+    'attributed_value'}]}}, channels ordered by attributed value.
+    """
+    account_ids: List[int] = []
+    timestamps: List[float] = []
+    scores: List[float] = []
+    type_codes: List[int] = []
+    channel_codes: List[int] = []
+    event_types: Dict[str, int] = {}
+    channels: Dict[str, int] = {}
+
+    rows = events.filter(account__isnull=False).order_by('account_id', 'created_at', 'pk').values_list(
+        'account_id', 'created_at', 'event_type', 'engagement_score',
+        'utm_campaign', 'utm_source', 'referring_domain',
+    )
+    for account_id, created_at, event_type, score, campaign, source, domain in rows.iterator(chunk_size=_chunk_size()):
+        account_ids.append(account_id)
+        timestamps.append(created_at.timestamp())
+        scores.append(score or 0.0)
+        type_codes.append(event_types.setdefault(event_type, len(event_types)))
+        channel_codes.append(channels.setdefault(channel_for(campaign, source, domain), len(channels)))
+
+    if not account_ids:
+        return {model: _empty_result(model, days) for model, _ in ATTRIBUTION_MODELS}
+
+    accounts = np.asarray(account_ids)
+    times = np.asarray(timestamps, dtype=float)
+    channel_index = np.asarray(channel_codes, dtype=np.intp)
+    base_values = np.asarray([ATTRIBUTION_EVENT_VALUES.get(name, 1.0) for name in event_types], dtype=float)
+    values = base_values[np.asarray(type_codes, dtype=np.intp)] * (1 + np.asarray(scores, dtype=float) / 100.0)
+
+    is_start = np.empty(len(accounts), dtype=bool)
+    is_start[0] = True
+    is_start[1:] = accounts[1:] != accounts[:-1]
+    starts = np.flatnonzero(is_start)
+    group = np.cumsum(is_start) - 1
+    counts = np.diff(np.append(starts, len(accounts)))
+    account_value = np.bincount(group, weights=values)
+
+    channel_names = list(channels)
+    touchpoints = np.bincount(channel_index, minlength=len(channel_names))
+    results = {}
+    for model, weights in _model_weights(times, group, starts, counts).items():
+        credit = np.bincount(channel_index, weights=weights, minlength=len(channel_names))
+        attributed = np.bincount(channel_index, weights=weights * account_value[group], minlength=len(channel_names))
+        channel_rows = [
+            {
+                'channel': name,
+                'touchpoints': int(touchpoints[code]),
+                'credit': float(credit[code]),
+                'credit_share': float(credit[code] / len(starts) * 100),  # Percentage
+                'attributed_value': float(attributed[code]),
+            }
+            for code, name in enumerate(channel_names)
+        ]
+        channel_rows.sort(key=lambda row: row['attributed_value'], reverse=True)
+        results[model] = {
+            'model': model,
+            'days': days,
+            'accounts': len(starts),
+            'touchpoints': len(accounts),
+            'total_value': float(account_value.sum()),
+            'channels': channel_rows,
+        }
+    return results
+
+
+def get_tenant_attribution(tenant_id, model: str = 'linear', days: int = 30) -> Dict[str, Any]:
+    """The tenant's attribution report for ``model`` over the last ``days`` days (cached)."""
+    if model not in dict(ATTRIBUTION_MODELS):
+        raise ValueError(f"Unknown attribution model: {model}")
+
+    key = CACHE_KEY.format(tenant_id=tenant_id, model=model, days=days)
+    result = cache.get(key)
+    if result is not None:
+        return result
+
+    events = EngagementEvent.objects.filter(
+        tenant_id=tenant_id,
+        created_at__gte=timezone.now() - timedelta(days=days),
+    )
+    results = attribute_events(events, days)
+    cache.set_many(
+        {CACHE_KEY.format(tenant_id=tenant_id, model=name, days=days): value for name, value in results.items()},
+        timeout=_cache_ttl(),
+    )
+    return results[model]
@@ -0,0 +1,132 @@
+"""
+Benchmark engagement event queries.
+
+Seeds synthetic EngagementEvents spread over the last 13 months and reports
+p50/p95 latency of the hot feed and score queries: an account's recent
+feed, its windowed score from raw events and from the score buckets, and
+a tenant-wide event type count over a window. Prints the plan the
+database picks for the feed query. All data is created inside a
+transaction that is rolled back afterwards.
+
+Usage:
+    python manage.py benchmark_engagement_events --rows 50000000 --accounts 40000
+"""
+import random
+import statistics
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, Sum
+from django.utils import timezone
+
+from core.models import User
+from engagement.models import EngagementEvent
+from engagement.scoring import bucket_scores, load_scoring_params, rebuild_buckets
+from engagement.utils import SCORE_WEIGHTS
+from tenants.models import Tenant
+
+
+class Command(BaseCommand):
+    help = 'Measure feed and score query latency over a large EngagementEvent table'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=200000, help='Events to seed')
+        parser.add_argument('--accounts', type=int, default=1000, help='Accounts the events are spread over')
+        parser.add_argument('--samples', type=int, default=50, help='Timed runs per query')
+        parser.add_argument('--batch-size', type=int, default=10000, help='Rows per bulk insert')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            tenant, accounts = self._seed(options['rows'], options['accounts'], options['batch_size'])
+            results = self._measure(tenant, accounts, options['samples'])
+            transaction.set_rollback(True)
+
+        for name, latencies in results:
+            p50 = statistics.median(latencies)
+            p95 = sorted(latencies)[max(int(len(latencies) * 0.95) - 1, 0)]
+            self.stdout.write(f"{name:<32} p50 {p50 * 1000:8.2f} ms   p95 {p95 * 1000:8.2f} ms")
+
+    def _seed(self, rows, account_count, batch_size):
+        stamp = time.time_ns()
+        tenant = Tenant.objects.create(name='Engagement Benchmark', slug=f'engagement-benchmark-{stamp}')
+        accounts = User.objects.bulk_create([
+            User(username=f'bench-{stamp}-{number}', email=f'bench-{stamp}-{number}@example.com', tenant=tenant)
+            for number in range(account_count)
+        ])
+        account_ids = [account.pk for account in accounts]
+        event_types = list(SCORE_WEIGHTS)
+        now = timezone.now()
+
+        # Keep the backdated timestamps instead of letting auto_now_add overwrite them
+        created_at = EngagementEvent._meta.get_field('created_at')
+        created_at.auto_now_add = False
+        try:
+            started = time.perf_counter()
+            for offset in range(0, rows, batch_size):
+                EngagementEvent.objects.bulk_create([
+                    EngagementEvent(
+                        tenant=tenant,
+                        account_id=random.choice(account_ids),
+                        event_type=random.choice(event_types),
+                        description='Benchmark event',
+                        engagement_score=random.uniform(0, 100),
+                        created_at=now - timedelta(seconds=random.randint(0, 395 * 24 * 60 * 60)),
+                        updated_at=now,
+                    )
+                    for _ in range(min(batch_size, rows - offset))
+                ])
+            self.stdout.write(f"Seeded {rows:,} events in {time.perf_counter() - started:.1f}s")
+        finally:
+            created_at.auto_now_add = True
+
+        started = time.perf_counter()
+        rebuild_buckets(tenant.id)
+        self.stdout.write(f"Built score buckets in {time.perf_counter() - started:.1f}s")
+        return tenant, account_ids
+
+    def _measure(self, tenant, account_ids, samples):
+        params = load_scoring_params(tenant.id)
+        window_start = timezone.now() - timedelta(days=params.rolling_window)
+        event_types = list(SCORE_WEIGHTS)
+
+        def feed(account_id):
+            return list(EngagementEvent.objects.filter(
+                tenant=tenant, account_id=account_id
+            ).order_by('-created_at')[:50])
+
+        def raw_score(account_id):
+            return EngagementEvent.objects.filter(
+                tenant=tenant, account_id=account_id, created_at__gte=window_start
+            ).aggregate(total=Sum('engagement_score'), count=Count('id'))
+
+        def bucket_score(account_id):
+            return bucket_scores(params, 'account', [account_id], timezone.now(), tenant.id)
+
+        def type_window(event_type):
+            return EngagementEvent.objects.filter(
+                tenant=tenant, event_type=event_type, created_at__gte=window_start
+            ).count()
+
+        plan = EngagementEvent.objects.filter(
+            tenant=tenant, account_id=account_ids[0]
+        ).order_by('-created_at')[:50].explain()
+        self.stdout.write(f"Feed query plan:\n{plan}\n")
+
+        queries = [
+            ('Account feed (latest 50)', feed, account_ids),
+            ('Account score (raw events)', raw_score, account_ids),
+            ('Account score (buckets)', bucket_score, account_ids),
+            ('Event type count (window)', type_window, event_types),
+        ]
+        results = []
+        for name, query, arguments in queries:
+            latencies = []
+            for _ in range(samples):
+                argument = random.choice(arguments)
+                started = time.perf_counter()
+                query(argument)
+                latencies.append(time.perf_counter() - started)
+            results.append((name, latencies))
+        return results
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from engagement.scoring import rebuild_buckets, rescore_accounts
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds engagement score buckets from the events and rescores every engagement status.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tenant', type=int, default=None, help='Only rebuild this tenant.')
+
+    def handle(self, *args, **options):
+        buckets = rebuild_buckets(options['tenant'])
+        count = rescore_accounts(options['tenant'])
+        self.stdout.write(self.style.SUCCESS(f"Wrote {buckets} score buckets and rescored {count} statuses."))
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('engagement', '0004_socialinteraction'),
+        ('tenants', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='engagementevent',
+            name='scored_at',
+            field=models.DateTimeField(blank=True, help_text="When the event was added to its entities' score buckets", null=True),
+        ),
+        migrations.AlterField(
+            model_name='engagementstatus',
+            name='engagement_score',
+            field=models.FloatField(db_index=True, default=0.0),
+        ),
+        migrations.CreateModel(
+            name='EngagementScoreBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('entity_type', models.CharField(choices=[('account', 'Account'), ('company', 'Company'), ('lead', 'Lead')], max_length=20)),
+                ('entity_id', models.PositiveBigIntegerField()),
+                ('day', models.DateField()),
+                ('event_type', models.CharField(max_length=50)),
+                ('event_count', models.IntegerField(default=0)),
+                ('engagement_score_sum', models.FloatField(default=0.0)),
+                ('tenant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='%(class)ss', to='tenants.tenant')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['entity_type', 'entity_id', 'day'], name='engagement_bucket_entity_idx'), models.Index(fields=['day'], name='engagement_bucket_day_idx')],
+                'constraints': [models.UniqueConstraint(fields=('tenant', 'entity_type', 'entity_id', 'day', 'event_type'), name='unique_engagement_score_bucket')],
+            },
+        ),
+    ]
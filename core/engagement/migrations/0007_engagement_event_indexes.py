@@ -0,0 +1,69 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:50
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+BRIN_INDEX = 'engagement_evt_created_brin'
+
+
+class AddIndexOnline(AddIndexConcurrently):
+    """
+    CREATE INDEX CONCURRENTLY on PostgreSQL, so writes to the table are not
+    blocked while the index builds; a plain AddIndex elsewhere.
+    """
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == 'postgresql':
+            return super().database_forwards(app_label, schema_editor, from_state, to_state)
+        return migrations.AddIndex.database_forwards(self, app_label, schema_editor, from_state, to_state)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == 'postgresql':
+            return super().database_backwards(app_label, schema_editor, from_state, to_state)
+        return migrations.AddIndex.database_backwards(self, app_label, schema_editor, from_state, to_state)
+
+
+def create_brin_index(apps, schema_editor):
+    """Block-range index on created_at for time-window scans. PostgreSQL only."""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        f'CREATE INDEX CONCURRENTLY IF NOT EXISTS {BRIN_INDEX} ON engagement_engagementevent USING brin (created_at)'
+    )
+
+
+def drop_brin_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(f'DROP INDEX CONCURRENTLY IF EXISTS {BRIN_INDEX}')
+
+
+class Migration(migrations.Migration):
+
+    # Concurrent index builds cannot run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('engagement', '0006_engagement_event_storage'),
+    ]
+
+    operations = [
+        AddIndexOnline(
+            model_name='engagementevent',
+            index=models.Index(fields=['tenant', 'account', '-created_at'], include=('event_type', 'engagement_score'), name='engagement_evt_account_idx'),
+        ),
+        AddIndexOnline(
+            model_name='engagementevent',
+            index=models.Index(fields=['tenant', 'event_type', '-created_at'], name='engagement_evt_type_idx'),
+        ),
+        AddIndexOnline(
+            model_name='engagementevent',
+            index=models.Index(fields=['tenant', 'lead', '-created_at'], name='engagement_evt_lead_idx'),
+        ),
+        AddIndexOnline(
+            model_name='engagementevent',
+            index=models.Index(fields=['tenant', 'account_company', '-created_at'], name='engagement_evt_company_idx'),
+        ),
+        migrations.RunPython(create_brin_index, drop_brin_index),
+    ]
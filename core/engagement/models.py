@@ -115,6 +115,9 @@ class EngagementEvent(TenantModel, TimeStampedModel):
     metadata = models.JSONField(default=dict, blank=True)
     engagement_score = models.FloatField(default=0.0)
     is_important = models.BooleanField(default=False)
+    scored_at = models.DateTimeField(
+        null=True, blank=True, help_text="When the event was added to its entities' score buckets"
+    )
 
     utm_source = models.CharField(max_length=255, blank=True, null=True)
     utm_medium = models.CharField(max_length=255, blank=True, null=True)
@@ -128,6 +131,19 @@ class EngagementEvent(TenantModel, TimeStampedModel):
     
     assigned_to = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='assigned_engagement_events')
     mentions = models.ManyToManyField(User, blank=True, related_name='mentioned_in_engagement_events')
+
+    class Meta:
+        # Hot lookups: an entity's events or one event type in a recent window.
+        # Where supported (PostgreSQL), the account index also covers score aggregation.
+        indexes = [
+            models.Index(
+                fields=['tenant', 'account', '-created_at'], name='engagement_evt_account_idx',
+                include=['event_type', 'engagement_score'],
+            ),
+            models.Index(fields=['tenant', 'event_type', '-created_at'], name='engagement_evt_type_idx'),
+            models.Index(fields=['tenant', 'lead', '-created_at'], name='engagement_evt_lead_idx'),
+            models.Index(fields=['tenant', 'account_company', '-created_at'], name='engagement_evt_company_idx'),
+        ]
     
     def clean(self):
         from django.core.exceptions import ValidationError
@@ -231,7 +247,7 @@ class EngagementStatus(TenantModel, TimeStampedModel):
     account = models.OneToOneField(User, on_delete=models.CASCADE, related_name='engagement_status')
     last_engaged_at = models.DateTimeField(null=True, blank=True)
     last_decay_calculation = models.DateTimeField(null=True, blank=True)
-    engagement_score = models.FloatField(default=0.0)
+    engagement_score = models.FloatField(default=0.0, db_index=True)
     notes = models.TextField(blank=True)
 
     def __str__(self):
@@ -622,3 +638,59 @@ class SocialInteraction(TenantModel, TimeStampedModel):
         self.is_processed = True
         self.save()
         return event
+
+
+class EngagementScoreBucket(TenantModel):
+    """
+    Running per-entity, per-day engagement aggregates by event type.
+    Maintained as events are logged; rolling-window scores sum the buckets
+    inside the window and apply the tenant's weights at read time
+    (see engagement.scoring).
+    """
+    ENTITY_TYPES = [
+        ('account', 'Account'),
+        ('company', 'Company'),
+        ('lead', 'Lead'),
+    ]
+
+    entity_type = models.CharField(max_length=20, choices=ENTITY_TYPES)
+    entity_id = models.PositiveBigIntegerField()
+    day = models.DateField()
+    event_type = models.CharField(max_length=50)
+    event_count = models.IntegerField(default=0)
+    engagement_score_sum = models.FloatField(default=0.0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['tenant', 'entity_type', 'entity_id', 'day', 'event_type'],
+                name='unique_engagement_score_bucket',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['entity_type', 'entity_id', 'day'], name='engagement_bucket_entity_idx'),
+            models.Index(fields=['day'], name='engagement_bucket_day_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.entity_type} {self.entity_id} {self.day} {self.event_type}: {self.event_count}"
+
+
+class EngagementEventArchive(TenantModel):
+    """
+    A month of a tenant's cold EngagementEvents, moved out of the live table
+    into a gzip-compressed JSON lines file (see engagement.storage).
+    """
+    month = models.DateField(help_text="First day of the archived month")
+    file = models.FileField(upload_to='engagement_archives/')
+    row_count = models.PositiveIntegerField(default=0)
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-month']
+        indexes = [
+            models.Index(fields=['tenant', 'month'], name='engagement_archive_month_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.tenant_id} {self.month:%Y-%m}: {self.row_count} events"
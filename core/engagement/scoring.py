@@ -0,0 +1,386 @@
+"""
+Engagement Scoring
+
+Engagement scores are kept up to date as events are written instead of
+rescanning every EngagementEvent in the rolling window whenever a score is
+needed:
+- Each logged event increments the daily EngagementScoreBucket of its
+  account, company and lead (one row per entity, day and event type). This
+  happens off the write path: the events of a transaction are handed to
+  the record_engagement_scores task once it commits. Events are claimed
+  (scored_at set) in the transaction that increments their buckets, so a
+  redelivered task or one running after a rebuild counts nothing twice
+- Rolling-window scores sum the buckets inside the window, applying the
+  tenant's ScoringRule weights at read time, so rule changes take effect
+  immediately and old buckets simply fall out of the window. The window
+  is counted in whole days
+- Decay is computed when a score is read, from last_engaged_at
+- Logging an account event stores its fresh score on EngagementStatus,
+  whose indexed engagement_score the report views sort on
+- The nightly apply_engagement_score_decay task rebuilds the trailing
+  ENGAGEMENT_SCORE_RECONCILE_DAYS of buckets from the events (picking up
+  deletes and edits), prunes buckets older than every tenant's window and
+  rescores all statuses in chunks: one grouped bucket aggregate and one
+  bulk_update per chunk, with config and rules loaded once per tenant
+
+Usage:
+    from engagement.scoring import rescore_accounts
+
+    rescore_accounts(tenant_id=tenant.id)
+"""
+import logging
+import threading
+from datetime import date, datetime, time, timedelta
+from typing import Dict, Iterable, List, NamedTuple, Optional
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Case, Count, F, FloatField, Max, Sum, Value, When
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import EngagementEvent, EngagementScoreBucket, EngagementScoringConfig, EngagementStatus
+from .utils import DECAY_PERIOD_DAYS, DECAY_RATE, INACTIVITY_THRESHOLD_DAYS, SCORE_WEIGHTS
+
+logger = logging.getLogger(__name__)
+
+_local = threading.local()
+
+
+class ScoringParams(NamedTuple):
+    """A tenant's scoring configuration and event weights."""
+    rolling_window: int
+    decay_rate: float
+    decay_period: int
+    inactivity_threshold: int
+    weights: Dict[str, float]
+
+
+# Bucketed entity -> EngagementEvent foreign key column
+ENTITY_FIELDS = {
+    'account': 'account_id',
+    'company': 'account_company_id',
+    'lead': 'lead_id',
+}
+
+
+def _batch_size() -> int:
+    return getattr(settings, 'ENGAGEMENT_SCORING_BATCH_SIZE', 2000)
+
+
+def _reconcile_days() -> int:
+    return getattr(settings, 'ENGAGEMENT_SCORE_RECONCILE_DAYS', 2)
+
+
+def _local_day(value: datetime) -> date:
+    return timezone.localdate(value) if timezone.is_aware(value) else value.date()
+
+
+def load_scoring_params(tenant_id=None) -> ScoringParams:
+    """The tenant's EngagementScoringConfig and active ScoringRule weights, or the defaults."""
+    from .models import ScoringRule
+
+    config = None
+    weights = SCORE_WEIGHTS.copy()
+    if tenant_id:
+        config = EngagementScoringConfig.objects.filter(tenant_id=tenant_id).first()
+        for event_type, weight in ScoringRule.objects.filter(
+            tenant_id=tenant_id, rule_is_active=True
+        ).values_list('event_type', 'weight'):
+            weights[event_type] = float(weight)
+
+    return ScoringParams(
+        rolling_window=config.rolling_window_days if config else 30,
+        decay_rate=float(config.decay_rate) if config else DECAY_RATE,
+        decay_period=config.decay_period_days if config else DECAY_PERIOD_DAYS,
+        inactivity_threshold=config.inactivity_threshold_days if config else INACTIVITY_THRESHOLD_DAYS,
+        weights=weights,
+    )
+
+
+def weighted_bucket_sum(weights: Dict[str, float]) -> Sum:
+    """Sum over buckets of each event's weight (1 if unweighted) plus a tenth of its engagement_score."""
+    weight = Case(
+        *[When(event_type=event_type, then=Value(float(value))) for event_type, value in weights.items()],
+        default=Value(1.0),
+        output_field=FloatField(),
+    )
+    return Sum(weight * F('event_count') + F('engagement_score_sum') * Value(0.1), output_field=FloatField())
+
+
+def bucket_scores(params: ScoringParams, entity_type: str, entity_ids: Iterable[int], now: datetime,
+                  tenant_id=None) -> Dict[int, float]:
+    """Undecayed rolling-window scores of the entities, keyed by entity id."""
+    buckets = EngagementScoreBucket.objects.filter(
+        entity_type=entity_type,
+        entity_id__in=list(entity_ids),
+        day__gte=_local_day(now - timedelta(days=params.rolling_window)),
+    )
+    if tenant_id:
+        buckets = buckets.filter(tenant_id=tenant_id)
+    return dict(
+        buckets.order_by().values('entity_id').annotate(
+            score=weighted_bucket_sum(params.weights)
+        ).values_list('entity_id', 'score')
+    )
+
+
+def decay_factor(params: ScoringParams, last_activity: Optional[datetime], now: datetime) -> float:
+    """(1 - decay_rate) for every full decay period past the inactivity threshold."""
+    if not last_activity:
+        return 1.0
+    days_inactive = (now - last_activity).days
+    if days_inactive > params.inactivity_threshold:
+        decay_periods = (days_inactive - params.inactivity_threshold) // params.decay_period
+        if decay_periods > 0:
+            return (1 - params.decay_rate) ** decay_periods
+    return 1.0
+
+
+def final_score(params: ScoringParams, base: float, last_activity: Optional[datetime], now: datetime) -> float:
+    """The base score capped at 100, decayed for inactivity."""
+    return round(min(base or 0, 100.0) * decay_factor(params, last_activity, now), 2)
+
+
+def _rescore_chunk(statuses: List[EngagementStatus], params: ScoringParams, tenant_id, now: datetime) -> None:
+    account_ids = [status.account_id for status in statuses]
+    bases = bucket_scores(params, 'account', account_ids, now, tenant_id)
+
+    missing = [status.account_id for status in statuses if not status.last_engaged_at]
+    latest = {}
+    if missing:
+        events = EngagementEvent.objects.filter(account_id__in=missing)
+        if tenant_id:
+            events = events.filter(tenant_id=tenant_id)
+        latest = dict(
+            events.order_by().values('account_id').annotate(
+                latest=Max('created_at')
+            ).values_list('account_id', 'latest')
+        )
+
+    for status in statuses:
+        if not status.last_engaged_at:
+            status.last_engaged_at = latest.get(status.account_id)
+        status.engagement_score = final_score(params, bases.get(status.account_id, 0), status.last_engaged_at, now)
+        status.last_decay_calculation = now
+        status.updated_at = now
+    EngagementStatus.objects.bulk_update(
+        statuses, ['engagement_score', 'last_engaged_at', 'last_decay_calculation', 'updated_at']
+    )
+
+
+def _chunks(statuses, size: int) -> Iterable[List[EngagementStatus]]:
+    """Keyset-paginated chunks of ``statuses``."""
+    last_pk = 0
+    while True:
+        chunk = list(statuses.filter(pk__gt=last_pk).order_by('pk')[:size])
+        if not chunk:
+            return
+        yield chunk
+        last_pk = chunk[-1].pk
+
+
+def rescore_accounts(tenant_id=None, batch_size: Optional[int] = None) -> int:
+    """
+    Recompute and store the decayed engagement score of every EngagementStatus
+    (of one tenant when ``tenant_id`` is given). Returns the number rescored.
+    """
+    now = timezone.now()
+    statuses = EngagementStatus.objects.only('pk', 'account_id', 'last_engaged_at')
+    if tenant_id:
+        statuses = statuses.filter(account__tenant_id=tenant_id)
+
+    account_tenants = list(statuses.order_by().values_list('account__tenant_id', flat=True).distinct())
+    count = 0
+    for account_tenant in account_tenants:
+        params = load_scoring_params(account_tenant)
+        for chunk in _chunks(statuses.filter(account__tenant_id=account_tenant), batch_size or _batch_size()):
+            _rescore_chunk(chunk, params, account_tenant, now)
+            count += len(chunk)
+    return count
+
+
+# ---------------------------------------------------------------------------
+# Running aggregates
+# ---------------------------------------------------------------------------
+
+def _increment(tenant_id, entity_type: str, entity_id: int, day: date, event_type: str,
+               count: int, score_sum: float) -> None:
+    lookup = {
+        'tenant_id': tenant_id,
+        'entity_type': entity_type,
+        'entity_id': entity_id,
+        'day': day,
+        'event_type': event_type,
+    }
+    updates = {
+        'event_count': F('event_count') + count,
+        'engagement_score_sum': F('engagement_score_sum') + score_sum,
+    }
+    if EngagementScoreBucket.objects.filter(**lookup).update(**updates):
+        return
+    try:
+        with transaction.atomic():
+            EngagementScoreBucket.objects.create(event_count=count, engagement_score_sum=score_sum, **lookup)
+    except IntegrityError:
+        # Another writer created the bucket first
+        EngagementScoreBucket.objects.filter(**lookup).update(**updates)
+
+
+def refresh_account_scores(tenant_id, last_events: Dict[int, datetime]) -> None:
+    """Store the current scores of accounts that just had events (account id -> latest event time)."""
+    params = load_scoring_params(tenant_id)
+    now = timezone.now()
+    bases = bucket_scores(params, 'account', last_events, now, tenant_id)
+
+    existing = {status.account_id: status for status in EngagementStatus.objects.filter(account_id__in=list(last_events))}
+    created = []
+    for account_id, last_event in last_events.items():
+        status = existing.get(account_id)
+        if status is None:
+            status = EngagementStatus(tenant_id=tenant_id, account_id=account_id)
+            created.append(status)
+        if not status.last_engaged_at:
+            status.last_engaged_at = last_event
+        status.engagement_score = final_score(params, bases.get(account_id, 0), status.last_engaged_at, now)
+        status.updated_at = now
+
+    EngagementStatus.objects.bulk_update(
+        list(existing.values()), ['engagement_score', 'last_engaged_at', 'updated_at']
+    )
+    EngagementStatus.objects.bulk_create(created, ignore_conflicts=True)
+
+
+def record_event_ids(event_ids: Iterable[int]) -> int:
+    """
+    Claim the events not yet scored among ``event_ids`` and add them to their
+    buckets in one transaction. Returns the number recorded.
+    """
+    with transaction.atomic():
+        events = list(
+            EngagementEvent.objects.select_for_update().filter(pk__in=list(event_ids), scored_at__isnull=True).only(
+                'tenant_id', 'created_at', 'event_type', 'engagement_score',
+                'account_id', 'account_company_id', 'lead_id',
+            )
+        )
+        if not events:
+            return 0
+        EngagementEvent.objects.filter(pk__in=[event.pk for event in events]).update(scored_at=timezone.now())
+        record_events(events)
+    return len(events)
+
+
+def record_events(events: Iterable[EngagementEvent]) -> None:
+    """
+    Add newly written events to their entities' buckets and refresh their
+    accounts' stored scores. Callers claim the events first (record_event_ids).
+    """
+    increments: Dict[tuple, List] = {}
+    accounts: Dict[object, Dict[int, datetime]] = {}
+    for event in events:
+        if event.tenant_id is None or event.created_at is None:
+            continue
+        day = _local_day(event.created_at)
+        for entity_type, field in ENTITY_FIELDS.items():
+            entity_id = getattr(event, field)
+            if entity_id is None:
+                continue
+            cell = increments.setdefault((event.tenant_id, entity_type, entity_id, day, event.event_type), [0, 0.0])
+            cell[0] += 1
+            cell[1] += event.engagement_score or 0
+        if event.account_id:
+            latest = accounts.setdefault(event.tenant_id, {})
+            latest[event.account_id] = max(latest.get(event.account_id, event.created_at), event.created_at)
+
+    for key, (count, score_sum) in increments.items():
+        _increment(*key, count, score_sum)
+    for tenant_id, last_events in accounts.items():
+        refresh_account_scores(tenant_id, last_events)
+
+
+def _dispatch() -> None:
+    event_ids = getattr(_local, 'pending', None)
+    _local.pending = set()
+    if not event_ids:
+        return
+    try:
+        from .tasks import record_engagement_scores
+        record_engagement_scores.delay(sorted(event_ids))
+    except Exception as e:
+        # The nightly reconcile rebuilds recent buckets and rescores every status
+        logger.error(f"Could not schedule engagement scoring for {len(event_ids)} events: {e}")
+
+
+def record_events_on_commit(events: Iterable[EngagementEvent]) -> None:
+    """
+    Queue newly written events for record_events. Once the surrounding
+    transaction commits, every event it queued goes to the
+    record_engagement_scores task in one batch. Ids left over from a
+    rolled back transaction go with the next batch; the task skips rows
+    that do not exist.
+    """
+    event_ids = [event.pk for event in events if event.pk is not None]
+    if not event_ids:
+        return
+    pending = getattr(_local, 'pending', None)
+    if pending is None:
+        pending = _local.pending = set()
+    pending.update(event_ids)
+    transaction.on_commit(_dispatch)
+
+
+def rebuild_buckets(tenant_id=None, start_day: Optional[date] = None) -> int:
+    """
+    Recompute buckets from the events, for days from ``start_day`` on (all
+    history when None). Returns the number of buckets written.
+    """
+    buckets = EngagementScoreBucket.objects.all()
+    events = EngagementEvent.objects.all()
+    if tenant_id:
+        buckets = buckets.filter(tenant_id=tenant_id)
+        events = events.filter(tenant_id=tenant_id)
+    if start_day is not None:
+        buckets = buckets.filter(day__gte=start_day)
+        start = datetime.combine(start_day, time.min)
+        events = events.filter(created_at__gte=timezone.make_aware(start) if settings.USE_TZ else start)
+
+    written = 0
+    with transaction.atomic():
+        # Claim the events counted here so queued tasks do not add them again;
+        # waits for tasks already incrementing them to commit
+        events.filter(scored_at__isnull=True).update(scored_at=timezone.now())
+        buckets.delete()
+        for entity_type, field in ENTITY_FIELDS.items():
+            grouped = events.filter(**{f'{field}__isnull': False}).annotate(
+                bucket_day=TruncDate('created_at')
+            ).order_by().values('tenant_id', field, 'bucket_day', 'event_type').annotate(
+                count=Count('id'), score_sum=Sum('engagement_score')
+            )
+            rows = [
+                EngagementScoreBucket(
+                    tenant_id=item['tenant_id'], entity_type=entity_type, entity_id=item[field],
+                    day=item['bucket_day'], event_type=item['event_type'],
+                    event_count=item['count'], engagement_score_sum=item['score_sum'] or 0,
+                )
+                for item in grouped.iterator()
+            ]
+            EngagementScoreBucket.objects.bulk_create(rows, batch_size=_batch_size())
+            written += len(rows)
+    return written
+
+
+def prune_buckets(now: Optional[datetime] = None) -> int:
+    """Delete buckets that have left every tenant's rolling window. Returns the number deleted."""
+    now = now or timezone.now()
+    longest = EngagementScoringConfig.objects.aggregate(longest=Max('rolling_window_days'))['longest'] or 0
+    cutoff = _local_day(now - timedelta(days=max(longest, 30) + 1))
+    deleted, _ = EngagementScoreBucket.objects.filter(day__lt=cutoff).delete()
+    return deleted
+
+
+def reconcile_scores(tenant_id=None, days: Optional[int] = None) -> int:
+    """Nightly maintenance: rebuild recent buckets, prune expired ones and rescore every status."""
+    days = _reconcile_days() if days is None else days
+    rebuild_buckets(tenant_id, timezone.localdate() - timedelta(days=days))
+    prune_buckets()
+    return rescore_accounts(tenant_id)
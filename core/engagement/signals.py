@@ -195,3 +195,11 @@ def log_learning_engagement(sender, instance, created, **kwargs):
             title=f"Learning: {instance.course.title}",
             engagement_score=15.0
         )
+
+@receiver(post_save, sender=EngagementEvent)
+def record_engagement_event_score(sender, instance, created, **kwargs):
+    """Add new events to their entities' running score buckets after commit (see engagement.scoring)."""
+    if not created or getattr(instance, '_score_recorded', False):
+        return
+    from .scoring import record_events_on_commit
+    record_events_on_commit([instance])
@@ -0,0 +1,143 @@
+"""
+EngagementEvent Storage
+
+EngagementEvent is the fastest-growing table, so its storage is managed by
+month:
+- Composite (tenant, entity, created_at) and (tenant, event_type,
+  created_at) indexes serve the entity feeds and windowed score queries;
+  on PostgreSQL the account index also covers event_type and
+  engagement_score, and a BRIN index on created_at serves tenant-wide
+  time windows
+- Months older than ENGAGEMENT_EVENT_HOT_MONTHS are cold. archive_cold_events
+  moves each cold tenant-month into a gzip-compressed JSON lines file
+  (EngagementEventArchive) and deletes the rows in batches. Events marked
+  is_important, and events users have commented on (deleting them would
+  cascade to EngagementEventComment), stay in the live table
+- The file is written to storage first; the archive record and the row
+  deletes then commit together, so a crash leaves either both or neither
+  and a retried month is never archived twice (at worst an orphaned file
+  is left in storage)
+
+Archives keep every column of the event row; many-to-many mentions are not
+archived.
+
+Usage:
+    from engagement.storage import archive_cold_events, read_archive
+
+    archive_cold_events()
+    rows = list(read_archive(archive))
+"""
+import gzip
+import json
+import logging
+import tempfile
+from datetime import date, datetime, time
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from django.conf import settings
+from django.core.files import File
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+
+from .models import EngagementEvent, EngagementEventArchive, EngagementEventComment
+
+logger = logging.getLogger(__name__)
+
+
+def _hot_months() -> int:
+    return getattr(settings, 'ENGAGEMENT_EVENT_HOT_MONTHS', 12)
+
+
+def _batch_size() -> int:
+    return getattr(settings, 'ENGAGEMENT_ARCHIVE_BATCH_SIZE', 5000)
+
+
+def month_start(day: date, months_back: int = 0) -> date:
+    """First day of the month ``months_back`` months before ``day``'s month."""
+    index = day.year * 12 + day.month - 1 - months_back
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _aware(day: date) -> datetime:
+    value = datetime.combine(day, time.min)
+    return timezone.make_aware(value) if settings.USE_TZ else value
+
+
+def _archivable():
+    """Events that may leave the live table: not important and without comments."""
+    return EngagementEvent.objects.filter(is_important=False).exclude(
+        Exists(EngagementEventComment.objects.filter(engagement_event=OuterRef('pk')))
+    )
+
+
+def _cold_events(tenant_id, month: date):
+    return _archivable().filter(
+        tenant_id=tenant_id,
+        created_at__gte=_aware(month),
+        created_at__lt=_aware(month_start(month, -1)),
+    )
+
+
+def cold_months(hot_months: Optional[int] = None) -> List[Tuple[int, date]]:
+    """(tenant_id, month) pairs with archivable events, oldest first."""
+    cutoff = month_start(timezone.localdate(), _hot_months() if hot_months is None else hot_months)
+    months = _archivable().filter(
+        created_at__lt=_aware(cutoff)
+    ).annotate(month=TruncMonth('created_at')).order_by().values_list('tenant_id', 'month').distinct()
+    return sorted(
+        {(tenant_id, month.date() if isinstance(month, datetime) else month) for tenant_id, month in months},
+        key=lambda pair: (pair[1], pair[0]),
+    )
+
+
+def archive_month(tenant_id, month: date) -> Optional[EngagementEventArchive]:
+    """Move a tenant's events of ``month`` into a compressed archive file. Returns None if there were none."""
+    archived_ids = []
+    with tempfile.TemporaryFile() as raw:
+        with gzip.GzipFile(fileobj=raw, mode='wb') as compressed:
+            for row in _cold_events(tenant_id, month).order_by('pk').values().iterator(chunk_size=_batch_size()):
+                compressed.write(json.dumps(row, cls=DjangoJSONEncoder).encode() + b'\n')
+                archived_ids.append(row['id'])
+        if not archived_ids:
+            return None
+
+        raw.seek(0)
+        archive = EngagementEventArchive(tenant_id=tenant_id, month=month, row_count=len(archived_ids))
+        stamp = timezone.now().strftime('%Y%m%d%H%M%S')
+        archive.file.save(f"engagement_events_{tenant_id}_{month:%Y_%m}_{stamp}.jsonl.gz", File(raw), save=False)
+
+    # The archive record and the deletes commit together. Only rows that made
+    # it into the file are removed, and only while they still have no comments
+    size = _batch_size()
+    with transaction.atomic():
+        archive.save()
+        for start in range(0, len(archived_ids), size):
+            deleted = _archivable().filter(pk__in=archived_ids[start:start + size]).delete()
+            if deleted[1].get(EngagementEvent._meta.label, 0) != len(archived_ids[start:start + size]):
+                raise RuntimeError("Engagement events changed while their month was being archived")
+    logger.info(f"Archived {len(archived_ids)} engagement events of {month:%Y-%m} for tenant {tenant_id}")
+    return archive
+
+
+def archive_cold_events(hot_months: Optional[int] = None) -> int:
+    """Archive every cold tenant-month. Returns the number of events moved."""
+    moved = 0
+    for tenant_id, month in cold_months(hot_months):
+        try:
+            archive = archive_month(tenant_id, month)
+        except Exception as e:
+            logger.error(f"Archiving engagement events of {month:%Y-%m} for tenant {tenant_id} failed: {e}")
+            continue
+        if archive is not None:
+            moved += archive.row_count
+    return moved
+
+
+def read_archive(archive: EngagementEventArchive) -> Iterator[Dict[str, Any]]:
+    """The archived event rows, as dicts of column values."""
+    with archive.file.open('rb') as stored, gzip.GzipFile(fileobj=stored, mode='rb') as compressed:
+        for line in compressed:
+            yield json.loads(line)
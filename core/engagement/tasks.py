@@ -17,6 +17,38 @@ def cleanup_old_engagement_events(days_older_than=365):
     ).delete()
     return f"Deleted {deleted_count} old engagement events."
 
+@shared_task
+def archive_cold_engagement_events():
+    """
+    Moves engagement events older than ENGAGEMENT_EVENT_HOT_MONTHS into
+    compressed monthly archives. Intended to run monthly.
+    """
+    from .storage import archive_cold_events
+    moved = archive_cold_events()
+    return f"Archived {moved} engagement events."
+
+@shared_task
+def apply_engagement_score_decay(tenant_id=None):
+    """
+    Reconciles recent engagement score buckets with the events, prunes expired
+    buckets and recomputes every account's decayed score in set-based batches.
+    Intended to run nightly.
+    """
+    from .scoring import reconcile_scores
+    count = reconcile_scores(tenant_id)
+    return f"Rescored {count} engagement statuses."
+
+@shared_task
+def record_engagement_scores(event_ids):
+    """
+    Adds newly logged events to their entities' score buckets and refreshes
+    their accounts' stored scores, queued when the events' transaction commits.
+    Events already scored are skipped, so a redelivered task counts nothing twice.
+    """
+    from .scoring import record_event_ids
+    count = record_event_ids(event_ids)
+    return f"Recorded {count} engagement events."
+
 @shared_task
 def auto_deduplicate_events():
     """
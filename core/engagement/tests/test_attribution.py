@@ -0,0 +1,65 @@
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.test import TestCase
+from django.utils import timezone
+
+from core.models import User
+from engagement.attribution import get_tenant_attribution
+from engagement.models import EngagementEvent
+from engagement.utils import get_multi_touch_attribution
+from tenants.models import Tenant
+
+
+class TenantAttributionTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.tenant = Tenant.objects.create(name="Attribution Tenant", slug="attribution-tenant")
+        self.first = User.objects.create_user(username='first', email='first@example.com', password='password')
+        self.second = User.objects.create_user(username='second', email='second@example.com', password='password')
+
+        now = timezone.now()
+        touches = [
+            (self.first, 'spring', None, now - timedelta(days=10)),
+            (self.first, None, 'google', now - timedelta(days=5)),
+            (self.first, 'spring', None, now),
+            (self.second, None, None, now - timedelta(days=2)),
+        ]
+        for account, campaign, source, created_at in touches:
+            event = EngagementEvent.objects.create(
+                tenant=self.tenant, account=account, event_type='website_visit',
+                description='Visit', utm_campaign=campaign, utm_source=source
+            )
+            EngagementEvent.objects.filter(pk=event.pk).update(created_at=created_at)
+
+    def _shares(self, model):
+        report = get_tenant_attribution(self.tenant.id, model=model, days=30)
+        return {row['channel']: round(row['credit_share'], 2) for row in report['channels']}
+
+    def test_models_split_each_accounts_credit(self):
+        # Two accounts, so each account's full credit is 50% of the total
+        self.assertEqual(self._shares('first_touch'), {'Campaign: spring': 50.0, 'Source: google': 0.0, 'Direct': 50.0})
+        self.assertEqual(self._shares('last_touch'), {'Campaign: spring': 50.0, 'Source: google': 0.0, 'Direct': 50.0})
+        self.assertEqual(self._shares('linear'), {'Campaign: spring': 33.33, 'Source: google': 16.67, 'Direct': 50.0})
+        self.assertEqual(self._shares('u_shaped'), {'Campaign: spring': 40.0, 'Source: google': 10.0, 'Direct': 50.0})
+
+        # Weights 2^0, 2^0.5 and 2^1 for the first account's touches
+        time_decay = self._shares('time_decay')
+        self.assertAlmostEqual(time_decay['Source: google'], round(50 * 2 ** 0.5 / (3 + 2 ** 0.5), 2))
+
+        report = get_tenant_attribution(self.tenant.id, model='linear', days=30)
+        self.assertEqual((report['accounts'], report['touchpoints']), (2, 4))
+        self.assertAlmostEqual(sum(row['attributed_value'] for row in report['channels']), report['total_value'])
+
+    def test_reports_are_cached_per_model_and_window(self):
+        get_tenant_attribution(self.tenant.id, model='linear', days=30)
+        with self.assertNumQueries(0):
+            get_tenant_attribution(self.tenant.id, model='time_decay', days=30)
+        with self.assertNumQueries(1):
+            get_tenant_attribution(self.tenant.id, model='linear', days=7)
+
+    def test_single_account_attribution(self):
+        result = get_multi_touch_attribution(self.first)
+        self.assertEqual(result['Campaign: spring']['touchpoints'], 2)
+        self.assertAlmostEqual(result['Source: google']['credit_share'], 100 / 3)
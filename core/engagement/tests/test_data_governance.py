@@ -88,3 +88,74 @@ class EngagementDataGovernanceTest(TestCase):
         
         self.assertFalse(EngagementEvent.objects.filter(pk=old_event.pk).exists())
         self.assertTrue(EngagementEvent.objects.filter(pk=important_old_event.pk).exists())
+
+
+class EngagementEventArchiveTest(TestCase):
+    def setUp(self):
+        import tempfile
+        from django.test import override_settings
+
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        media_settings = override_settings(MEDIA_ROOT=media.name)
+        media_settings.enable()
+        self.addCleanup(media_settings.disable)
+
+        from tenants.models import Tenant
+        self.tenant = Tenant.objects.create(name='Archive Tenant', slug='archive-tenant')
+
+    def _event(self, days_ago, **kwargs):
+        event = EngagementEvent.objects.create(
+            tenant=self.tenant, event_type='website_visit', description='Visit', **kwargs
+        )
+        EngagementEvent.objects.filter(pk=event.pk).update(created_at=timezone.now() - timedelta(days=days_ago))
+        return event
+
+    def test_cold_months_move_to_compressed_archives(self):
+        from engagement.models import EngagementEventArchive
+        from engagement.storage import archive_cold_events, read_archive
+
+        cold = [self._event(500, title=f'Cold {number}') for number in range(3)]
+        important = self._event(500, is_important=True)
+        recent = self._event(1)
+
+        self.assertEqual(archive_cold_events(hot_months=12), 3)
+
+        self.assertEqual(
+            set(EngagementEvent.objects.filter(tenant=self.tenant).values_list('pk', flat=True)),
+            {important.pk, recent.pk},
+        )
+        archive = EngagementEventArchive.objects.get(tenant=self.tenant)
+        self.assertEqual(archive.row_count, 3)
+        self.assertTrue(archive.file.name.endswith('.jsonl.gz'))
+        rows = list(read_archive(archive))
+        self.assertEqual(sorted(row['id'] for row in rows), sorted(event.pk for event in cold))
+        self.assertEqual({row['title'] for row in rows}, {'Cold 0', 'Cold 1', 'Cold 2'})
+
+        # Nothing left to archive
+        self.assertEqual(archive_cold_events(hot_months=12), 0)
+
+    def test_commented_events_stay_live_and_failed_deletes_leave_no_archive(self):
+        from unittest import mock
+        from engagement.models import EngagementEventArchive, EngagementEventComment
+        from engagement.storage import archive_cold_events
+
+        author = User.objects.create_user(
+            username='archive-author', email='author@example.com', password='password', tenant=self.tenant
+        )
+        commented = self._event(500, title='Discussed')
+        EngagementEventComment.objects.create(
+            tenant=self.tenant, engagement_event=commented, user=author, content='Follow up'
+        )
+        cold = self._event(500, title='Quiet')
+
+        # A failure while deleting rolls the archive record back with the deletes
+        with mock.patch('django.db.models.query.QuerySet.delete', side_effect=RuntimeError('crash')):
+            self.assertEqual(archive_cold_events(hot_months=12), 0)
+        self.assertFalse(EngagementEventArchive.objects.exists())
+        self.assertTrue(EngagementEvent.objects.filter(pk=cold.pk).exists())
+
+        self.assertEqual(archive_cold_events(hot_months=12), 1)
+        self.assertEqual(EngagementEventArchive.objects.get(tenant=self.tenant).row_count, 1)
+        self.assertTrue(EngagementEvent.objects.filter(pk=commented.pk).exists())
+        self.assertEqual(commented.event_comments.count(), 1)
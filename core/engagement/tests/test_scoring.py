@@ -1,9 +1,12 @@
+from contextlib import contextmanager
+from unittest import mock
 from django.test import TestCase
 from django.utils import timezone
 from datetime import timedelta
 from core.models import User
 from tenants.models import Tenant
 from engagement.models import EngagementEvent, EngagementStatus, EngagementScoringConfig, ScoringRule
+from engagement.tasks import record_engagement_scores
 from engagement.utils import calculate_engagement_score
 
 class EngagementScoringTest(TestCase):
@@ -22,6 +25,14 @@ class EngagementScoringTest(TestCase):
             inactivity_threshold_days=10
         )
 
+    @contextmanager
+    def _scoring(self):
+        """Commit the events written in the block and run the scoring task inline."""
+        with mock.patch('engagement.tasks.record_engagement_scores.delay',
+                        side_effect=record_engagement_scores) as delay:
+            with self.captureOnCommitCallbacks(execute=True):
+                yield delay
+
     def test_calculate_base_score_with_custom_weights(self):
         """Verify dynamic weights from ScoringRule are applied."""
         ScoringRule.objects.create(
@@ -30,13 +41,14 @@ class EngagementScoringTest(TestCase):
             weight=10.0
         )
         
-        EngagementEvent.objects.create(
-            account=self.user,
-            tenant_id=self.tenant_id,
-            event_type='proposal_viewed',
-            title='Test Event',
-            engagement_score=0.0
-        )
+        with self._scoring():
+            EngagementEvent.objects.create(
+                account=self.user,
+                tenant_id=self.tenant_id,
+                event_type='proposal_viewed',
+                title='Test Event',
+                engagement_score=0.0
+            )
         
         score = calculate_engagement_score(self.user, tenant_id=self.tenant_id)
         # Base logic: 10 (weight) + 0 (event score * 0.1) = 10
@@ -51,16 +63,105 @@ class EngagementScoringTest(TestCase):
         self.status.last_engaged_at = last_active
         self.status.save()
         
-        EngagementEvent.objects.create(
-            account=self.user,
-            tenant_id=self.tenant_id,
-            event_type='demo_completed', # Default weight 10
-            title='Old Demo',
-            created_at=today - timedelta(days=19),
-            engagement_score=0
-        )
+        with self._scoring():
+            EngagementEvent.objects.create(
+                account=self.user,
+                tenant_id=self.tenant_id,
+                event_type='demo_completed', # Default weight 10
+                title='Old Demo',
+                created_at=today - timedelta(days=19),
+                engagement_score=0
+            )
         
         score = calculate_engagement_score(self.user, tenant_id=self.tenant_id)
         
         # Expected: 10 * (1 - 0.1)^2 = 10 * 0.81 = 8.1
         self.assertEqual(score, 8.1)
+
+    def test_batch_rescore_matches_single_account_score(self):
+        """Verify the set-based decay job stores the same scores as calculate_engagement_score."""
+        from engagement.utils import apply_decay_to_all_accounts
+
+        other = User.objects.create_user(username='otheruser', email='other@example.com', password='password')
+        other.tenant = self.tenant
+        other.save()
+        other_status = EngagementStatus.objects.create(account=other)
+
+        ScoringRule.objects.create(tenant_id=self.tenant_id, event_type='proposal_viewed', weight=10.0)
+        with self._scoring():
+            for account, event_type in ((self.user, 'proposal_viewed'), (self.user, 'email_opened'), (other, 'demo_completed')):
+                EngagementEvent.objects.create(
+                    account=account, tenant_id=self.tenant_id, event_type=event_type,
+                    title='Batch Event', engagement_score=5.0
+                )
+        EngagementStatus.objects.filter(pk=other_status.pk).update(last_engaged_at=timezone.now() - timedelta(days=20))
+
+        expected = {
+            self.user.pk: calculate_engagement_score(self.user, tenant_id=self.tenant_id),
+            other.pk: calculate_engagement_score(other, tenant_id=self.tenant_id),
+        }
+        self.assertEqual(apply_decay_to_all_accounts(tenant_id=self.tenant.id), 2)
+
+        for status in EngagementStatus.objects.filter(account__in=[self.user, other]):
+            self.assertEqual(status.engagement_score, expected[status.account_id])
+            self.assertIsNotNone(status.last_decay_calculation)
+        # 10 + 0.5 + 1 + 0.5 for the user, 10.5 decayed twice by 10% for the other account
+        self.assertEqual(expected[self.user.pk], 12.0)
+        self.assertEqual(expected[other.pk], 8.51)
+
+    def test_logged_events_maintain_running_buckets_and_stored_score(self):
+        """Verify events update daily buckets and the stored score without rescanning events."""
+        from engagement.models import EngagementScoreBucket
+        from engagement.utils import log_engagement_event
+
+        with self._scoring() as delay:
+            events = [
+                log_engagement_event(self.tenant_id, 'email_opened', 'Opened', account=self.user, engagement_score=10.0)
+                for _ in range(2)
+            ]
+            # Nothing is scored until the events commit, then once for both
+            self.assertFalse(EngagementScoreBucket.objects.exists())
+        delay.assert_called_once_with(sorted(event.pk for event in events))
+
+        bucket = EngagementScoreBucket.objects.get(entity_type='account', entity_id=self.user.pk)
+        self.assertEqual(bucket.event_count, 2)
+        self.assertEqual(bucket.engagement_score_sum, 20.0)
+        self.status.refresh_from_db()
+        # 2 x (1 + 10 * 0.1)
+        self.assertEqual(self.status.engagement_score, 4.0)
+        self.assertIsNotNone(self.status.last_engaged_at)
+
+        # Buckets outside the rolling window no longer count
+        EngagementScoreBucket.objects.create(
+            tenant=self.tenant, entity_type='account', entity_id=self.user.pk,
+            day=timezone.localdate() - timedelta(days=45), event_type='demo_completed', event_count=5
+        )
+        # Rule weights apply at read time
+        ScoringRule.objects.create(tenant_id=self.tenant_id, event_type='email_opened', weight=3.0)
+        with self.assertNumQueries(4):
+            score = calculate_engagement_score(self.user, tenant_id=self.tenant_id)
+        self.assertEqual(score, 8.0)
+
+    def test_redelivered_and_rebuilt_events_are_counted_once(self):
+        """Verify the scoring task claims its events, so retries and rebuilds do not double count."""
+        from engagement.models import EngagementScoreBucket
+        from engagement.scoring import rebuild_buckets
+
+        with self._scoring():
+            first = EngagementEvent.objects.create(
+                account=self.user, tenant_id=self.tenant_id, event_type='email_opened', title='First'
+            )
+        record_engagement_scores([first.pk])
+
+        with mock.patch('engagement.tasks.record_engagement_scores.delay') as delay:
+            with self.captureOnCommitCallbacks(execute=True):
+                second = EngagementEvent.objects.create(
+                    account=self.user, tenant_id=self.tenant_id, event_type='email_opened', title='Second'
+                )
+        # The nightly rebuild runs before the queued task
+        rebuild_buckets(self.tenant.id)
+        record_engagement_scores(*delay.call_args.args)
+
+        bucket = EngagementScoreBucket.objects.get(entity_type='account', entity_id=self.user.pk)
+        self.assertEqual(bucket.event_count, 2)
+        self.assertEqual(EngagementEvent.objects.filter(pk__in=[first.pk, second.pk], scored_at__isnull=True).count(), 0)
@@ -59,55 +59,39 @@ SCORE_WEIGHTS = {
     'support_ticket_created': 1,
 }
 
+# Base attributed value of each event type (see calculate_attribution_value)
+ATTRIBUTION_EVENT_VALUES = {
+    'email_opened': 1.0,
+    'link_clicked': 2.0,
+    'proposal_viewed': 10.0,
+    'demo_completed': 25.0,
+    'content_downloaded': 5.0,
+    'webinar_attended': 15.0,
+    'nps_submitted': 8.0,
+    'social_interaction': 3.0,
+    'website_visit': 0.5,
+    'document_view': 2.0,
+}
+
 def calculate_engagement_score(account, tenant_id=None):
     """
     Recalculate the engagement score for a given account.
     Considers recent events and applies time-based decay.
     Now uses tenant-specific configurations if available.
     """
-    from .models import EngagementScoringConfig, ScoringRule
-    
-    # 1. Load configuration
-    config = None
-    if tenant_id:
-        config = EngagementScoringConfig.objects.filter(tenant_id=tenant_id).first()
-    
-    # Use config values or defaults
-    rolling_window = config.rolling_window_days if config else 30
-    decay_rate = float(config.decay_rate) if config else DECAY_RATE
-    decay_period = config.decay_period_days if config else DECAY_PERIOD_DAYS
-    inactivity_threshold = config.inactivity_threshold_days if config else INACTIVITY_THRESHOLD_DAYS
-    
-    # Load scoring rules for weights
-    weights = SCORE_WEIGHTS.copy()
-    if tenant_id:
-        rules = ScoringRule.objects.filter(tenant_id=tenant_id, rule_is_active=True)
-        for rule in rules:
-            weights[rule.event_type] = float(rule.weight)
-
-    # 2. Base Score from recent events
-    cutoff_date = timezone.now() - timedelta(days=rolling_window)
-    events_query = EngagementEvent.objects.filter(
-        account=account,
-        created_at__gte=cutoff_date
-    )
-    
-    if tenant_id:
-        events_query = events_query.filter(tenant_id=tenant_id)
-        
-    events = events_query.all()
+    from .scoring import bucket_scores, final_score, load_scoring_params
     
-    # Weighted scoring logic
-    base_score = 0
-    for event in events:
-        weight = weights.get(event.event_type, 1)
-        base_score += weight + (event.engagement_score * 0.1)
-        
-    # Cap base score at 100
-    final_score = min(base_score, 100.0)
+    # 1. Load configuration and rule weights
+    params = load_scoring_params(tenant_id)
+    now = timezone.now()
+
+    # 2. Base Score from the account's daily buckets in the rolling window
+    base_score = bucket_scores(params, 'account', [account.pk], now, tenant_id).get(account.pk, 0)
     
     # 3. Apply Decay if inactive
-    status, created = EngagementStatus.objects.get_or_create(account=account)
+    status, created = EngagementStatus.objects.get_or_create(
+        account=account, defaults={'tenant_id': tenant_id or getattr(account, 'tenant_id', None)}
+    )
     
     last_activity = status.last_engaged_at
     if not last_activity:
@@ -120,17 +104,8 @@ def calculate_engagement_score(account, tenant_id=None):
             last_activity = latest_event.created_at
             status.last_engaged_at = last_activity
             status.save()
-            
-    if last_activity:
-        days_inactive = (timezone.now() - last_activity).days
-        
-        if days_inactive > inactivity_threshold:
-            decay_periods = (days_inactive - inactivity_threshold) // decay_period
-            if decay_periods > 0:
-                decay_factor = (1 - decay_rate) ** decay_periods
-                final_score = final_score * decay_factor
                 
-    return round(final_score, 2)
+    return final_score(params, base_score, last_activity, now)
 
 def log_website_visit(user, page_url, duration_sec=None, tenant_id=None):
     """Log a website visit event."""
@@ -173,20 +148,10 @@ def log_video_engagement(user, video_title, watch_time_sec, completed=False, ten
 def apply_decay_to_all_accounts(tenant_id=None):
     """
     Batch process to update engagement scores with decay.
-    Should be run via Celery task.
+    Should be run via Celery task. See engagement.scoring for the set-based engine.
     """
-    # Iterate through all engagement statuses
-    # In a real system, we'd batch this query
-    statuses = EngagementStatus.objects.all()
-    if tenant_id:
-        statuses = statuses.filter(account__tenant_id=tenant_id)
-        
-    for status in statuses:
-        new_score = calculate_engagement_score(status.account, tenant_id)
-        
-        status.engagement_score = new_score
-        status.last_decay_calculation = timezone.now()
-        status.save()
+    from .scoring import rescore_accounts
+    return rescore_accounts(tenant_id)
 
 
 def get_best_engagement_time(account):
@@ -590,88 +555,45 @@ def calculate_attribution_value(engagement_event):
     Calculate the attributed value of an engagement event based on its type and score.
     This is a simplified model that can be expanded based on business requirements.
     """
-    # Base values for different event types
-    event_values = {
-        'email_opened': 1.0,
-        'link_clicked': 2.0,
-        'proposal_viewed': 10.0,
-        'demo_completed': 25.0,
-        'content_downloaded': 5.0,
-        'webinar_attended': 15.0,
-        'nps_submitted': 8.0,
-        'social_interaction': 3.0,
-        'website_visit': 0.5,
-        'document_view': 2.0,
-    }
-    
     # Get base value for event type
-    base_value = event_values.get(engagement_event.event_type, 1.0)
+    base_value = ATTRIBUTION_EVENT_VALUES.get(engagement_event.event_type, 1.0)
     
     # Adjust based on engagement score (0-100)
     score_multiplier = engagement_event.engagement_score / 100.0
     
     return base_value * (1 + score_multiplier)
 
-def get_multi_touch_attribution(account, days=30):
+def get_multi_touch_attribution(account, days=30, model='linear'):
     """
     Calculate multi-touch attribution for an account over a specified period.
-    Uses a linear attribution model (equal credit to all touchpoints).
+    Uses a linear attribution model (equal credit to all touchpoints) unless
+    another engagement.attribution model is given.
     """
-    from django.utils import timezone
-    from datetime import timedelta
-    from collections import defaultdict
+    from .attribution import attribute_events
     
     # Get events in timeframe
     cutoff_date = timezone.now() - timedelta(days=days)
     events = EngagementEvent.objects.filter(
         account=account,
         created_at__gte=cutoff_date
-    ).order_by('created_at')
-    
-    if not events.exists():
-        return {}
-    
-    # Group events by campaign/source
-    campaign_touchpoints = defaultdict(list)
-    
-    for event in events:
-        # Try to identify campaign/source
-        identifier = None
-        if event.utm_campaign:
-            identifier = f"Campaign: {event.utm_campaign}"
-        elif event.utm_source:
-            identifier = f"Source: {event.utm_source}"
-        elif event.referring_domain:
-            identifier = f"Domain: {event.referring_domain}"
-        else:
-            identifier = "Direct"
-            
-        campaign_touchpoints[identifier].append(event)
-    
-    # Calculate linear attribution (equal credit to all touchpoints)
-    total_touchpoints = sum(len(events) for events in campaign_touchpoints.values())
-    attribution_results = {}
+    )
     
-    for identifier, events in campaign_touchpoints.items():
-        # Each touchpoint gets equal credit
-        touchpoint_credit = 1.0 / total_touchpoints if total_touchpoints > 0 else 0
-        total_credit = len(events) * touchpoint_credit
-        
-        # Calculate value contributed
-        total_value = sum(calculate_attribution_value(event) for event in events)
-        attributed_value = total_value * touchpoint_credit * len(events)
-        
-        attribution_results[identifier] = {
-            'touchpoints': len(events),
-            'credit_share': total_credit * 100,  # Percentage
-            'attributed_value': attributed_value,
+    return {
+        channel['channel']: {
+            'touchpoints': channel['touchpoints'],
+            'credit_share': channel['credit_share'],  # Percentage
+            'attributed_value': channel['attributed_value'],
         }
-    
-    return attribution_results
+        for channel in attribute_events(events, days)[model]['channels']
+    }
+
+
 def log_engagement_event(tenant_id, event_type, description, **kwargs):
     """
     Centralized helper for logging engagement events from any module.
     Automatically handles common fields and allows overriding/adding others via kwargs.
+    The event's score buckets are updated after commit, queued by its post_save
+    receiver (see engagement.scoring).
     """
     params = {
         'tenant_id': tenant_id,
@@ -685,53 +607,46 @@ def log_engagement_event(tenant_id, event_type, description, **kwargs):
     return event
 
 
+def log_engagement_events(entries):
+    """
+    Bulk counterpart of log_engagement_event for batched event bus dispatch.
+    Each entry is a dict of EngagementEvent fields. post_save receivers still
+    run for every row, inside one event bus batch so the automation triggers
+    they emit are coalesced too.
+    """
+    from django.db.models.signals import post_save
+    from core.event_bus import event_bus
+    from .scoring import record_events_on_commit
+
+    events = EngagementEvent.objects.bulk_create([EngagementEvent(**params) for params in entries])
+    # Scores are queued once for the batch rather than per post_save
+    record_events_on_commit(events)
+    with event_bus.batch():
+        for event in events:
+            event._score_recorded = True
+            post_save.send(sender=EngagementEvent, instance=event, created=True,
+                           update_fields=None, raw=False, using=event._state.db)
+    logger.info(f"Engagement Events Logged: {len(events)} in bulk")
+    return events
+
+
 def calculate_company_engagement_score(company, tenant_id=None):
     """
     Recalculate the engagement score for a business Account (Company).
     Considers events linked to the account_company and its contacts.
     """
-    cutoff_date = timezone.now() - timedelta(days=30)
-    
-    # Events directly linked to the company
-    events_query = EngagementEvent.objects.filter(
-        account_company=company,
-        created_at__gte=cutoff_date
-    )
-    
-    if tenant_id:
-        events_query = events_query.filter(tenant_id=tenant_id)
-        
-    events = events_query.all()
-    
-    base_score = 0
-    for event in events:
-        weight = SCORE_WEIGHTS.get(event.event_type, 1)
-        base_score += weight + (event.engagement_score * 0.1)
-        
-    return round(min(base_score, 100.0), 2)
+    from .scoring import bucket_scores, load_scoring_params
+
+    # Default weights over the last 30 days
+    scores = bucket_scores(load_scoring_params(), 'company', [company.pk], timezone.now(), tenant_id)
+    return round(min(scores.get(company.pk, 0), 100.0), 2)
 
 
 def calculate_lead_engagement_score(lead, tenant_id=None):
     """
     Recalculate the engagement score for a Lead.
     """
-    cutoff_date = timezone.now() - timedelta(days=30)
-    
-    events_query = EngagementEvent.objects.filter(
-        lead=lead,
-        created_at__gte=cutoff_date
-    )
-    
-    if tenant_id:
-        events_query = events_query.filter(tenant_id=tenant_id)
-        
-    events = events_query.all()
-    
-    base_score = 0
-    for event in events:
-        weight = SCORE_WEIGHTS.get(event.event_type, 1)
-        base_score += weight + (event.engagement_score * 0.1)
-        
-    return round(min(base_score, 100.0), 2)
-
+    from .scoring import bucket_scores, load_scoring_params
 
+    scores = bucket_scores(load_scoring_params(), 'lead', [lead.pk], timezone.now(), tenant_id)
+    return round(min(scores.get(lead.pk, 0), 100.0), 2)
@@ -2014,11 +2014,20 @@ class AttributionReportView(LoginRequiredMixin, TenantAwareViewMixin, TemplateVi
             total_score=Sum('engagement_score')
         ).order_by('-event_count')
         
+        # Multi-touch attribution across all of the tenant's accounts
+        from .attribution import ATTRIBUTION_MODELS, get_tenant_attribution
+        attribution_model = self.request.GET.get('model', 'linear')
+        if attribution_model not in dict(ATTRIBUTION_MODELS):
+            attribution_model = 'linear'
+        
         context.update({
             'source_data': source_data,
             'campaign_data': campaign_data,
             'domain_data': domain_data,
             'days': days,
+            'attribution': get_tenant_attribution(tenant_id, attribution_model, days),
+            'attribution_model': attribution_model,
+            'attribution_models': ATTRIBUTION_MODELS,
         })
         
         return context
@@ -5,3 +5,6 @@ class FeatureFlagsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'feature_flags'
     verbose_name = 'Feature Flags & Release Management'
+
+    def ready(self):
+        import feature_flags.signals
@@ -31,6 +31,12 @@ class FeatureFlag(models.Model):
     def __str__(self):
         return f"{self.name} ({self.key}) - {'Active' if self.is_active else 'Inactive'}"
 
+    def is_enabled_for_user(self, user):
+        """Evaluate this flag for a user against the tenant's cached compiled rules"""
+        from core.feature_flag_middleware import flag_cache
+        tenant_id = getattr(user, 'tenant_id', None) if user else None
+        return flag_cache.get_rules(tenant_id).is_enabled(self.key, user)
+
 
 class FeatureTarget(models.Model):
     """Model for targeting specific users, tenants, or groups for feature flags"""
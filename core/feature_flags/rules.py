@@ -0,0 +1,241 @@
+"""
+Compiled Feature Flag Rules
+
+Loads every flag, target and dependency for one tenant in a few bulk queries
+and turns them into plain, picklable rule objects:
+- Activation state and schedule windows
+- User, tenant, role, group and email-domain targets
+- Stable percentage rollout buckets (identical in every worker)
+- Prerequisites and conflicts between flags
+
+Evaluating a FlagRuleSet never touches the database, so it can be cached
+in process and shared across workers through the cache backend.
+"""
+import hashlib
+import logging
+from typing import Dict, FrozenSet, Iterable, Optional, Tuple
+
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+REQUIRES_DEPENDENCIES = ('requires', 'prerequisite')
+CONFLICT_DEPENDENCIES = ('conflicts_with',)
+
+
+def rollout_bucket(flag_key: str, user_id) -> float:
+    """
+    Place a user in a 0-100 rollout bucket for a flag.
+
+    Uses a stable hash so a user lands in the same bucket in every process.
+    """
+    digest = hashlib.md5(f"{flag_key}:{user_id}".encode()).hexdigest()
+    return int(digest[:8], 16) % 10000 / 100
+
+
+class CompiledFlag:
+    """Database-free representation of a single feature flag."""
+
+    __slots__ = (
+        'key', 'is_active', 'enabled_for_all', 'rollout_percentage',
+        'activation', 'deactivation', 'prerequisites', 'conflicts',
+        'user_ids', 'tenant_targeted', 'role_ids', 'email_domains',
+    )
+
+    def __init__(self, key: str, is_active: bool, enabled_for_all: bool,
+                 rollout_percentage: float, activation=None, deactivation=None,
+                 prerequisites: Tuple[str, ...] = (), conflicts: Tuple[str, ...] = (),
+                 user_ids: FrozenSet[int] = frozenset(), tenant_targeted: bool = False,
+                 role_ids: FrozenSet[int] = frozenset(),
+                 email_domains: FrozenSet[str] = frozenset()):
+        self.key = key
+        self.is_active = is_active
+        self.enabled_for_all = enabled_for_all
+        self.rollout_percentage = rollout_percentage
+        self.activation = activation
+        self.deactivation = deactivation
+        self.prerequisites = prerequisites
+        self.conflicts = conflicts
+        self.user_ids = user_ids
+        self.tenant_targeted = tenant_targeted
+        self.role_ids = role_ids
+        self.email_domains = email_domains
+
+    def __getstate__(self):
+        return {slot: getattr(self, slot) for slot in self.__slots__}
+
+    def __setstate__(self, state):
+        for slot, value in state.items():
+            setattr(self, slot, value)
+
+    def is_live(self, now) -> bool:
+        """Check the active switch and the schedule window."""
+        if not self.is_active:
+            return False
+        if self.activation and now < self.activation:
+            return False
+        if self.deactivation and now >= self.deactivation:
+            return False
+        return True
+
+    def matches(self, user) -> bool:
+        """Check targeting and rollout for an authenticated user."""
+        if self.enabled_for_all:
+            return True
+        if user.pk in self.user_ids:
+            return True
+        if self.tenant_targeted:
+            return True
+        if getattr(user, 'role_id', None) in self.role_ids:
+            return True
+        if self.email_domains:
+            domain = (user.email or '').rpartition('@')[2].lower()
+            if domain in self.email_domains:
+                return True
+        if self.rollout_percentage <= 0:
+            return False
+        return rollout_bucket(self.key, user.pk) < self.rollout_percentage
+
+
+class FlagRuleSet:
+    """
+    Every compiled flag visible to one tenant.
+
+    Usage:
+        from feature_flags.rules import compile_flag_rules
+
+        rules = compile_flag_rules(tenant_id)
+        rules.is_enabled('new_dashboard', request.user)
+    """
+
+    def __init__(self, tenant_id: Optional[int], flags: Dict[str, CompiledFlag]):
+        self.tenant_id = tenant_id
+        self.flags = flags
+
+    def __len__(self):
+        return len(self.flags)
+
+    def is_enabled(self, key: str, user=None, now=None) -> bool:
+        """Evaluate a flag for a user (None for anonymous) without queries."""
+        return self._evaluate(key, user, now or timezone.now(), set())
+
+    def enabled_features(self, user=None, now=None) -> Dict[str, bool]:
+        """Evaluate every active flag for a user."""
+        now = now or timezone.now()
+        return {
+            key: self._evaluate(key, user, now, set())
+            for key, flag in self.flags.items() if flag.is_active
+        }
+
+    def _evaluate(self, key: str, user, now, seen: set) -> bool:
+        flag = self.flags.get(key)
+        if flag is None or key in seen or not flag.is_live(now):
+            return False
+        seen.add(key)
+
+        if user is None:
+            # Anonymous visitors only see whether the flag is switched on
+            enabled = True
+        else:
+            enabled = flag.matches(user)
+
+        if enabled and flag.prerequisites:
+            enabled = all(self._evaluate(required, user, now, set(seen)) for required in flag.prerequisites)
+        if enabled and flag.conflicts:
+            enabled = not any(self._evaluate(other, user, now, set(seen)) for other in flag.conflicts)
+        return enabled
+
+
+def _split_ids(values: Iterable[str]) -> set:
+    return {int(value) for value in values if str(value).strip().isdigit()}
+
+
+def compile_flag_rules(tenant_id: Optional[int] = None) -> FlagRuleSet:
+    """Compile the flag rules for a tenant from the database."""
+    from django.contrib.auth import get_user_model
+    from django.db.models import Q
+    from access_control.role_models import Role
+    from .models import FeatureFlag, FeatureTarget, FeatureFlagDependency
+
+    flag_rows = list(FeatureFlag.objects.values_list(
+        'pk', 'key', 'is_active', 'disabled_for_all', 'enabled_for_all',
+        'rollout_percentage', 'scheduled_activation', 'scheduled_deactivation',
+        'prerequisites',
+    ))
+
+    targets: Dict[int, Dict[str, set]] = {}
+    for flag_id, target_type, target_value in FeatureTarget.objects.values_list(
+        'feature_flag_id', 'target_type', 'target_value'
+    ):
+        targets.setdefault(flag_id, {}).setdefault(target_type, set()).add(target_value.strip())
+
+    requires: Dict[int, list] = {}
+    conflicts: Dict[int, list] = {}
+    for flag_id, required_key, dependency_type in FeatureFlagDependency.objects.filter(
+        is_active=True
+    ).values_list('dependent_feature_id', 'required_feature__key', 'dependency_type'):
+        if dependency_type in REQUIRES_DEPENDENCIES:
+            requires.setdefault(flag_id, []).append(required_key)
+        elif dependency_type in CONFLICT_DEPENDENCIES:
+            conflicts.setdefault(flag_id, []).append(required_key)
+
+    # Resolve group and role targets for this tenant up front
+    group_names = set()
+    role_values = set()
+    for by_type in targets.values():
+        group_names |= by_type.get('group', set())
+        role_values |= by_type.get('role', set())
+
+    group_members: Dict[str, set] = {}
+    if group_names and tenant_id:
+        User = get_user_model()
+        for user_id, group_name in User.objects.filter(
+            tenant_id=tenant_id, groups__name__in=group_names
+        ).values_list('pk', 'groups__name'):
+            group_members.setdefault(group_name, set()).add(user_id)
+
+    role_ids_by_value: Dict[str, set] = {}
+    if role_values:
+        role_scope = Role.objects.filter(
+            Q(name__in=role_values) | Q(pk__in=_split_ids(role_values))
+        )
+        role_scope = role_scope.filter(Q(tenant_id=tenant_id) | Q(tenant__isnull=True))
+        for role_id, role_name in role_scope.values_list('pk', 'name'):
+            role_ids_by_value.setdefault(role_name, set()).add(role_id)
+            role_ids_by_value.setdefault(str(role_id), set()).add(role_id)
+
+    flags = {}
+    for (flag_id, key, is_active, disabled_for_all, enabled_for_all, rollout,
+         activation, deactivation, prerequisites) in flag_rows:
+        by_type = targets.get(flag_id, {})
+
+        user_ids = _split_ids(by_type.get('user', ()))
+        for group_name in by_type.get('group', ()):
+            user_ids |= group_members.get(group_name, set())
+
+        role_ids = set()
+        for value in by_type.get('role', ()):
+            role_ids |= role_ids_by_value.get(value, set())
+
+        percentages = [float(value) for value in by_type.get('percentage', ())
+                       if value.replace('.', '', 1).isdigit()]
+
+        flags[key] = CompiledFlag(
+            key=key,
+            is_active=is_active and not disabled_for_all,
+            enabled_for_all=enabled_for_all,
+            rollout_percentage=max([rollout or 0.0] + percentages),
+            activation=activation,
+            deactivation=deactivation,
+            prerequisites=tuple(prerequisites or ()) + tuple(requires.get(flag_id, ())),
+            conflicts=tuple(conflicts.get(flag_id, ())),
+            user_ids=frozenset(user_ids),
+            tenant_targeted=bool(tenant_id) and str(tenant_id) in by_type.get('tenant', ()),
+            role_ids=frozenset(role_ids),
+            email_domains=frozenset(
+                value.lstrip('@').lower() for value in by_type.get('email_domain', ())
+            ),
+        )
+
+    logger.debug(f"Compiled {len(flags)} feature flags for tenant {tenant_id}")
+    return FlagRuleSet(tenant_id, flags)
@@ -0,0 +1,31 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_save, post_delete, m2m_changed
+from django.dispatch import receiver
+from access_control.role_models import Role
+from core.feature_flag_middleware import flag_cache
+from .models import FeatureFlag, FeatureTarget, FeatureFlagDependency
+
+
+@receiver(post_save, sender=FeatureFlag)
+@receiver(post_delete, sender=FeatureFlag)
+@receiver(post_save, sender=FeatureTarget)
+@receiver(post_delete, sender=FeatureTarget)
+@receiver(post_save, sender=FeatureFlagDependency)
+@receiver(post_delete, sender=FeatureFlagDependency)
+def invalidate_flag_rules(sender, **kwargs):
+    """Recompile flag rules in every worker after a flag change"""
+    flag_cache.invalidate()
+
+
+@receiver(post_save, sender=Role)
+@receiver(post_delete, sender=Role)
+def invalidate_flag_rules_for_role(sender, **kwargs):
+    """Role targets are resolved by name when rules are compiled"""
+    flag_cache.invalidate()
+
+
+@receiver(m2m_changed, sender=get_user_model().groups.through)
+def invalidate_flag_rules_for_groups(sender, action, **kwargs):
+    """Group targets are expanded to member ids when rules are compiled"""
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        flag_cache.invalidate()
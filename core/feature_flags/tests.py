@@ -147,3 +147,77 @@ class FeatureFlagUtilsTests(TestCase):
         adoption = calculate_adoption_rate(self.flag)
         self.assertEqual(adoption['rollout_percentage'], 100)
         self.assertEqual(adoption['is_active'], True)
+
+
+class CompiledFlagCacheTests(TestCase):
+    def setUp(self):
+        from django.core.cache import cache
+        from tenants.models import Tenant
+        from core.feature_flag_middleware import FeatureFlagCache
+
+        cache.clear()
+        self.flag_cache = FeatureFlagCache(max_entries=2, ttl=60)
+        self.tenant = Tenant.objects.create(name='Flag Tenant', slug='flag-tenant')
+        self.user = User.objects.create_user(
+            username='flaguser', email='flag@acme.io', password='password', tenant=self.tenant
+        )
+        self.flag = FeatureFlag.objects.create(
+            key='beta_reports', name='Beta Reports', is_active=True, rollout_percentage=0
+        )
+
+    def _enabled(self, key='beta_reports'):
+        return self.flag_cache.get_rules(self.user.tenant_id).is_enabled(key, self.user)
+
+    def test_targets_are_evaluated_without_queries(self):
+        FeatureTarget.objects.create(
+            feature_flag=self.flag, target_type='email_domain', target_value='acme.io'
+        )
+        self.flag_cache.get_rules(self.user.tenant_id)
+        with self.assertNumQueries(0):
+            for _ in range(10):
+                self.assertTrue(self._enabled())
+                self.assertFalse(self._enabled('missing'))
+
+    def test_model_changes_invalidate_cached_rules(self):
+        self.assertFalse(self._enabled())
+        FeatureTarget.objects.create(
+            feature_flag=self.flag, target_type='tenant', target_value=str(self.tenant.pk)
+        )
+        self.assertTrue(self._enabled())
+        self.flag.disabled_for_all = True
+        self.flag.save()
+        self.assertFalse(self._enabled())
+
+    def test_prerequisites_and_rollout(self):
+        self.flag.rollout_percentage = 100
+        self.flag.prerequisites = ['base_feature']
+        self.flag.save()
+        self.assertFalse(self._enabled())
+        FeatureFlag.objects.create(
+            key='base_feature', name='Base', is_active=True, enabled_for_all=True
+        )
+        self.assertTrue(self._enabled())
+
+    def test_model_and_utils_read_through_the_flag_cache(self):
+        from core.feature_flag_middleware import flag_cache
+        from .utils import get_feature_flags_for_user
+
+        FeatureFlag.objects.create(key='everyone', name='Everyone', is_active=True, enabled_for_all=True)
+        flag_cache.get_rules(self.user.tenant_id)
+        with self.assertNumQueries(0):
+            self.assertFalse(self.flag.is_enabled_for_user(self.user))
+        # One query for the active flags, none per flag
+        with self.assertNumQueries(1):
+            self.assertEqual(list(get_feature_flags_for_user(self.user)), ['everyone'])
+
+    def test_lru_eviction_and_ttl(self):
+        for tenant_id in (None, 1, 2):
+            self.flag_cache.get_rules(tenant_id)
+        self.assertEqual(len(self.flag_cache), 2)
+        self.assertNotIn(None, self.flag_cache._entries)
+
+        self.flag_cache.ttl = 0
+        self.flag_cache.get_rules(3)
+        misses = self.flag_cache.misses
+        self.flag_cache.get_rules(3)
+        self.assertEqual(self.flag_cache.misses, misses + 1)
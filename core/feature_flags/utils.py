@@ -32,9 +32,12 @@ def get_feature_flags_for_user(user):
     Returns:
         dict: Dictionary of enabled flags {key: flag_object}
     """
+    from core.feature_flag_middleware import flag_cache
+
+    rules = flag_cache.get_rules(getattr(user, 'tenant_id', None) if user else None)
     enabled_flags = {}
     for flag in FeatureFlag.objects.filter(is_active=True):
-        if flag.is_enabled_for_user(user):
+        if rules.is_enabled(flag.key, user):
             enabled_flags[flag.key] = flag
     return enabled_flags
 
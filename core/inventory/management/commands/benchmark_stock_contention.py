@@ -0,0 +1,145 @@
+"""
+Benchmark stock decrements under contention.
+
+Seeds one hot SKU and has many threads, each on its own database
+connection, sell it one unit at a time until more units have been
+requested than are in stock. Checks that exactly the stocked units were
+sold, that the balance ends at zero, that there is one ledger movement per
+sale and that every movement recorded a distinct balance (no lost
+updates), then reports throughput and p50/p95 latency. With --lines > 1
+every sale also takes a unit of other, well stocked SKUs through
+remove_stock_lines. The workers commit, so the seeded tenant is deleted
+afterwards.
+
+Usage:
+    python manage.py benchmark_stock_contention --workers 32 --sales 200 --lines 5
+"""
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from core.models import User
+from inventory.models import StockLevel, StockMovement, Warehouse
+from inventory.services import InventoryService
+from products.models import Product
+from tenants.models import Tenant
+
+
+class Command(BaseCommand):
+    help = 'Sell one SKU from many threads and check the stock ledger stays consistent'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=16, help='Concurrent threads')
+        parser.add_argument('--sales', type=int, default=100, help='Sales attempted per thread')
+        parser.add_argument('--stock', type=int, default=None,
+                            help='Units of the hot SKU in stock (default: 3/4 of the attempted sales)')
+        parser.add_argument('--lines', type=int, default=1, help='Products per sale')
+        parser.add_argument('--min-throughput', type=float, default=0,
+                            help='Fail if fewer sales per second are completed')
+
+    def handle(self, *args, **options):
+        workers, sales, lines = options['workers'], options['sales'], options['lines']
+        attempts = workers * sales
+        stock = options['stock'] if options['stock'] is not None else attempts * 3 // 4
+
+        tenant = self._seed(stock, lines, attempts)
+        try:
+            latencies, sold, elapsed = self._hammer(tenant, workers, sales)
+            self._verify(tenant, stock, attempts, sold)
+        finally:
+            tenant.delete()
+
+        throughput = sold / elapsed if elapsed else 0.0
+        p50 = statistics.median(latencies)
+        p95 = sorted(latencies)[max(int(len(latencies) * 0.95) - 1, 0)]
+        self.stdout.write(
+            f"{sold:,} of {attempts:,} sales completed by {workers} workers in {elapsed:.2f}s "
+            f"({throughput:,.0f} sales/s)"
+        )
+        self.stdout.write(f"Sale latency p50 {p50 * 1000:8.2f} ms   p95 {p95 * 1000:8.2f} ms")
+        if throughput < options['min_throughput']:
+            raise CommandError(f"Throughput {throughput:,.0f} sales/s is below {options['min_throughput']:,.0f}")
+        self.stdout.write(self.style.SUCCESS('Stock ledger is consistent'))
+
+    def _seed(self, stock, lines, attempts):
+        stamp = time.time_ns()
+        tenant = Tenant.objects.create(name='Stock Benchmark', slug=f'stock-benchmark-{stamp}')
+        self.user = User.objects.create(username=f'stock-bench-{stamp}', email=f'stock-bench-{stamp}@example.com', tenant=tenant)
+        self.warehouse = Warehouse.objects.create(warehouse_name='Benchmark', warehouse_code=f'BENCH-{stamp}', tenant=tenant)
+        self.products = Product.objects.bulk_create([
+            Product(product_name=f'Benchmark {number}', sku=f'BENCH-{stamp}-{number}',
+                    base_price=Decimal('10.00'), track_inventory=True, tenant=tenant)
+            for number in range(lines)
+        ])
+        self.hot = self.products[0]
+        StockLevel.objects.bulk_create([
+            StockLevel(product=product, warehouse=self.warehouse, tenant=tenant,
+                       quantity=Decimal(stock if product is self.hot else attempts), cost_price=Decimal('6.00'))
+            for product in self.products
+        ])
+        return tenant
+
+    def _sell(self, tenant):
+        if len(self.products) == 1:
+            InventoryService.remove_stock(
+                product=self.hot, warehouse=self.warehouse, quantity=1, user=self.user,
+                reference_type='benchmark', movement_type='sale', tenant=tenant,
+            )
+        else:
+            InventoryService.remove_stock_lines(
+                warehouse=self.warehouse, lines=[(product, 1) for product in self.products], user=self.user,
+                reference_type='benchmark', movement_type='sale', tenant=tenant,
+            )
+
+    def _hammer(self, tenant, workers, sales):
+        latencies = []
+        sold = []
+        lock = threading.Lock()
+        start_line = threading.Barrier(workers)
+
+        def worker():
+            own_latencies, own_sold = [], 0
+            try:
+                start_line.wait()
+                for _ in range(sales):
+                    started = time.perf_counter()
+                    try:
+                        self._sell(tenant)
+                        own_sold += 1
+                    except ValueError:
+                        pass  # Sold out
+                    own_latencies.append(time.perf_counter() - started)
+            finally:
+                connection.close()
+            with lock:
+                latencies.extend(own_latencies)
+                sold.append(own_sold)
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            for future in [pool.submit(worker) for _ in range(workers)]:
+                future.result()
+        return latencies, sum(sold), time.perf_counter() - started
+
+    def _verify(self, tenant, stock, attempts, sold):
+        expected = min(stock, attempts)
+        level = StockLevel.objects.get(product=self.hot, warehouse=self.warehouse, tenant=tenant)
+        balances = list(StockMovement.objects.filter(
+            product=self.hot, tenant=tenant, reference_type='benchmark'
+        ).values_list('balance_after', flat=True))
+        problems = []
+        if sold != expected:
+            problems.append(f"{sold} sales completed, expected {expected}")
+        if level.quantity != stock - expected:
+            problems.append(f"balance is {level.quantity}, expected {stock - expected}")
+        if len(balances) != expected:
+            problems.append(f"{len(balances)} ledger movements, expected {expected}")
+        if sorted(balances) != [Decimal(value) for value in range(stock - expected, stock)]:
+            problems.append('ledger balances are not one distinct step per sale')
+        if problems:
+            raise CommandError('Stock ledger is inconsistent: ' + '; '.join(problems))
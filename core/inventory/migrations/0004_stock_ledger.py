@@ -0,0 +1,49 @@
+# Generated by Django 5.2.18 on 2026-10-16 10:12
+
+from django.db import migrations, models
+
+
+def merge_unlocated_levels(apps, schema_editor):
+    """Fold stock levels sharing (product, warehouse) with no location into the oldest one."""
+    StockLevel = apps.get_model('inventory', 'StockLevel')
+    duplicates = StockLevel.objects.filter(location__isnull=True).values('product_id', 'warehouse_id').annotate(
+        rows=models.Count('id')
+    ).filter(rows__gt=1).order_by()
+    for key in duplicates:
+        rows = list(StockLevel.objects.filter(
+            product_id=key['product_id'], warehouse_id=key['warehouse_id'], location__isnull=True
+        ).order_by('pk'))
+        keep = rows[0]
+        for row in rows[1:]:
+            keep.quantity += row.quantity
+            keep.reserved_quantity += row.reserved_quantity
+        keep.save(update_fields=['quantity', 'reserved_quantity'])
+        StockLevel.objects.filter(pk__in=[row.pk for row in rows[1:]]).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0003_stocklevel_acquisition_date_stocklevel_batch_number_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='stockmovement',
+            name='balance_after',
+            field=models.DecimalField(blank=True, decimal_places=2, help_text='Stock level quantity right after this movement was applied', max_digits=12, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='stockmovement',
+            index=models.Index(fields=['tenant', 'product', 'created_at'], name='inventory_mov_product_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='stockmovement',
+            index=models.Index(fields=['reference_type', 'reference_id'], name='inventory_mov_reference_idx'),
+        ),
+        migrations.RunPython(merge_unlocated_levels, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='stocklevel',
+            constraint=models.UniqueConstraint(condition=models.Q(('location__isnull', True)), fields=('product', 'warehouse'), name='unique_stock_level_no_location'),
+        ),
+    ]
@@ -145,6 +145,14 @@ class StockLevel(TenantModel):
     class Meta:
         ordering = ['product', 'warehouse']
         unique_together = [('product', 'warehouse', 'location')]
+        constraints = [
+            # unique_together treats NULL locations as distinct
+            models.UniqueConstraint(
+                fields=['product', 'warehouse'],
+                condition=models.Q(location__isnull=True),
+                name='unique_stock_level_no_location',
+            ),
+        ]
         verbose_name = 'Stock Level'
         verbose_name_plural = 'Stock Levels'
 
@@ -218,6 +226,13 @@ class StockMovement(TenantModel):
     # Costs
     unit_cost = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True)
     total_cost = models.DecimalField(max_digits=14, decimal_places=2, null=True, blank=True)
+    balance_after = models.DecimalField(
+        max_digits=12,
+        decimal_places=2,
+        null=True,
+        blank=True,
+        help_text="Stock level quantity right after this movement was applied"
+    )
     
     # Metadata
     notes = models.TextField(blank=True)
@@ -233,6 +248,10 @@ class StockMovement(TenantModel):
         ordering = ['-created_at']
         verbose_name = 'Stock Movement'
         verbose_name_plural = 'Stock Movements'
+        indexes = [
+            models.Index(fields=['tenant', 'product', 'created_at'], name='inventory_mov_product_idx'),
+            models.Index(fields=['reference_type', 'reference_id'], name='inventory_mov_reference_idx'),
+        ]
 
     def __str__(self):
         return f"{self.movement_type.upper()}: {self.quantity} x {self.product.product_name}"
@@ -1,7 +1,15 @@
 """
 Inventory Service - Business logic for stock management.
+
+StockLevel rows are the materialised balance per (product, warehouse,
+location) and StockMovement is the append-only ledger of changes to them.
+Balances are only changed with single conditional UPDATEs (never a
+read-modify-write), so concurrent sales of the same SKU neither lose
+updates nor oversell, and every movement records the balance it left.
 """
-from django.db import transaction
+from collections import defaultdict
+from django.db import IntegrityError, transaction
+from django.db.models import Case, DecimalField, F, Value, When
 from django.utils import timezone
 from decimal import Decimal
 from core.event_bus import event_bus
@@ -56,6 +64,19 @@ class InventoryService:
             'available': (result['total'] or Decimal('0')) - (result['reserved'] or Decimal('0'))
         }
 
+    @staticmethod
+    def _get_or_create_level(product, warehouse, location, tenant):
+        """
+        Get or create the balance row, tolerating a concurrent insert of the same row.
+        """
+        lookup = {'product': product, 'warehouse': warehouse, 'location': location, 'tenant': tenant}
+        try:
+            with transaction.atomic():
+                stock, created = StockLevel.objects.get_or_create(**lookup, defaults={'quantity': Decimal('0')})
+        except IntegrityError:
+            stock = StockLevel.objects.get(**lookup)
+        return stock
+
     @staticmethod
     @transaction.atomic
     def add_stock(product, warehouse, quantity, user, location=None, 
@@ -64,41 +85,41 @@ class InventoryService:
         """
         Add stock to a warehouse location.
         """
-        # Get or create stock level
-        stock, created = StockLevel.objects.get_or_create(
-            product=product,
-            warehouse=warehouse,
-            location=location,
-            tenant=tenant or product.tenant,
-            defaults={'quantity': Decimal('0'), 'cost_price': unit_cost}
-        )
+        tenant = tenant or product.tenant
+        quantity = Decimal(str(quantity))
+        stock = InventoryService._get_or_create_level(product, warehouse, location, tenant)
         
-        # Update quantity
-        stock.quantity += Decimal(str(quantity))
+        # Increment in SQL so concurrent receipts cannot overwrite each other
+        changes = {'quantity': F('quantity') + quantity, 'updated_at': timezone.now()}
         if unit_cost:
-            # Calculate weighted average cost
-            if stock.cost_price and stock.quantity > Decimal('0'):
-                old_value = stock.cost_price * (stock.quantity - Decimal(str(quantity)))
-                new_value = Decimal(str(unit_cost)) * Decimal(str(quantity))
-                stock.cost_price = (old_value + new_value) / stock.quantity
-            else:
-                stock.cost_price = Decimal(str(unit_cost))
-        stock.save()
+            unit_cost = Decimal(str(unit_cost))
+            # Weighted average cost, computed from the pre-update row values
+            changes['cost_price'] = Case(
+                When(
+                    cost_price__isnull=False,
+                    then=(F('cost_price') * F('quantity') + unit_cost * quantity) / (F('quantity') + quantity),
+                ),
+                default=Value(unit_cost),
+                output_field=DecimalField(max_digits=12, decimal_places=2),
+            )
+        StockLevel.objects.filter(pk=stock.pk).update(**changes)
+        stock.refresh_from_db(fields=['quantity', 'cost_price', 'reserved_quantity', 'updated_at'])
         
         # Record movement
         StockMovement.objects.create(
             product=product,
             movement_type='in',
-            quantity=Decimal(str(quantity)),
+            quantity=quantity,
             to_warehouse=warehouse,
             to_location=location,
             unit_cost=unit_cost,
-            total_cost=Decimal(str(quantity)) * Decimal(str(unit_cost)) if unit_cost else None,
+            total_cost=quantity * unit_cost if unit_cost else None,
+            balance_after=stock.quantity,
             reference_type=reference_type,
             reference_id=reference_id,
             notes=notes,
             performed_by=user,
-            tenant=tenant or product.tenant
+            tenant=tenant
         )
         
         # Check if we need to clear any alerts
@@ -109,7 +130,7 @@ class InventoryService:
             'warehouse_id': warehouse.id,
             'quantity': float(quantity),
             'location_id': location.id if location else None,
-            'tenant_id': (tenant or product.tenant).id,
+            'tenant_id': tenant.id,
             'user': user,
             'reference_type': reference_type,
             'reference_id': reference_id
@@ -117,6 +138,17 @@ class InventoryService:
         
         return stock
 
+    @staticmethod
+    def _decrement(stock, quantity):
+        """
+        Take ``quantity`` off a balance row only if that much is available.
+        Returns False, leaving the row untouched, when it is not.
+        """
+        return StockLevel.objects.filter(
+            pk=stock.pk,
+            quantity__gte=F('reserved_quantity') + quantity,
+        ).update(quantity=F('quantity') - quantity, updated_at=timezone.now()) == 1
+
     @staticmethod
     @transaction.atomic
     def remove_stock(product, warehouse, quantity, user, location=None,
@@ -130,23 +162,24 @@ class InventoryService:
         if not stock:
             raise ValueError(f"No stock found for {product.product_name} at {warehouse.warehouse_code}")
         
-        if stock.available_quantity < Decimal(str(quantity)):
+        quantity = Decimal(str(quantity))
+        if not InventoryService._decrement(stock, quantity):
+            stock.refresh_from_db(fields=['quantity', 'reserved_quantity'])
             raise ValueError(
                 f"Insufficient stock. Available: {stock.available_quantity}, Requested: {quantity}"
             )
-        
-        stock.quantity -= Decimal(str(quantity))
-        stock.save()
+        stock.refresh_from_db(fields=['quantity', 'cost_price', 'reserved_quantity', 'updated_at'])
         
         # Record movement
         StockMovement.objects.create(
             product=product,
             movement_type=movement_type,
-            quantity=Decimal(str(quantity)),
+            quantity=quantity,
             from_warehouse=warehouse,
             from_location=location,
             unit_cost=stock.cost_price,
-            total_cost=Decimal(str(quantity)) * stock.cost_price if stock.cost_price else None,
+            total_cost=quantity * stock.cost_price if stock.cost_price else None,
+            balance_after=stock.quantity,
             reference_type=reference_type,
             reference_id=reference_id,
             notes=notes,
@@ -171,6 +204,105 @@ class InventoryService:
         
         return stock
 
+    @staticmethod
+    @transaction.atomic
+    def remove_stock_lines(warehouse, lines, user, reference_type='', reference_id=None,
+                           notes='', movement_type='out', tenant=None, skip_insufficient=False):
+        """
+        Remove several products from a warehouse in one pass, e.g. a sale's lines.
+        lines: list of (product, quantity) tuples; repeated products are combined.
+
+        Balances are decremented in product id order so concurrent batches lock
+        rows in the same order, and the movements are inserted in one query.
+        Raises ValueError on the first product short of stock, unless
+        skip_insufficient is set, in which case short products are left
+        untouched and returned.
+        """
+        products = {}
+        quantities = defaultdict(Decimal)
+        for product, quantity in lines:
+            products[product.id] = product
+            quantities[product.id] += Decimal(str(quantity))
+        if not products:
+            return []
+        tenant = tenant or warehouse.tenant
+
+        # Same row get_stock_level picks; a warehouse-level row wins over binned ones
+        levels = {}
+        for stock in StockLevel.objects.filter(
+            product_id__in=products, warehouse=warehouse, tenant=tenant
+        ).order_by('product_id', F('location_id').asc(nulls_first=True), 'pk'):
+            levels.setdefault(stock.product_id, stock)
+
+        applied = []
+        short = []
+        for product_id in sorted(products):
+            product = products[product_id]
+            stock = levels.get(product_id)
+            if stock and InventoryService._decrement(stock, quantities[product_id]):
+                applied.append(product_id)
+                continue
+            if not skip_insufficient:
+                if not stock:
+                    raise ValueError(f"No stock found for {product.product_name} at {warehouse.warehouse_code}")
+                stock.refresh_from_db(fields=['quantity', 'reserved_quantity'])
+                raise ValueError(
+                    f"Insufficient stock for {product.product_name}. "
+                    f"Available: {stock.available_quantity}, Requested: {quantities[product_id]}"
+                )
+            short.append(product)
+        if not applied:
+            return short
+
+        balances = {
+            row['pk']: row
+            for row in StockLevel.objects.filter(
+                pk__in=[levels[product_id].pk for product_id in applied]
+            ).values('pk', 'quantity', 'cost_price')
+        }
+        movements = []
+        for product_id in applied:
+            stock = levels[product_id]
+            balance = balances[stock.pk]
+            quantity = quantities[product_id]
+            movements.append(StockMovement(
+                product=products[product_id],
+                movement_type=movement_type,
+                quantity=quantity,
+                from_warehouse=warehouse,
+                from_location=stock.location,
+                unit_cost=balance['cost_price'],
+                total_cost=quantity * balance['cost_price'] if balance['cost_price'] else None,
+                balance_after=balance['quantity'],
+                reference_type=reference_type,
+                reference_id=reference_id,
+                notes=notes,
+                performed_by=user,
+                tenant=tenant
+            ))
+        StockMovement.objects.bulk_create(movements)
+
+        # Only products with an active rule need the reorder check
+        ruled = set(ReorderRule.objects.filter(
+            product_id__in=applied, warehouse=warehouse, tenant=tenant, is_active=True
+        ).values_list('product_id', flat=True))
+        for product_id in applied:
+            if product_id in ruled:
+                InventoryService._check_reorder_rules(products[product_id], warehouse, tenant)
+            event_bus.emit('inventory.stock.removed', {
+                'product_id': product_id,
+                'warehouse_id': warehouse.id,
+                'quantity': float(quantities[product_id]),
+                'location_id': levels[product_id].location_id,
+                'tenant_id': tenant.id,
+                'user': user,
+                'reference_type': reference_type,
+                'reference_id': reference_id,
+                'movement_type': movement_type
+            })
+        
+        return short
+
     @staticmethod
     @transaction.atomic
     def transfer_stock(product, from_warehouse, to_warehouse, quantity, user,
@@ -219,14 +351,18 @@ class InventoryService:
         if not stock:
             raise ValueError(f"No stock found for {product.product_name} at {warehouse.warehouse_code}")
         
-        if stock.available_quantity < Decimal(str(quantity)):
+        quantity = Decimal(str(quantity))
+        reserved = StockLevel.objects.filter(
+            pk=stock.pk,
+            quantity__gte=F('reserved_quantity') + quantity,
+        ).update(reserved_quantity=F('reserved_quantity') + quantity, updated_at=timezone.now())
+        stock.refresh_from_db(fields=['quantity', 'reserved_quantity', 'updated_at'])
+        
+        if not reserved:
             raise ValueError(
                 f"Insufficient stock to reserve. Available: {stock.available_quantity}, Requested: {quantity}"
             )
         
-        stock.reserved_quantity += Decimal(str(quantity))
-        stock.save()
-        
         return stock
 
     @staticmethod
@@ -237,9 +373,13 @@ class InventoryService:
         """
         stock = InventoryService.get_stock_level(product, warehouse, tenant=tenant)
         
-        if stock and stock.reserved_quantity >= Decimal(str(quantity)):
-            stock.reserved_quantity -= Decimal(str(quantity))
-            stock.save()
+        if stock:
+            quantity = Decimal(str(quantity))
+            StockLevel.objects.filter(
+                pk=stock.pk,
+                reserved_quantity__gte=quantity,
+            ).update(reserved_quantity=F('reserved_quantity') - quantity, updated_at=timezone.now())
+            stock.refresh_from_db(fields=['quantity', 'reserved_quantity', 'updated_at'])
         
         return stock
 
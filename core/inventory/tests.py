@@ -1,3 +1,116 @@
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError
 from django.test import TestCase
 
-# Create your tests here.
+from inventory.models import StockLevel, StockMovement, Warehouse
+from inventory.services import InventoryService
+from products.models import Product
+from tenants.models import Tenant
+
+
+class StockLedgerTests(TestCase):
+    def setUp(self):
+        self.tenant = Tenant.objects.create(name="Ledger Tenant", slug="ledger-tenant")
+        self.user = get_user_model().objects.create_user(
+            username="ledger-user", password="password", tenant=self.tenant
+        )
+        self.warehouse = Warehouse.objects.create(
+            warehouse_name="Main", warehouse_code="LEDGER-WH", tenant=self.tenant
+        )
+        self.widget = Product.objects.create(
+            product_name="Widget", sku="LEDGER-1", base_price=Decimal("10.00"), tenant=self.tenant
+        )
+        self.gadget = Product.objects.create(
+            product_name="Gadget", sku="LEDGER-2", base_price=Decimal("20.00"), tenant=self.tenant
+        )
+
+    def add(self, product, quantity, unit_cost=None):
+        return InventoryService.add_stock(
+            product, self.warehouse, quantity, self.user, unit_cost=unit_cost, tenant=self.tenant
+        )
+
+    def test_add_stock_averages_cost_and_records_balance(self):
+        self.add(self.widget, 10, unit_cost=Decimal("4.00"))
+        stock = self.add(self.widget, 30, unit_cost=Decimal("8.00"))
+
+        self.assertEqual(stock.quantity, Decimal("40"))
+        self.assertEqual(stock.cost_price, Decimal("7.00"))
+        self.assertEqual(
+            sorted(StockMovement.objects.filter(product=self.widget).values_list('balance_after', flat=True)),
+            [Decimal("10"), Decimal("40")],
+        )
+
+    def test_remove_stock_never_takes_reserved_units(self):
+        self.add(self.widget, 5)
+        InventoryService.reserve_stock(self.widget, self.warehouse, 3, tenant=self.tenant)
+
+        with self.assertRaises(ValueError):
+            InventoryService.remove_stock(self.widget, self.warehouse, 3, self.user, tenant=self.tenant)
+        stock = InventoryService.remove_stock(self.widget, self.warehouse, 2, self.user, tenant=self.tenant)
+
+        self.assertEqual(stock.quantity, Decimal("3"))
+        self.assertEqual(stock.available_quantity, Decimal("0"))
+        self.assertEqual(StockMovement.objects.filter(movement_type='out').count(), 1)
+
+    def test_remove_stock_lines_combines_products_and_skips_short_ones(self):
+        self.add(self.widget, 5)
+        self.add(self.gadget, 1)
+
+        short = InventoryService.remove_stock_lines(
+            self.warehouse,
+            [(self.widget, 2), (self.gadget, 2), (self.widget, 1)],
+            self.user,
+            movement_type='sale',
+            tenant=self.tenant,
+            skip_insufficient=True,
+        )
+
+        self.assertEqual(short, [self.gadget])
+        levels = dict(StockLevel.objects.values_list('product_id', 'quantity'))
+        self.assertEqual(levels, {self.widget.id: Decimal("2"), self.gadget.id: Decimal("1")})
+        sale = StockMovement.objects.get(movement_type='sale')
+        self.assertEqual((sale.product_id, sale.quantity, sale.balance_after), (self.widget.id, Decimal("3"), Decimal("2")))
+
+    def test_remove_stock_lines_is_all_or_nothing(self):
+        self.add(self.widget, 5)
+        self.add(self.gadget, 1)
+
+        with self.assertRaises(ValueError):
+            InventoryService.remove_stock_lines(
+                self.warehouse, [(self.widget, 2), (self.gadget, 2)], self.user, tenant=self.tenant
+            )
+
+        self.assertEqual(InventoryService.get_stock_level(self.widget, self.warehouse).quantity, Decimal("5"))
+        self.assertFalse(StockMovement.objects.filter(movement_type='out').exists())
+
+    def test_stock_changes_touch_updated_at(self):
+        stock = self.add(self.widget, 5)
+        stale = stock.updated_at - timedelta(hours=1)
+
+        for change in (
+            lambda: self.add(self.widget, 1),
+            lambda: InventoryService.reserve_stock(self.widget, self.warehouse, 2, tenant=self.tenant),
+            lambda: InventoryService.release_reservation(self.widget, self.warehouse, 2, tenant=self.tenant),
+            lambda: InventoryService.remove_stock(self.widget, self.warehouse, 1, self.user, tenant=self.tenant),
+        ):
+            StockLevel.objects.filter(pk=stock.pk).update(updated_at=stale)
+            self.assertGreater(change().updated_at, stale)
+
+    def test_concurrent_first_receipt_reuses_the_unlocated_row(self):
+        self.add(self.widget, 5)
+
+        # Another receipt inserted the row after this one looked it up
+        def racing_get_or_create(defaults=None, **lookup):
+            return StockLevel.objects.create(**lookup, **defaults), True
+
+        with mock.patch.object(StockLevel.objects, 'get_or_create', side_effect=racing_get_or_create):
+            stock = self.add(self.widget, 2)
+
+        self.assertEqual(stock.quantity, Decimal("7"))
+        self.assertEqual(StockLevel.objects.filter(product=self.widget, location__isnull=True).count(), 1)
+        with self.assertRaises(IntegrityError):
+            StockLevel.objects.create(product=self.widget, warehouse=self.warehouse, tenant=self.tenant)
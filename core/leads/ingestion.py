@@ -0,0 +1,233 @@
+"""
+Bulk Lead Ingestion
+
+Imports many leads without paying Lead.save()'s per-row side effects
+(re-save for status, one task insert and several event dispatches per lead):
+- Initial scores and statuses computed column-wise over each chunk
+- Leads, their initial follow-up tasks and 'lead_created' engagement events
+  inserted with bulk_create
+- Automation triggers ('leads.lead_created', 'leads.lead_qualified',
+  'lead.created') emitted inside one event bus batch per chunk, so they are
+  published after commit as chunked dispatches
+- Dashboard KPI rollup days refreshed once per chunk after commit
+- lead.created webhooks fanned out only when the tenant has subscribers
+
+Per-row post_save receivers of Lead and Task are not run; everything they
+would do for a new lead is done here in bulk instead.
+
+Usage:
+    from leads.ingestion import ingest_leads
+
+    leads = ingest_leads(rows, tenant_id=tenant.id, owner=request.user)
+"""
+import logging
+from itertools import islice
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
+from django.utils import timezone
+
+from core.event_bus import event_bus
+from dashboard.rollups import mark_instances_dirty
+
+from .models import LEAD_SOURCE_SCORES, Lead
+
+logger = logging.getLogger(__name__)
+
+# Engagement recorded for a new lead, and for the status its score moves it to
+CREATED_ENGAGEMENT_SCORE = 10
+STATUS_ENGAGEMENT = {
+    'contacted': ('lead_contacted', 15),
+    'qualified': ('lead_qualified', 25),
+}
+
+
+def score_leads(leads: List[Lead]) -> List[int]:
+    """
+    Initial scores for a chunk of unsaved leads, computed column by column
+    with the same rules as Lead.calculate_initial_score.
+    """
+    columns = (
+        [10 if lead.email else 0 for lead in leads],
+        [10 if lead.phone else 0 for lead in leads],
+        [5 if lead.job_title else 0 for lead in leads],
+        [5 if lead.lead_description else 0 for lead in leads],
+        [10 if lead.industry else 0 for lead in leads],
+        [LEAD_SOURCE_SCORES.get(lead.lead_source, 0) for lead in leads],
+        [20 if lead.account_id else 0 for lead in leads],
+    )
+    return [min(sum(points), 100) for points in zip(*columns)]
+
+
+def ingest_leads(rows: Iterable[Union[Dict[str, Any], Lead]], tenant_id: Optional[int] = None,
+                 owner=None, batch_size: Optional[int] = None) -> List[Lead]:
+    """
+    Create leads in bulk and return them (with primary keys).
+
+    ``rows`` are dicts of Lead field values or unsaved Lead instances;
+    ``tenant_id`` and ``owner`` fill in rows that do not set them. Each chunk
+    of ``batch_size`` rows is written in its own transaction.
+    """
+    batch_size = batch_size or getattr(settings, 'LEAD_INGEST_BATCH_SIZE', 1000)
+    owner_id = getattr(owner, 'pk', owner)
+    created: List[Lead] = []
+
+    iterator = iter(rows)
+    while True:
+        chunk = list(islice(iterator, batch_size))
+        if not chunk:
+            break
+        leads = [row if isinstance(row, Lead) else Lead(**row) for row in chunk]
+        created.extend(_ingest_chunk(leads, tenant_id, owner_id))
+
+    logger.info(f"Ingested {len(created)} leads in bulk")
+    return created
+
+
+def _ingest_chunk(leads: List[Lead], tenant_id: Optional[int], owner_id: Optional[int]) -> List[Lead]:
+    now = timezone.now()
+    for lead, score in zip(leads, score_leads(leads)):
+        if lead.tenant_id is None:
+            lead.tenant_id = tenant_id
+        if lead.owner_id is None:
+            lead.owner_id = owner_id
+        if not lead.lead_acquisition_date:
+            lead.lead_acquisition_date = now
+        lead.lead_score = score
+        lead.status = Lead.status_for_score(score)
+
+    with transaction.atomic(), event_bus.batch():
+        Lead.objects.bulk_create(leads)
+        sources = _source_names(leads)
+        _create_initial_tasks(leads)
+        _log_engagement(leads)
+        _emit_automation_triggers(leads, sources)
+        mark_instances_dirty(leads)
+        transaction.on_commit(lambda: _notify_webhooks(leads, sources))
+    return leads
+
+
+def _source_names(leads: List[Lead]) -> Dict[int, Tuple[str, str]]:
+    """(source_name, label) of the leads' dynamic sources, keyed by pk."""
+    from .models import LeadSource
+
+    source_ids = {lead.source_ref_id for lead in leads if lead.source_ref_id}
+    if not source_ids:
+        return {}
+    return {
+        pk: (source_name, label)
+        for pk, source_name, label in LeadSource.objects.filter(
+            pk__in=source_ids
+        ).values_list('pk', 'source_name', 'label')
+    }
+
+
+def _create_initial_tasks(leads: List[Lead]) -> None:
+    from tasks.models import Task
+
+    account_type = ContentType.objects.get_for_model(Lead._meta.get_field('account').related_model)
+    lead_type = ContentType.objects.get_for_model(Lead)
+    tasks = []
+    for lead in leads:
+        task = lead.build_initial_task()
+        if task is None:
+            continue
+        # What Task.save() fills in for the generic relation
+        if task.account_id:
+            task.content_type, task.object_id = account_type, task.account_id
+        else:
+            task.content_type, task.object_id = lead_type, lead.pk
+        tasks.append(task)
+    Task.objects.bulk_create(tasks)
+    mark_instances_dirty(tasks)
+
+
+def _log_engagement(leads: List[Lead]) -> None:
+    from engagement.utils import log_engagement_events
+
+    entries = []
+    for lead in leads:
+        entries.append({
+            'tenant_id': lead.tenant_id,
+            'lead_id': lead.pk,
+            'account_id': lead.owner_id,
+            'event_type': 'lead_created',
+            'title': f"New Lead: {lead.full_name}",
+            'description': f"Lead created for {lead.company}",
+            'engagement_score': CREATED_ENGAGEMENT_SCORE,
+            'priority': 'medium',
+        })
+        if lead.status in STATUS_ENGAGEMENT:
+            event_type, score = STATUS_ENGAGEMENT[lead.status]
+            entries.append({
+                'tenant_id': lead.tenant_id,
+                'lead_id': lead.pk,
+                'account_id': lead.owner_id,
+                'event_type': event_type,
+                'title': f"Lead {lead.status.title()}: {lead.full_name}",
+                'description': f"Lead status changed from new to {lead.status}",
+                'engagement_score': score,
+                'priority': 'medium',
+            })
+    log_engagement_events(entries)
+
+
+def _emit_automation_triggers(leads: List[Lead], sources: Dict[int, Tuple[str, str]]) -> None:
+    from automation.utils import emit_event
+
+    for lead in leads:
+        if lead.status == 'qualified':
+            emit_event('leads.lead_qualified', {
+                'lead_id': lead.pk,
+                'lead_name': lead.full_name,
+                'lead_score': lead.lead_score,
+                'company': lead.company,
+                'owner_id': lead.owner_id,
+                'tenant_id': lead.tenant_id,
+            })
+        emit_event('leads.lead_created', {
+            'lead_id': lead.pk,
+            'lead_name': lead.full_name,
+            'lead_score': lead.lead_score,
+            'status': lead.status,
+            'company': lead.company,
+            'email': lead.email,
+            'owner_id': lead.owner_id,
+            'tenant_id': lead.tenant_id,
+        })
+        emit_event('lead.created', {
+            'lead_id': lead.pk,
+            'lead_score': lead.lead_score,
+            'status': lead.status,
+            'source': sources[lead.source_ref_id][0] if lead.source_ref_id in sources else lead.lead_source,
+            'tenant_id': lead.tenant_id,
+        })
+
+
+def _notify_webhooks(leads: List[Lead], sources: Dict[int, Tuple[str, str]]) -> None:
+    """Queue lead.created webhooks, skipping tenants with no subscribers (one query)."""
+    from developer.models import Webhook
+    from settings_app.tasks import trigger_webhook
+
+    tenant_ids = {lead.tenant_id for lead in leads}
+    subscribed = {
+        tenant_id
+        for tenant_id, events in Webhook.objects.filter(
+            tenant_id__in=tenant_ids, is_active=True
+        ).values_list('tenant_id', 'events')
+        if 'lead.created' in (events or [])
+    }
+    for lead in leads:
+        if lead.tenant_id in subscribed:
+            trigger_webhook.delay('lead.created', {
+                'id': lead.pk,
+                'first_name': lead.first_name,
+                'last_name': lead.last_name,
+                'email': lead.email,
+                'status': lead.status,
+                'source': sources[lead.source_ref_id][1] if lead.source_ref_id in sources else None,
+                'created_at': lead.lead_acquisition_date.isoformat() if lead.lead_acquisition_date else None,
+                'updated_at': lead.updated_at.isoformat() if lead.updated_at else None,
+            }, lead.tenant_id)
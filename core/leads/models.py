@@ -27,6 +27,43 @@ LEAD_STATUS_CHOICES = [
     ('converted', 'Converted'),
 ]
 
+# Initial score points per lead source (see Lead.calculate_initial_score)
+LEAD_SOURCE_SCORES = {
+    'referral': 15,
+    'partner': 15,
+    'event': 15,
+    'web_form': 5,
+    'manual': 2,
+}
+
+# Follow-up task created for a new lead, by the status its initial score gives it
+INITIAL_LEAD_TASKS = {
+    'new': {
+        # Low priority nurturing task
+        'title': "Review lead: {name}",
+        'description': "This lead needs initial review and potential outreach",
+        'priority': 'low',
+        'due_in': timedelta(days=3),
+        'task_type': 'lead_review',
+    },
+    'contacted': {
+        # Medium priority contact task
+        'title': "Contact lead: {name}",
+        'description': "Follow up with this lead based on their engagement score",
+        'priority': 'medium',
+        'due_in': timedelta(days=1),
+        'task_type': 'lead_contact',
+    },
+    'qualified': {
+        # High priority qualification task
+        'title': "Qualify lead: {name}",
+        'description': "This lead has high engagement score and needs immediate qualification",
+        'priority': 'high',
+        'due_in': timedelta(hours=4),
+        'task_type': 'lead_qualify',
+    },
+}
+
 MARKETING_CHANNEL_CHOICES = [
     ('email', 'Email Marketing'),
     ('social', 'Social Media'),
@@ -307,16 +344,10 @@ class Lead(TenantModel, TimeStampedModel):
             score += 10
             
         # Lead source scoring
-        high_value_sources = ['referral', 'partner', 'event']
-        if self.lead_source in high_value_sources:
-            score += 15
-        elif self.lead_source == 'web_form':
-            score += 5
-        elif self.lead_source == 'manual':
-            score += 2
+        score += LEAD_SOURCE_SCORES.get(self.lead_source, 0)
             
         # Account association bonus
-        if self.account:  # Existing customer lead
+        if self.account_id:  # Existing customer lead
             score += 20
             
         # Cap score at 100
@@ -324,14 +355,7 @@ class Lead(TenantModel, TimeStampedModel):
     
     def update_status_from_score(self):
         """Update lead status based on current score."""
-        current_score = self.lead_score
-        
-        if current_score >= 70:
-            new_status = 'qualified'
-        elif current_score >= 40:
-            new_status = 'contacted'
-        else:
-            new_status = 'new'
+        new_status = self.status_for_score(self.lead_score)
             
         if self.status != new_status:
             old_status = self.status
@@ -353,6 +377,15 @@ class Lead(TenantModel, TimeStampedModel):
             return True, old_status, new_status
         return False, None, None
     
+    @staticmethod
+    def status_for_score(score):
+        """Status a lead with this score should have."""
+        if score >= 70:
+            return 'qualified'
+        if score >= 40:
+            return 'contacted'
+        return 'new'
+    
     def save(self, *args, **kwargs):
         """Override save to calculate initial score and set status."""
         is_new = self.pk is None
@@ -389,52 +422,30 @@ class Lead(TenantModel, TimeStampedModel):
     
     def create_initial_tasks(self):
         """Create initial follow-up tasks based on lead score and status."""
+        task = self.build_initial_task()
+        if task is not None:
+            task.save()
+    
+    def build_initial_task(self):
+        """Return the unsaved initial follow-up task for this lead's status, if any."""
         from tasks.models import Task  # Import here to avoid circular imports
         
-        if self.status == 'new':
-            # Low priority nurturing task
-            Task.objects.create(
-                title=f"Review lead: {self.full_name}",
-                task_description="This lead needs initial review and potential outreach",
-                assigned_to=self.owner,
-                account=self.account,
-                priority='low',
-                status='todo',
-                due_date=timezone.now() + timedelta(days=3),
-                task_type='lead_review',
-                tenant_id=self.tenant_id,
-                lead=self
-            )
-            
-        elif self.status == 'contacted':
-            # Medium priority contact task
-            Task.objects.create(
-                title=f"Contact lead: {self.full_name}",
-                task_description="Follow up with this lead based on their engagement score",
-                assigned_to=self.owner,
-                account=self.account,
-                priority='medium',
-                status='todo',
-                due_date=timezone.now() + timedelta(days=1),
-                task_type='lead_contact',
-                tenant_id=self.tenant_id,
-                lead=self
-            )
-            
-        elif self.status == 'qualified':
-            # High priority qualification task
-            Task.objects.create(
-                title=f"Qualify lead: {self.full_name}",
-                task_description="This lead has high engagement score and needs immediate qualification",
-                assigned_to=self.owner,
-                account=self.account,
-                priority='high',
-                status='todo',
-                due_date=timezone.now() + timedelta(hours=4),
-                task_type='lead_qualify',
-                tenant_id=self.tenant_id,
-                lead=self
-            )
+        spec = INITIAL_LEAD_TASKS.get(self.status)
+        if spec is None:
+            return None
+        
+        return Task(
+            title=spec['title'].format(name=self.full_name),
+            task_description=spec['description'],
+            assigned_to_id=self.owner_id,
+            account_id=self.account_id,
+            priority=spec['priority'],
+            status='todo',
+            due_date=timezone.now() + spec['due_in'],
+            task_type=spec['task_type'],
+            tenant_id=self.tenant_id,
+            lead=self
+        )
 
     def calculate_cac(self):
         """Calculate Customer Acquisition Cost for this lead."""
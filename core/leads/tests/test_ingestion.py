@@ -0,0 +1,107 @@
+from unittest import mock
+
+from django.contrib.contenttypes.models import ContentType
+from django.test import TestCase, override_settings
+from accounts.models import Account
+from core.models import User
+from engagement.models import EngagementEvent
+from leads.ingestion import ingest_leads, score_leads
+from leads.models import Lead, WebToLeadForm
+from leads.utils import process_web_to_lead_submission, process_web_to_lead_submissions
+from tasks.models import Task
+from tenants.models import Tenant
+
+
+def make_row(n, **fields):
+    row = {
+        'first_name': f'Lead{n}',
+        'last_name': 'Bulk',
+        'email': f'lead{n}@example.com',
+        'company': f'Company {n}',
+        'industry': 'tech',
+        'lead_source': 'web_form',
+    }
+    row.update(fields)
+    return row
+
+
+@override_settings(EVENT_BUS_ASYNC=False, AUTOMATION_ASYNC=False)
+class LeadIngestionTests(TestCase):
+    def setUp(self):
+        self.tenant = Tenant.objects.create(name='Ingest Tenant', slug='ingest-tenant')
+        self.owner = User.objects.create_user(
+            email='owner@example.com', username='owner', password='pass', tenant=self.tenant
+        )
+
+    def test_vectorised_scores_match_model_scoring(self):
+        leads = [
+            Lead(**make_row(0)),
+            Lead(**make_row(1, phone='555', job_title='CTO', lead_source='referral')),
+            Lead(**make_row(2, email='', industry='', lead_description='Met at a fair', lead_source='event')),
+        ]
+        self.assertEqual(score_leads(leads), [lead.calculate_initial_score() for lead in leads])
+
+    def test_leads_and_tasks_are_bulk_created(self):
+        rows = [make_row(n) for n in range(20)]
+        rows.append(make_row(20, phone='555', job_title='CTO', lead_source='referral',
+                             lead_description='Warm intro'))
+
+        ContentType.objects.get_for_models(Lead, Account)
+        with mock.patch('automation.utils.execute_automations_batch'):
+            # Savepoint, leads, tasks, engagement events, release
+            with self.assertNumQueries(5):
+                leads = ingest_leads(rows, tenant_id=self.tenant.id, owner=self.owner, batch_size=50)
+
+        self.assertEqual(Lead.objects.filter(tenant=self.tenant).count(), 21)
+        self.assertEqual({lead.status for lead in leads[:20]}, {'new'})
+        self.assertEqual(leads[20].status, 'contacted')
+        self.assertEqual(Task.objects.filter(lead__in=leads, assigned_to=self.owner).count(), 21)
+        self.assertEqual(
+            Task.objects.get(lead=leads[20]).priority, 'medium'
+        )
+
+    def test_engagement_events_are_recorded(self):
+        rows = [make_row(0), make_row(1, phone='555', job_title='CTO', lead_source='referral',
+                                      lead_description='Warm intro')]
+        with mock.patch('automation.utils.execute_automations_batch'):
+            with self.captureOnCommitCallbacks(execute=True):
+                leads = ingest_leads(rows, tenant_id=self.tenant.id, owner=self.owner)
+
+        events = EngagementEvent.objects.filter(lead__in=leads)
+        self.assertEqual(events.filter(event_type='lead_created').count(), 2)
+        self.assertEqual(events.filter(event_type='lead_contacted', lead=leads[1]).count(), 1)
+
+    def test_automation_triggers_are_published_once_per_chunk(self):
+        rows = [make_row(n) for n in range(5)]
+        with mock.patch('automation.utils.execute_automations_batch') as execute:
+            with self.captureOnCommitCallbacks(execute=True):
+                ingest_leads(rows, tenant_id=self.tenant.id, batch_size=5)
+                execute.assert_not_called()
+
+        triggers = [trigger for call in execute.call_args_list for trigger, _ in call.args[0]]
+        self.assertEqual(triggers.count('leads.lead_created'), 5)
+        self.assertEqual(triggers.count('lead.created'), 5)
+
+    def test_web_to_lead_submission_uses_bulk_path(self):
+        form = WebToLeadForm.objects.create(
+            tenant=self.tenant, form_name='Contact us', assign_to=self.owner
+        )
+        with mock.patch('automation.utils.execute_automations_batch'):
+            lead = process_web_to_lead_submission(form, make_row(7, phone='555'))
+
+        self.assertEqual(lead.lead_source, 'web')
+        self.assertEqual(lead.owner, self.owner)
+        self.assertEqual(Lead.objects.get(pk=lead.pk).lead_score, lead.lead_score)
+        form.refresh_from_db()
+        self.assertEqual(form.form_submissions, 1)
+
+    def test_web_to_lead_submissions_dilute_conversion_rate(self):
+        form = WebToLeadForm.objects.create(
+            tenant=self.tenant, form_name='Demo request', form_submissions=3, conversion_rate=40.0
+        )
+        with mock.patch('automation.utils.execute_automations_batch'):
+            process_web_to_lead_submissions(form, [make_row(n) for n in range(8, 10)])
+
+        form.refresh_from_db()
+        self.assertEqual(form.form_submissions, 5)
+        self.assertAlmostEqual(form.conversion_rate, 24.0)
@@ -2,7 +2,8 @@ from django.utils import timezone
 from datetime import timedelta
 from .models import Lead, LeadSourceAnalytics
 from core.models import User as  Account
-from django.db.models import Avg
+from django.db.models import Avg, F, FloatField
+from django.db.models.functions import Cast
 
 def calculate_lead_score(lead: Lead) -> int:
     """
@@ -23,7 +24,7 @@ def calculate_lead_score(lead: Lead) -> int:
         'ads': 10,
         'manual': 5
     }
-    score += source_scores.get(lead.source, 5)
+    score += source_scores.get(lead.lead_source, 5)
 
     # Job title seniority (simple keyword match)
     senior_titles = {'ceo', 'cto', 'director', 'manager', 'head', 'vp', 'president'}
@@ -75,47 +76,55 @@ def process_web_to_lead_submission(form_config, cleaned_data, ip_address=None):
     """
     Process a web-to-lead form submission.
     """
-    # Create lead
-    lead_data = {
-        'first_name': cleaned_data.get('first_name', ''),
-        'last_name': cleaned_data.get('last_name', ''),
-        'email': cleaned_data.get('email', ''),
-        'phone': cleaned_data.get('phone', ''),
-        'company': cleaned_data.get('company', ''),
-        'industry': cleaned_data.get('industry', 'other'),
-        'job_title': cleaned_data.get('job_title', ''),
-        'source': 'web',
-        'tenant_id': form_config.tenant_id
-    }
+    return process_web_to_lead_submissions(form_config, [cleaned_data])[0]
+
+
+def process_web_to_lead_submissions(form_config, submissions):
+    """
+    Process queued submissions of one web-to-lead form through bulk ingestion.
+    """
+    from .ingestion import ingest_leads
     
-    lead = Lead.objects.create(**lead_data)
-    lead.lead_score = calculate_lead_score(lead)
-    lead.save(update_fields=['lead_score'])
+    rows = [
+        {
+            'first_name': cleaned_data.get('first_name', ''),
+            'last_name': cleaned_data.get('last_name', ''),
+            'email': cleaned_data.get('email', ''),
+            'phone': cleaned_data.get('phone', ''),
+            'company': cleaned_data.get('company', ''),
+            'industry': cleaned_data.get('industry', 'other'),
+            'job_title': cleaned_data.get('job_title', ''),
+            'lead_source': 'web',
+        }
+        for cleaned_data in submissions
+    ]
+    if not rows:
+        return []
     
     # Assign owner
-    if form_config.assign_to:
-        lead.owner = form_config.assign_to
-        lead.save(update_fields=['owner'])
-    elif form_config.assign_to_role:
+    owner = form_config.assign_to
+    if owner is None and form_config.assign_to_role:
         # Find user with role (simplified)
         from core.models import User
-        potential_owner = User.objects.filter(
+        owner = User.objects.filter(
             role__name=form_config.assign_to_role,
             tenant_id=form_config.tenant_id
         ).first()
-        if potential_owner:
-            lead.owner = potential_owner
-            lead.save(update_fields=['owner'])
     
-    # Update form stats
-    form_config.form_submissions += 1
-    if lead.status == 'converted':
-        form_config.conversion_rate = (form_config.conversion_rate * (form_config.form_submissions - 1) + 100) / form_config.form_submissions
-    else:
-        form_config.conversion_rate = (form_config.conversion_rate * (form_config.form_submissions - 1)) / form_config.form_submissions
-    form_config.save(update_fields=['form_submissions', 'conversion_rate'])
+    leads = ingest_leads(rows, tenant_id=form_config.tenant_id, owner=owner)
+    for lead in leads:
+        lead.lead_score = calculate_lead_score(lead)
+    Lead.objects.bulk_update(leads, ['lead_score'])
+    
+    # Update form stats; new leads are not converted, so the rate is diluted
+    # over the new submission count (both sides read the pre-update row)
+    type(form_config).objects.filter(pk=form_config.pk).update(
+        form_submissions=F('form_submissions') + len(leads),
+        conversion_rate=F('conversion_rate') * Cast('form_submissions', FloatField())
+        / (F('form_submissions') + len(leads)),
+    )
     
-    return lead
+    return leads
 
 def find_duplicate_accounts(lead_data, tenant_id):
     """Find existing accounts that match lead data."""
@@ -2,7 +2,7 @@ from django.contrib import admin
 from .models import (
     POSTerminal, POSSession, POSTransaction, POSTransactionLine,
     POSPayment, POSReceipt, POSCashDrawer, POSCashMovement,
-    POSRefund, POSRefundLine
+    POSRefund, POSRefundLine, POSPostSaleTask
 )
 
 
@@ -125,3 +125,15 @@ class POSRefundAdmin(admin.ModelAdmin):
     ordering = ['-created_at']
     inlines = [POSRefundLineInline]
     readonly_fields = ['refund_number']
+
+
+@admin.register(POSPostSaleTask)
+class POSPostSaleTaskAdmin(admin.ModelAdmin):
+    list_display = [
+        'transaction', 'step', 'status', 'attempts',
+        'next_attempt_at', 'completed_at'
+    ]
+    list_filter = ['step', 'status', 'tenant']
+    search_fields = ['transaction__transaction_number', 'last_error']
+    ordering = ['-created_at']
+    readonly_fields = ['transaction', 'step', 'attempts', 'last_error', 'created_at', 'completed_at']
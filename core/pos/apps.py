@@ -5,3 +5,6 @@ class PosConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'pos'
     verbose_name = 'Point of Sale'
+
+    def ready(self):
+        import pos.signals
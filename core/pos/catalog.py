@@ -0,0 +1,320 @@
+"""
+POS Catalog Index
+
+Barcode scans and product searches at the till are served from an
+in-memory, per-tenant index instead of LIKE scans on the Product table:
+- Exact maps from UPC and from SKU to the product (UPC wins, as before)
+- 2- and 3-gram posting sets over the lower-cased name, SKU and UPC; a
+  search intersects the postings of the query's grams and only checks
+  the candidates, so lookups do not grow with the catalog
+- Each worker process builds a tenant's index once. Product saves and
+  deletes bump a version in the shared (Redis) cache and record the
+  changed product under that version; a stale index re-reads only those
+  products. Gaps in the change log, more than POS_CATALOG_MAX_DELTA
+  changes or an index older than POS_CATALOG_MAX_AGE seconds trigger a
+  full rebuild
+- When the database cannot be reached the last good index keeps serving
+- export_snapshot / export_changes give terminals the index contents (and
+  deltas since a version) to load at session open and work offline
+
+Usage:
+    from pos.catalog import get_catalog, export_snapshot
+
+    product = get_catalog(tenant_id).lookup(barcode)
+    snapshot = export_snapshot(tenant_id)
+"""
+import heapq
+import logging
+import threading
+import time
+from decimal import Decimal
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Set
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DatabaseError
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+VERSION_KEY = 'pos_catalog:version:{tenant_id}'
+CHANGE_KEY = 'pos_catalog:change:{tenant_id}:{version}'
+GRAM_SIZES = (2, 3)
+
+
+class CatalogProduct(NamedTuple):
+    id: int
+    name: str
+    sku: str
+    upc: str
+    price: Decimal
+    category_id: Optional[int]
+    image: Optional[str]
+
+
+SNAPSHOT_FIELDS = list(CatalogProduct._fields)
+
+
+def _max_age() -> int:
+    return getattr(settings, 'POS_CATALOG_MAX_AGE', 300)
+
+
+def _max_delta() -> int:
+    return getattr(settings, 'POS_CATALOG_MAX_DELTA', 500)
+
+
+def _change_ttl() -> int:
+    return getattr(settings, 'POS_CATALOG_CHANGE_TTL', 24 * 60 * 60)
+
+
+def _grams(text: str) -> Set[str]:
+    return {text[i:i + size] for size in GRAM_SIZES for i in range(len(text) - size + 1)}
+
+
+class POSCatalog:
+    """One tenant's product index. Safe to share between threads."""
+
+    def __init__(self, tenant_id, version: int = 0):
+        self.tenant_id = tenant_id
+        self.version = version
+        self.built_at = time.monotonic()
+        self.products: Dict[int, CatalogProduct] = {}
+        self.by_upc: Dict[str, int] = {}
+        self.by_sku: Dict[str, int] = {}
+        self.by_category: Dict[Optional[int], Set[int]] = {}
+        self.grams: Dict[str, Set[int]] = {}
+        self._haystacks: Dict[int, tuple] = {}
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self.products)
+
+    def upsert(self, product: CatalogProduct) -> None:
+        with self._lock:
+            self.remove(product.id)
+            self.products[product.id] = product
+            if product.upc:
+                self.by_upc.setdefault(product.upc, product.id)
+            self.by_sku[product.sku] = product.id
+            self.by_category.setdefault(product.category_id, set()).add(product.id)
+            haystack = tuple(field.lower() for field in (product.name, product.sku, product.upc) if field)
+            self._haystacks[product.id] = haystack
+            for gram in set().union(*(_grams(field) for field in haystack)):
+                self.grams.setdefault(gram, set()).add(product.id)
+
+    def remove(self, product_id: int) -> None:
+        with self._lock:
+            product = self.products.pop(product_id, None)
+            if product is None:
+                return
+            if self.by_upc.get(product.upc) == product_id:
+                del self.by_upc[product.upc]
+            if self.by_sku.get(product.sku) == product_id:
+                del self.by_sku[product.sku]
+            self.by_category.get(product.category_id, set()).discard(product_id)
+            for gram in set().union(*(_grams(field) for field in self._haystacks.pop(product_id))):
+                postings = self.grams.get(gram)
+                if postings is not None:
+                    postings.discard(product_id)
+                    if not postings:
+                        del self.grams[gram]
+
+    def lookup(self, code: str) -> Optional[CatalogProduct]:
+        """The product with this UPC, or failing that this SKU."""
+        with self._lock:
+            product_id = self.by_upc.get(code)
+            if product_id is None:
+                product_id = self.by_sku.get(code)
+            return self.products.get(product_id) if product_id is not None else None
+
+    def search(self, query: str, category_id=None, limit: int = 20) -> List[CatalogProduct]:
+        """
+        Products whose name, SKU or UPC contains ``query`` (case-insensitive),
+        optionally in one category. Name prefix matches come first, then by name.
+        """
+        needle = (query or '').strip().lower()
+        with self._lock:
+            if category_id:
+                candidates: Iterable[int] = self.by_category.get(int(category_id), set())
+            else:
+                candidates = self.products.keys()
+
+            if len(needle) >= GRAM_SIZES[0]:
+                size = max(s for s in GRAM_SIZES if s <= len(needle))
+                postings = sorted(
+                    (self.grams.get(needle[i:i + size], set()) for i in range(len(needle) - size + 1)),
+                    key=len,
+                )
+                ids = postings[0].intersection(*postings[1:])
+                if category_id:
+                    ids &= set(candidates)
+                candidates = ids
+
+            matches = [
+                self.products[product_id] for product_id in candidates
+                if not needle or any(needle in field for field in self._haystacks[product_id])
+            ]
+        return heapq.nsmallest(
+            limit, matches,
+            key=lambda product: (not product.name.lower().startswith(needle), product.name.lower(), product.id),
+        )
+
+    def to_snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            rows = [_row(product) for product in self.products.values()]
+        return {
+            'tenant_id': self.tenant_id,
+            'version': self.version,
+            'generated_at': timezone.now().isoformat(),
+            'fields': SNAPSHOT_FIELDS,
+            'products': rows,
+        }
+
+    @classmethod
+    def from_snapshot(cls, snapshot: Dict[str, Any]) -> 'POSCatalog':
+        """Rebuild an index from export_snapshot output (e.g. on a terminal)."""
+        catalog = cls(snapshot['tenant_id'], snapshot['version'])
+        apply_changes(catalog, snapshot)
+        return catalog
+
+
+def _row(product: CatalogProduct) -> list:
+    return [str(value) if isinstance(value, Decimal) else value for value in product]
+
+
+def apply_changes(catalog: POSCatalog, changes: Dict[str, Any]) -> None:
+    """Apply export_snapshot or export_changes output to an index."""
+    fields = changes.get('fields', SNAPSHOT_FIELDS)
+    for row in changes.get('products', []):
+        values = dict(zip(fields, row))
+        values['price'] = Decimal(values['price'])
+        catalog.upsert(CatalogProduct(**values))
+    for product_id in changes.get('removed', []):
+        catalog.remove(product_id)
+    catalog.version = max(catalog.version, changes['version'])
+
+
+def _load(tenant_id, product_ids=None) -> Dict[int, CatalogProduct]:
+    from products.models import Product
+
+    storage = Product._meta.get_field('thumbnail').storage
+    products = Product.objects.filter(tenant_id=tenant_id, product_is_active=True)
+    if product_ids is not None:
+        products = products.filter(pk__in=product_ids)
+    rows = products.order_by().values_list('id', 'product_name', 'sku', 'upc', 'base_price', 'category_id', 'thumbnail')
+    return {
+        row[0]: CatalogProduct(*row[:6], image=storage.url(row[6]) if row[6] else None)
+        for row in rows.iterator(chunk_size=5000)
+    }
+
+
+# Per-process indexes, keyed by tenant id
+_catalogs: Dict[Any, POSCatalog] = {}
+_registry_lock = threading.Lock()
+
+
+def shared_version(tenant_id) -> int:
+    return cache.get(VERSION_KEY.format(tenant_id=tenant_id)) or 0
+
+
+def record_change(tenant_id, product_id) -> None:
+    """Publish that a tenant's product changed. Call after the change commits."""
+    key = VERSION_KEY.format(tenant_id=tenant_id)
+    try:
+        cache.add(key, 0, timeout=None)
+        version = cache.incr(key)
+        cache.set(CHANGE_KEY.format(tenant_id=tenant_id, version=version), product_id, timeout=_change_ttl())
+    except Exception as e:
+        logger.error(f"Could not record POS catalog change for tenant {tenant_id}: {e}")
+
+
+def _changed_ids(tenant_id, since: int, until: int) -> Optional[Set[int]]:
+    """Products changed after version ``since``; None when the log cannot tell."""
+    if until - since > _max_delta():
+        return None
+    keys = [CHANGE_KEY.format(tenant_id=tenant_id, version=version) for version in range(since + 1, until + 1)]
+    found = cache.get_many(keys)
+    if len(found) != len(keys):
+        return None
+    return set(found.values())
+
+
+def _build(tenant_id) -> POSCatalog:
+    catalog = POSCatalog(tenant_id, shared_version(tenant_id))
+    for product in _load(tenant_id).values():
+        catalog.upsert(product)
+    return catalog
+
+
+def _sync(catalog: POSCatalog, version: int) -> Optional[POSCatalog]:
+    """Bring ``catalog`` up to ``version`` in place. Returns None if it needs a rebuild."""
+    product_ids = _changed_ids(catalog.tenant_id, catalog.version, version)
+    if product_ids is None:
+        return None
+    current = _load(catalog.tenant_id, product_ids)
+    for product_id in product_ids:
+        if product_id in current:
+            catalog.upsert(current[product_id])
+        else:
+            catalog.remove(product_id)
+    catalog.version = version
+    return catalog
+
+
+def get_catalog(tenant_id) -> POSCatalog:
+    """This process's index for the tenant, built or brought up to date as needed."""
+    catalog = _catalogs.get(tenant_id)
+    version = shared_version(tenant_id)
+    if catalog is not None and catalog.version >= version and time.monotonic() - catalog.built_at < _max_age():
+        return catalog
+
+    with _registry_lock:
+        catalog = _catalogs.get(tenant_id)
+        try:
+            fresh = None
+            if catalog is not None and time.monotonic() - catalog.built_at < _max_age():
+                fresh = catalog if catalog.version >= version else _sync(catalog, version)
+            if fresh is None:
+                fresh = _build(tenant_id)
+        except DatabaseError as e:
+            if catalog is None:
+                raise
+            logger.warning(f"Serving POS catalog version {catalog.version} for tenant {tenant_id}: {e}")
+            return catalog
+        _catalogs[tenant_id] = fresh
+        return fresh
+
+
+def clear_local(tenant_id=None) -> None:
+    """Drop this process's indexes (all tenants by default)."""
+    with _registry_lock:
+        if tenant_id is None:
+            _catalogs.clear()
+        else:
+            _catalogs.pop(tenant_id, None)
+
+
+def export_snapshot(tenant_id) -> Dict[str, Any]:
+    """The tenant's whole catalog as JSON-serialisable rows, with its version."""
+    return get_catalog(tenant_id).to_snapshot()
+
+
+def export_changes(tenant_id, since_version: int) -> Optional[Dict[str, Any]]:
+    """
+    Products changed or removed since ``since_version``, for terminals that
+    already hold a snapshot. None when the terminal must load a new snapshot.
+    """
+    catalog = get_catalog(tenant_id)
+    if since_version > catalog.version:
+        return None
+    product_ids = _changed_ids(tenant_id, since_version, catalog.version)
+    if product_ids is None:
+        return None
+    products = [catalog.products.get(product_id) for product_id in sorted(product_ids)]
+    return {
+        'tenant_id': tenant_id,
+        'version': catalog.version,
+        'fields': SNAPSHOT_FIELDS,
+        'products': [_row(product) for product in products if product is not None],
+        'removed': [product_id for product_id, product in zip(sorted(product_ids), products) if product is None],
+    }
@@ -690,3 +690,58 @@ class POSRefundLine(TenantModel):
 
     def __str__(self):
         return f"{self.quantity} x {self.original_line.product_name}"
+
+
+POST_SALE_STEP_CHOICES = [
+    ('stock', 'Stock Deduction'),
+    ('loyalty', 'Loyalty Points'),
+    ('ledger', 'General Ledger Posting'),
+]
+
+POST_SALE_STATUS_CHOICES = [
+    ('pending', 'Pending'),
+    ('done', 'Done'),
+    ('failed', 'Failed'),
+    ('cancelled', 'Cancelled'),
+]
+
+
+class POSPostSaleTask(TenantModel):
+    """
+    Outbox entry for work that follows a completed sale (stock, loyalty,
+    GL). Written in the same transaction as the sale and applied
+    by pos.post_sale workers.
+    """
+    transaction = models.ForeignKey(
+        POSTransaction,
+        on_delete=models.CASCADE,
+        related_name='post_sale_tasks'
+    )
+    step = models.CharField(max_length=20, choices=POST_SALE_STEP_CHOICES)
+    status = models.CharField(max_length=20, choices=POST_SALE_STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    performed_by = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='pos_post_sale_tasks'
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['created_at']
+        verbose_name = 'POS Post-Sale Task'
+        verbose_name_plural = 'POS Post-Sale Tasks'
+        constraints = [
+            models.UniqueConstraint(fields=['transaction', 'step'], name='unique_pos_post_sale_step'),
+        ]
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='pos_post_sale_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_step_display()} for {self.transaction.transaction_number} ({self.status})"
@@ -0,0 +1,219 @@
+"""
+POS Post-Sale Pipeline
+
+Completing a sale at the till only records the payment, the completed
+transaction and one POSPostSaleTask outbox row per follow-up step, all in
+the till's transaction:
+- stock: removes the tracked lines from the terminal's warehouse in one
+  remove_stock_lines call
+- loyalty: awards points on the part of the total not paid with points
+- ledger: posts the sale to the general ledger
+
+After commit a worker is scheduled. Workers claim due tasks in batches
+with SELECT ... FOR UPDATE SKIP LOCKED, so several can drain the outbox
+side by side, and apply each task in a savepoint that commits together
+with marking it done: a step is applied once however often it is retried.
+Failed steps are retried with exponential backoff and left as 'failed'
+after POS_POST_SALE_MAX_ATTEMPTS. A beat task sweeps the outbox every
+minute for retries and for sales whose worker was never scheduled.
+
+Usage:
+    from pos.post_sale import enqueue_post_sale, drain_outbox
+
+    enqueue_post_sale(pos_transaction, user)
+    drain_outbox()
+"""
+import logging
+from datetime import timedelta
+from typing import List, Optional, Set
+
+from django.conf import settings
+from django.core.exceptions import ObjectDoesNotExist
+from django.db import transaction
+from django.db.models import Sum
+from django.utils import timezone
+
+from .models import POSPostSaleTask
+
+logger = logging.getLogger(__name__)
+
+
+def _batch_size() -> int:
+    return getattr(settings, 'POS_POST_SALE_BATCH_SIZE', 100)
+
+
+def _max_attempts() -> int:
+    return getattr(settings, 'POS_POST_SALE_MAX_ATTEMPTS', 8)
+
+
+def _retry_delay() -> int:
+    return getattr(settings, 'POS_POST_SALE_RETRY_DELAY', 30)
+
+
+def enqueue_post_sale(pos_transaction, user) -> None:
+    """
+    Queue the follow-up steps of a completed sale. Must run in the sale's
+    transaction; queuing the same sale twice is a no-op.
+    """
+    steps = ['ledger']
+    if pos_transaction.terminal and pos_transaction.terminal.warehouse_id:
+        steps.append('stock')
+    if pos_transaction.customer_id:
+        steps.append('loyalty')
+
+    POSPostSaleTask.objects.bulk_create([
+        POSPostSaleTask(transaction=pos_transaction, step=step, performed_by=user, tenant=pos_transaction.tenant)
+        for step in steps
+    ], ignore_conflicts=True)
+    transaction.on_commit(_schedule)
+
+
+def _schedule() -> None:
+    try:
+        from .tasks import process_post_sale_tasks
+        process_post_sale_tasks.delay()
+    except Exception as e:
+        # The beat sweep picks the tasks up
+        logger.error(f"Could not schedule POS post-sale processing: {e}")
+
+
+def cancel_unapplied(pos_transaction) -> Set[str]:
+    """Cancel the sale's steps that have not been applied. Returns their names."""
+    with transaction.atomic():
+        # Waits for a worker applying one of them, which then no longer matches
+        steps = set(POSPostSaleTask.objects.select_for_update().filter(
+            transaction=pos_transaction, status__in=['pending', 'failed']
+        ).values_list('step', flat=True))
+        if steps:
+            POSPostSaleTask.objects.filter(
+                transaction=pos_transaction, step__in=steps
+            ).update(status='cancelled', completed_at=timezone.now())
+    return steps
+
+
+def _apply_stock(task: POSPostSaleTask) -> None:
+    from inventory.services import InventoryService
+
+    sale = task.transaction
+    terminal = sale.terminal
+    if not terminal or not terminal.warehouse_id:
+        return
+    lines = [
+        (line.product, line.quantity)
+        for line in sale.lines.select_related('product')
+        if getattr(line.product, 'track_inventory', False)
+    ]
+    # Short lines are skipped on terminals that allow negative stock, otherwise retried
+    InventoryService.remove_stock_lines(
+        warehouse=terminal.warehouse,
+        lines=lines,
+        user=task.performed_by,
+        reference_type='pos_transaction',
+        reference_id=sale.id,
+        movement_type='sale',
+        tenant=sale.tenant,
+        skip_insufficient=terminal.allow_negative_stock
+    )
+
+
+def _apply_loyalty(task: POSPostSaleTask) -> None:
+    from loyalty.services import LoyaltyService
+
+    sale = task.transaction
+    try:
+        loyalty_profile = sale.customer.loyalty_account
+    except ObjectDoesNotExist:
+        return
+    if not loyalty_profile.program or not loyalty_profile.program.is_active:
+        return
+
+    # Earn on the cash/card portion only
+    loyalty_payments = sale.payments.filter(
+        payment_method='loyalty', status='completed'
+    ).aggregate(total=Sum('amount'))['total'] or 0
+    eligible_amount = sale.total_amount - loyalty_payments
+    if eligible_amount <= 0:
+        return
+    points_to_earn = int(eligible_amount * loyalty_profile.program.points_per_currency)
+    if points_to_earn > 0:
+        LoyaltyService.award_points(
+            customer=sale.customer,
+            points=points_to_earn,
+            description=f"Earned from POS Transaction {sale.transaction_number}",
+            sale_amount=eligible_amount,
+            reference=f"POS-{sale.transaction_number}",
+            member=task.performed_by
+        )
+
+
+def _apply_ledger(task: POSPostSaleTask) -> None:
+    from billing.services import AccountingIntegrationService
+
+    AccountingIntegrationService.post_pos_sale_to_gl(task.transaction)
+
+
+STEP_HANDLERS = {
+    'stock': _apply_stock,
+    'loyalty': _apply_loyalty,
+    'ledger': _apply_ledger,
+}
+
+
+def process_due_tasks(batch_size: Optional[int] = None) -> int:
+    """Claim and apply one batch of due tasks. Returns the number claimed."""
+    now = timezone.now()
+    with transaction.atomic():
+        tasks: List[POSPostSaleTask] = list(
+            POSPostSaleTask.objects.select_for_update(skip_locked=True, of=('self',))
+            .filter(status='pending', next_attempt_at__lte=now)
+            .select_related('transaction', 'transaction__terminal', 'transaction__tenant',
+                            'transaction__customer', 'performed_by')
+            .order_by('next_attempt_at', 'pk')[:batch_size or _batch_size()]
+        )
+        for task in tasks:
+            task.attempts += 1
+            try:
+                with transaction.atomic():
+                    STEP_HANDLERS[task.step](task)
+            except Exception as e:
+                task.last_error = str(e)
+                if task.attempts >= _max_attempts():
+                    task.status = 'failed'
+                    logger.error(
+                        f"POS post-sale {task.step} for transaction {task.transaction_id} "
+                        f"failed after {task.attempts} attempts: {e}"
+                    )
+                else:
+                    task.next_attempt_at = now + timedelta(seconds=_retry_delay() * 2 ** (task.attempts - 1))
+                    logger.warning(f"POS post-sale {task.step} for transaction {task.transaction_id} will be retried: {e}")
+            else:
+                task.status = 'done'
+                task.completed_at = timezone.now()
+                task.last_error = ''
+        POSPostSaleTask.objects.bulk_update(
+            tasks, ['status', 'attempts', 'next_attempt_at', 'last_error', 'completed_at']
+        )
+    return len(tasks)
+
+
+def drain_outbox(max_batches: int = 50) -> int:
+    """Process batches until no task is due (or max_batches). Returns the number claimed."""
+    processed = 0
+    size = _batch_size()
+    for _ in range(max_batches):
+        claimed = process_due_tasks(size)
+        processed += claimed
+        if claimed < size:
+            break
+    return processed
+
+
+def retry_failed(pos_transaction=None) -> int:
+    """Put failed tasks back in the queue. Returns the number requeued."""
+    tasks = POSPostSaleTask.objects.filter(status='failed')
+    if pos_transaction is not None:
+        tasks = tasks.filter(transaction=pos_transaction)
+    count = tasks.update(status='pending', attempts=0, next_attempt_at=timezone.now())
+    if count:
+        transaction.on_commit(_schedule)
+    return count
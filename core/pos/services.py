@@ -2,6 +2,7 @@
 POS Service - Business logic for Point of Sale operations.
 """
 from django.db import transaction
+from django.db.models import Sum
 from django.utils import timezone
 from decimal import Decimal
 from .models import (
@@ -14,6 +15,8 @@ from billing.services import TaxService
 from products.services import PricingService, PromotionService
 from loyalty.services import LoyaltyService
 from core.event_bus import event_bus
+from .catalog import get_catalog
+from .post_sale import cancel_unapplied, enqueue_post_sale
 
 
 class POSService:
@@ -321,11 +324,22 @@ class POSService:
         """
         Process a payment for a transaction. Support for multiple payment methods
         is handled by calling this multiple times or through bulk logic.
+        The coupon use is counted with the first tender, so a coupon at its
+        usage limit fails before any split tender is taken; later tenders
+        for the same sale count nothing more. Once fully paid the sale
+        completes and its stock, loyalty and GL work is queued for
+        pos.post_sale instead of run here.
         """
         if transaction.status not in ['draft', 'pending']:
             raise ValueError("Transaction is not in a payable state.")
         
         amount = Decimal(str(amount))
+
+        if transaction.coupon_id and not PromotionService.use_coupon(
+            transaction.coupon, reference_type='pos_transaction',
+            reference_id=transaction.id, user=user
+        ):
+            raise ValueError("Coupon error: Coupon usage limit reached.")
         
         if redeem_points and transaction.customer:
             # Handle Loyalty Redemption
@@ -363,9 +377,9 @@ class POSService:
         )
         
         # Update transaction
-        total_paid = sum(
-            p.amount for p in transaction.payments.filter(status='completed')
-        )
+        total_paid = transaction.payments.filter(
+            status='completed'
+        ).aggregate(total=Sum('amount'))['total'] or Decimal('0')
         transaction.amount_paid = total_paid
         
         if total_paid >= transaction.total_amount:
@@ -373,67 +387,16 @@ class POSService:
             transaction.status = 'completed'
             transaction.completed_at = timezone.now()
             
-            # Use coupon if present
-            if transaction.coupon:
-                PromotionService.use_coupon(transaction.coupon)
-                
-            # Earn Loyalty Points on Cash/Card portion (not loyalty portion)
-            if transaction.customer:
-                try:
-                    loyalty_payments = transaction.payments.filter(payment_method='loyalty').aggregate(total=models.Sum('amount'))['total'] or 0
-                    eligible_amount = transaction.total_amount - loyalty_payments
-                    
-                    if eligible_amount > 0:
-                        loyalty_profile = transaction.customer.loyalty_account
-                        if loyalty_profile.program and loyalty_profile.program.is_active:
-                            points_to_earn = int(eligible_amount * loyalty_profile.program.points_per_currency)
-                            if points_to_earn > 0:
-                                LoyaltyService.award_points(
-                                    customer=transaction.customer,
-                                    points=points_to_earn,
-                                    description=f"Earned from POS Transaction {transaction.transaction_number}",
-                                    sale_amount=eligible_amount,
-                                    reference=f"POS-{transaction.transaction_number}",
-                                    member=user
-                                )
-                except Exception:
-                    pass # Don't block transaction completion on loyalty error
-            
-            # Deduct stock for each line item
-            if transaction.terminal and transaction.terminal.warehouse:
-                warehouse = transaction.terminal.warehouse
-                for line in transaction.lines.all():
-                    if hasattr(line.product, 'track_inventory') and line.product.track_inventory:
-                        try:
-                            InventoryService.remove_stock(
-                                product=line.product,
-                                warehouse=warehouse,
-                                quantity=line.quantity,
-                                user=user,
-                                reference_type='pos_transaction',
-                                reference_id=transaction.id,
-                                movement_type='sale',
-                                tenant=transaction.tenant
-                            )
-                        except ValueError:
-                            # Handle out of stock - depends on terminal settings
-                            if not transaction.terminal.allow_negative_stock:
-                                raise
-                
-            # Integration: Post to Accounting
-            from billing.services import AccountingIntegrationService
-            try:
-                AccountingIntegrationService.post_pos_sale_to_gl(transaction)
-            except Exception:
-                pass # Non-critical for POS flow
+            # Stock, loyalty and GL are applied by the post-sale workers
+            enqueue_post_sale(transaction, user)
             
             # Emit sale completed event
             event_bus.emit('pos.sale.completed', {
                 'transaction_id': transaction.id,
                 'total_amount': float(transaction.total_amount),
-                'terminal_id': transaction.terminal.id if transaction.terminal else None,
-                'customer_id': transaction.customer.id if transaction.customer else None,
-                'tenant_id': transaction.tenant.id,
+                'terminal_id': transaction.terminal_id,
+                'customer_id': transaction.customer_id,
+                'tenant_id': transaction.tenant_id,
                 'user': user
             })
             
@@ -460,8 +423,9 @@ class POSService:
             raise ValueError("Transaction is already voided.")
         
         if transaction.status == 'completed':
-            # Reverse stock movements
-            if transaction.terminal and transaction.terminal.warehouse:
+            # Steps not yet applied are dropped; stock only needs reversing once deducted
+            unapplied = cancel_unapplied(transaction)
+            if 'stock' not in unapplied and transaction.terminal and transaction.terminal.warehouse:
                 warehouse = transaction.terminal.warehouse
                 for line in transaction.lines.all():
                     if hasattr(line.product, 'track_inventory') and line.product.track_inventory:
@@ -474,6 +438,12 @@ class POSService:
                             reference_id=transaction.id,
                             tenant=transaction.tenant
                         )
+
+        # Pending sales hold the use counted with their first tender too
+        if transaction.coupon_id:
+            PromotionService.release_coupon(
+                transaction.coupon, 'pos_transaction', transaction.id, user
+            )
         
         transaction.status = 'voided'
         transaction.voided_at = timezone.now()
@@ -760,47 +730,14 @@ class POSService:
     def search_products(query, tenant, category_id=None, limit=20):
         """
         Search for products by name, SKU, or barcode.
+        Served from the tenant's in-memory catalog; returns CatalogProducts.
         """
-        from products.models import Product
-        from django.db.models import Q
-        
-        products = Product.objects.filter(
-            tenant=tenant,
-            product_is_active=True
-        )
-        
-        if query:
-            products = products.filter(
-                Q(product_name__icontains=query) |
-                Q(sku__icontains=query) |
-                Q(upc__icontains=query)
-            )
-            
-        if category_id:
-            products = products.filter(category_id=category_id)
-            
-        return products[:limit]
+        return get_catalog(tenant.id).search(query, category_id=category_id, limit=limit)
 
     @staticmethod
     def get_product_by_barcode(barcode, tenant):
         """
-        Get a product by its barcode/UPC.
+        Get a product by its barcode/UPC, falling back to SKU.
+        Served from the tenant's in-memory catalog; returns a CatalogProduct.
         """
-        from products.models import Product
-        
-        try:
-            return Product.objects.get(
-                tenant=tenant,
-                upc=barcode,
-                product_is_active=True
-            )
-        except Product.DoesNotExist:
-            # Try SKU as fallback
-            try:
-                return Product.objects.get(
-                    tenant=tenant,
-                    sku=barcode,
-                    product_is_active=True
-                )
-            except Product.DoesNotExist:
-                return None
+        return get_catalog(tenant.id).lookup(barcode)
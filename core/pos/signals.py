@@ -1 +1,15 @@
-# Redundant signals removed. Logic migrated to POSService.
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from products.models import Product
+
+from .catalog import record_change
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def refresh_pos_catalog(sender, instance, **kwargs):
+    """Tell the POS catalog indexes about the change once it commits."""
+    tenant_id, product_id = instance.tenant_id, instance.pk
+    transaction.on_commit(lambda: record_change(tenant_id, product_id))
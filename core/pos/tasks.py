@@ -0,0 +1,12 @@
+from celery import shared_task
+
+
+@shared_task
+def process_post_sale_tasks():
+    """
+    Applies due POS post-sale steps (stock, coupon, loyalty, GL) from the
+    outbox. Scheduled after each completed sale and swept every minute.
+    """
+    from .post_sale import drain_outbox
+    processed = drain_outbox()
+    return f"Processed {processed} POS post-sale tasks."
@@ -1,12 +1,22 @@
+import json
+import time
+from datetime import timedelta
+from unittest import mock
+
+from django.core.cache import cache, caches
 from django.test import TestCase
+from django.urls import reverse
 from django.utils import timezone
 from core.models import User
 from tenants.models import Tenant
 from pos.models import POSSession, POSTerminal, POSTransaction, POSTransactionLine
+from pos.catalog import POSCatalog, clear_local, export_changes, export_snapshot, get_catalog
+from pos.post_sale import drain_outbox
 from pos.services import POSService
-from products.models import Product
+from products.models import Coupon, Product
 from accounts.models import Account
 from loyalty.models import LoyaltyProgram, CustomerLoyalty, LoyaltyTransaction
+from inventory.models import StockLevel, StockMovement, Warehouse
 from decimal import Decimal
 
 class POSLoyaltyTest(TestCase):
@@ -114,6 +124,8 @@ class POSLoyaltyTest(TestCase):
             amount=Decimal("100.00"),
             user=self.user
         )
+        # Points are awarded by the post-sale pipeline
+        drain_outbox()
         
         self.loyalty_profile.refresh_from_db()
         
@@ -126,3 +138,205 @@ class POSLoyaltyTest(TestCase):
             transaction_type='earn'
         ).last()
         self.assertEqual(ledger.points, 100)
+
+
+class POSPostSaleTest(TestCase):
+    def setUp(self):
+        self.tenant = Tenant.objects.create(name="Outbox Tenant", slug="outbox-tenant")
+        self.user = User.objects.create_user(username="outbox-cashier", email="outbox@test.com", password="password")
+        self.tenant.users.add(self.user)
+        self.warehouse = Warehouse.objects.create(
+            tenant=self.tenant, warehouse_name="Store", warehouse_code="OUTBOX-WH"
+        )
+        self.terminal = POSTerminal.objects.create(
+            tenant=self.tenant,
+            terminal_name="Till 2",
+            terminal_code="TILL-2",
+            warehouse=self.warehouse
+        )
+        self.product = Product.objects.create(
+            tenant=self.tenant,
+            product_name="Stocked Product",
+            sku="OUTBOX-1",
+            base_price=Decimal("20.00"),
+            track_inventory=True
+        )
+        StockLevel.objects.create(
+            tenant=self.tenant, product=self.product, warehouse=self.warehouse, quantity=Decimal("10")
+        )
+        self.session = POSService.open_session(self.terminal, self.user)
+
+    def complete_sale(self, quantity):
+        txn = POSService.create_transaction(self.session, self.user)
+        POSService.add_line_item(txn, self.product, quantity=quantity)
+        txn.refresh_from_db()
+        POSService.process_payment(
+            transaction=txn,
+            payment_method='card',
+            amount=txn.total_amount,
+            user=self.user
+        )
+        txn.refresh_from_db()
+        return txn
+
+    def stock(self):
+        return StockLevel.objects.get(product=self.product, warehouse=self.warehouse).quantity
+
+    def test_sale_completes_before_stock_is_deducted_once(self):
+        txn = self.complete_sale(3)
+
+        self.assertEqual(txn.status, 'completed')
+        self.assertEqual(self.stock(), Decimal("10"))
+        self.assertEqual(
+            set(txn.post_sale_tasks.values_list('step', 'status')),
+            {('stock', 'pending'), ('ledger', 'pending')},
+        )
+
+        drain_outbox()
+        drain_outbox()
+
+        self.assertEqual(self.stock(), Decimal("7"))
+        self.assertEqual(StockMovement.objects.filter(reference_id=txn.id, movement_type='sale').count(), 1)
+        self.assertFalse(txn.post_sale_tasks.exclude(status='done').exists())
+
+    def test_short_stock_is_retried_with_backoff(self):
+        txn = self.complete_sale(12)
+
+        drain_outbox()
+
+        task = txn.post_sale_tasks.get(step='stock')
+        self.assertEqual((task.status, task.attempts), ('pending', 1))
+        self.assertGreater(task.next_attempt_at, timezone.now())
+        self.assertIn('Insufficient stock', task.last_error)
+        self.assertEqual(self.stock(), Decimal("10"))
+
+    def test_void_before_processing_cancels_without_restocking(self):
+        txn = self.complete_sale(2)
+
+        POSService.void_transaction(txn, "Customer changed mind", self.user)
+        drain_outbox()
+
+        self.assertEqual(self.stock(), Decimal("10"))
+        self.assertEqual(set(txn.post_sale_tasks.values_list('status', flat=True)), {'cancelled'})
+
+    def test_coupon_is_claimed_with_the_first_tender(self):
+        now = timezone.now()
+        coupon = Coupon.objects.create(
+            code="ONCE", discount_type="fixed", discount_value=Decimal("5.00"),
+            start_date=now - timedelta(days=1), end_date=now + timedelta(days=1),
+            usage_limit=1, tenant=self.tenant
+        )
+        sales = []
+        for _ in range(2):
+            txn = POSService.create_transaction(self.session, self.user)
+            POSService.add_line_item(txn, self.product, quantity=1)
+            POSService.apply_coupon(txn, "ONCE")
+            sales.append(txn)
+        first, second = sales
+
+        # The first sale's split tender claims the last use before it completes
+        POSService.process_payment(transaction=first, payment_method='card', amount=Decimal("5.00"), user=self.user)
+        with self.assertRaisesMessage(ValueError, "usage limit"):
+            POSService.process_payment(transaction=second, payment_method='card', amount=Decimal("5.00"), user=self.user)
+        self.assertFalse(second.payments.exists())
+        coupon.refresh_from_db()
+        self.assertEqual(coupon.used_count, 1)
+
+        first.refresh_from_db()
+        self.assertEqual(first.status, 'pending')
+        POSService.void_transaction(first, "Customer left", self.user)
+        coupon.refresh_from_db()
+        self.assertEqual(coupon.used_count, 0)
+
+
+class POSCatalogTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        clear_local()
+        self.tenant = Tenant.objects.create(name="Catalog Tenant", slug="catalog-tenant")
+        self.bread = Product.objects.create(
+            tenant=self.tenant, product_name="Brown Bread", sku="BRD-1", upc="123456789", base_price=Decimal("2.50")
+        )
+        self.butter = Product.objects.create(
+            tenant=self.tenant, product_name="Butter", sku="123456789", base_price=Decimal("4.00")
+        )
+        Product.objects.create(
+            tenant=self.tenant, product_name="Old Bread", sku="BRD-0", base_price=Decimal("1.00"), product_is_active=False
+        )
+
+    def test_barcode_prefers_upc_over_sku(self):
+        self.assertEqual(POSService.get_product_by_barcode("123456789", self.tenant).id, self.bread.id)
+        self.assertEqual(POSService.get_product_by_barcode("BRD-1", self.tenant).price, Decimal("2.50"))
+        self.assertIsNone(POSService.get_product_by_barcode("BRD-0", self.tenant))
+
+    def test_search_matches_substrings_of_active_products(self):
+        self.assertEqual([p.id for p in POSService.search_products("bread", self.tenant)], [self.bread.id])
+        self.assertEqual(
+            [p.id for p in POSService.search_products("bu", self.tenant)], [self.butter.id]
+        )
+        self.assertEqual(POSService.search_products("rdx", self.tenant), [])
+
+    def test_changes_are_applied_incrementally(self):
+        catalog = get_catalog(self.tenant.id)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.butter.product_name = "Salted Butter"
+            self.butter.save()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.bread.delete()
+
+        updated = get_catalog(self.tenant.id)
+        self.assertIs(updated, catalog)
+        self.assertEqual(updated.version, 2)
+        self.assertEqual([p.name for p in updated.search("salted")], ["Salted Butter"])
+        self.assertIsNone(updated.lookup("BRD-1"))
+        changes = export_changes(self.tenant.id, 0)
+        self.assertEqual(changes['removed'], [self.bread.id])
+        self.assertEqual([row[0] for row in changes['products']], [self.butter.id])
+
+    def test_change_in_another_worker_is_seen(self):
+        catalog = get_catalog(self.tenant.id)
+
+        # A second client stands in for another worker sharing the cache
+        other_worker = caches.create_connection('default')
+        with mock.patch('pos.catalog.cache', other_worker), self.captureOnCommitCallbacks(execute=True):
+            self.butter.product_name = "Salted Butter"
+            self.butter.save()
+
+        self.assertEqual([p.name for p in get_catalog(self.tenant.id).search("salted")], ["Salted Butter"])
+        self.assertIs(get_catalog(self.tenant.id), catalog)
+
+    def test_old_indexes_are_rebuilt_without_a_change(self):
+        catalog = get_catalog(self.tenant.id)
+        # Bypasses signals, as a change whose publish was lost
+        Product.objects.filter(pk=self.butter.pk).update(product_name="Salted Butter")
+        self.assertEqual(get_catalog(self.tenant.id).search("salted"), [])
+
+        with self.settings(POS_CATALOG_MAX_AGE=300):
+            catalog.built_at = time.monotonic() - 301
+            rebuilt = get_catalog(self.tenant.id)
+
+        self.assertIsNot(rebuilt, catalog)
+        self.assertEqual([p.name for p in rebuilt.search("salted")], ["Salted Butter"])
+
+    def test_product_grid_api_serves_the_catalog(self):
+        user = User.objects.create_user(
+            username="catalog-cashier", email="catalog@test.com", password="password", tenant=self.tenant
+        )
+        self.client.force_login(user)
+
+        response = self.client.get(reverse('pos:api_product_list'))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [(p['name'], p['price'], p['image']) for p in response.json()['products']],
+            [("Brown Bread", "2.50", None), ("Butter", "4.00", None)],
+        )
+
+    def test_snapshot_round_trip(self):
+        snapshot = json.loads(json.dumps(export_snapshot(self.tenant.id)))
+
+        terminal = POSCatalog.from_snapshot(snapshot)
+
+        self.assertEqual(len(terminal), 2)
+        self.assertEqual(terminal.lookup("123456789").name, "Brown Bread")
@@ -47,6 +47,7 @@ urlpatterns = [
     path('api/categories/', views.CategoryListAPI.as_view(), name='api_category_list'),
     path('api/products/search/', views.ProductSearchAPI.as_view(), name='api_product_search'),
     path('api/products/barcode/<str:barcode>/', views.ProductBarcodeAPI.as_view(), name='api_product_barcode'),
+    path('api/catalog/', views.CatalogSnapshotAPI.as_view(), name='api_catalog'),
     path('api/transactions/', views.TransactionCreateAPI.as_view(), name='api_transaction_create'),
     path('api/transactions/<int:pk>/', views.TransactionDetailAPI.as_view(), name='api_transaction_detail'),
     path('api/transactions/<int:pk>/lines/', views.TransactionLineAPI.as_view(), name='api_transaction_lines'),
@@ -25,6 +25,7 @@ from .forms import (
     VoidTransactionForm, RefundForm, CashMovementForm
 )
 from .services import POSService
+from .catalog import export_changes, export_snapshot, get_catalog
 from products.models import ProductCategory
 
 from .hardware import (
@@ -632,17 +633,12 @@ class ProductSearchAPI(LoginRequiredMixin, View):
         
         product_list = []
         for p in products:
-            try:
-                image_url = p.thumbnail.url if hasattr(p, 'thumbnail') and p.thumbnail else None
-            except:
-                image_url = None
-                
             product_list.append({
                 'id': p.id,
-                'name': p.product_name,
+                'name': p.name,
                 'sku': p.sku,
-                'price': str(p.base_price),
-                'image': image_url,
+                'price': str(p.price),
+                'image': p.image,
                 'in_stock': True  # TODO: Check actual stock
             })
         
@@ -698,20 +694,36 @@ class ProductBarcodeAPI(LoginRequiredMixin, View):
         
         qty = 0
         if warehouse:
-            stock = StockLevel.objects.filter(product=product, warehouse=warehouse).aggregate(total=Sum('quantity'))['total'] or 0
-            reserved = StockLevel.objects.filter(product=product, warehouse=warehouse).aggregate(total=Sum('reserved_quantity'))['total'] or 0
+            stock = StockLevel.objects.filter(product_id=product.id, warehouse=warehouse).aggregate(total=Sum('quantity'))['total'] or 0
+            reserved = StockLevel.objects.filter(product_id=product.id, warehouse=warehouse).aggregate(total=Sum('reserved_quantity'))['total'] or 0
             qty = float(stock - reserved)
 
         return JsonResponse({
             'id': product.id,
-            'name': product.product_name,
+            'name': product.name,
             'sku': product.sku,
-            'price': str(product.base_price),
+            'price': str(product.price),
             'in_stock': qty > 0,
             'stock_qty': qty
         })
 
 
+class CatalogSnapshotAPI(LoginRequiredMixin, View):
+    """
+    API for the terminal's offline product catalog. Returns the full
+    snapshot, or only the changes when ?since=<version> is still covered.
+    """
+    
+    def get(self, request):
+        tenant_id = request.user.tenant.id
+        since = request.GET.get('since')
+        if since and since.isdigit():
+            changes = export_changes(tenant_id, int(since))
+            if changes is not None:
+                return JsonResponse({'type': 'changes', **changes})
+        return JsonResponse({'type': 'snapshot', **export_snapshot(tenant_id)})
+
+
 class TransactionCreateAPI(LoginRequiredMixin, View):
     """API for creating transactions."""
     
@@ -843,32 +855,21 @@ class ProductListAPI(LoginRequiredMixin, View):
     """API for listing all products."""
     
     def get(self, request):
-        from products.models import Product
         category_id = request.GET.get('category')
         
-        products = Product.objects.filter(
-            tenant=request.user.tenant,
-            product_is_active=True
+        # Active products from the in-memory catalog, by name
+        products = get_catalog(request.user.tenant.id).search(
+            '', category_id=category_id, limit=50  # Limit to 50 products
         )
         
-        if category_id:
-            products = products.filter(category_id=category_id)
-            
-        products = products[:50]  # Limit to 50 products
-        
         product_list = []
         for p in products:
-            try:
-                image_url = p.thumbnail.url if hasattr(p, 'thumbnail') and p.thumbnail else None
-            except:
-                image_url = None
-                
             product_list.append({
                 'id': p.id,
-                'name': p.product_name,
+                'name': p.name,
                 'sku': p.sku,
-                'price': str(p.base_price),
-                'image': image_url,
+                'price': str(p.price),
+                'image': p.image,
                 'in_stock': True  # TODO: Check actual stock
             })
         
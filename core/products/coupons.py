@@ -0,0 +1,131 @@
+"""
+Coupon Redemptions
+
+Coupon uses are counted with one conditional UPDATE instead of reading
+used_count and saving the whole row:
+- A claim runs ``UPDATE ... SET used_count = used_count + 1 WHERE
+  used_count < usage_limit``. When it matches no row the coupon is used up,
+  so concurrent checkouts cannot redeem a limited coupon more often than
+  its limit, and the row lock lasts only until the claiming transaction
+  commits
+- Every claim and every release appends a CouponRedemption row. Rows that
+  name a reference (e.g. a POS transaction) are unique per coupon, kind and
+  reference, so redeeming or releasing twice for one sale counts once
+- validate_coupons checks all the codes of a cart with one query, and
+  redeem_coupons claims them all or none, in primary key order so two carts
+  sharing codes cannot deadlock
+
+Usage:
+    from products.coupons import validate_coupons, redeem_coupons
+
+    results = validate_coupons(['SAVE10', 'FREESHIP'], tenant, cart_total)
+    exhausted = redeem_coupons(coupons, 'pos_transaction', sale.id, user)
+"""
+from decimal import Decimal
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from django.db import IntegrityError, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import Coupon, CouponRedemption
+
+# No limit when usage_limit is empty or 0, as before
+WITHIN_LIMIT = Q(usage_limit__isnull=True) | Q(usage_limit=0) | Q(used_count__lt=F('usage_limit'))
+
+
+def check_coupon(coupon: Coupon, cart_total=Decimal('0'), now=None) -> Tuple[bool, str]:
+    """Whether ``coupon`` can be applied to a cart of ``cart_total``, with the message to show."""
+    now = now or timezone.now()
+    if not coupon.is_active:
+        return False, "Coupon is inactive."
+    if coupon.start_date > now:
+        return False, "Coupon is not yet valid."
+    if coupon.end_date < now:
+        return False, "Coupon has expired."
+    if coupon.usage_limit and coupon.used_count >= coupon.usage_limit:
+        return False, "Coupon usage limit reached."
+    if cart_total < coupon.min_purchase_amount:
+        return False, f"Minimum purchase of {coupon.min_purchase_amount} required."
+    return True, "Coupon applied successfully."
+
+
+def validate_coupons(codes: Iterable[str], tenant, cart_total=Decimal('0')) -> Dict[str, Tuple[bool, str, Optional[Coupon]]]:
+    """
+    Validate every code of a cart with one query. Returns
+    {code: (is_valid, message, coupon_or_None)} in the order given.
+    """
+    codes = list(dict.fromkeys(codes))
+    coupons = {coupon.code: coupon for coupon in Coupon.objects.filter(tenant=tenant, code__in=codes)}
+    now = timezone.now()
+    results = {}
+    for code in codes:
+        coupon = coupons.get(code)
+        if coupon is None:
+            results[code] = (False, "Invalid coupon code.", None)
+            continue
+        is_valid, message = check_coupon(coupon, cart_total, now)
+        results[code] = (is_valid, message, coupon if is_valid else None)
+    return results
+
+
+def _claim(coupon_id) -> bool:
+    """Count one use if the coupon is under its limit. Locks its row until commit."""
+    return Coupon.objects.filter(WITHIN_LIMIT, pk=coupon_id).update(used_count=F('used_count') + 1) == 1
+
+
+def redeem_coupons(coupons: Iterable[Coupon], reference_type: str = '', reference_id=None, user=None) -> List[Coupon]:
+    """
+    Count one use of each coupon, all or none. Returns the coupons that had
+    reached their usage limit; nothing is counted then. Coupons already
+    redeemed for ``reference_id`` are not counted again.
+    """
+    coupons = sorted({coupon.pk: coupon for coupon in coupons}.values(), key=lambda coupon: coupon.pk)
+    try:
+        with transaction.atomic():
+            if reference_id is not None:
+                redeemed = set(CouponRedemption.objects.filter(
+                    coupon__in=coupons, kind='redeem',
+                    reference_type=reference_type, reference_id=reference_id
+                ).values_list('coupon_id', flat=True))
+                coupons = [coupon for coupon in coupons if coupon.pk not in redeemed]
+
+            exhausted = [coupon for coupon in coupons if not _claim(coupon.pk)]
+            if exhausted:
+                transaction.set_rollback(True)
+                return exhausted
+
+            CouponRedemption.objects.bulk_create([
+                CouponRedemption(
+                    coupon=coupon, kind='redeem', reference_type=reference_type,
+                    reference_id=reference_id, redeemed_by=user, tenant_id=coupon.tenant_id
+                )
+                for coupon in coupons
+            ])
+    except IntegrityError:
+        # A concurrent call redeemed them for the same reference first
+        if reference_id is None:
+            raise
+    return []
+
+
+def redeem_coupon(coupon: Coupon, reference_type: str = '', reference_id=None, user=None) -> bool:
+    """Count one use of ``coupon``. False when it has reached its usage limit."""
+    return not redeem_coupons([coupon], reference_type, reference_id, user)
+
+
+def release_coupon(coupon: Coupon, reference_type: str, reference_id, user=None) -> bool:
+    """
+    Give back the use redeemed for a reference (e.g. a voided sale). False
+    when there is none or it was already given back.
+    """
+    reference = {'coupon': coupon, 'reference_type': reference_type, 'reference_id': reference_id}
+    try:
+        with transaction.atomic():
+            if not CouponRedemption.objects.filter(kind='redeem', **reference).exists():
+                return False
+            CouponRedemption.objects.create(kind='release', redeemed_by=user, tenant_id=coupon.tenant_id, **reference)
+            Coupon.objects.filter(pk=coupon.pk, used_count__gt=0).update(used_count=F('used_count') - 1)
+    except IntegrityError:
+        return False
+    return True
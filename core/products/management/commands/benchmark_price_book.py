@@ -0,0 +1,125 @@
+"""
+Benchmark quote pricing.
+
+Seeds a catalogue with volume tiers and a price list, then prices a quote
+of --lines lines three ways: the per-line PriceListItem/PricingTier
+queries PricingService used to run, price_lines on a freshly compiled
+book and price_lines on a warm book. Reports p50/p95 latency and queries
+per quote, and fails if any line is priced differently from the per-line
+queries. All data is created inside a transaction that is rolled back
+afterwards.
+
+Usage:
+    python manage.py benchmark_price_book --lines 500 --products 5000
+"""
+import random
+import statistics
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from accounts.models import Account
+from products.models import PriceList, PriceListItem, PricingTier, Product
+from products.pricing import get_price_book, invalidate, price_lines
+from tenants.models import Tenant
+
+
+def legacy_price(product, account, quantity):
+    """The per-line lookup PricingService.get_price ran before price books."""
+    qty = int(quantity)
+    if account and account.price_list and account.price_list.is_active:
+        price_item = PriceListItem.objects.filter(
+            price_list=account.price_list, product=product, min_quantity__lte=qty
+        ).order_by('-min_quantity').first()
+        if price_item:
+            return price_item.price
+    tier = PricingTier.objects.filter(product=product, min_quantity__lte=qty).order_by('-min_quantity').first()
+    if tier and (tier.max_quantity is None or qty <= tier.max_quantity):
+        if tier.unit_price > 0:
+            return tier.unit_price
+        elif tier.discount_percent > 0:
+            return product.base_price - product.base_price * (Decimal(str(tier.discount_percent)) / Decimal('100'))
+    return product.base_price
+
+
+class Command(BaseCommand):
+    help = 'Measure pricing a large quote with and without compiled price books'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lines', type=int, default=500, help='Lines per quote')
+        parser.add_argument('--products', type=int, default=2000, help='Products in the catalogue')
+        parser.add_argument('--samples', type=int, default=20, help='Quotes priced per method')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            tenant, account, products = self._seed(options['products'])
+            results = self._measure(tenant, account, products, options['lines'], options['samples'])
+            transaction.set_rollback(True)
+
+        self.stdout.write(f"Pricing a {options['lines']}-line quote:")
+        for name, latencies, queries in results:
+            p50 = statistics.median(latencies)
+            p95 = sorted(latencies)[max(int(len(latencies) * 0.95) - 1, 0)]
+            self.stdout.write(f"{name:<26} p50 {p50 * 1000:9.2f} ms   p95 {p95 * 1000:9.2f} ms   {queries:5d} queries")
+
+    def _seed(self, product_count):
+        stamp = time.time_ns()
+        tenant = Tenant.objects.create(name='Pricing Benchmark', slug=f'pricing-benchmark-{stamp}')
+        products = Product.objects.bulk_create([
+            Product(product_name=f'Benchmark {number}', sku=f'PRICE-{stamp}-{number}',
+                    base_price=Decimal(random.randint(500, 50000)) / 100, tenant=tenant)
+            for number in range(product_count)
+        ])
+        PricingTier.objects.bulk_create([
+            PricingTier(product=product, min_quantity=min_quantity, max_quantity=max_quantity,
+                        unit_price=product.base_price * Decimal(factor), tenant=tenant)
+            for product in products
+            for min_quantity, max_quantity, factor in ((10, 49, '0.95'), (50, 199, '0.9'), (200, None, '0.85'))
+        ])
+        price_list = PriceList.objects.create(name='Benchmark Wholesale', tenant=tenant)
+        PriceListItem.objects.bulk_create([
+            PriceListItem(price_list=price_list, product=product, min_quantity=min_quantity,
+                          price=product.base_price * Decimal(factor), tenant=tenant)
+            for product in products[::3]
+            for min_quantity, factor in ((1, '0.8'), (100, '0.75'))
+        ])
+        account = Account.objects.create(account_name='Benchmark Wholesale Buyer', price_list=price_list, tenant=tenant)
+        return tenant, account, products
+
+    def _measure(self, tenant, account, products, line_count, samples):
+        quotes = [
+            [(random.choice(products), random.choice([1, 5, 12, 60, 150, 300])) for _ in range(line_count)]
+            for _ in range(samples)
+        ]
+
+        def per_line(quote):
+            return [legacy_price(product, account, quantity) for product, quantity in quote]
+
+        def cold_book(quote):
+            invalidate(tenant.id)
+            return [line['unit_price'] for line in price_lines(quote, account)]
+
+        def warm_book(quote):
+            return [line['unit_price'] for line in price_lines(quote, account)]
+
+        get_price_book(tenant.id, account.price_list_id)
+        results = []
+        expected = None
+        for name, method in [('Per-line queries', per_line), ('Price book (cold)', cold_book),
+                             ('Price book (warm)', warm_book)]:
+            latencies = []
+            prices = []
+            with CaptureQueriesContext(connection) as queries:
+                for quote in quotes:
+                    started = time.perf_counter()
+                    prices.append(method(quote))
+                    latencies.append(time.perf_counter() - started)
+            if expected is None:
+                expected = prices
+            elif prices != expected:
+                raise CommandError(f"{name} priced the quotes differently from the per-line queries")
+            results.append((name, latencies, len(queries) // samples))
+        return results
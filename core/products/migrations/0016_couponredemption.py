@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-16 13:20
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0015_alter_product_tax_rate'),
+        ('tenants', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CouponRedemption',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('redeem', 'Redeemed'), ('release', 'Released')], default='redeem', max_length=10)),
+                ('reference_type', models.CharField(blank=True, help_text="e.g. 'pos_transaction'", max_length=50)),
+                ('reference_id', models.BigIntegerField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('coupon', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='redemptions', to='products.coupon')),
+                ('redeemed_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='coupon_redemptions', to=settings.AUTH_USER_MODEL)),
+                ('tenant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='%(class)ss', to='tenants.tenant')),
+            ],
+            options={
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['coupon', 'created_at'], name='products_coupon_redeem_idx')],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('reference_id__isnull', False)), fields=('coupon', 'kind', 'reference_type', 'reference_id'), name='unique_coupon_redemption_ref')],
+            },
+        ),
+    ]
@@ -291,6 +291,41 @@ class Coupon(TenantModel):
         return self.code
 
 
+COUPON_REDEMPTION_KIND_CHOICES = [
+    ('redeem', 'Redeemed'),
+    ('release', 'Released'),
+]
+
+
+class CouponRedemption(TenantModel):
+    """
+    Append-only log of coupon uses, and of uses given back (e.g. a voided
+    sale). Coupon.used_count is the running total of this log.
+    """
+    coupon = models.ForeignKey(Coupon, on_delete=models.CASCADE, related_name='redemptions')
+    kind = models.CharField(max_length=10, choices=COUPON_REDEMPTION_KIND_CHOICES, default='redeem')
+    reference_type = models.CharField(max_length=50, blank=True, help_text="e.g. 'pos_transaction'")
+    reference_id = models.BigIntegerField(null=True, blank=True)
+    redeemed_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='coupon_redemptions')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['coupon', 'kind', 'reference_type', 'reference_id'],
+                condition=models.Q(reference_id__isnull=False),
+                name='unique_coupon_redemption_ref',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['coupon', 'created_at'], name='products_coupon_redeem_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.coupon.code} {self.kind} ({self.reference_type} {self.reference_id})"
+
+
 class Promotion(TenantModel):
     """
     Automatic promotions applied based on criteria (e.g., Seasonal Sale).
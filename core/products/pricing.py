@@ -0,0 +1,158 @@
+"""
+Compiled Price Books
+
+PricingService prices lines from a price book compiled per (tenant, price
+list) instead of querying PriceListItem and PricingTier for every line:
+- Each product's price list entries and volume tiers are held as sorted
+  min_quantity breakpoints (arrays) with the matching prices; a lookup is
+  a bisect, with the same precedence as before (price list entry, then
+  tier, then base price)
+- Books live in a per-process LRU (PRICE_BOOK_CACHE_SIZE) stamped with the
+  tenant's ``price_book:{tenant_id}`` version in the shared (Redis) cache,
+  which is bumped when a PriceList, PriceListItem or PricingTier of the
+  tenant changes. Books older than PRICE_BOOK_MAX_AGE seconds are rebuilt
+  even without a bump
+- price_lines prices a whole basket with one version check and no other
+  queries
+
+Usage:
+    from products.pricing import get_price_book
+
+    book = get_price_book(product.tenant_id, account.price_list_id)
+    unit_price = book.unit_price(product, 12)
+"""
+from array import array
+from bisect import bisect_right
+from decimal import Decimal
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from django.conf import settings
+
+from core.cache_versions import VersionedLocalCache, bump_version
+
+from .models import PriceList, PriceListItem, PricingTier
+
+
+class Ladder(NamedTuple):
+    """Ascending min_quantity breakpoints and the value that applies from each."""
+    breaks: array
+    values: list
+
+    def at(self, quantity: int) -> Any:
+        """The value of the highest breakpoint <= quantity, or None."""
+        index = bisect_right(self.breaks, quantity)
+        return self.values[index - 1] if index else None
+
+
+def _ladders(rows: Iterable[Tuple[int, int, Any]]) -> Dict[int, Ladder]:
+    """(product_id, min_quantity, value) rows, sorted by product and quantity."""
+    ladders: Dict[int, Ladder] = {}
+    for product_id, min_quantity, value in rows:
+        ladder = ladders.get(product_id)
+        if ladder is None:
+            ladder = ladders[product_id] = Ladder(array('q'), [])
+        if ladder.breaks and ladder.breaks[-1] == min_quantity:
+            # Same breakpoint twice: the later row wins
+            ladder.values[-1] = value
+            continue
+        ladder.breaks.append(min_quantity)
+        ladder.values.append(value)
+    return ladders
+
+
+class PriceBook:
+    """Unit prices for one tenant under one price list (or none)."""
+
+    def __init__(self, tenant_id, price_list_id=None):
+        self.tenant_id = tenant_id
+        self.price_list_id = price_list_id
+        self.list_prices: Dict[int, Ladder] = {}
+        if price_list_id and PriceList.objects.filter(pk=price_list_id, is_active=True).exists():
+            self.list_prices = _ladders(
+                PriceListItem.objects.filter(price_list_id=price_list_id)
+                .order_by('product_id', 'min_quantity')
+                .values_list('product_id', 'min_quantity', 'price')
+            )
+        self.tiers = _ladders(
+            (product_id, min_quantity, (max_quantity, unit_price, discount_percent))
+            for product_id, min_quantity, max_quantity, unit_price, discount_percent in
+            PricingTier.objects.filter(tenant_id=tenant_id)
+            .order_by('product_id', 'min_quantity', 'pk')
+            .values_list('product_id', 'min_quantity', 'max_quantity', 'unit_price', 'discount_percent')
+        )
+
+    def unit_price(self, product, quantity=1) -> Decimal:
+        qty = int(quantity)
+
+        # 1. Price list entry with the highest min_quantity <= qty
+        ladder = self.list_prices.get(product.pk)
+        if ladder is not None:
+            price = ladder.at(qty)
+            if price is not None:
+                return price
+
+        # 2. Volume tier with the highest min_quantity <= qty, if qty is within its max
+        ladder = self.tiers.get(product.pk)
+        if ladder is not None:
+            tier = ladder.at(qty)
+            if tier is not None:
+                max_quantity, unit_price, discount_percent = tier
+                if max_quantity is None or qty <= max_quantity:
+                    if unit_price > 0:
+                        return unit_price
+                    elif discount_percent > 0:
+                        discount = product.base_price * (Decimal(str(discount_percent)) / Decimal('100'))
+                        return product.base_price - discount
+
+        # 3. Base price
+        return product.base_price
+
+
+_books = VersionedLocalCache(
+    max_entries=getattr(settings, 'PRICE_BOOK_CACHE_SIZE', 256),
+    max_age=getattr(settings, 'PRICE_BOOK_MAX_AGE', 300),
+)
+
+
+def version_name(tenant_id) -> str:
+    return f"price_book:{tenant_id}"
+
+
+def get_price_book(tenant_id, price_list_id=None) -> PriceBook:
+    """The tenant's compiled book for ``price_list_id``, rebuilt after any pricing change."""
+    return _books.get_or_build(
+        (tenant_id, price_list_id),
+        version_name(tenant_id),
+        lambda: PriceBook(tenant_id, price_list_id),
+    )
+
+
+def invalidate(tenant_id) -> None:
+    """Drop every worker's books for the tenant."""
+    bump_version(version_name(tenant_id))
+
+
+def _price_list_id(account) -> Optional[int]:
+    return getattr(account, 'price_list_id', None) if account is not None else None
+
+
+def price_lines(lines: Iterable[Tuple[Any, Any]], account=None) -> List[Dict[str, Any]]:
+    """
+    Price a basket of (product, quantity) lines for ``account``. Returns one
+    {'product', 'quantity', 'unit_price', 'line_total'} dict per line, in order.
+    """
+    books: Dict[Any, PriceBook] = {}
+    price_list_id = _price_list_id(account)
+    priced = []
+    for product, quantity in lines:
+        book = books.get(product.tenant_id)
+        if book is None:
+            book = books[product.tenant_id] = get_price_book(product.tenant_id, price_list_id)
+        unit_price = book.unit_price(product, quantity)
+        priced.append({
+            'product': product,
+            'quantity': quantity,
+            'unit_price': unit_price,
+            'line_total': unit_price * Decimal(str(quantity)),
+        })
+    return priced
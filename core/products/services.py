@@ -1,6 +1,7 @@
 from decimal import Decimal
-from django.utils import timezone
-from .models import PriceList, PriceListItem, PricingTier, Coupon, Promotion
+from .models import PriceList, Coupon, Promotion
+from .coupons import check_coupon, redeem_coupon, redeem_coupons, release_coupon, validate_coupons
+from .pricing import get_price_book, price_lines
 import barcode
 from barcode.writer import ImageWriter
 import qrcode
@@ -15,38 +16,10 @@ class PricingService:
         1. Account-specific Price List (if exists) -> PriceListItem
         2. Pricing Tiers (Volume Discounts)
         3. Product Base Price
+        Looked up in the tenant's compiled price book (products.pricing).
         """
-        qty = int(quantity)
-        
-        # 1. Price List
-        if account and account.price_list and account.price_list.is_active:
-             price_item = PriceListItem.objects.filter(
-                 price_list=account.price_list,
-                 product=product,
-                 min_quantity__lte=qty
-             ).order_by('-min_quantity').first()
-             
-             if price_item:
-                 return price_item.price
-
-        # 2. Volume Pricing Tiers (Global)
-        # Find applicable tier with highest min_quantity that is <= current qty
-        tier = PricingTier.objects.filter(
-            product=product,
-            min_quantity__lte=qty
-        ).order_by('-min_quantity').first()
-        
-        if tier:
-            # Check max_quantity
-            if tier.max_quantity is None or qty <= tier.max_quantity:
-                if tier.unit_price > 0:
-                    return tier.unit_price
-                elif tier.discount_percent > 0:
-                    discount = product.base_price * (Decimal(str(tier.discount_percent)) / Decimal('100'))
-                    return product.base_price - discount
-
-        # 3. Base Price
-        return product.base_price
+        price_list_id = account.price_list_id if account is not None else None
+        return get_price_book(product.tenant_id, price_list_id).unit_price(product, quantity)
 
     @staticmethod
     def calculate_line_total(product, quantity, account=None):
@@ -56,6 +29,15 @@ class PricingService:
         unit_price = PricingService.get_price(product, account, quantity)
         return unit_price * Decimal(str(quantity))
 
+    @staticmethod
+    def price_lines(lines, account=None):
+        """
+        Price a whole basket in one call.
+        lines: list of (product, quantity) tuples. Returns one dict per line with
+        'product', 'quantity', 'unit_price' and 'line_total'.
+        """
+        return price_lines(lines, account)
+
 
 class PromotionService:
     @staticmethod
@@ -63,28 +45,21 @@ class PromotionService:
         """
         Validate a coupon code. Returns (is_valid, message, coupon_obj).
         """
-        now = timezone.now()
         try:
             coupon = Coupon.objects.get(code=code, tenant=tenant)
         except Coupon.DoesNotExist:
             return False, "Invalid coupon code.", None
-            
-        if not coupon.is_active:
-            return False, "Coupon is inactive.", None
-            
-        if coupon.start_date > now:
-            return False, "Coupon is not yet valid.", None
-            
-        if coupon.end_date < now:
-            return False, "Coupon has expired.", None
-            
-        if coupon.usage_limit and coupon.used_count >= coupon.usage_limit:
-            return False, "Coupon usage limit reached.", None
-            
-        if cart_total < coupon.min_purchase_amount:
-            return False, f"Minimum purchase of {coupon.min_purchase_amount} required.", None
-            
-        return True, "Coupon applied successfully.", coupon
+
+        is_valid, message = check_coupon(coupon, cart_total)
+        return is_valid, message, coupon if is_valid else None
+
+    @staticmethod
+    def validate_coupons(codes, tenant, user=None, cart_total=Decimal('0')):
+        """
+        Validate all the coupon codes of a cart in one query.
+        Returns {code: (is_valid, message, coupon_obj)}.
+        """
+        return validate_coupons(codes, tenant, cart_total)
 
     @staticmethod
     def calculate_discount(coupon, cart_total):
@@ -98,12 +73,29 @@ class PromotionService:
         return Decimal('0')
 
     @staticmethod
-    def use_coupon(coupon):
+    def use_coupon(coupon, reference_type='', reference_id=None, user=None):
+        """
+        Count one use of the coupon with an atomic, limit-checked update and
+        log the redemption (products.coupons). Returns False when the coupon
+        has reached its usage limit. Using it twice for the same reference
+        counts once.
+        """
+        return redeem_coupon(coupon, reference_type, reference_id, user)
+
+    @staticmethod
+    def use_coupons(coupons, reference_type='', reference_id=None, user=None):
+        """
+        Count one use of each coupon of a cart, all or none.
+        Returns the coupons that had reached their usage limit.
+        """
+        return redeem_coupons(coupons, reference_type, reference_id, user)
+
+    @staticmethod
+    def release_coupon(coupon, reference_type, reference_id, user=None):
         """
-        Increment usage count.
+        Give back the use counted for a reference, e.g. when a sale is voided.
         """
-        coupon.used_count += 1
-        coupon.save()
+        return release_coupon(coupon, reference_type, reference_id, user)
 
 
 class BarcodeService:
@@ -1,6 +1,8 @@
-from django.db.models.signals import post_save
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
-from .models import Product
+from .models import PriceList, PriceListItem, PricingTier, Product
+from .pricing import invalidate as invalidate_price_books
 from PIL import Image
 import os
 from io import BytesIO
@@ -28,3 +30,17 @@ def create_thumbnail(sender, instance, **kwargs):
         
         instance.thumbnail.save(thumb_name, ContentFile(thumb_io.getvalue()), save=False)
         instance.save(update_fields=['thumbnail'])
+
+
+@receiver(post_save, sender=PriceList)
+@receiver(post_delete, sender=PriceList)
+@receiver(post_save, sender=PriceListItem)
+@receiver(post_delete, sender=PriceListItem)
+@receiver(post_save, sender=PricingTier)
+@receiver(post_delete, sender=PricingTier)
+def invalidate_compiled_prices(sender, instance, **kwargs):
+    """Recompile the tenant's price books in every worker after a pricing change"""
+    tenant_id = instance.tenant_id
+    invalidate_price_books(tenant_id)
+    # Again after commit, in case a worker recompiled from the pre-commit rows
+    transaction.on_commit(lambda: invalidate_price_books(tenant_id))
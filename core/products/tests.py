@@ -1,3 +1,161 @@
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
+
+from django.core.cache import cache, caches
 from django.test import TestCase
+from django.utils import timezone
+
+from accounts.models import Account
+from products import pricing
+from products.models import Coupon, CouponRedemption, PriceList, PriceListItem, PricingTier, Product
+from products.services import PricingService, PromotionService
+from tenants.models import Tenant
+
+
+class PriceBookTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        pricing._books.clear()
+        self.tenant = Tenant.objects.create(name="Pricing Tenant", slug="pricing-tenant")
+        self.widget = Product.objects.create(
+            product_name="Widget", sku="PB-1", base_price=Decimal("100.00"), tenant=self.tenant
+        )
+        self.gadget = Product.objects.create(
+            product_name="Gadget", sku="PB-2", base_price=Decimal("50.00"), tenant=self.tenant
+        )
+        PricingTier.objects.create(
+            product=self.widget, min_quantity=10, max_quantity=49, unit_price=Decimal("90.00"), tenant=self.tenant
+        )
+        PricingTier.objects.create(
+            product=self.widget, min_quantity=50, max_quantity=99, unit_price=Decimal("0"),
+            discount_percent=20.0, tenant=self.tenant
+        )
+        self.wholesale = PriceList.objects.create(name="Wholesale", tenant=self.tenant)
+        PriceListItem.objects.create(
+            price_list=self.wholesale, product=self.gadget, price=Decimal("45.00"), tenant=self.tenant
+        )
+        PriceListItem.objects.create(
+            price_list=self.wholesale, product=self.gadget, price=Decimal("40.00"), min_quantity=20, tenant=self.tenant
+        )
+        self.retail = Account.objects.create(account_name="Retail Co", tenant=self.tenant)
+        self.trade = Account.objects.create(account_name="Trade Co", price_list=self.wholesale, tenant=self.tenant)
+
+    def test_price_precedence(self):
+        cases = [
+            (self.widget, self.retail, 1, Decimal("100.00")),
+            (self.widget, self.retail, 10, Decimal("90.00")),
+            (self.widget, self.retail, 60, Decimal("80.00")),
+            (self.widget, self.retail, 100, Decimal("100.00")),  # Beyond the top tier's max
+            (self.gadget, self.retail, 25, Decimal("50.00")),
+            (self.gadget, self.trade, 1, Decimal("45.00")),
+            (self.gadget, self.trade, 20, Decimal("40.00")),
+            (self.widget, self.trade, 10, Decimal("90.00")),  # Not on the list: tiers apply
+        ]
+        for product, account, quantity, expected in cases:
+            with self.subTest(product=product.sku, account=account.account_name, quantity=quantity):
+                self.assertEqual(PricingService.get_price(product, account, quantity), expected)
+
+    def test_basket_is_priced_from_a_warm_book_without_queries(self):
+        PricingService.get_price(self.gadget, self.trade, 1)
+
+        with self.assertNumQueries(0):
+            lines = PricingService.price_lines([(self.widget, 12), (self.gadget, 30)], account=self.trade)
+
+        self.assertEqual([line['unit_price'] for line in lines], [Decimal("90.00"), Decimal("40.00")])
+        self.assertEqual([line['line_total'] for line in lines], [Decimal("1080.00"), Decimal("1200.00")])
+
+    def test_pricing_changes_recompile_the_book(self):
+        self.assertEqual(PricingService.get_price(self.gadget, self.trade, 1), Decimal("45.00"))
+
+        self.wholesale.is_active = False
+        self.wholesale.save()
+        self.assertEqual(PricingService.get_price(self.gadget, self.trade, 1), Decimal("50.00"))
+
+        PricingTier.objects.create(product=self.gadget, min_quantity=1, unit_price=Decimal("48.00"), tenant=self.tenant)
+        self.assertEqual(PricingService.get_price(self.gadget, self.trade, 1), Decimal("48.00"))
+
+    def test_change_in_another_worker_recompiles_the_book(self):
+        self.assertEqual(PricingService.get_price(self.gadget, self.trade, 1), Decimal("45.00"))
+
+        # A second client stands in for another worker sharing the cache
+        other_worker = caches.create_connection('default')
+        with mock.patch('core.cache_versions.cache', other_worker):
+            PricingTier.objects.create(
+                product=self.gadget, min_quantity=1, unit_price=Decimal("48.00"), tenant=self.tenant
+            )
+        self.assertEqual(PricingService.get_price(self.gadget, self.retail, 1), Decimal("48.00"))
+
+    def test_old_books_are_rebuilt_without_a_bump(self):
+        self.assertEqual(PricingService.get_price(self.gadget, self.retail, 1), Decimal("50.00"))
+        # Bypasses signals; only the age bound sees it
+        PricingTier.objects.bulk_create([
+            PricingTier(product=self.gadget, min_quantity=1, unit_price=Decimal("48.00"), tenant=self.tenant)
+        ])
+        self.assertEqual(PricingService.get_price(self.gadget, self.retail, 1), Decimal("50.00"))
+
+        with mock.patch.object(pricing._books, 'max_age', 0):
+            self.assertEqual(PricingService.get_price(self.gadget, self.retail, 1), Decimal("48.00"))
+
+
+class CouponRedemptionTests(TestCase):
+    def setUp(self):
+        self.tenant = Tenant.objects.create(name="Coupon Tenant", slug="coupon-tenant")
+        now = timezone.now()
+        self.limited = Coupon.objects.create(
+            code="FLASH", discount_type="fixed", discount_value=Decimal("5.00"),
+            start_date=now - timedelta(days=1), end_date=now + timedelta(days=1),
+            usage_limit=2, tenant=self.tenant
+        )
+        self.open = Coupon.objects.create(
+            code="WELCOME", discount_type="percentage", discount_value=Decimal("10.00"),
+            min_purchase_amount=Decimal("50.00"),
+            start_date=now - timedelta(days=1), end_date=now + timedelta(days=1), tenant=self.tenant
+        )
+
+    def test_usage_limit_is_enforced_by_the_update(self):
+        # Stale copies all look under the limit; only two uses are counted
+        stale = [Coupon.objects.get(pk=self.limited.pk) for _ in range(3)]
+        results = [PromotionService.use_coupon(coupon) for coupon in stale]
+
+        self.assertEqual(results, [True, True, False])
+        self.limited.refresh_from_db()
+        self.assertEqual(self.limited.used_count, 2)
+        self.assertEqual(self.limited.redemptions.filter(kind='redeem').count(), 2)
+
+    def test_same_reference_counts_once_and_releases_once(self):
+        for _ in range(2):
+            self.assertTrue(PromotionService.use_coupon(self.limited, 'pos_transaction', 7))
+        self.limited.refresh_from_db()
+        self.assertEqual(self.limited.used_count, 1)
+
+        self.assertTrue(PromotionService.release_coupon(self.limited, 'pos_transaction', 7))
+        self.assertFalse(PromotionService.release_coupon(self.limited, 'pos_transaction', 7))
+        self.limited.refresh_from_db()
+        self.assertEqual(self.limited.used_count, 0)
+        self.assertEqual(
+            list(CouponRedemption.objects.order_by('pk').values_list('kind', flat=True)), ['redeem', 'release']
+        )
+
+    def test_cart_coupons_are_used_all_or_none(self):
+        self.limited.used_count = 2
+        self.limited.save()
+
+        exhausted = PromotionService.use_coupons([self.open, self.limited], 'pos_transaction', 8)
+
+        self.assertEqual(exhausted, [self.limited])
+        self.open.refresh_from_db()
+        self.assertEqual(self.open.used_count, 0)
+        self.assertFalse(CouponRedemption.objects.exists())
+
+    def test_cart_codes_are_validated_in_one_query(self):
+        with self.assertNumQueries(1):
+            results = PromotionService.validate_coupons(
+                ["WELCOME", "FLASH", "NOPE"], self.tenant, cart_total=Decimal("40.00")
+            )
 
-# Create your tests here.
+        self.assertEqual(list(results), ["WELCOME", "FLASH", "NOPE"])
+        self.assertFalse(results["WELCOME"][0])
+        self.assertIn("Minimum purchase", results["WELCOME"][1])
+        self.assertEqual(results["FLASH"], (True, "Coupon applied successfully.", self.limited))
+        self.assertEqual(results["NOPE"], (False, "Invalid coupon code.", None))
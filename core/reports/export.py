@@ -0,0 +1,242 @@
+"""
+Streaming Report Export
+
+Writes report exports without materialising the result set:
+- Only the requested columns are selected (values_list), so related paths
+  such as 'account__name' become joins instead of per-row lazy loads
+- Rows are read in chunks of REPORT_EXPORT_CHUNK_SIZE (server-side cursors
+  on PostgreSQL)
+- CSV is streamed to the client while rows are still being read
+- XLSX is written through openpyxl's write-only (constant memory) worksheet
+- PDF pages are drawn one at a time on a canvas
+
+Columns that are not database fields (model properties or methods) fall
+back to iterating model instances with their forward relations joined in.
+
+Usage:
+    from reports.export import export_csv
+
+    response = export_csv(queryset, ['account__name', 'amount'])
+"""
+import csv
+import logging
+import tempfile
+from datetime import datetime
+from decimal import Decimal
+from itertools import chain, islice
+from typing import Any, Callable, Iterable, Iterator, List, Optional, Sequence
+
+from django.conf import settings
+from django.core.files import File
+from django.http import FileResponse, StreamingHttpResponse
+from django.utils import timezone
+
+from .query_plan import analyze_columns
+
+logger = logging.getLogger(__name__)
+
+XLSX_CONTENT_TYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+
+def column_headers(fields: Sequence[str]) -> List[str]:
+    return [field.replace('__', ' ').replace('_', ' ').title() for field in fields]
+
+
+def export_filename(extension: str) -> str:
+    return f"report_{timezone.now().strftime('%Y%m%d_%H%M%S')}.{extension}"
+
+
+def _chunk_size() -> int:
+    return getattr(settings, 'REPORT_EXPORT_CHUNK_SIZE', 2000)
+
+
+def _attribute_getter(field: str) -> Callable[[Any], Any]:
+    """Resolve a field on a model instance, following '__' through attributes."""
+    parts = field.split('__')
+
+    def get(obj):
+        if hasattr(obj, field):
+            value = getattr(obj, field)
+        elif len(parts) > 1:
+            try:
+                value = obj
+                for part in parts:
+                    value = getattr(value, part)
+            except (AttributeError, TypeError):
+                return None
+        else:
+            return None
+        return value() if callable(value) else value
+
+    return get
+
+
+def iter_rows(queryset, fields: Sequence[str], limit: Optional[int] = None) -> Iterator[Sequence[Any]]:
+    """
+    Yield one tuple of raw values per row, reading the queryset in chunks.
+    """
+    if limit is not None:
+        queryset = queryset[:limit]
+
+    columns = analyze_columns(queryset.model, tuple(fields), frozenset(queryset.query.annotations))
+    if columns.projectable:
+        rows = queryset.prefetch_related(None).values_list(*fields)
+        yield from rows.iterator(chunk_size=_chunk_size())
+        return
+
+    if columns.select_related:
+        queryset = queryset.select_related(*columns.select_related)
+    getters = [_attribute_getter(field) for field in fields]
+    for obj in queryset.iterator(chunk_size=_chunk_size()):
+        yield tuple(get(obj) for get in getters)
+
+
+def _started(rows: Iterator[Sequence[Any]]) -> Iterator[Sequence[Any]]:
+    """Run the query now, so database errors surface before the response is returned."""
+    first = list(islice(rows, 1))
+    return chain(first, rows)
+
+
+def _text(value: Any) -> str:
+    return '' if value is None else str(value)
+
+
+class _Echo:
+    """File-like object whose write() returns what it was given."""
+
+    def write(self, value):
+        return value
+
+
+def iter_csv(rows: Iterable[Sequence[Any]], fields: Sequence[str]) -> Iterator[str]:
+    """Yield CSV text in blocks of REPORT_EXPORT_CHUNK_SIZE rows."""
+    writer = csv.writer(_Echo())
+    yield writer.writerow(column_headers(fields))
+
+    rows = iter(rows)
+    while True:
+        block = [writer.writerow([_text(value) for value in row]) for row in islice(rows, _chunk_size())]
+        if not block:
+            break
+        yield ''.join(block)
+
+
+def export_csv(queryset, fields: Sequence[str]) -> StreamingHttpResponse:
+    """Stream a CSV export."""
+    rows = _started(iter_rows(queryset, fields))
+    response = StreamingHttpResponse(iter_csv(rows, fields), content_type='text/csv')
+    response['Content-Disposition'] = f'attachment; filename="{export_filename("csv")}"'
+    return response
+
+
+def _xlsx_value(value: Any) -> Any:
+    if value is None:
+        return ''
+    if isinstance(value, datetime):
+        # Excel has no time zones
+        return timezone.make_naive(value) if timezone.is_aware(value) else value
+    if isinstance(value, (str, int, float, Decimal, bool)) or hasattr(value, 'isoformat'):
+        return value
+    return str(value)
+
+
+def export_xlsx(queryset, fields: Sequence[str]) -> FileResponse:
+    """
+    Write an XLSX export in write-only mode to a temporary file and stream it.
+
+    Raises ImportError if openpyxl is not installed.
+    """
+    import openpyxl
+    from openpyxl.utils import get_column_letter
+
+    rows = _started(iter_rows(queryset, fields))
+
+    workbook = openpyxl.Workbook(write_only=True)
+    sheet = workbook.create_sheet("Report")
+    for column in range(1, len(fields) + 1):
+        sheet.column_dimensions[get_column_letter(column)].width = 20
+    sheet.append(column_headers(fields))
+    for row in rows:
+        sheet.append([_xlsx_value(value) for value in row])
+
+    handle = tempfile.TemporaryFile()
+    workbook.save(handle)
+    handle.seek(0)
+    return FileResponse(handle, as_attachment=True, filename=export_filename('xlsx'),
+                        content_type=XLSX_CONTENT_TYPE)
+
+
+def export_pdf(queryset, fields: Sequence[str]) -> FileResponse:
+    """
+    Draw a PDF export page by page to a temporary file and stream it.
+
+    At most REPORT_PDF_MAX_ROWS rows are included. Raises ImportError if
+    reportlab is not installed.
+    """
+    from reportlab.lib import colors
+    from reportlab.lib.pagesizes import A4
+    from reportlab.pdfgen import canvas
+
+    rows = _started(iter_rows(queryset, fields, limit=getattr(settings, 'REPORT_PDF_MAX_ROWS', 1000)))
+
+    handle = tempfile.TemporaryFile()
+    pdf = canvas.Canvas(handle, pagesize=A4)
+    page_width, page_height = A4
+    margin, row_height = 36, 16
+    column_width = (page_width - 2 * margin) / max(len(fields), 1)
+    max_chars = max(int(column_width / 5), 4)
+    headers = column_headers(fields)
+    title = f"SalesCompass Report - {timezone.now().strftime('%Y-%m-%d %H:%M')}"
+
+    def draw_row(values, y, header=False):
+        if header:
+            pdf.setFillColor(colors.grey)
+            pdf.rect(margin, y - 4, page_width - 2 * margin, row_height, fill=1, stroke=0)
+            pdf.setFillColor(colors.whitesmoke)
+            pdf.setFont('Helvetica-Bold', 9)
+        else:
+            pdf.setFillColor(colors.black)
+            pdf.setFont('Helvetica', 8)
+        for column, value in enumerate(values):
+            text = _text(value)
+            if len(text) > max_chars:
+                text = text[:max_chars - 1] + '…'
+            pdf.drawString(margin + column * column_width + 2, y, text)
+
+    def start_page(page_number):
+        y = page_height - margin
+        if page_number == 1:
+            pdf.setFont('Helvetica-Bold', 14)
+            pdf.drawString(margin, y, title)
+            y -= 2 * row_height
+        draw_row(headers, y, header=True)
+        pdf.setFont('Helvetica', 7)
+        pdf.setFillColor(colors.black)
+        pdf.drawRightString(page_width - margin, margin / 2, f"Page {page_number}")
+        return y - row_height
+
+    page_number = 1
+    y = start_page(page_number)
+    for row in rows:
+        if y < margin:
+            pdf.showPage()
+            page_number += 1
+            y = start_page(page_number)
+        draw_row(row, y)
+        y -= row_height
+    pdf.showPage()
+    pdf.save()
+
+    handle.seek(0)
+    return FileResponse(handle, as_attachment=True, filename=export_filename('pdf'),
+                        content_type='application/pdf')
+
+
+def save_response(file_field, name: str, response) -> None:
+    """Save a (possibly streaming) export response to a FileField without buffering it in memory."""
+    with tempfile.TemporaryFile() as handle:
+        for chunk in response:
+            handle.write(chunk)
+        response.close()
+        handle.seek(0)
+        file_field.save(name, File(handle, name=name))
@@ -0,0 +1,46 @@
+# Generated by Django 5.2.18 on 2026-10-16 22:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reports', '0002_initial'),
+        ('tenants', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reportexport',
+            name='config_hash',
+            field=models.CharField(blank=True, help_text='Hash of the query_config the export was generated from', max_length=40),
+        ),
+        migrations.AddField(
+            model_name='reportexport',
+            name='data_watermark',
+            field=models.CharField(blank=True, help_text="Data watermark of the report's source rows when exported", max_length=64),
+        ),
+        migrations.AddIndex(
+            model_name='reportexport',
+            index=models.Index(fields=['report', 'export_format', 'config_hash', 'data_watermark'], name='reports_export_reuse_idx'),
+        ),
+        migrations.CreateModel(
+            name='ReportResultSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('config_hash', models.CharField(help_text='Hash of the query_config the result was computed from', max_length=40)),
+                ('data_updated_at', models.DateTimeField(blank=True, help_text='Latest updated_at of the source rows when computed', null=True)),
+                ('data_row_count', models.PositiveIntegerField(default=0, help_text='Number of source rows when computed')),
+                ('result', models.JSONField(default=dict, help_text='Chart data as returned by get_report_data')),
+                ('buckets', models.JSONField(blank=True, default=dict, help_text='Per-period values of time-bucketed reports')),
+                ('computed_at', models.DateTimeField(help_text='When the result was last computed in full')),
+                ('report', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='result_snapshots', to='reports.report')),
+                ('tenant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='%(class)ss', to='tenants.tenant')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('tenant', 'config_hash'), name='unique_report_result_snapshot')],
+            },
+        ),
+    ]
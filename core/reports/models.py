@@ -370,6 +370,13 @@ class ReportExport(TenantModel):
     error_message = models.TextField(blank=True)
     export_created_at = models.DateTimeField(auto_now_add=True)  # Renamed from 'created_at' to avoid conflict with base class
     completed_at = models.DateTimeField(null=True, blank=True)
+    config_hash = models.CharField(max_length=40, blank=True, help_text="Hash of the query_config the export was generated from")
+    data_watermark = models.CharField(max_length=64, blank=True, help_text="Data watermark of the report's source rows when exported")
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['report', 'export_format', 'config_hash', 'data_watermark'], name='reports_export_reuse_idx'),
+        ]
 
     def __str__(self):
         return f"{self.report.report_name} - {self.export_format}"
@@ -501,6 +508,28 @@ class ReportSnapshot(TenantModel):
         return f"Snapshot of {self.report.report_name} on {self.snapshot_date}"
 
 
+class ReportResultSnapshot(TenantModel):
+    """
+    Materialised get_report_data result for one query_config and tenant,
+    valid while the source rows are unchanged (see reports.snapshots).
+    """
+    report = models.ForeignKey(Report, on_delete=models.CASCADE, null=True, blank=True, related_name='result_snapshots')
+    config_hash = models.CharField(max_length=40, help_text="Hash of the query_config the result was computed from")
+    data_updated_at = models.DateTimeField(null=True, blank=True, help_text="Latest updated_at of the source rows when computed")
+    data_row_count = models.PositiveIntegerField(default=0, help_text="Number of source rows when computed")
+    result = models.JSONField(default=dict, help_text="Chart data as returned by get_report_data")
+    buckets = models.JSONField(default=dict, blank=True, help_text="Per-period values of time-bucketed reports")
+    computed_at = models.DateTimeField(help_text="When the result was last computed in full")
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['tenant', 'config_hash'], name='unique_report_result_snapshot'),
+        ]
+
+    def __str__(self):
+        return f"Result snapshot {self.config_hash[:8]} computed {self.computed_at}"
+
+
 class ReportSubscription(TenantModel):
     report = models.ForeignKey(Report, on_delete=models.CASCADE, related_name='subscriptions')
     user = models.ForeignKey('core.User', on_delete=models.CASCADE, related_name='report_subscriptions')
@@ -0,0 +1,209 @@
+"""
+Report Pivot Engine
+
+Builds the crosstab for pivot charts from a PivotSpec (see
+reports.query_plan.compile_pivot):
+- Rows and columns may be several fields deep (e.g. territory x stage on
+  rows, close_date__month on columns); date suffixes are truncated in SQL
+- count, sum and avg measures. Cells carry (total, count) so buckets can
+  be merged and averages stay exact
+- When the distinct column keys fit within REPORT_PIVOT_SQL_MAX_COLUMNS,
+  each column becomes a conditional aggregate and the database returns one
+  row per pivot row. Otherwise the grouped rows x columns result is read
+  once into a dict index
+- top_rows / top_cols keep the largest keys and fold the rest into an
+  'Other' bucket
+
+Usage:
+    from reports.pivot import build_pivot
+
+    data = build_pivot(queryset, plan.pivot)
+"""
+from datetime import date
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from django.conf import settings
+from django.db.models import Count, Q, Sum
+
+from .query_plan import DATE_TRUNCATIONS, PivotSpec
+
+OTHER_KEY = ('Other',)
+TOTAL = 'pivot_total'
+COUNT = 'pivot_count'
+
+Key = Tuple[Any, ...]
+Cells = Dict[Key, Dict[Key, List[Any]]]
+
+
+def _sql_max_columns() -> int:
+    return getattr(settings, 'REPORT_PIVOT_SQL_MAX_COLUMNS', 24)
+
+
+def _group_fields(queryset, spec: PivotSpec):
+    """Annotate truncated date fields and return the value names for rows and columns."""
+    names = []
+    for position, field in enumerate(spec.rows + spec.cols):
+        for suffix, truncate in DATE_TRUNCATIONS:
+            if field.endswith(suffix):
+                alias = f'pivot_{position}'
+                queryset = queryset.annotate(**{alias: truncate(field[:-len(suffix)])})
+                names.append(alias)
+                break
+        else:
+            names.append(field)
+    return queryset.order_by(), tuple(names[:len(spec.rows)]), tuple(names[len(spec.rows):])
+
+
+def _aggregates(spec: PivotSpec, condition: Optional[Q] = None):
+    """The (total, count) aggregates for one cell."""
+    if spec.measure_field:
+        return Sum(spec.measure_field, filter=condition), Count(spec.measure_field, filter=condition)
+    return Count('id', filter=condition), None
+
+
+def _is_key(key: Key) -> bool:
+    return all(part is not None and part != '' for part in key)
+
+
+def _add(cell: List[Any], total: Any, count: Any) -> None:
+    cell[0] += total or 0
+    cell[1] += count or 0
+
+
+def _python_cells(queryset, spec: PivotSpec, row_names, col_names) -> Cells:
+    """One grouped query over rows x columns, indexed in a single pass."""
+    total, count = _aggregates(spec)
+    annotations = {TOTAL: total}
+    if count is not None:
+        annotations[COUNT] = count
+
+    cells: Cells = {}
+    for item in queryset.values(*row_names, *col_names).annotate(**annotations).iterator():
+        row_key = tuple(item[name] for name in row_names)
+        col_key = tuple(item[name] for name in col_names)
+        if not (_is_key(row_key) and _is_key(col_key)):
+            continue
+        cell = cells.setdefault(row_key, {}).setdefault(col_key, [0, 0])
+        _add(cell, item[TOTAL], item.get(COUNT, item[TOTAL]))
+    return cells
+
+
+def _column_keys(queryset, col_names, limit: int) -> Optional[List[Key]]:
+    """Distinct column keys, or None if there are more than ``limit``."""
+    if limit <= 0:
+        return None
+    items = list(queryset.values(*col_names).distinct()[:limit + 1])
+    if len(items) > limit:
+        return None
+    keys = (tuple(item[name] for name in col_names) for item in items)
+    return [key for key in keys if _is_key(key)]
+
+
+def _sql_cells(queryset, spec: PivotSpec, row_names, col_names, col_keys: List[Key]) -> Cells:
+    """Conditional aggregation: one result row per pivot row, one aggregate per column key."""
+    annotations = {}
+    for position, key in enumerate(col_keys):
+        total, count = _aggregates(spec, Q(**dict(zip(col_names, key))))
+        annotations[f'{TOTAL}_{position}'] = total
+        if count is not None:
+            annotations[f'{COUNT}_{position}'] = count
+
+    cells: Cells = {}
+    for item in queryset.values(*row_names).annotate(**annotations).iterator():
+        row_key = tuple(item[name] for name in row_names)
+        if not _is_key(row_key):
+            continue
+        row = cells.setdefault(row_key, {})
+        for position, col_key in enumerate(col_keys):
+            total = item[f'{TOTAL}_{position}']
+            count = item.get(f'{COUNT}_{position}', total)
+            if count:
+                _add(row.setdefault(col_key, [0, 0]), total, count)
+    return cells
+
+
+def _sorted(keys: Iterable[Key]) -> List[Key]:
+    keys = list(keys)
+    try:
+        return sorted(keys)
+    except TypeError:
+        return sorted(keys, key=lambda key: tuple(str(part) for part in key))
+
+
+def _top(weights: Dict[Key, Any], limit: Optional[int]) -> Tuple[List[Key], bool]:
+    """The keys to keep in natural order, and whether any were folded into 'Other'."""
+    if not limit or len(weights) <= limit:
+        return _sorted(weights), False
+    largest = sorted(weights, key=lambda key: weights[key], reverse=True)[:limit]
+    return _sorted(largest), True
+
+
+def _fold(cells: Cells, spec: PivotSpec):
+    """Apply top-N truncation, merging the remaining keys into OTHER_KEY."""
+    # Averages rank by how many values they cover, sums and counts by size
+    weight = 1 if spec.measure == 'avg' else 0
+    row_weights: Dict[Key, Any] = {}
+    col_weights: Dict[Key, Any] = {}
+    for row_key, row in cells.items():
+        for col_key, cell in row.items():
+            row_weights[row_key] = row_weights.get(row_key, 0) + cell[weight]
+            col_weights[col_key] = col_weights.get(col_key, 0) + cell[weight]
+
+    row_order, rows_folded = _top(row_weights, spec.top_rows)
+    col_order, cols_folded = _top(col_weights, spec.top_cols)
+    if not (rows_folded or cols_folded):
+        return cells, row_order, col_order
+
+    kept_rows, kept_cols = set(row_order), set(col_order)
+    folded: Cells = {}
+    for row_key, row in cells.items():
+        target_row = folded.setdefault(row_key if row_key in kept_rows else OTHER_KEY, {})
+        for col_key, cell in row.items():
+            _add(target_row.setdefault(col_key if col_key in kept_cols else OTHER_KEY, [0, 0]), *cell)
+    return (
+        folded,
+        row_order + [OTHER_KEY] if rows_folded else row_order,
+        col_order + [OTHER_KEY] if cols_folded else col_order,
+    )
+
+
+def _label(key: Key) -> str:
+    return ' / '.join(part.strftime('%Y-%m-%d') if isinstance(part, date) else str(part) for part in key)
+
+
+def _value(cell: Optional[List[Any]], spec: PivotSpec):
+    if not cell:
+        return 0
+    total, count = cell
+    if spec.measure == 'count':
+        return total
+    if spec.measure == 'avg':
+        return float(total) / count if count else 0
+    return float(total)
+
+
+def build_pivot(queryset, spec: PivotSpec) -> Dict[str, Any]:
+    """
+    Build the pivot matrix for ``queryset``.
+    Returns: { 'labels': [column labels], 'datasets': [{ 'label': row, 'data': [...] }], 'is_pivot': True }
+    """
+    queryset, row_names, col_names = _group_fields(queryset, spec)
+
+    col_keys = _column_keys(queryset, col_names, _sql_max_columns())
+    if col_keys is not None:
+        cells = _sql_cells(queryset, spec, row_names, col_names, col_keys)
+    else:
+        cells = _python_cells(queryset, spec, row_names, col_names)
+
+    cells, row_order, col_order = _fold(cells, spec)
+    return {
+        'labels': [_label(key) for key in col_order],
+        'datasets': [
+            {
+                'label': _label(row_key),
+                'data': [_value(cells[row_key].get(col_key), spec) for col_key in col_order],
+            }
+            for row_key in row_order
+        ],
+        'is_pivot': True,
+    }
@@ -0,0 +1,352 @@
+"""
+Compiled Report Query Plans
+
+Parses a report's query_config once into an immutable plan that
+generate_report and get_report_data apply to a queryset:
+- Formulas parsed with the ``ast`` module into F() arithmetic. Only
+  numbers, field names, + - * / and parentheses are accepted, so unsafe
+  expressions are rejected by structure rather than handed to eval
+- Formula field references checked against the model when compiling
+- Filters turned into the lookups for each filter() call, joins into
+  select_related / prefetch_related lists
+- group_by split into a field and a date truncation, the measure into an
+  aggregate, sort_by into an ordering
+- pivot_config normalised into a PivotSpec for reports.pivot
+- Export columns analysed once: projectable through values_list, or which
+  relations to join when model instances are needed
+
+Plans are cached per process under a hash of the canonical config, so a
+saved report rendered repeatedly is only parsed once. The request's
+tenant_id is not part of the plan; it is applied when the plan is used.
+
+Usage:
+    from reports.query_plan import get_query_plan
+
+    plan = get_query_plan(Opportunity, report.query_config)
+    queryset = plan.apply(Opportunity.objects.all())
+"""
+import ast
+import hashlib
+import json
+import logging
+import operator
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, Dict, FrozenSet, NamedTuple, Optional, Sequence, Tuple
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Avg, Count, ExpressionWrapper, F, FloatField, Sum, Value
+from django.db.models.functions import TruncDay, TruncMonth, TruncYear
+
+logger = logging.getLogger(__name__)
+
+MAX_PLANS = 512
+
+ENTITY_MODELS = {
+    'account': 'accounts.Account',
+    'opportunity': 'opportunities.Opportunity',
+    'lead': 'leads.Lead',
+    'case': 'cases.Case',
+    'task': 'tasks.Task',
+}
+
+FORMULA_OPERATORS = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: operator.mul,
+    ast.Div: operator.truediv,
+}
+
+DATE_TRUNCATIONS = (
+    ('__month', TruncMonth),
+    ('__year', TruncYear),
+    ('__day', TruncDay),
+)
+
+MEASURES = {
+    'sum': Sum,
+    'avg': Avg,
+}
+
+GEO_FIELDS = frozenset(['billing_country', 'territory', 'shipping_country', 'billing_state', 'shipping_state'])
+
+
+class FormulaError(ValueError):
+    """A formula expression that cannot be compiled."""
+
+
+def field_path_exists(model, path: str) -> bool:
+    """True if a '__' separated path names a field, following relations."""
+    for part in path.split('__'):
+        if model is None:
+            return False
+        try:
+            field = model._meta.get_field(part)
+        except FieldDoesNotExist:
+            return False
+        model = field.related_model if field.is_relation else None
+    return True
+
+
+def parse_formula(expression: str, model=None, names: FrozenSet[str] = frozenset()):
+    """
+    Compile a formula such as ``amount * probability / 100`` into a query
+    expression. Identifiers must be fields of ``model`` (when given) or
+    earlier formula ``names``.
+    """
+    try:
+        tree = ast.parse(str(expression).strip(), mode='eval')
+    except SyntaxError as e:
+        raise FormulaError(f"Invalid formula {expression!r}: {e.msg}")
+
+    def compile_node(node):
+        if isinstance(node, ast.BinOp) and type(node.op) in FORMULA_OPERATORS:
+            try:
+                return FORMULA_OPERATORS[type(node.op)](compile_node(node.left), compile_node(node.right))
+            except ArithmeticError as e:
+                raise FormulaError(f"Invalid formula {expression!r}: {e}")
+        if isinstance(node, ast.UnaryOp) and isinstance(node.op, (ast.UAdd, ast.USub)):
+            operand = compile_node(node.operand)
+            return -operand if isinstance(node.op, ast.USub) else operand
+        if isinstance(node, ast.Constant) and type(node.value) in (int, float):
+            return node.value
+        if isinstance(node, ast.Name):
+            if model is not None and node.id not in names and not field_path_exists(model, node.id):
+                raise FormulaError(f"Unknown field {node.id!r} in formula {expression!r}")
+            return F(node.id)
+        raise FormulaError(f"Unsupported {type(node).__name__} in formula {expression!r}")
+
+    compiled = compile_node(tree.body)
+    if isinstance(compiled, (int, float)):
+        compiled = Value(compiled)
+    return ExpressionWrapper(compiled, output_field=FloatField())
+
+
+def compile_filters(filters: Any) -> Tuple[Dict[str, Any], ...]:
+    """
+    Turn query_config filters (a list of {field, operator, value} or a
+    {field: value} mapping) into the lookups of each filter() call.
+    """
+    steps = []
+    if isinstance(filters, list):
+        for item in filters:
+            field = item.get('field')
+            operator_name = item.get('operator')
+            value = item.get('value')
+            if field and operator_name and value:
+                lookup = f"{field}__{operator_name}" if operator_name != 'exact' else field
+                steps.append({lookup: value})
+    elif isinstance(filters, dict):
+        for field, value in filters.items():
+            if isinstance(value, list):
+                steps.append({f"{field}__in": tuple(value)})
+            elif isinstance(value, dict):
+                for op, val in value.items():
+                    lookup = f"{field}{op}" if op.startswith('__') else f"{field}__{op}"
+                    steps.append({lookup: val})
+            else:
+                steps.append({field: value})
+    return tuple(steps)
+
+
+class PivotSpec(NamedTuple):
+    """
+    A normalised pivot_config. ``rows`` and ``cols`` are field paths, each
+    optionally suffixed with __month / __year / __day.
+    """
+    rows: Tuple[str, ...]
+    cols: Tuple[str, ...]
+    measure: str
+    measure_field: Optional[str]
+    top_rows: Optional[int]
+    top_cols: Optional[int]
+
+
+def _pivot_fields(value: Any) -> Tuple[str, ...]:
+    if isinstance(value, str):
+        value = [value]
+    if not isinstance(value, (list, tuple)):
+        return ()
+    return tuple(field for field in value if isinstance(field, str) and field)
+
+
+def _positive_int(value: Any) -> Optional[int]:
+    try:
+        value = int(value)
+    except (TypeError, ValueError):
+        return None
+    return value if value > 0 else None
+
+
+def compile_pivot(config: Dict[str, Any]) -> Optional[PivotSpec]:
+    """Normalise pivot_config; None unless the chart is a pivot with rows and cols."""
+    pivot = config.get('pivot_config') or {}
+    if config.get('chart_type') != 'pivot' or not isinstance(pivot, dict):
+        return None
+    rows = _pivot_fields(pivot.get('rows'))
+    cols = _pivot_fields(pivot.get('cols'))
+    if not (rows and cols):
+        return None
+
+    measure = pivot.get('measure') or config.get('measure') or 'count'
+    measure_field = pivot.get('measure_field') or config.get('measure_field')
+    if measure not in MEASURES or not measure_field:
+        measure, measure_field = 'count', None
+    return PivotSpec(
+        rows=rows,
+        cols=cols,
+        measure=measure,
+        measure_field=measure_field,
+        top_rows=_positive_int(pivot.get('top_rows')),
+        top_cols=_positive_int(pivot.get('top_cols')),
+    )
+
+
+class ColumnPlan(NamedTuple):
+    """How export columns are read: projected with values_list, or from instances."""
+    projectable: bool
+    select_related: Tuple[str, ...]
+
+
+def _is_column(model, field: str, annotations: FrozenSet[str]) -> bool:
+    """True if ``field`` is an annotation or a concrete column reached through forward relations."""
+    if field in annotations:
+        return True
+    parts = field.split('__')
+    for position, part in enumerate(parts):
+        try:
+            model_field = model._meta.get_field(part)
+        except FieldDoesNotExist:
+            return False
+        if position == len(parts) - 1:
+            # A trailing relation would export its key rather than str(related object)
+            return model_field.concrete and not model_field.is_relation
+        if not (model_field.concrete and (model_field.many_to_one or model_field.one_to_one)):
+            return False
+        model = model_field.related_model
+    return False
+
+
+@lru_cache(maxsize=MAX_PLANS)
+def analyze_columns(model, fields: Tuple[str, ...], annotations: FrozenSet[str] = frozenset()) -> ColumnPlan:
+    """Analyse export columns once per model, field list and annotation set."""
+    columns = [_is_column(model, field, annotations) for field in fields]
+    relations = tuple(sorted({
+        field.rsplit('__', 1)[0]
+        for field, is_column in zip(fields, columns)
+        if is_column and '__' in field and field not in annotations
+    }))
+    return ColumnPlan(projectable=all(columns), select_related=relations)
+
+
+class ReportQueryPlan:
+    """
+    The compiled form of one query_config for one model.
+    """
+
+    def __init__(self, model, config: Dict[str, Any], config_hash: str):
+        self.model = model
+        self.config_hash = config_hash
+        self.chart_type = config.get('chart_type', 'bar')
+
+        self.select_related = tuple(
+            join for join in config.get('joins', []) if isinstance(join, str) and '__' not in join
+        )
+        self.prefetch_related = tuple(
+            join for join in config.get('joins', []) if isinstance(join, str) and '__' in join
+        )
+
+        annotations = []
+        names = set()
+        for formula in config.get('formulas', []):
+            name = formula.get('name')
+            expression = formula.get('expression')
+            if not (name and expression):
+                continue
+            try:
+                if not str(name).isidentifier() or field_path_exists(model, name):
+                    raise FormulaError(f"Invalid formula name {name!r}")
+                annotations.append((name, parse_formula(expression, model, frozenset(names))))
+                names.add(name)
+            except FormulaError as e:
+                logger.warning(f"Skipping report formula: {e}")
+        self.annotations = tuple(annotations)
+        self.annotation_names = frozenset(names)
+
+        self.filters = compile_filters(config.get('filters', []))
+        self.order_by = (config['sort_by'],) if config.get('sort_by') else ()
+
+        # Grouping
+        group_by = config.get('group_by') or None
+        self.group_by = group_by
+        self.truncate = None
+        if group_by:
+            for suffix, truncate in DATE_TRUNCATIONS:
+                if suffix in group_by:
+                    self.group_by = group_by.replace(suffix, '')
+                    self.truncate = truncate
+                    break
+            if self.truncate is None and group_by in GEO_FIELDS:
+                self.chart_type = 'choropleth'
+
+        measure = MEASURES.get(config.get('measure', 'count'))
+        measure_field = config.get('measure_field')
+        self.measure = measure(measure_field) if measure and measure_field else Count('id')
+
+        self.pivot = compile_pivot(config)
+
+    def apply(self, queryset, tenant_id=None):
+        """Apply joins, formulas, filters and ordering to ``queryset``."""
+        if self.select_related:
+            queryset = queryset.select_related(*self.select_related)
+        if self.prefetch_related:
+            queryset = queryset.prefetch_related(*self.prefetch_related)
+        for name, expression in self.annotations:
+            queryset = queryset.annotate(**{name: expression})
+        if tenant_id is not None:
+            queryset = queryset.filter(tenant_id=tenant_id)
+        for lookups in self.filters:
+            queryset = queryset.filter(**lookups)
+        if self.order_by:
+            queryset = queryset.order_by(*self.order_by)
+        return queryset
+
+    def columns(self, fields: Sequence[str]) -> ColumnPlan:
+        return analyze_columns(self.model, tuple(fields), self.annotation_names)
+
+
+def config_hash(query_config: Dict[str, Any]) -> str:
+    """Hash of the canonical config, ignoring the per-request tenant_id."""
+    canonical = json.dumps(
+        {key: value for key, value in query_config.items() if key != 'tenant_id'},
+        sort_keys=True, default=str,
+    )
+    return hashlib.sha1(canonical.encode('utf-8')).hexdigest()
+
+
+_plans: OrderedDict = OrderedDict()
+_plans_lock = threading.Lock()
+
+
+def get_query_plan(model, query_config: Optional[Dict[str, Any]]) -> ReportQueryPlan:
+    """Return the cached plan for a model and config, compiling it on first use."""
+    query_config = query_config or {}
+    key = (model._meta.label_lower, config_hash(query_config))
+    with _plans_lock:
+        plan = _plans.get(key)
+        if plan is not None:
+            _plans.move_to_end(key)
+            return plan
+
+    plan = ReportQueryPlan(model, query_config, key[1])
+    with _plans_lock:
+        _plans[key] = plan
+        while len(_plans) > MAX_PLANS:
+            _plans.popitem(last=False)
+    return plan
+
+
+def clear_query_plans() -> None:
+    with _plans_lock:
+        _plans.clear()
@@ -0,0 +1,244 @@
+"""
+Materialised Report Results
+
+Stores computed report results so that dashboard widgets, public links and
+scheduled reports sharing a report reuse them instead of re-running it:
+- Results are keyed by tenant and query_config hash and record a data
+  watermark: the latest updated_at and the row count of the report's
+  source model for the tenant, read with one aggregate query
+- A stored result is served while the watermark is unchanged and its last
+  full computation is younger than REPORT_SNAPSHOT_MAX_AGE
+- Reports bucketed by an insert-only date (e.g. created_at__month) only
+  recount the buckets holding rows changed since the watermark. Deleted
+  rows force a full recompute
+- Scheduled exports record the watermark, so schedules of the same report
+  and format share one export file while the data is unchanged
+
+The watermark covers the report's primary model only; changes to related
+rows are picked up when the snapshot ages out.
+
+Usage:
+    from reports.snapshots import get_report_snapshot_data
+
+    data = get_report_snapshot_data(report.query_config, report=report)
+"""
+import json
+import logging
+from datetime import datetime, timedelta
+from decimal import Decimal
+from typing import Any, Dict, NamedTuple, Optional
+
+from django.apps import apps
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import IntegrityError, transaction
+from django.db.models import Count, Max
+from django.utils import timezone
+
+from .export import save_response
+from .query_plan import ENTITY_MODELS, config_hash, get_query_plan
+from .utils import build_report_queryset, chart_payload, get_report_data, period_label, time_bucket_counts
+
+logger = logging.getLogger(__name__)
+
+
+class Watermark(NamedTuple):
+    """State of a tenant's source rows: latest updated_at and row count."""
+    updated_at: Optional[datetime]
+    row_count: int
+
+    def __str__(self):
+        stamp = self.updated_at.isoformat() if self.updated_at else ''
+        return f'{stamp}|{self.row_count}'
+
+
+class _ResultEncoder(DjangoJSONEncoder):
+    """Keeps aggregated decimals numeric when results are stored as JSON."""
+
+    def default(self, o):
+        if isinstance(o, Decimal):
+            return float(o)
+        return super().default(o)
+
+
+def _max_age() -> timedelta:
+    return timedelta(seconds=getattr(settings, 'REPORT_SNAPSHOT_MAX_AGE', 3600))
+
+
+def _has_field(model, name: str) -> bool:
+    try:
+        model._meta.get_field(name)
+    except FieldDoesNotExist:
+        return False
+    return True
+
+
+def _entity_model(entity: str):
+    model_path = ENTITY_MODELS.get(entity)
+    if not model_path:
+        return None
+    try:
+        return apps.get_model(*model_path.split('.'))
+    except LookupError:
+        return None
+
+
+def data_watermark(model, tenant_id) -> Optional[Watermark]:
+    """The watermark of ``model`` rows for a tenant, or None if it cannot be tracked."""
+    if tenant_id is None or not (_has_field(model, 'tenant') and _has_field(model, 'updated_at')):
+        return None
+    state = model._default_manager.filter(tenant_id=tenant_id).aggregate(
+        updated_at=Max('updated_at'), row_count=Count('pk')
+    )
+    return Watermark(state['updated_at'], state['row_count'])
+
+
+def report_watermark(report) -> Optional[Watermark]:
+    queryset = build_report_queryset(report.report_type, report.query_config or {})
+    return data_watermark(queryset.model, report.tenant_id)
+
+
+def _is_append_only_bucketing(model, plan) -> bool:
+    """True if rows never move between the plan's date buckets once inserted."""
+    if plan.truncate is None or plan.pivot or '__' in plan.group_by:
+        return False
+    if not (_has_field(model, 'created_at') and _has_field(model, 'updated_at')):
+        return False
+    try:
+        field = model._meta.get_field(plan.group_by)
+    except FieldDoesNotExist:
+        return False
+    return bool(getattr(field, 'auto_now_add', False))
+
+
+def _refresh_buckets(model, plan, entity: str, snapshot, watermark: Watermark):
+    """
+    Recount only the buckets touched since the snapshot's watermark.
+    Returns (result, buckets), or None when a full recompute is needed.
+    """
+    since = snapshot.data_updated_at
+    if since is None:
+        return None
+    rows = model._default_manager.filter(tenant_id=snapshot.tenant_id)
+
+    # Every new row is newer than the watermark, so any other change in the
+    # row count means rows were deleted or inserted with backdated timestamps
+    if watermark.row_count - snapshot.data_row_count != rows.filter(created_at__gt=since).count():
+        return None
+
+    touched = list(
+        rows.filter(updated_at__gte=since)
+        .annotate(period=plan.truncate(plan.group_by))
+        .order_by().values_list('period', flat=True).distinct()
+    )
+    buckets = dict(snapshot.buckets)
+    for period in touched:
+        buckets.pop(period_label(period), None)
+    if touched:
+        queryset = plan.apply(model._default_manager.all(), tenant_id=snapshot.tenant_id)
+        buckets.update(time_bucket_counts(queryset, plan, periods=touched))
+
+    labels = sorted(buckets)
+    return chart_payload(entity, labels, [buckets[label] for label in labels], plan.chart_type), buckets
+
+
+def get_report_snapshot_data(query_config: Optional[Dict[str, Any]], report=None) -> Dict[str, Any]:
+    """
+    get_report_data, served from the tenant's materialised result while the
+    source rows are unchanged. ``report`` scopes the data to its tenant.
+    """
+    config = dict(query_config or {})
+    if report is not None:
+        config['tenant_id'] = report.tenant_id
+    tenant_id = config.get('tenant_id')
+    entity = config.get('entity', 'account')
+
+    model = _entity_model(entity)
+    watermark = data_watermark(model, tenant_id) if model is not None else None
+    if watermark is None:
+        return get_report_data(config)
+
+    from .models import ReportResultSnapshot
+    plan = get_query_plan(model, config)
+    snapshot = ReportResultSnapshot.objects.filter(tenant_id=tenant_id, config_hash=plan.config_hash).first()
+    fresh = snapshot is not None and snapshot.computed_at >= timezone.now() - _max_age()
+    if fresh and Watermark(snapshot.data_updated_at, snapshot.data_row_count) == watermark:
+        return snapshot.result
+
+    bucketed = _is_append_only_bucketing(model, plan)
+    refreshed = _refresh_buckets(model, plan, entity, snapshot, watermark) if (
+        fresh and bucketed and snapshot.buckets
+    ) else None
+    if refreshed is not None:
+        result, buckets = refreshed
+        computed_at = snapshot.computed_at
+    else:
+        result = get_report_data(config)
+        buckets = {}
+        if bucketed and 'error' not in result:
+            buckets = dict(zip(result['labels'], result['datasets'][0]['data']))
+        computed_at = timezone.now()
+
+    # Round-trip through JSON so fresh and stored results look the same
+    result = json.loads(json.dumps(result, cls=_ResultEncoder))
+    if 'error' in result:
+        return result
+    try:
+        ReportResultSnapshot.objects.update_or_create(
+            tenant_id=tenant_id,
+            config_hash=plan.config_hash,
+            defaults={
+                'report': report,
+                'data_updated_at': watermark.updated_at,
+                'data_row_count': watermark.row_count,
+                'result': result,
+                'buckets': buckets,
+                'computed_at': computed_at,
+            },
+        )
+    except IntegrityError:
+        # Another worker stored the same result concurrently
+        logger.debug(f"Report result snapshot {plan.config_hash} already stored")
+    return result
+
+
+def reusable_export(report, export_format: str, watermark: Optional[Watermark]):
+    """A completed export of ``report`` generated from the same config and data, if any."""
+    if watermark is None:
+        return None
+    from .models import ReportExport
+    return ReportExport.objects.filter(
+        report=report,
+        export_format=export_format,
+        config_hash=config_hash(report.query_config or {}),
+        data_watermark=str(watermark),
+        status='completed',
+        export_created_at__gte=timezone.now() - _max_age(),
+    ).exclude(file='').order_by('-export_created_at').first()
+
+
+def get_or_create_export(report, export_format: str, generate):
+    """
+    Return a reusable export of ``report`` or generate one with ``generate()``.
+    Schedules of the same report are serialised on the report row, so a
+    burst of them produces the file once.
+    """
+    from .models import Report, ReportExport
+    with transaction.atomic():
+        Report.objects.select_for_update().filter(pk=report.pk).first()
+        watermark = report_watermark(report)
+        export = reusable_export(report, export_format, watermark)
+        if export is not None:
+            return export
+
+        export = ReportExport.objects.create(
+            report=report,
+            export_format=export_format,
+            status='completed',
+            tenant_id=report.tenant_id,
+            config_hash=config_hash(report.query_config or {}),
+            data_watermark=str(watermark) if watermark else '',
+        )
+        save_response(export.file, f"report_{report.id}_{export.id}.{export_format}", generate())
+    return export
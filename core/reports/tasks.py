@@ -1,26 +1,22 @@
 from celery import shared_task
 from django.core.mail import EmailMultiAlternatives
 from django.template.loader import render_to_string
+from .snapshots import get_or_create_export
 from .utils import generate_report
 
 @shared_task
 def send_scheduled_report(schedule_id: int):
     """Send scheduled report via email."""
-    from .models import ReportSchedule, ReportExport
+    from .models import ReportSchedule
     
     schedule = ReportSchedule.objects.get(id=schedule_id)
     report = schedule.report
     
-    # Generate report
-    response = generate_report(report.id, schedule.export_format)
-    
-    # Save export record
-    export = ReportExport.objects.create(
-        report=report,
-        export_format=schedule.export_format,
-        status='completed'
+    # Generate report, or reuse the export of another schedule of the same
+    # report and format made from unchanged data
+    export = get_or_create_export(
+        report, schedule.export_format, lambda: generate_report(report.id, schedule.export_format)
     )
-    export.file.save(f"report_{report.id}_{export.id}.{schedule.export_format}", response)
     
     # Send email to recipients
     for recipient in schedule.recipients:
@@ -1,10 +1,23 @@
-from django.test import TestCase, Client
+import csv
+import io
+from datetime import timedelta
+from unittest import mock
+
+from django.db import DatabaseError
+from django.http import HttpResponse
+from django.test import TestCase, Client, override_settings
 from django.urls import reverse
 from django.contrib.auth import get_user_model
+from django.utils import timezone
 from .models import Report
 import json
-from opportunities.models import Opportunity
+from opportunities.models import Opportunity, OpportunityStage
 from accounts.models import Account
+from reports.export import export_csv, save_response
+from reports.query_plan import FormulaError, analyze_columns, clear_query_plans, get_query_plan, parse_formula
+from reports.snapshots import get_or_create_export, get_report_snapshot_data
+from reports.utils import get_report_data
+from tenants.models import Tenant
 
 User = get_user_model()
 
@@ -377,7 +390,7 @@ class ReportGenerationTests(TestCase):
         self.assertEqual(response['Content-Type'], 'text/csv')
         self.assertIn('attachment; filename=', response['Content-Disposition'])
         
-        content = response.content.decode('utf-8')
+        content = response.getvalue().decode('utf-8')
         # Check CSV has headers and data
         self.assertIn('Name', content)
         self.assertIn('Amount', content)
@@ -729,7 +742,7 @@ class ReportExportTests(TestCase):
         self.assertEqual(response['Content-Type'], 'text/csv')
         self.assertIn('attachment; filename=', response['Content-Disposition'])
         
-        content = response.content.decode('utf-8')
+        content = response.getvalue().decode('utf-8')
         self.assertIn('Name', content)
         self.assertIn('Industry', content)
         self.assertIn('Acc 1', content)
@@ -743,7 +756,7 @@ class ReportExportTests(TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertEqual(response['Content-Type'], 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
         self.assertIn('attachment; filename=', response['Content-Disposition'])
-        self.assertTrue(len(response.content) > 0)
+        self.assertTrue(len(response.getvalue()) > 0)
 
     def test_export_pdf(self):
         """Test PDF export generation."""
@@ -753,9 +766,10 @@ class ReportExportTests(TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertEqual(response['Content-Type'], 'application/pdf')
         self.assertIn('attachment; filename=', response['Content-Disposition'])
-        self.assertTrue(len(response.content) > 0)
+        content = response.getvalue()
+        self.assertTrue(len(content) > 0)
         # PDF content starts with %PDF
-        self.assertTrue(response.content.startswith(b'%PDF'))
+        self.assertTrue(content.startswith(b'%PDF'))
 
     def test_export_invalid_format(self):
         """Test invalid export format handling."""
@@ -782,3 +796,257 @@ class ReportExportTests(TestCase):
         
         self.assertEqual(response.status_code, 302)
         self.assertRedirects(response, reverse('reports:list'), target_status_code=403)
+
+
+class ReportFixtureMixin:
+    """
+    A tenant named after ``fixture_name`` with an open opportunity stage and
+    one account. Outgoing webhooks are patched out and cached query plans
+    are cleared.
+    """
+
+    fixture_name = 'Report'
+
+    def setUp(self):
+        super().setUp()
+        clear_query_plans()
+        webhooks = mock.patch('settings_app.signals.trigger_webhook')
+        webhooks.start()
+        self.addCleanup(webhooks.stop)
+
+        self.tenant = self.create_tenant(self.fixture_name)
+        self.stage = self.create_stage('Open')
+        self.account = self.create_account(f'{self.fixture_name} Account')
+
+    def create_tenant(self, name):
+        return Tenant.objects.create(name=f'{name} Tenant', slug=f'{name.lower()}-tenant')
+
+    def create_stage(self, name, tenant=None):
+        return OpportunityStage.objects.create(tenant=tenant or self.tenant, opportunity_stage_name=name)
+
+    def create_account(self, name, tenant=None):
+        return Account.objects.create(tenant=tenant or self.tenant, account_name=name)
+
+    def create_opportunity(self, amount, stage=None, account=None, name=None):
+        account = account or self.account
+        return Opportunity.objects.create(
+            tenant=account.tenant, opportunity_name=name or f'Deal {amount}', amount=amount, probability=0.5,
+            stage=stage or self.stage, account=account, close_date='2024-01-01'
+        )
+
+
+class StreamingExportTests(ReportFixtureMixin, TestCase):
+    """Test suite for the streaming export engine."""
+
+    fixture_name = 'Export'
+
+    def setUp(self):
+        super().setUp()
+        self.accounts = [self.create_account(f'Account {n}') for n in range(3)]
+        for n in range(9):
+            self.create_opportunity(100 * n, account=self.accounts[n % 3], name=f'Deal {n}')
+        self.queryset = Opportunity.objects.filter(tenant=self.tenant).order_by('id')
+
+    def _csv(self, response):
+        return list(csv.reader(io.StringIO(response.getvalue().decode('utf-8'))))
+
+    def test_csv_projects_columns_in_one_query(self):
+        with self.assertNumQueries(1):
+            response = export_csv(self.queryset, ['opportunity_name', 'account__account_name', 'amount'])
+            rows = self._csv(response)
+
+        self.assertTrue(response.streaming)
+        self.assertEqual(rows[0], ['Opportunity Name', 'Account Account Name', 'Amount'])
+        self.assertEqual(rows[1], ['Deal 0', 'Account 0', '0.00'])
+        self.assertEqual(len(rows), 10)
+
+    def test_csv_is_written_in_chunks(self):
+        with self.settings(REPORT_EXPORT_CHUNK_SIZE=4):
+            response = export_csv(self.queryset, ['opportunity_name'])
+            blocks = list(response.streaming_content)
+        # Header, then blocks of 4, 4 and 1 rows
+        self.assertEqual([block.count(b'\n') for block in blocks], [1, 4, 4, 1])
+
+    def test_non_field_columns_fall_back_to_instances(self):
+        # weighted_value is a method, 'account' a relation and 'missing' unknown
+        with self.assertNumQueries(1):
+            rows = self._csv(export_csv(
+                self.queryset, ['opportunity_name', 'weighted_value', 'account', 'account__account_name', 'missing']
+            ))
+        self.assertEqual(rows[2], ['Deal 1', '50.0', 'Account 1', 'Account 1', ''])
+
+    def test_errors_surface_before_streaming(self):
+        with self.assertRaises(DatabaseError):
+            export_csv(self.queryset.extra(where=['no_such_column = 1']), ['opportunity_name'])
+
+    def test_save_response_writes_streamed_export(self):
+        file_field = mock.Mock()
+        file_field.save.side_effect = lambda name, content: self.assertIn(b'Deal 8', content.read())
+        save_response(file_field, 'report.csv', export_csv(self.queryset, ['opportunity_name']))
+        file_field.save.assert_called_once()
+
+
+class ReportQueryPlanTests(ReportFixtureMixin, TestCase):
+    """Test suite for compiled report query plans."""
+
+    fixture_name = 'Plan'
+
+    def setUp(self):
+        super().setUp()
+        for amount in (100, 200, 300):
+            self.create_opportunity(amount)
+        other = self.create_tenant('Other Plan')
+        self.create_opportunity(
+            400, stage=self.create_stage('Open', tenant=other), account=self.create_account('Other Account', tenant=other)
+        )
+
+    def test_plans_are_cached_by_config(self):
+        config = {'entity': 'opportunity', 'formulas': [{'name': 'expected', 'expression': 'amount * probability'}]}
+        plan = get_query_plan(Opportunity, dict(config))
+        self.assertIs(get_query_plan(Opportunity, dict(config, tenant_id=self.tenant.id)), plan)
+        self.assertIsNot(get_query_plan(Opportunity, dict(config, sort_by='amount')), plan)
+
+    def test_formulas_compile_to_expressions(self):
+        plan = get_query_plan(Opportunity, {'formulas': [
+            {'name': 'expected', 'expression': 'amount * probability'},
+            {'name': 'doubled', 'expression': '-(expected - amount) * 2 / 1'},
+        ], 'sort_by': 'amount'})
+        rows = list(plan.apply(Opportunity.objects.all(), tenant_id=self.tenant.id).values_list('expected', 'doubled'))
+        self.assertEqual(rows, [(50.0, 100.0), (100.0, 200.0), (150.0, 300.0)])
+
+    def test_unsafe_formulas_are_rejected(self):
+        for expression in ["__import__('os').system('true')", 'amount.__class__', 'amount ** 2',
+                           '[amount]', 'amount if amount else 0', 'unknown_field * 2', '1 / 0']:
+            with self.assertRaises(FormulaError):
+                parse_formula(expression, Opportunity)
+
+        plan = get_query_plan(Opportunity, {'formulas': [
+            {'name': 'bad', 'expression': "__import__('os')"},
+            {'name': 'amount', 'expression': 'amount * 2'},
+        ]})
+        self.assertEqual(plan.annotations, ())
+
+    def test_report_data_applies_filters_and_tenant(self):
+        data = get_report_data({
+            'entity': 'opportunity', 'tenant_id': self.tenant.id,
+            'filters': [{'field': 'amount', 'operator': 'gt', 'value': '150'}],
+        })
+        self.assertEqual(data['datasets'][0]['data'], [2])
+
+    def test_export_columns_are_analysed_once(self):
+        plan = analyze_columns(Opportunity, ('opportunity_name', 'account__account_name'))
+        self.assertTrue(plan.projectable)
+        self.assertEqual(plan.select_related, ('account',))
+        self.assertIs(analyze_columns(Opportunity, ('opportunity_name', 'account__account_name')), plan)
+        self.assertFalse(analyze_columns(Opportunity, ('weighted_value',)).projectable)
+
+
+class ReportPivotTests(ReportFixtureMixin, TestCase):
+    """Test suite for the report pivot engine."""
+
+    fixture_name = 'Pivot'
+
+    def setUp(self):
+        super().setUp()
+        stages = {'Open': self.stage, 'Won': self.create_stage('Won')}
+        rows = [
+            ('Acme', 'Open', 100), ('Acme', 'Open', 300), ('Acme', 'Won', 50),
+            ('Beta', 'Won', 200), ('Gamma', 'Open', 10),
+        ]
+        accounts = {}
+        for account_name, stage_name, amount in rows:
+            account = accounts.get(account_name) or self.create_account(account_name)
+            accounts[account_name] = account
+            self.create_opportunity(amount, stage=stages[stage_name], account=account, name=f'{account_name} {amount}')
+
+    def _pivot(self, **pivot_config):
+        pivot_config.setdefault('rows', 'account__account_name')
+        pivot_config.setdefault('cols', 'stage__opportunity_stage_name')
+        return get_report_data({
+            'entity': 'opportunity', 'tenant_id': self.tenant.id,
+            'chart_type': 'pivot', 'pivot_config': pivot_config,
+        })
+
+    def _matrix(self, data):
+        return {dataset['label']: dataset['data'] for dataset in data['datasets']}
+
+    def test_count_matrix(self):
+        data = self._pivot()
+        self.assertTrue(data['is_pivot'])
+        self.assertEqual(data['labels'], ['Open', 'Won'])
+        self.assertEqual(self._matrix(data), {'Acme': [2, 1], 'Beta': [0, 1], 'Gamma': [1, 0]})
+
+    def test_sql_and_python_paths_agree(self):
+        for measure in ('count', 'sum', 'avg'):
+            pushed_down = self._pivot(measure=measure, measure_field='amount')
+            with override_settings(REPORT_PIVOT_SQL_MAX_COLUMNS=0):
+                in_python = self._pivot(measure=measure, measure_field='amount')
+            self.assertEqual(pushed_down, in_python)
+        self.assertEqual(self._matrix(pushed_down)['Acme'], [200.0, 50.0])
+
+    def test_multi_level_keys(self):
+        data = self._pivot(rows=['account__account_name', 'stage__opportunity_stage_name'], cols='close_date__year')
+        self.assertEqual(data['labels'], ['2024-01-01'])
+        self.assertEqual(self._matrix(data)['Acme / Open'], [2])
+
+    def test_top_n_folds_into_other(self):
+        data = self._pivot(measure='sum', measure_field='amount', top_rows=1, top_cols=1)
+        self.assertEqual(data['labels'], ['Open', 'Other'])
+        self.assertEqual(self._matrix(data), {'Acme': [400.0, 50.0], 'Other': [10.0, 200.0]})
+
+
+class ReportSnapshotStoreTests(ReportFixtureMixin, TestCase):
+    """Test suite for materialised report results and shared scheduled exports."""
+
+    fixture_name = 'Snapshot'
+
+    def setUp(self):
+        super().setUp()
+        self.report = Report.objects.create(
+            tenant=self.tenant, report_name='Monthly Deals', report_type='custom',
+            query_config={'entity': 'opportunity', 'group_by': 'created_at__month', 'chart_type': 'line'},
+        )
+        for amount in (100, 200):
+            self.create_opportunity(amount)
+
+    def _data(self):
+        return get_report_snapshot_data(self.report.query_config, report=self.report)
+
+    def test_unchanged_data_is_served_from_snapshot(self):
+        first = self._data()
+        self.assertEqual(first['datasets'][0]['data'], [2])
+        with mock.patch('reports.snapshots.get_report_data') as recompute:
+            self.assertEqual(self._data(), first)
+        recompute.assert_not_called()
+
+    def test_new_rows_refresh_only_touched_buckets(self):
+        Opportunity.objects.filter(tenant=self.tenant).update(created_at=timezone.now() - timedelta(days=400))
+        self.assertEqual(self._data()['datasets'][0]['data'], [2])
+
+        self.create_opportunity(300)
+        with mock.patch('reports.snapshots.get_report_data') as recompute:
+            data = self._data()
+        recompute.assert_not_called()
+        self.assertEqual(data['datasets'][0]['data'], [2, 1])
+        self.assertEqual(len(data['labels']), 2)
+
+    def test_deleted_rows_force_full_recompute(self):
+        self._data()
+        Opportunity.objects.filter(tenant=self.tenant).first().delete()
+        self.assertEqual(self._data(), get_report_data(dict(self.report.query_config, tenant_id=self.tenant.id)))
+        self.assertEqual(self._data()['datasets'][0]['data'], [1])
+
+    def test_schedules_share_export_while_data_is_unchanged(self):
+        calls = []
+
+        def counted():
+            calls.append(1)
+            return HttpResponse(b'id\n1\n', content_type='text/csv')
+
+        first = get_or_create_export(self.report, 'csv', counted)
+        self.assertEqual(get_or_create_export(self.report, 'csv', counted), first)
+        self.assertEqual(len(calls), 1)
+
+        self.create_opportunity(300)
+        self.assertNotEqual(get_or_create_export(self.report, 'csv', counted), first)
+        self.assertEqual(len(calls), 2)
@@ -1,11 +1,11 @@
-import csv
 import json
-from django.http import HttpResponse
-from django.db.models import Q, Sum, Avg, Count, F
-from django.db.models.functions import TruncMonth, TruncYear, TruncDay
+from django.db.models import Q, Count, F
 from django.utils import timezone
 from datetime import datetime, timedelta
 from django.apps import apps
+from .export import export_csv, export_pdf, export_xlsx
+from .pivot import build_pivot
+from .query_plan import ENTITY_MODELS, compile_filters, get_query_plan
  
 def generate_report(report_id, export_format='csv', user=None):
     """
@@ -14,86 +14,43 @@ def generate_report(report_id, export_format='csv', user=None):
     from .models import Report
     report = Report.objects.get(id=report_id)
     query_config = report.query_config or {}
-    
-    # Build queryset based on report type and config
-    if report.report_type == 'sales_performance':
-        queryset = _build_sales_performance_query(query_config)
-    elif report.report_type == 'esg_impact':
-        queryset = _build_esg_impact_query(query_config)
-    elif report.report_type == 'pipeline_forecast':
-        queryset = _build_pipeline_forecast_query(query_config)
-    elif report.report_type == 'csrd_compliance':
-        queryset = _build_csrd_compliance_query(query_config)
-    elif report.report_type == 'leads_recent':
-        queryset = _build_leads_recent_query(query_config)
-    elif report.report_type == 'cases_recent':
-        queryset = _build_cases_recent_query(query_config)
-    else:  # custom
-        queryset = _build_custom_query(query_config)
+    queryset = build_report_queryset(report.report_type, query_config)
 
-    # Apply Joins (Cross-object)
-    joins = query_config.get('joins', [])
-    for join in joins:
-        queryset = queryset.select_related(join) if '__' not in join else queryset.prefetch_related(join)
-
-    # Apply Formulas (Computed fields)
-    formulas = query_config.get('formulas', [])
-    for formula in formulas:
-        name = formula.get('name')
-        expression = formula.get('expression')
-        if name and expression:
-            try:
-                # Enhanced parser for expressions using F objects
-                from django.db.models import FloatField, ExpressionWrapper
-                import re
-
-                def to_expression(expr_str):
-                    tokens = re.split(r'(\s*[\+\-\*/\(\)]\s*)', expr_str)
-                    processed_tokens = []
-                    for t in tokens:
-                        t = t.strip()
-                        if not t: continue
-                        if t in '+-*/()':
-                            processed_tokens.append(t)
-                        else:
-                            try:
-                                float(t)
-                                processed_tokens.append(t)
-                            except ValueError:
-                                processed_tokens.append(f"F('{t}')")
-                    return "".join(processed_tokens)
-
-                python_expr = to_expression(expression)
-                queryset = queryset.annotate(**{name: ExpressionWrapper(eval(python_expr), output_field=FloatField())})
-            except Exception as e:
-                print(f"Formula error: {e}")
-                pass
-
-    # Apply filters from query_config
-    if 'filters' in query_config:
-        queryset = _apply_filters(queryset, query_config['filters'])
-    
-    # Apply ordering
-    if 'sort_by' in query_config:
-        queryset = queryset.order_by(query_config['sort_by'])
-    else:
+    # Joins, formulas, filters and ordering come from the compiled plan
+    plan = get_query_plan(queryset.model, query_config)
+    queryset = plan.apply(queryset)
+    if not plan.order_by:
         queryset = queryset.order_by('-report_created_at')
     
     # Get fields to include
     fields = query_config.get('fields', _get_default_fields(report.report_type))
 
-    # Apply Conditional Formatting (Annotates data for UI)
-    formatting = query_config.get('formatting', [])
-    data_rows = list(queryset) # Evaluate for formatting
-    _apply_formatting(data_rows, formatting)
-    
-    # Generate export
+    # Conditional formatting only annotates rows for the UI, so exports
+    # stream the queryset directly instead of evaluating it
     if export_format == 'csv':
-        return _generate_csv_export(data_rows, fields, report.report_type)
+        return _generate_csv_export(queryset, fields, report.report_type)
     elif export_format == 'xlsx':
-        return _generate_xlsx_export(data_rows, fields, report.report_type)
+        return _generate_xlsx_export(queryset, fields, report.report_type)
     else:  # pdf
-        return _generate_pdf_export(data_rows, fields, report.report_type)
+        return _generate_pdf_export(queryset, fields, report.report_type)
+
+
+def build_report_queryset(report_type, query_config):
+    """Base queryset for a report type, before the query plan is applied."""
+    if report_type == 'sales_performance':
+        return _build_sales_performance_query(query_config)
+    elif report_type == 'esg_impact':
+        return _build_esg_impact_query(query_config)
+    elif report_type == 'pipeline_forecast':
+        return _build_pipeline_forecast_query(query_config)
+    elif report_type == 'csrd_compliance':
+        return _build_csrd_compliance_query(query_config)
+    elif report_type == 'leads_recent':
+        return _build_leads_recent_query(query_config)
+    elif report_type == 'cases_recent':
+        return _build_cases_recent_query(query_config)
+    else:  # custom
+        return _build_custom_query(query_config)
 
 
 def _get_default_fields(report_type):
@@ -183,15 +140,7 @@ def _build_custom_query(config):
     """Build custom report query based on entities specified."""
     entity = config.get('entity', 'account') # Single primary entity
     
-    model_map = {
-        'account': 'accounts.Account',
-        'opportunity': 'opportunities.Opportunity',
-        'lead': 'leads.Lead',
-        'case': 'support.Case',
-        'task': 'tasks.Task',
-    }
-
-    model_path = model_map.get(entity, 'accounts.Account')
+    model_path = ENTITY_MODELS.get(entity, 'accounts.Account')
     app_label, model_name = model_path.split('.')
     Model = apps.get_model(app_label, model_name)
     
@@ -217,56 +166,10 @@ def _build_custom_query(config):
     return queryset
 
 
-def _apply_formatting(data_rows, formatting_rules):
-    """
-    Apply conditional formatting rules to data rows.
-    Adds a '_formatting' dict to each object in the list.
-    """
-    if not formatting_rules:
-        return
-
-    for obj in data_rows:
-        obj._formatting = {}
-        for rule in formatting_rules:
-            field = rule.get('field')
-            operator = rule.get('operator')
-            value = rule.get('value')
-            style = rule.get('style') # e.g. {'color': 'red', 'font-weight': 'bold'}
-            
-            if not (field and operator and style):
-                continue
-            
-            field_val = getattr(obj, field, None)
-            if field_val is None:
-                continue
-
-            match = False
-            if operator == 'gt': match = field_val > value
-            elif operator == 'lt': match = field_val < value
-            elif operator == 'eq': match = field_val == value
-            elif operator == 'contains': match = str(value) in str(field_val)
-            
-            if match:
-                obj._formatting[field] = style
+def _apply_filters(queryset, filters):
     """Apply filters to queryset (handles both dict and list of dicts)."""
-    if isinstance(filters, list):
-        for f in filters:
-            field = f.get('field')
-            operator = f.get('operator')
-            value = f.get('value')
-            if field and operator and value:
-                lookup = f"{field}__{operator}" if operator != 'exact' else field
-                queryset = queryset.filter(**{lookup: value})
-    else:
-        for field, value in filters.items():
-            if isinstance(value, list):
-                queryset = queryset.filter(**{f"{field}__in": value})
-            elif isinstance(value, dict):
-                for op, val in value.items():
-                    lookup = f"{field}{op}" if op.startswith('__') else f"{field}__{op}"
-                    queryset = queryset.filter(**{lookup: val})
-            else:
-                queryset = queryset.filter(**{field: value})
+    for lookups in compile_filters(filters):
+        queryset = queryset.filter(**lookups)
     return queryset
 
 
@@ -276,22 +179,9 @@ def get_report_data(query_config):
     Returns: { 'labels': [...], 'datasets': [{ 'label': '...', 'data': [...] }] }
     """
     entity = query_config.get('entity', 'account')
-    filters = query_config.get('filters', [])
-    group_by = query_config.get('group_by')
-    chart_type = query_config.get('chart_type', 'bar')
-    formulas = query_config.get('formulas', [])
-    pivot_config = query_config.get('pivot_config', {})
 
     # Map entity to model
-    model_map = {
-        'account': 'accounts.Account',
-        'opportunity': 'opportunities.Opportunity',
-        'lead': 'leads.Lead',
-        'case': 'cases.Case', # Fixed mapping from support.Case to cases.Case
-        'task': 'tasks.Task',
-    }
-
-    model_path = model_map.get(entity)
+    model_path = ENTITY_MODELS.get(entity)
     if not model_path:
         return {'error': 'Invalid entity'}
 
@@ -301,105 +191,27 @@ def get_report_data(query_config):
     except LookupError:
         return {'error': f'Model {entity} not found'}
 
-    # Base QuerySet
-    queryset = Model.objects.all()
-
-    # Apply Formulas
-    for formula in formulas:
-        name = formula.get('name')
-        expr = formula.get('expression')
-        if name and expr:
-            try:
-                from django.db.models import FloatField, ExpressionWrapper
-                import re
-                def to_expression(expr_str):
-                    tokens = re.split(r'(\s*[\+\-\*/\(\)]\s*)', expr_str)
-                    processed_tokens = []
-                    for t in tokens:
-                        t = t.strip()
-                        if not t: continue
-                        if t in '+-*/()':
-                            processed_tokens.append(t)
-                        else:
-                            try:
-                                float(t)
-                                processed_tokens.append(t)
-                            except ValueError:
-                                processed_tokens.append(f"F('{t}')")
-                    return "".join(processed_tokens)
-                
-                python_expr = to_expression(expr)
-                queryset = queryset.annotate(**{name: ExpressionWrapper(eval(python_expr), output_field=FloatField())})
-            except Exception:
-                pass
+    # Formulas and filters from the compiled plan, scoped to the requesting tenant
+    plan = get_query_plan(Model, query_config)
+    queryset = plan.apply(Model.objects.all(), tenant_id=query_config.get('tenant_id'))
+    chart_type = plan.chart_type
 
     # Aggregation
     labels = []
     datasets = []
 
-    if chart_type == 'pivot' and pivot_config.get('rows') and pivot_config.get('cols'):
-        row_field = pivot_config['rows']
-        col_field = pivot_config['cols']
-        
-        # Aggregate by both fields
-        data = queryset.values(row_field, col_field).annotate(count=Count('id')).order_by(row_field, col_field)
-        
-        # Group into a matrix
-        rows = sorted(list(set(item[row_field] for item in data if item[row_field])))
-        cols = sorted(list(set(item[col_field] for item in data if item[col_field])))
-        
-        labels = [str(c) for c in cols]
-        for r in rows:
-            row_data = []
-            for c in cols:
-                count = next((item['count'] for item in data if item[row_field] == r and item[col_field] == c), 0)
-                row_data.append(count)
-            
-            datasets.append({
-                'label': str(r),
-                'data': row_data
-            })
-            
-        return {
-            'labels': labels,
-            'datasets': datasets,
-            'is_pivot': True
-        }
+    if plan.pivot:
+        return build_pivot(queryset, plan.pivot)
 
-    if group_by:
-        # Check for date truncation
-        date_field = None
-        trunc_func = None
-
-        if '__month' in group_by:
-            date_field = group_by.replace('__month', '')
-            trunc_func = TruncMonth
-        elif '__year' in group_by:
-            date_field = group_by.replace('__year', '')
-            trunc_func = TruncYear
-        elif '__day' in group_by:
-            date_field = group_by.replace('__day', '')
-            trunc_func = TruncDay
-
-        if date_field and trunc_func:
-            data = queryset.annotate(period=trunc_func(date_field)).values('period').annotate(count=Count('id')).order_by('period')
-            for item in data:
-                labels.append(item['period'].strftime('%Y-%m-%d') if item['period'] else 'None')
-                datasets.append(item['count'])
+    if plan.group_by:
+        group_by = plan.group_by
+        if plan.truncate:
+            for label, count in time_bucket_counts(queryset, plan):
+                labels.append(label)
+                datasets.append(count)
         else:
-            # Special case for geographic mapping
-            is_geo = group_by in ['billing_country', 'territory', 'shipping_country', 'billing_state', 'shipping_state']
-            if is_geo:
-                chart_type = 'choropleth'
-            
             # Categorical grouping with optional secondary measure
-            measure = query_config.get('measure', 'count')
-            if measure == 'sum' and query_config.get('measure_field'):
-                data = queryset.values(group_by).annotate(value=Sum(query_config['measure_field'])).order_by('-value')
-            elif measure == 'avg' and query_config.get('measure_field'):
-                data = queryset.values(group_by).annotate(value=Avg(query_config['measure_field'])).order_by('-value')
-            else:
-                data = queryset.values(group_by).annotate(value=Count('id')).order_by('-value')
+            data = queryset.values(group_by).annotate(value=plan.measure).order_by('-value')
 
             for item in data:
                 labels.append(str(item[group_by]) if item[group_by] else 'None')
@@ -409,7 +221,27 @@ def get_report_data(query_config):
         labels = ["Total Records"]
         datasets = [queryset.count()]
 
-    # Standardize result for Chart.js
+    return chart_payload(entity, labels, datasets, chart_type)
+
+
+def time_bucket_counts(queryset, plan, periods=None):
+    """
+    (label, count) per date bucket of a time-bucketed plan, optionally
+    restricted to the truncated ``periods``.
+    """
+    queryset = queryset.annotate(period=plan.truncate(plan.group_by))
+    if periods is not None:
+        queryset = queryset.filter(period__in=periods)
+    data = queryset.values('period').annotate(count=Count('id')).order_by('period')
+    return [(period_label(item['period']), item['count']) for item in data]
+
+
+def period_label(period):
+    return period.strftime('%Y-%m-%d') if period else 'None'
+
+
+def chart_payload(entity, labels, datasets, chart_type):
+    """Standardize result for Chart.js."""
     if not isinstance(datasets, list) or (datasets and not isinstance(datasets[0], dict)):
         datasets = [{
             'label': entity.title(),
@@ -427,107 +259,14 @@ def get_report_data(query_config):
 
 
 def _generate_csv_export(queryset, fields, report_type):
-    """Generate CSV export."""
-    response = HttpResponse(content_type='text/csv')
-    response['Content-Disposition'] = f'attachment; filename="report_{timezone.now().strftime("%Y%m%d_%H%M%S")}.csv"'
-    
-    writer = csv.writer(response)
-    
-    # Write headers
-    headers = []
-    for field in fields:
-        headers.append(field.replace('__', ' ').replace('_', ' ').title())
-    writer.writerow(headers)
-    
-    # Write data
-    for obj in queryset:
-        row = []
-        for field in fields:
-            if hasattr(obj, field):
-                value = getattr(obj, field)
-                if value is None:
-                    row.append('')
-                elif callable(value):
-                    row.append(str(value()))
-                else:
-                    row.append(str(value))
-            else:
-                # Handle related fields (e.g., 'account__name')
-                if '__' in field:
-                    try:
-                        value = obj
-                        for f in field.split('__'):
-                            value = getattr(value, f)
-                        if value is None:
-                            row.append('')
-                        elif callable(value):
-                            row.append(str(value()))
-                        else:
-                            row.append(str(value))
-                    except (AttributeError, TypeError):
-                        row.append('')
-                else:
-                    row.append('')
-        writer.writerow(row)
-    
-    return response
+    """Generate CSV export, streamed as rows are read."""
+    return export_csv(queryset, fields)
 
 
 def _generate_xlsx_export(queryset, fields, report_type):
     """Generate Excel export."""
     try:
-        import openpyxl
-        from openpyxl.utils import get_column_letter
-        
-        # Create workbook and worksheet
-        wb = openpyxl.Workbook()
-        ws = wb.active
-        ws.title = "Report"
-        
-        # Write headers
-        headers = []
-        for field in fields:
-            headers.append(field.replace('__', ' ').replace('_', ' ').title())
-        
-        for col_num, header in enumerate(headers, 1):
-            ws.cell(row=1, column=col_num, value=header)
-            ws.column_dimensions[get_column_letter(col_num)].width = 20
-        
-        # Write data
-        for row_num, obj in enumerate(queryset, 2):
-            for col_num, field in enumerate(fields, 1):
-                if hasattr(obj, field):
-                    value = getattr(obj, field)
-                    if value is None:
-                        ws.cell(row=row_num, column=col_num, value='')
-                    elif callable(value):
-                        ws.cell(row=row_num, column=col_num, value=str(value()))
-                    else:
-                        ws.cell(row=row_num, column=col_num, value=value)
-                else:
-                    # Handle related fields
-                    if '__' in field:
-                        try:
-                            value = obj
-                            for f in field.split('__'):
-                                value = getattr(value, f)
-                            if value is None:
-                                ws.cell(row=row_num, column=col_num, value='')
-                            elif callable(value):
-                                ws.cell(row=row_num, column=col_num, value=str(value()))
-                            else:
-                                ws.cell(row=row_num, column=col_num, value=value)
-                        except (AttributeError, TypeError):
-                            ws.cell(row=row_num, column=col_num, value='')
-                    else:
-                        ws.cell(row=row_num, column=col_num, value='')
-        
-        # Create response
-        response = HttpResponse(content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
-        response['Content-Disposition'] = f'attachment; filename="report_{timezone.now().strftime("%Y%m%d_%H%M%S")}.xlsx"'
-        wb.save(response)
-        return response
-        
+        return export_xlsx(queryset, fields)
     except ImportError:
         # Fallback to CSV if openpyxl is not installed
         return _generate_csv_export(queryset, fields, report_type)
@@ -536,85 +275,7 @@ def _generate_xlsx_export(queryset, fields, report_type):
 def _generate_pdf_export(queryset, fields, report_type):
     """Generate PDF export."""
     try:
-        from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
-        from reportlab.lib.styles import getSampleStyleSheet
-        from reportlab.lib import colors
-        from reportlab.lib.pagesizes import letter, A4
-        from io import BytesIO
-        
-        buffer = BytesIO()
-        doc = SimpleDocTemplate(buffer, pagesize=A4)
-        styles = getSampleStyleSheet()
-        story = []
-        
-        # Title
-        title = Paragraph(f"SalesCompass Report - {timezone.now().strftime('%Y-%m-%d %H:%M')}", styles['Title'])
-        story.append(title)
-        story.append(Spacer(1, 12))
-        
-        # Build table data
-        table_data = []
-        
-        # Headers
-        headers = []
-        for field in fields:
-            headers.append(field.replace('__', ' ').replace('_', ' ').title())
-        table_data.append(headers)
-        
-        # Data rows
-        for obj in queryset[:1000]:  # Limit to 1000 rows for PDF
-            row = []
-            for field in fields:
-                if hasattr(obj, field):
-                    value = getattr(obj, field)
-                    if value is None:
-                        row.append('')
-                    elif callable(value):
-                        row.append(str(value()))
-                    else:
-                        row.append(str(value))
-                else:
-                    # Handle related fields
-                    if '__' in field:
-                        try:
-                            value = obj
-                            for f in field.split('__'):
-                                value = getattr(value, f)
-                            if value is None:
-                                row.append('')
-                            elif callable(value):
-                                row.append(str(value()))
-                            else:
-                                row.append(str(value))
-                        except (AttributeError, TypeError):
-                            row.append('')
-                    else:
-                        row.append('')
-            table_data.append(row)
-        
-        # Create table
-        table = Table(table_data)
-        table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, 0), 12),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-            ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black)
-        ]))
-        
-        story.append(table)
-        doc.build(story)
-        
-        # Create response
-        pdf = buffer.getvalue()
-        buffer.close()
-        response = HttpResponse(pdf, content_type='application/pdf')
-        response['Content-Disposition'] = f'attachment; filename="report_{timezone.now().strftime("%Y%m%d_%H%M%S")}.pdf"'
-        return response
-        
+        return export_pdf(queryset, fields)
     except ImportError:
         # Fallback to CSV if reportlab is not installed
         return _generate_csv_export(queryset, fields, report_type)
@@ -625,25 +286,17 @@ def create_scheduled_report_export(schedule_id):
     Create a scheduled report export (for Celery task).
     """
     from .models import ReportSchedule, ReportExport
+    from .snapshots import get_or_create_export
     schedule = ReportSchedule.objects.get(id=schedule_id)
     
     try:
-        # Generate the report
-        response = generate_report(schedule.report.id, schedule.export_format)
-        
-        # Save to file field
-        export = ReportExport.objects.create(
-            report=schedule.report,
-            export_format=schedule.export_format,
-            status='completed',
-            tenant_id=schedule.tenant_id
+        # Generate the report, or reuse an export made from unchanged data
+        export = get_or_create_export(
+            schedule.report,
+            schedule.export_format,
+            lambda: generate_report(schedule.report.id, schedule.export_format)
         )
         
-        # Save the file
-        filename = f"report_{schedule.report.id}_{timezone.now().strftime('%Y%m%d_%H%M%S')}.{schedule.export_format}"
-        export.file.save(filename, response)
-        export.save()
-        
         # Send email to recipients
         from .utils import send_scheduled_report_email
         send_scheduled_report_email(export, schedule.recipients)
@@ -14,6 +14,7 @@ from .models import Report, ReportSchedule, ReportExport, EXPORT_FORMATS, WIDGET
 from dashboard.models import DashboardWidget
 from dashboard.forms import DashboardWidgetForm
 from .forms import ReportForm, ReportScheduleForm
+from .snapshots import get_report_snapshot_data
 from .utils import generate_report, get_report_data
 from services.business_metrics_service import BusinessMetricsService
 import csv
@@ -110,7 +111,7 @@ class PublicReportView(SalesCompassDetailView):
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         # Generate data for the public view
-        context['report_data'] = get_report_data(self.object.query_config)
+        context['report_data'] = get_report_snapshot_data(self.object.query_config, report=self.object)
         return context
 
 
@@ -153,7 +154,7 @@ class ReportSnapshotCreateView(LoginRequiredMixin, TenantAwareViewMixin, View):
 
     def post(self, request, report_id):
         report = get_object_or_404(Report, id=report_id, tenant_id=request.user.tenant_id)
-        data = get_report_data(report.query_config)
+        data = get_report_snapshot_data(report.query_config, report=report)
         
         ReportSnapshot.objects.create(
             report=report,
@@ -250,7 +251,7 @@ class DashboardView(LoginRequiredMixin, TenantAwareViewMixin, TemplateView):
         for widget in widgets:
             if widget.widget_type in ['chart', 'table', 'trend']:
                 try:
-                    widget.report_data = get_report_data(widget.report.query_config)
+                    widget.report_data = get_report_snapshot_data(widget.report.query_config, report=widget.report)
                 except Exception as e:
                     widget.report_data = {'error': str(e)}
             
@@ -158,6 +158,7 @@ SPECTACULAR_SETTINGS = {
 
 
 MIDDLEWARE = [
+    'core.request_cache.RequestCacheMiddleware',  # Request-scoped memoisation and query counts
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -311,6 +312,22 @@ CELERY_BEAT_SCHEDULE = {
         'task': 'infrastructure.tasks.calculate_usage',
         'schedule': crontab(hour='*/6'),  # Every 6 hours
     },
+    'reconcile-kpi-rollups': {
+        'task': 'dashboard.tasks.reconcile_kpi_rollups',
+        'schedule': crontab(hour=2, minute=15),  # Nightly
+    },
+    'apply-engagement-score-decay': {
+        'task': 'engagement.tasks.apply_engagement_score_decay',
+        'schedule': crontab(hour=3, minute=0),  # Nightly
+    },
+    'archive-cold-engagement-events': {
+        'task': 'engagement.tasks.archive_cold_engagement_events',
+        'schedule': crontab(day_of_month=1, hour=4, minute=0),  # Monthly
+    },
+    'process-pos-post-sale-tasks': {
+        'task': 'pos.tasks.process_post_sale_tasks',
+        'schedule': crontab(minute='*'),  # Every minute (retries and missed wake-ups)
+    },
 }
 
 # # ASGI application (replace your current WSGI_APPLICATION)
@@ -345,6 +362,19 @@ CHANNEL_LAYERS = {
     },
 }
 
+# Shared cache - version stamps (core.cache_versions), compiled permission
+# sets and other cross-process state must be seen by every web, ASGI and
+# Celery process, so this cannot be the per-process local-memory default
+CACHE_REDIS_URL = os.getenv('CACHE_REDIS_URL', REDIS_URL)
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': CACHE_REDIS_URL,
+        'KEY_PREFIX': 'salescompass',
+    },
+}
+
 
 # Elasticsearch Configuration
 ELASTICSEARCH_HOST = os.getenv('ELASTICSEARCH_HOST', 'http://localhost:9200')
@@ -436,6 +466,131 @@ EVENT_BUS_ASYNC = not CELERY_TASK_ALWAYS_EAGER
 # Enable automation async execution when broker is available
 AUTOMATION_ASYNC = not CELERY_TASK_ALWAYS_EAGER
 
+# Compiled trigger indexes and execution plans are rebuilt at least this
+# often (seconds), on top of the shared version bumps made by edits
+AUTOMATION_COMPILED_MAX_AGE = 300
+
+# Hold events emitted inside a transaction until it commits (dropped on rollback)
+EVENT_BUS_DEFER_IN_TRANSACTION = True
+
+# Events per Celery task when a batch or transaction publishes its events
+EVENT_BUS_BATCH_SIZE = 500
+
+# =============================================================================
+# LEAD INGESTION CONFIGURATION
+# =============================================================================
+
+# Leads written per transaction by bulk ingestion (imports, web-to-lead queues)
+LEAD_INGEST_BATCH_SIZE = 1000
+
+# =============================================================================
+# REPORT EXPORT CONFIGURATION
+# =============================================================================
+
+# Rows read per database round trip (and per CSV block) when exporting reports
+REPORT_EXPORT_CHUNK_SIZE = 2000
+
+# PDF exports are capped at this many rows
+REPORT_PDF_MAX_ROWS = 1000
+
+# Materialised report results and scheduled exports are reused while their
+# source rows are unchanged, but never for longer than this (seconds)
+REPORT_SNAPSHOT_MAX_AGE = 3600
+
+# =============================================================================
+# BI DASHBOARD LIVE UPDATES
+# =============================================================================
+
+# Lead/opportunity changes within this many seconds are coalesced into one
+# live update per tenant
+BI_DASHBOARD_UPDATE_DEBOUNCE = 5
+
+# The nightly KPI rollup reconcile recomputes this many trailing days
+KPI_ROLLUP_RECONCILE_DAYS = 3
+
+# =============================================================================
+# ENGAGEMENT SCORING
+# =============================================================================
+
+# Engagement statuses rescored per grouped query / bulk_update by the nightly decay job
+ENGAGEMENT_SCORING_BATCH_SIZE = 2000
+
+# Trailing days of score buckets the nightly job rebuilds from the events,
+# picking up deleted and edited events
+ENGAGEMENT_SCORE_RECONCILE_DAYS = 2
+
+# Tenant-wide attribution reports are cached per (tenant, model, window) for
+# this many seconds; events are streamed from the database in chunks of this size
+ENGAGEMENT_ATTRIBUTION_CACHE_TTL = 900
+ENGAGEMENT_ATTRIBUTION_CHUNK_SIZE = 5000
+
+# Engagement events older than this many whole months are moved to compressed
+# monthly archives, deleting this many rows per batch
+ENGAGEMENT_EVENT_HOT_MONTHS = 12
+ENGAGEMENT_ARCHIVE_BATCH_SIZE = 5000
+
+# =============================================================================
+# POINT OF SALE
+# =============================================================================
+
+# Outbox tasks (stock, coupon, loyalty, GL) claimed per worker batch
+POS_POST_SALE_BATCH_SIZE = 100
+
+# A failed step is retried after RETRY_DELAY * 2^(attempt - 1) seconds and
+# marked failed after MAX_ATTEMPTS
+POS_POST_SALE_MAX_ATTEMPTS = 8
+POS_POST_SALE_RETRY_DELAY = 30
+
+# In-memory POS catalog indexes are rebuilt when older than this (seconds),
+# which bounds staleness if a change is never published to the shared cache,
+# or when more than MAX_DELTA product changes are pending; the change log
+# terminals and workers sync from is kept for CHANGE_TTL seconds
+POS_CATALOG_MAX_AGE = 300
+POS_CATALOG_MAX_DELTA = 500
+POS_CATALOG_CHANGE_TTL = 24 * 60 * 60
+
+# =============================================================================
+# PRODUCT PRICING
+# =============================================================================
+
+# Compiled (tenant, price list) price books kept per worker (LRU), and
+# rebuilt when older than MAX_AGE seconds even if no change was published
+PRICE_BOOK_CACHE_SIZE = 256
+PRICE_BOOK_MAX_AGE = 300
+
+# =============================================================================
+# AUDIT PIPELINE CONFIGURATION
+# =============================================================================
+
+# Audit rows are queued in process and bulk inserted by a background flusher
+AUDIT_PIPELINE_BACKGROUND = True
+AUDIT_QUEUE_MAX_SIZE = 10000
+AUDIT_BATCH_SIZE = 500
+AUDIT_FLUSH_INTERVAL = 2
+
+# When the queue is full: 'block' (wait, then write inline), 'sync' or 'drop'
+AUDIT_QUEUE_FULL_POLICY = 'block'
+AUDIT_QUEUE_BLOCK_TIMEOUT = 0.5
+
+# =============================================================================
+# REQUEST CACHE CONFIGURATION
+# =============================================================================
+
+# Return each request's query count in an X-Query-Count response header
+REQUEST_QUERY_COUNT_HEADER = DEBUG
+
+# =============================================================================
+# USAGE METERING CONFIGURATION
+# =============================================================================
+
+# Tenant usage counters are buffered in process and flushed as one row per bucket
+USAGE_METER_BUCKET_SECONDS = 3600
+USAGE_METER_FLUSH_INTERVAL = 30
+USAGE_METER_MAX_PENDING = 1000
+
+# Seconds a tenant's usage-limit snapshot is served before being rebuilt
+USAGE_LIMIT_CACHE_TTL = 60
+
 # =============================================================================
 # FEATURE FLAG CONFIGURATION
 # =============================================================================
@@ -447,6 +602,10 @@ FEATURE_FLAG_URL_RULES = {
     '/new-reports/': 'new_reports',
 }
 
+# Compiled per-tenant flag rules kept per worker (LRU) and their lifetime in seconds
+FEATURE_FLAG_CACHE_SIZE = 256
+FEATURE_FLAG_CACHE_TTL = 60
+
 # =============================================================================
 # LOGGING CONFIGURATION
 # =============================================================================
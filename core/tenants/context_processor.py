@@ -1,22 +1,13 @@
+from core.request_cache import get_request_white_label
+
 def white_label_context(request):
     """
     Context processor to add white-label branding settings to all templates
     """
-    if hasattr(request.user, 'tenant') and request.user.tenant:
-        try:
-            white_label_settings = request.user.tenant.white_label_settings
-            return {
-                'white_label_settings': white_label_settings,
-            }
-        except:
-            # If no white-label settings exist, return empty context
-            return {
-                'white_label_settings': None,
-            }
-    else:
-        return {
-            'white_label_settings': None,
-        } 
+    # Loaded once per request; None when the tenant has no white-label settings
+    return {
+        'white_label_settings': get_request_white_label(request),
+    }
 
 def feature_flags(request):
     """Add feature flags to all template contexts"""
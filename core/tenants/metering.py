@@ -0,0 +1,189 @@
+"""
+Write-behind Usage Metering for SalesCompass Tenants
+
+Replaces the per-call TenantUsageMetric INSERT with an in-process meter that:
+- Aggregates counters per (tenant, metric, unit, time bucket)
+- Flushes periodically as bulk upserts, one row per bucket
+- Flushes on worker shutdown so buffered counts are not lost
+"""
+import atexit
+import logging
+import threading
+import time
+from datetime import datetime, timezone as dt_timezone
+from typing import Dict, Tuple, Optional
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Case, F, FloatField, Value, When
+
+logger = logging.getLogger(__name__)
+
+# (tenant_id, metric_type, unit, bucket_start)
+BucketKey = Tuple[int, str, str, datetime]
+
+
+class UsageMeter:
+    """
+    Buffers tenant usage counters in memory and writes them behind.
+
+    Usage:
+        from tenants.metering import usage_meter
+
+        usage_meter.record(tenant, 'api_requests', value=1, unit='requests')
+
+        # Force buffered counters to the database (tests, shutdown hooks)
+        usage_meter.flush()
+
+    Settings:
+        USAGE_METER_BUCKET_SECONDS: width of each usage bucket (default 3600)
+        USAGE_METER_FLUSH_INTERVAL: seconds between flushes, 0 writes on every
+            record (default 30)
+        USAGE_METER_MAX_PENDING: flush early once this many buckets are
+            buffered (default 1000)
+    """
+
+    def __init__(self):
+        self._pending: Dict[BucketKey, float] = {}
+        self._lock = threading.Lock()
+        self._last_flush = time.monotonic()
+
+    @property
+    def bucket_seconds(self) -> int:
+        return max(1, int(getattr(settings, 'USAGE_METER_BUCKET_SECONDS', 3600)))
+
+    @property
+    def flush_interval(self) -> float:
+        return getattr(settings, 'USAGE_METER_FLUSH_INTERVAL', 30)
+
+    @property
+    def max_pending(self) -> int:
+        return getattr(settings, 'USAGE_METER_MAX_PENDING', 1000)
+
+    def bucket_bounds(self, at: Optional[datetime] = None) -> Tuple[datetime, datetime]:
+        """Return the (start, end) of the bucket containing ``at``."""
+        seconds = self.bucket_seconds
+        epoch = (at.timestamp() if at else time.time())
+        start = int(epoch) - int(epoch) % seconds
+        return (
+            datetime.fromtimestamp(start, tz=dt_timezone.utc),
+            datetime.fromtimestamp(start + seconds, tz=dt_timezone.utc),
+        )
+
+    def record(self, tenant, metric_type: str, value: float = 1, unit: str = '') -> None:
+        """Add ``value`` to the current bucket for this tenant and metric."""
+        tenant_id = getattr(tenant, 'pk', tenant)
+        bucket_start, _ = self.bucket_bounds()
+        key = (tenant_id, metric_type, unit or '', bucket_start)
+
+        with self._lock:
+            self._pending[key] = self._pending.get(key, 0) + value
+            due = (
+                len(self._pending) >= self.max_pending or
+                time.monotonic() - self._last_flush >= self.flush_interval
+            )
+
+        if due:
+            self.flush()
+
+    def pending(self, tenant_id: int, metric_type: str) -> float:
+        """Return the buffered, not yet flushed total for a tenant metric."""
+        with self._lock:
+            return sum(
+                value for (t_id, m_type, _, _), value in self._pending.items()
+                if t_id == tenant_id and m_type == metric_type
+            )
+
+    def flush(self) -> int:
+        """
+        Write all buffered counters to the database.
+
+        Returns the number of buckets written. On failure the counters are put
+        back into the buffer so the next flush retries them.
+        """
+        with self._lock:
+            batch, self._pending = self._pending, {}
+            self._last_flush = time.monotonic()
+
+        if not batch:
+            return 0
+
+        try:
+            self._write(batch)
+        except Exception as e:
+            logger.warning(f"Usage meter flush failed, retaining {len(batch)} buckets: {e}")
+            with self._lock:
+                for key, value in batch.items():
+                    self._pending[key] = self._pending.get(key, 0) + value
+            return 0
+
+        return len(batch)
+
+    def _write(self, batch: Dict[BucketKey, float]) -> None:
+        """Upsert bucket rows: increment existing ones, bulk create the rest."""
+        from .models import Tenant, TenantUsageMetric
+
+        # Drop counters for tenants deleted since they were recorded, otherwise
+        # the batch would fail its foreign key check on every retry
+        live_tenants = set(Tenant.objects.filter(
+            pk__in={key[0] for key in batch}
+        ).values_list('pk', flat=True))
+        batch = {key: value for key, value in batch.items() if key[0] in live_tenants}
+
+        for attempt in range(2):
+            existing = self._existing_buckets(batch)
+            to_update = {existing[key]: value for key, value in batch.items() if key in existing}
+            to_create = [key for key in batch if key not in existing]
+
+            try:
+                with transaction.atomic():
+                    if to_update:
+                        TenantUsageMetric.objects.filter(pk__in=to_update.keys()).update(
+                            value=F('value') + Case(
+                                *[When(pk=pk, then=Value(delta)) for pk, delta in to_update.items()],
+                                default=Value(0.0),
+                                output_field=FloatField(),
+                            )
+                        )
+                    if to_create:
+                        TenantUsageMetric.objects.bulk_create([
+                            TenantUsageMetric(
+                                tenant_id=tenant_id,
+                                metric_type=metric_type,
+                                unit=unit,
+                                value=batch[(tenant_id, metric_type, unit, bucket_start)],
+                                timestamp=bucket_start,
+                                bucket_start=bucket_start,
+                                period_start=bucket_start,
+                                period_end=self.bucket_bounds(bucket_start)[1],
+                            )
+                            for tenant_id, metric_type, unit, bucket_start in to_create
+                        ])
+                break
+            except IntegrityError:
+                # Another worker created one of our buckets first; the retry
+                # picks it up as an existing row and increments it instead.
+                if attempt:
+                    raise
+
+        from .usage_limits import apply_usage
+        for (tenant_id, metric_type, _, _), value in batch.items():
+            apply_usage(tenant_id, metric_type, value)
+
+    def _existing_buckets(self, batch: Dict[BucketKey, float]) -> Dict[BucketKey, int]:
+        from .models import TenantUsageMetric
+
+        rows = TenantUsageMetric.objects.filter(
+            tenant_id__in={key[0] for key in batch},
+            metric_type__in={key[1] for key in batch},
+            bucket_start__in={key[3] for key in batch},
+        ).values_list('pk', 'tenant_id', 'metric_type', 'unit', 'bucket_start')
+
+        return {
+            (tenant_id, metric_type, unit, bucket_start): pk
+            for pk, tenant_id, metric_type, unit, bucket_start in rows
+        }
+
+
+usage_meter = UsageMeter()
+atexit.register(usage_meter.flush)
@@ -8,6 +8,8 @@ from django.template.response import TemplateResponse
 from tenants.models import Tenant
 from core.models import User
 from audit_logs.models import AuditLog
+from core.audit_pipeline import audit_pipeline
+from core.request_cache import get_request_tenant
 import logging
 
 
@@ -240,8 +242,8 @@ class CrossTenantAccessLoggingMiddleware(MiddlewareMixin):
         Log a cross-tenant access attempt if the user's tenant doesn't match the resource's tenant.
         """
         if user_tenant and resource_tenant and user_tenant.id != resource_tenant.id:
-            # Cross-tenant access detected - log it
-            AuditLog.objects.create(
+            # Cross-tenant access detected - queue it for the audit pipeline
+            audit_pipeline.submit(AuditLog(
                 tenant=user_tenant,  # Log under the user's tenant
                 user=request.user,
                 action='authorization',
@@ -262,7 +264,7 @@ class CrossTenantAccessLoggingMiddleware(MiddlewareMixin):
                     'path': request.path,
                 },
                 severity='critical'
-            )
+            ))
             
             # Also log to the tenant data isolation violations
             from tenants.models import TenantDataIsolationViolation, TenantDataIsolationAudit
@@ -278,8 +280,8 @@ class CrossTenantAccessLoggingMiddleware(MiddlewareMixin):
                 }
             )
             
-            # Create a violation record
-            TenantDataIsolationViolation.objects.create(
+            # Queue a violation record
+            audit_pipeline.submit(TenantDataIsolationViolation(
                 audit=audit,
                 model_name=type(resource_obj).__name__,
                 record_id=resource_obj.pk if hasattr(resource_obj, 'pk') else 0,
@@ -290,7 +292,7 @@ class CrossTenantAccessLoggingMiddleware(MiddlewareMixin):
                 severity='critical',
                 description=f'User {request.user.email} attempted to access {type(resource_obj).__name__} belonging to tenant {resource_tenant.id} from tenant {user_tenant.id}',
                 resolution_status='open'
-            )
+            ))
             
             logger.warning(
                 f"Cross-tenant access detected: user {request.user.email} (tenant {user_tenant.id}) "
@@ -320,7 +322,8 @@ logger = logging.getLogger(__name__)
 class UsageTrackingMiddleware(MiddlewareMixin):
     """
     Middleware to track tenant usage metrics throughout the request lifecycle.
-    This middleware records various usage metrics for each tenant.
+    This middleware records various usage metrics for each tenant. Counters are
+    buffered by the usage meter (tenants.metering) rather than inserted per request.
     """
     
     def __init__(self, get_response):
@@ -355,13 +358,8 @@ class UsageTrackingMiddleware(MiddlewareMixin):
         This is where we'll track usage metrics for the tenant.
         """
         # Check if the user is authenticated and has a tenant
-        if (hasattr(request, 'user') and 
-            request.user.is_authenticated and 
-            hasattr(request.user, 'tenant') and 
-            request.user.tenant):
-            
-            tenant = request.user.tenant
-            
+        tenant = get_request_tenant(request)
+        if tenant:
             # Track API request count
             try:
                 # Track the request for this tenant
@@ -428,13 +426,8 @@ class OverageCheckMiddleware(MiddlewareMixin):
         Check if the tenant has exceeded usage limits.
         """
         # Check if the user is authenticated and has a tenant
-        if (hasattr(request, 'user') and 
-            request.user.is_authenticated and 
-            hasattr(request.user, 'tenant') and 
-            request.user.tenant):
-            
-            tenant = request.user.tenant
-            
+        tenant = get_request_tenant(request)
+        if tenant:
             try:
                 # Check if tenant has exceeded usage limits
                 if tenant.is_archived:
@@ -450,8 +443,9 @@ class OverageCheckMiddleware(MiddlewareMixin):
                         "This account has been suspended. Please contact support."
                     )
                 
-                # Check usage limits
-                usage_status = tenant.check_usage_limits()
+                # Check usage limits against the cached snapshot
+                from tenants.usage_limits import get_limit_status
+                usage_status = get_limit_status(tenant)
                 
                 # If there are critical overages, restrict access
                 if usage_status.get('has_critical_overage', False):
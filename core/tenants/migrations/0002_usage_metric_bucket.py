@@ -0,0 +1,22 @@
+# Generated by Django 5.2.18 on 2026-10-16 20:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tenants', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tenantusagemetric',
+            name='bucket_start',
+            field=models.DateTimeField(blank=True, help_text='Start of the aggregation bucket for metered usage; empty for individually recorded metrics', null=True),
+        ),
+        migrations.AddConstraint(
+            model_name='tenantusagemetric',
+            constraint=models.UniqueConstraint(fields=('tenant', 'metric_type', 'unit', 'bucket_start'), name='unique_tenant_usage_bucket'),
+        ),
+    ]
@@ -925,6 +925,11 @@ class TenantUsageMetric(models.Model):
     timestamp = models.DateTimeField(default=timezone.now)
     period_start = models.DateTimeField()
     period_end = models.DateTimeField()
+    bucket_start = models.DateTimeField(
+        null=True, 
+        blank=True, 
+        help_text="Start of the aggregation bucket for metered usage; empty for individually recorded metrics"
+    )
     
     class Meta:
         verbose_name = "Tenant Usage Metric"
@@ -933,6 +938,12 @@ class TenantUsageMetric(models.Model):
         indexes = [
             models.Index(fields=['tenant', 'metric_type', 'timestamp']),
         ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['tenant', 'metric_type', 'unit', 'bucket_start'],
+                name='unique_tenant_usage_bucket'
+            ),
+        ]
     
     def __str__(self):
         return f"{self.metric_type} for {self.tenant.name}: {self.value}{self.unit}"
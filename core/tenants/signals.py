@@ -0,0 +1,19 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from billing.models import Plan
+from .models import Tenant
+from .usage_limits import invalidate_limit_status
+
+
+@receiver(post_save, sender=Tenant)
+@receiver(post_delete, sender=Tenant)
+def invalidate_tenant_limit_status(sender, instance, **kwargs):
+    """Rebuild the usage-limit snapshot after plan or limit changes"""
+    invalidate_limit_status([instance.pk])
+
+
+@receiver(post_save, sender=Plan)
+def invalidate_plan_limit_status(sender, instance, created, **kwargs):
+    """Plan edits can change limits for every tenant on the plan"""
+    if not created:
+        invalidate_limit_status(instance.tenants.values_list('pk', flat=True))
@@ -0,0 +1,62 @@
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from tenants.models import Tenant
+from tenants.metering import UsageMeter
+from tenants.usage_limits import get_limit_status
+
+
+@override_settings(USAGE_METER_FLUSH_INTERVAL=3600)
+class UsageLimitSnapshotTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.tenant = Tenant.objects.create(
+            name='Limited Co', slug='limited-co', user_limit=10, api_call_limit=100
+        )
+
+    def _record_period_usage(self, metric_type, value):
+        now = timezone.now()
+        self.tenant.track_usage(
+            metric_type, value=value,
+            period_start=now - timezone.timedelta(hours=1), period_end=now
+        )
+
+    def test_status_matches_uncached_check(self):
+        self._record_period_usage('users_total', 9)
+        self.assertEqual(get_limit_status(self.tenant), self.tenant.check_usage_limits())
+
+    def test_snapshot_is_served_from_cache(self):
+        get_limit_status(self.tenant)
+        with self.assertNumQueries(0):
+            status = get_limit_status(self.tenant)
+        self.assertFalse(status['has_critical_overage'])
+
+    def test_recorded_usage_updates_snapshot_incrementally(self):
+        get_limit_status(self.tenant)
+        self._record_period_usage('users_total', 8)
+
+        with self.assertNumQueries(0):
+            status = get_limit_status(self.tenant)
+        self.assertTrue(status['approaching_limit'])
+        self.assertEqual(status['warnings'][0]['metric'], 'users_total')
+
+    def test_metered_usage_updates_snapshot_on_flush(self):
+        get_limit_status(self.tenant)
+        meter = UsageMeter()
+        meter.record(self.tenant, 'api_calls', value=100)
+        self.assertFalse(get_limit_status(self.tenant)['has_critical_overage'])
+
+        meter.flush()
+        status = get_limit_status(self.tenant)
+        self.assertTrue(status['has_critical_overage'])
+        self.assertEqual(status['overage_type'], 'api_calls')
+
+    def test_limit_change_invalidates_snapshot(self):
+        self._record_period_usage('users_total', 5)
+        self.assertFalse(get_limit_status(self.tenant)['has_critical_overage'])
+
+        self.tenant.user_limit = 5
+        self.tenant.save()
+        status = get_limit_status(self.tenant)
+        self.assertTrue(status['has_critical_overage'])
+        self.assertEqual(status['overage_type'], 'user_count')
@@ -0,0 +1,63 @@
+from django.test import TestCase, override_settings
+from tenants.models import Tenant, TenantUsageMetric
+from tenants.metering import UsageMeter, usage_meter
+from tenants.utils import track_usage
+
+
+@override_settings(USAGE_METER_FLUSH_INTERVAL=3600, USAGE_METER_MAX_PENDING=1000)
+class UsageMeterTest(TestCase):
+    def setUp(self):
+        self.tenant = Tenant.objects.create(name='Metered Co', slug='metered-co')
+        usage_meter.flush()
+        TenantUsageMetric.objects.all().delete()
+        self.meter = UsageMeter()
+
+    def test_record_is_buffered_until_flush(self):
+        self.meter.record(self.tenant, 'api_requests', value=1, unit='requests')
+        self.meter.record(self.tenant, 'api_requests', value=2, unit='requests')
+
+        self.assertEqual(TenantUsageMetric.objects.count(), 0)
+        self.assertEqual(self.meter.pending(self.tenant.id, 'api_requests'), 3)
+
+        self.assertEqual(self.meter.flush(), 1)
+        metric = TenantUsageMetric.objects.get()
+        self.assertEqual(metric.value, 3)
+        self.assertEqual(metric.unit, 'requests')
+        self.assertIsNotNone(metric.bucket_start)
+        self.assertEqual(self.meter.pending(self.tenant.id, 'api_requests'), 0)
+
+    def test_flush_increments_existing_bucket(self):
+        self.meter.record(self.tenant, 'api_requests', value=1, unit='requests')
+        self.meter.flush()
+        self.meter.record(self.tenant, 'api_requests', value=4, unit='requests')
+        self.meter.record(self.tenant, 'read_operations', value=1, unit='operations')
+        self.meter.flush()
+
+        self.assertEqual(TenantUsageMetric.objects.count(), 2)
+        self.assertEqual(
+            TenantUsageMetric.objects.get(metric_type='api_requests').value, 5
+        )
+
+    def test_flush_on_max_pending(self):
+        with override_settings(USAGE_METER_MAX_PENDING=2):
+            self.meter.record(self.tenant, 'api_requests')
+            self.assertEqual(TenantUsageMetric.objects.count(), 0)
+            self.meter.record(self.tenant, 'write_operations')
+        self.assertEqual(TenantUsageMetric.objects.count(), 2)
+
+    def test_track_usage_without_period_is_metered(self):
+        self.assertIsNone(track_usage(self.tenant, 'view_access', unit='views'))
+        self.assertEqual(TenantUsageMetric.objects.count(), 0)
+
+        usage_meter.flush()
+        self.assertEqual(TenantUsageMetric.objects.get().metric_type, 'view_access')
+
+    def test_track_usage_with_period_writes_through(self):
+        from django.utils import timezone
+        now = timezone.now()
+        metric = track_usage(
+            self.tenant, 'storage_used_mb', value=10, unit='MB',
+            period_start=now - timezone.timedelta(hours=1), period_end=now
+        )
+        self.assertIsNotNone(metric.pk)
+        self.assertIsNone(metric.bucket_start)
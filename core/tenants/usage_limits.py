@@ -0,0 +1,84 @@
+"""
+Cached Tenant Usage-Limit Snapshots
+
+Keeps a precomputed "limit status" per tenant so OverageCheckMiddleware can
+answer in O(1) instead of summing TenantUsageMetric rows on every request:
+- Snapshots hold the limits, the rolling usage totals and the evaluated status
+- Recorded usage is applied to a live snapshot incrementally
+- Snapshots expire after USAGE_LIMIT_CACHE_TTL seconds and are invalidated
+  explicitly when a tenant's plan or limits change
+"""
+import logging
+from typing import Dict, Any, Iterable
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .utils import (
+    USAGE_LIMIT_CHECKS, evaluate_usage_limits, get_current_usage, get_usage_limits,
+)
+
+logger = logging.getLogger(__name__)
+
+CACHE_PREFIX = 'tenant_limits:'
+LIMITED_METRICS = {metric_type for metric_type, _, _, _, _ in USAGE_LIMIT_CHECKS}
+
+
+def _cache_key(tenant_id) -> str:
+    return f"{CACHE_PREFIX}{tenant_id}"
+
+
+def _cache_ttl() -> int:
+    return getattr(settings, 'USAGE_LIMIT_CACHE_TTL', 60)
+
+
+def build_limit_snapshot(tenant) -> Dict[str, Any]:
+    """Compute a fresh snapshot for a tenant from the database."""
+    limits = get_usage_limits(tenant)
+    usage = {metric_type: get_current_usage(tenant, metric_type) for metric_type in LIMITED_METRICS}
+    return {
+        'limits': limits,
+        'usage': usage,
+        'status': evaluate_usage_limits(limits, usage),
+    }
+
+
+def get_limit_status(tenant) -> Dict[str, Any]:
+    """
+    Get the usage-limit status for a tenant.
+
+    Returns the same structure as Tenant.check_usage_limits(), served from
+    the cached snapshot when one is available.
+    """
+    key = _cache_key(tenant.pk)
+    snapshot = cache.get(key)
+    if snapshot is None:
+        snapshot = build_limit_snapshot(tenant)
+        cache.set(key, snapshot, _cache_ttl())
+    return snapshot['status']
+
+
+def apply_usage(tenant_id, metric_type: str, delta: float) -> None:
+    """
+    Fold newly recorded usage into a tenant's cached snapshot.
+
+    Does nothing when no snapshot is cached; the next read rebuilds it.
+    """
+    if metric_type not in LIMITED_METRICS or not delta:
+        return
+
+    key = _cache_key(tenant_id)
+    snapshot = cache.get(key)
+    if snapshot is None:
+        return
+
+    snapshot['usage'][metric_type] = snapshot['usage'].get(metric_type, 0) + delta
+    snapshot['status'] = evaluate_usage_limits(snapshot['limits'], snapshot['usage'])
+    cache.set(key, snapshot, _cache_ttl())
+
+
+def invalidate_limit_status(tenant_ids: Iterable) -> None:
+    """Drop cached snapshots so they are rebuilt on the next request."""
+    keys = [_cache_key(tenant_id) for tenant_id in tenant_ids]
+    if keys:
+        cache.delete_many(keys)
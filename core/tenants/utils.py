@@ -6,7 +6,16 @@ import datetime
 def track_usage(tenant, metric_type, value=1, unit='', period_start=None, period_end=None):
     """
     Track usage for a tenant
+
+    Counters without an explicit period are buffered by the usage meter and
+    written behind into per-bucket rows, so nothing is returned for them.
+    Metrics recorded for an explicit period are stored immediately.
     """
+    if period_start is None and period_end is None:
+        from .metering import usage_meter
+        usage_meter.record(tenant, metric_type, value=value, unit=unit)
+        return None
+
     if period_start is None:
         period_start = timezone.now() - timezone.timedelta(days=1)
     if period_end is None:
@@ -20,6 +29,9 @@ def track_usage(tenant, metric_type, value=1, unit='', period_start=None, period
         period_start=period_start,
         period_end=period_end
     )
+
+    from .usage_limits import apply_usage
+    apply_usage(tenant.pk, metric_type, value)
     return metric
 
 def get_current_usage(tenant, metric_type, period_start=None, period_end=None):
@@ -31,14 +43,14 @@ def get_current_usage(tenant, metric_type, period_start=None, period_end=None):
     if period_end is None:
         period_end = timezone.now()
     
-    metrics = TenantUsageMetric.objects.filter(
+    total = TenantUsageMetric.objects.filter(
         tenant=tenant,
         metric_type=metric_type,
         timestamp__gte=period_start,
         timestamp__lte=period_end
-    )
+    ).aggregate(total=Sum('value'))['total']
     
-    return sum([m.value for m in metrics])
+    return total or 0
 
 def get_usage_trend(tenant, metric_type, days=30):
     """
@@ -64,9 +76,28 @@ def get_usage_trend(tenant, metric_type, days=30):
     
     return {'dates': dates, 'values': values}
 
-def check_usage_limits(tenant):
+# (metric_type, tenant limit field, overage_type, label, unit suffix)
+USAGE_LIMIT_CHECKS = [
+    ('users_total', 'user_limit', 'user_count', 'User limit', ''),
+    ('storage_used_mb', 'storage_limit_mb', 'storage', 'Storage limit', ' MB'),
+    ('api_calls', 'api_call_limit', 'api_calls', 'API call limit', ''),
+]
+
+def get_usage_limits(tenant):
     """
-    Check if tenant is approaching or exceeding usage limits
+    Get the configured usage limits for a tenant, keyed by metric type
+    """
+    return {
+        metric_type: getattr(tenant, limit_field)
+        for metric_type, limit_field, _, _, _ in USAGE_LIMIT_CHECKS
+    }
+
+def evaluate_usage_limits(limits, usage):
+    """
+    Evaluate current usage against limits without touching the database.
+    
+    Both arguments are dicts keyed by metric type; the result has the same
+    shape as check_usage_limits().
     """
     alerts = []
     warnings = []
@@ -74,82 +105,31 @@ def check_usage_limits(tenant):
     overage_type = None
     approaching_limit = False
 
-    # Check user limit
-    current_users = get_current_usage(tenant, 'users_total')
-    if tenant.user_limit > 0:
-        user_percentage = (current_users / tenant.user_limit) * 100
-        if user_percentage >= 100:
-            has_critical_overage = True
-            overage_type = 'user_count'
-            alerts.append({
-                'type': 'danger',
-                'message': f'User limit exceeded ({current_users}/{tenant.user_limit})',
-                'metric': 'users_total'
-            })
-        elif user_percentage >= 80:
-            approaching_limit = True
-            alerts.append({
-                'type': 'warning' if user_percentage < 100 else 'danger',
-                'message': f'User limit approaching ({current_users}/{tenant.user_limit})',
-                'metric': 'users_total'
-            })
-            warnings.append({
-                'type': 'warning',
-                'message': f'User limit approaching ({current_users}/{tenant.user_limit})',
-                'metric': 'users_total'
-            })
+    for metric_type, _, metric_overage_type, label, suffix in USAGE_LIMIT_CHECKS:
+        limit = limits.get(metric_type, 0)
+        current = usage.get(metric_type, 0)
+        if limit <= 0:
+            continue
 
-    # Check storage limit
-    current_storage = get_current_usage(tenant, 'storage_used_mb')
-    if tenant.storage_limit_mb > 0:
-        storage_percentage = (current_storage / tenant.storage_limit_mb) * 100
-        if storage_percentage >= 100:
+        percentage = (current / limit) * 100
+        if percentage >= 100:
             has_critical_overage = True
             if overage_type is None:
-                overage_type = 'storage'
+                overage_type = metric_overage_type
             alerts.append({
                 'type': 'danger',
-                'message': f'Storage limit exceeded ({current_storage}/{tenant.storage_limit_mb} MB)',
-                'metric': 'storage_used_mb'
+                'message': f'{label} exceeded ({current}/{limit}{suffix})',
+                'metric': metric_type
             })
-        elif storage_percentage >= 80:
+        elif percentage >= 80:
             approaching_limit = True
-            alerts.append({
-                'type': 'warning' if storage_percentage < 100 else 'danger',
-                'message': f'Storage limit approaching ({current_storage}/{tenant.storage_limit_mb} MB)',
-                'metric': 'storage_used_mb'
-            })
-            warnings.append({
+            alert = {
                 'type': 'warning',
-                'message': f'Storage limit approaching ({current_storage}/{tenant.storage_limit_mb} MB)',
-                'metric': 'storage_used_mb'
-            })
-
-    # Check API call limit
-    current_api_calls = get_current_usage(tenant, 'api_calls')
-    if tenant.api_call_limit > 0:
-        api_percentage = (current_api_calls / tenant.api_call_limit) * 100
-        if api_percentage >= 100:
-            has_critical_overage = True
-            if overage_type is None:
-                overage_type = 'api_calls'
-            alerts.append({
-                'type': 'danger',
-                'message': f'API call limit exceeded ({current_api_calls}/{tenant.api_call_limit})',
-                'metric': 'api_calls'
-            })
-        elif api_percentage >= 80:
-            approaching_limit = True
-            alerts.append({
-                'type': 'warning' if api_percentage < 100 else 'danger',
-                'message': f'API call limit approaching ({current_api_calls}/{tenant.api_call_limit})',
-                'metric': 'api_calls'
-            })
-            warnings.append({
-                'type': 'warning',
-                'message': f'API call limit approaching ({current_api_calls}/{tenant.api_call_limit})',
-                'metric': 'api_calls'
-            })
+                'message': f'{label} approaching ({current}/{limit}{suffix})',
+                'metric': metric_type
+            }
+            alerts.append(alert)
+            warnings.append(dict(alert))
 
     # Return a structured dictionary that matches what the middleware expects
     return {
@@ -160,6 +140,16 @@ def check_usage_limits(tenant):
         'approaching_limit': approaching_limit
     }
 
+def check_usage_limits(tenant):
+    """
+    Check if tenant is approaching or exceeding usage limits
+    """
+    usage = {
+        metric_type: get_current_usage(tenant, metric_type)
+        for metric_type, _, _, _, _ in USAGE_LIMIT_CHECKS
+    }
+    return evaluate_usage_limits(get_usage_limits(tenant), usage)
+
 def generate_usage_report(tenant, metric_type, start_date, end_date, include_trend=False, include_comparison=False):
     """
     Generate a usage report for a specific metric type and time period